@@ -1,6 +1,36 @@
+"""
+Importação do histórico de honorários a partir de CSV (separador ";").
+
+Layout: colunas Cliente, Data e Valor, seguidas de uma coluna por sócio
+(cabeçalho = nome do sócio) com o percentual daquele sócio na entrada:
+
+    Cliente;Data;Valor;Ana;Bruno
+    Empresa X;05/01/2024;R$ 1.500,00;50%;50%
+
+O arquivo é lido linha a linha (nada é carregado inteiro em memória) e cada
+linha é validada; as linhas válidas viram Entrada + EntradaSocio + o
+lançamento de receita (o de crud_plano_contas.lancar_entrada_honorarios,
+debitando a conta analítica de caixa: D Caixa Corrente 1.1.1.1 / C Receita
+4.1.1) por inserts em lote, tudo numa única transação. Sócios e clientes
+são resolvidos por nome a partir de mapas carregados uma vez.
+"""
+import codecs
 import csv
 import datetime
-from typing import List, Dict, Tuple, Optional
+import functools
+import io
+import unicodedata
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database import models
+
+TAMANHO_LOTE = 1000  # entradas por insert em lote
+LIMITE_ERROS = 500  # erros detalhados no relatório (os demais só são contados)
+AMOSTRA_CODIFICACAO = 64 * 1024  # bytes lidos para decidir entre UTF-8 e Latin-1
 
 
 def _parse_valor_brl_to_centavos(s: str) -> Optional[int]:
@@ -9,22 +39,49 @@ def _parse_valor_brl_to_centavos(s: str) -> Optional[int]:
     s = s.strip().replace("R$", "").replace(" ", "")
     s = s.replace(".", "").replace(",", ".")
     try:
-        v = float(s)
-        return int(round(v * 100))
-    except Exception:
+        v = Decimal(s)
+    except InvalidOperation:
         return None
+    if not v.is_finite():
+        return None
+    return int((v * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
 
 
-def _parse_percent_to_mil(s: str) -> Optional[int]:
+def _parse_percentual(s: str) -> Optional[Decimal]:
+    """'50%', '33,33' → Decimal na escala 0–100 (None se vazio ou inválido)"""
     if not s:
         return None
-    s = s.strip().replace("%", "")
-    s = s.replace(",", ".")
+    s = s.strip().replace("%", "").replace(" ", "").replace(",", ".")
     try:
-        v = float(s)
-        return int(round(v * 10))  # 50% => 500 milésimos
-    except Exception:
+        v = Decimal(s)
+    except InvalidOperation:
         return None
+    return v if v.is_finite() else None
+
+
+def _parse_percent_to_mil(s: str) -> Optional[int]:
+    v = _parse_percentual(s)
+    return None if v is None else int(round(v * 10))  # 50% => 500 milésimos
+
+
+@functools.lru_cache(maxsize=8192)  # datas e nomes se repetem muito num histórico
+def _parse_data(s: str) -> Optional[datetime.date]:
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+@functools.lru_cache(maxsize=8192)
+def _normalizar_nome(nome: str) -> str:
+    """Chave de comparação de nomes: sem acentos, minúsculas e espaços simples"""
+    sem_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", nome or "")
+        if not unicodedata.combining(c)
+    )
+    return " ".join(sem_acentos.casefold().split())
 
 
 def detectar_colunas(csv_header: List[str]) -> Tuple[int, int, int, List[int]]:
@@ -36,57 +93,254 @@ def detectar_colunas(csv_header: List[str]) -> Tuple[int, int, int, List[int]]:
     return cliente_idx, data_idx, valor_idx, socio_idxs
 
 
-def carregar_csv_contabilidade(filepath: str) -> List[Dict]:
-    rows: List[List[str]] = []
-    for encoding in ["latin-1", "utf-8-sig"]:
-        try:
-            with open(filepath, "r", encoding=encoding, newline="") as f:
-                reader = csv.reader(f, delimiter=";")
-                rows = list(reader)
-            break
-        except Exception:
-            continue
+# ===== LEITURA =====
+
+def abrir_texto_csv(arquivo: BinaryIO) -> TextIO:
+    """
+    Envolve o arquivo binário num leitor de texto. A codificação é decidida
+    por uma amostra do início: UTF-8 (com ou sem BOM) se ela decodificar,
+    senão Latin-1 (planilhas exportadas pelo Excel no Windows).
+    """
+    buffer = arquivo if hasattr(arquivo, "peek") else io.BufferedReader(arquivo)
+    amostra = buffer.peek(AMOSTRA_CODIFICACAO)[:AMOSTRA_CODIFICACAO]
+    try:
+        # final=False: um caractere multibyte cortado no fim da amostra não é erro
+        codecs.getincrementaldecoder("utf-8")().decode(amostra, final=False)
+        codificacao = "utf-8-sig"
+    except UnicodeDecodeError:
+        codificacao = "latin-1"
+    return io.TextIOWrapper(buffer, encoding=codificacao, newline="")
 
-    if not rows:
-        return []
 
-    header = rows[0]
+def iterar_csv_contabilidade(texto: TextIO) -> Iterator[Tuple[int, Dict]]:
+    """
+    Percorre o CSV linha a linha. Produz (número da linha, dados brutos);
+    linhas em branco são puladas. Os valores não são validados aqui.
+    """
+    leitor = csv.reader(texto, delimiter=";")
+    header = next(leitor, None)
+    if not header:
+        return
     cliente_idx, data_idx, valor_idx, socio_idxs = detectar_colunas(header)
+    if min(cliente_idx, data_idx, valor_idx) < 0:
+        raise ValueError("Cabeçalho inválido: são necessárias as colunas Cliente, Data e Valor")
+    socios = [(i, header[i].strip()) for i in socio_idxs]
 
-    entries: List[Dict] = []
-    for row in rows[1:]:
-        if all((c is None or str(c).strip() == "") for c in row):
+    for row in leitor:
+        if all(c.strip() == "" for c in row):
             continue
-        cliente_nome = row[cliente_idx].strip() if 0 <= cliente_idx < len(row) else None
-        data_str = row[data_idx].strip() if 0 <= data_idx < len(row) else None
-        valor_str = row[valor_idx].strip() if 0 <= valor_idx < len(row) else None
-
-        data_dt = None
-        if data_str:
-            for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
-                try:
-                    data_dt = datetime.datetime.strptime(data_str, fmt).date()
-                    break
-                except Exception:
-                    continue
-
-        valor_centavos = _parse_valor_brl_to_centavos(valor_str)
-
-        participacoes: List[Dict] = []
-        for i in socio_idxs:
-            nome_coluna = header[i].strip()
-            if not nome_coluna:
+        campo = lambda i: row[i].strip() if 0 <= i < len(row) else ""
+        yield leitor.line_num, {
+            "cliente": campo(cliente_idx),
+            "data": campo(data_idx),
+            "valor": campo(valor_idx),
+            "participacoes": [(nome, campo(i)) for i, nome in socios if campo(i)],
+        }
+
+
+def carregar_csv_contabilidade(filepath: str) -> List[Dict]:
+    with open(filepath, "rb") as f:
+        texto = abrir_texto_csv(f)
+        entries: List[Dict] = []
+        for _, bruto in iterar_csv_contabilidade(texto):
+            participacoes = []
+            for nome, pct in bruto["participacoes"]:
+                pct_mil = _parse_percent_to_mil(pct)
+                if pct_mil is not None:
+                    participacoes.append({"socio_nome": nome, "percentual_mil": pct_mil})
+            entries.append({
+                "cliente_nome": bruto["cliente"] or None,
+                "data": _parse_data(bruto["data"]),
+                "valor_centavos": _parse_valor_brl_to_centavos(bruto["valor"]),
+                "participacoes": participacoes,
+            })
+        return entries
+
+
+def _validar_linha(bruto: Dict, socios: Dict[str, int]) -> Tuple[Optional[Dict], List[str]]:
+    """Converte e valida uma linha. Retorna (linha pronta para inserir, erros)"""
+    erros: List[str] = []
+    if not bruto["cliente"]:
+        erros.append("Cliente vazio")
+
+    data = _parse_data(bruto["data"])
+    if data is None:
+        erros.append(f"Data inválida: '{bruto['data']}' (use DD/MM/AAAA)")
+
+    centavos = _parse_valor_brl_to_centavos(bruto["valor"])
+    if centavos is None:
+        erros.append(f"Valor inválido: '{bruto['valor']}'")
+    elif centavos <= 0:
+        erros.append("Valor deve ser maior que zero")
+
+    participacoes: Dict[int, float] = {}
+    total = Decimal(0)
+    for nome, texto in bruto["participacoes"]:
+        percentual = _parse_percentual(texto)
+        socio_id = socios.get(_normalizar_nome(nome))
+        if percentual is None:
+            erros.append(f"Percentual inválido para {nome}: '{texto}'")
+        elif not 0 <= percentual <= 100:
+            erros.append(f"Percentual de {nome} fora de 0–100: {texto}")
+        elif socio_id is None:
+            erros.append(f"Sócio não cadastrado: {nome}")
+        elif percentual > 0:
+            participacoes[socio_id] = float(percentual)
+            total += percentual
+    if participacoes and abs(total - 100) > Decimal("0.01"):
+        erros.append(f"Soma dos percentuais deve ser 100% (encontrado {total}%)")
+
+    if erros:
+        return None, erros
+    return {
+        "cliente": bruto["cliente"],
+        "data": data,
+        "valor_centavos": centavos,
+        "participacoes": participacoes,
+    }, []
+
+
+# ===== IMPORTAÇÃO =====
+
+def _mapa_clientes(db: Session) -> Dict[str, Optional[int]]:
+    """Nome normalizado → id do cliente (None quando o nome é ambíguo)"""
+    mapa: Dict[str, Optional[int]] = {}
+    for cliente_id, nome in db.query(models.Cliente.id, models.Cliente.nome):
+        chave = _normalizar_nome(nome)
+        mapa[chave] = None if chave in mapa else cliente_id
+    return mapa
+
+
+def _inserir_lote(db: Session, lote: List[Dict], contas: Tuple[int, int]) -> None:
+    """Insere as entradas do lote com seus sócios e lançamentos de receita"""
+    from utils.dinheiro import para_reais
+
+    # Core (tabelas) e não ORM: sem eventos de mapper nem @validates, por isso
+    # valor_centavos e atualizado_em vão explícitos
+    agora = datetime.datetime.utcnow()
+    entradas = models.Entrada.__table__
+    ids = db.execute(
+        insert(entradas).returning(entradas.c.id, sort_by_parameter_order=True),
+        [{
+            "cliente": linha["cliente"],
+            "cliente_id": linha["cliente_id"],
+            "data": linha["data"],
+            "valor": para_reais(linha["valor_centavos"]),
+            "valor_centavos": linha["valor_centavos"],
+            "atualizado_em": agora,
+        } for linha in lote],
+    ).scalars().all()
+
+    socios = [
+        {"entrada_id": entrada_id, "socio_id": socio_id, "percentual": percentual}
+        for entrada_id, linha in zip(ids, lote)
+        for socio_id, percentual in linha["participacoes"].items()
+    ]
+    if socios:
+        db.execute(insert(models.EntradaSocio.__table__), socios)
+
+    conta_caixa_id, conta_receita_id = contas
+    db.execute(insert(models.LancamentoContabil.__table__), [{
+        "data": linha["data"],
+        "conta_debito_id": conta_caixa_id,
+        "conta_credito_id": conta_receita_id,
+        "valor": para_reais(linha["valor_centavos"]),
+        "valor_centavos": linha["valor_centavos"],
+        "historico": f"Recebimento de honorários - {linha['cliente']}",
+        "automatico": True,
+        "editavel": False,
+        "entrada_id": entrada_id,
+        "tipo_lancamento": "efetivo",
+        "referencia_mes": linha["data"].strftime("%Y-%m"),
+        "criado_em": agora,
+        "atualizado_em": agora,
+    } for entrada_id, linha in zip(ids, lote)])
+
+
+def importar_honorarios_csv(
+    db: Session,
+    arquivo: BinaryIO,
+    dry_run: bool = False,
+    ignorar_invalidas: bool = False,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> Dict:
+    """
+    Importa o CSV de honorários numa única transação.
+
+    Linhas idênticas a entradas já cadastradas (mesma data, cliente e valor)
+    são puladas, para que reimportar o mesmo arquivo não duplique o histórico.
+    Com erros de validação nada é gravado, a menos que ignorar_invalidas seja
+    True (as linhas válidas são importadas e as inválidas só relatadas).
+    Em dry_run o arquivo é validado por inteiro e a transação é desfeita.
+    """
+    from database import crud_plano_contas, crud_resumo_mensal, eventos
+
+    socios = {_normalizar_nome(nome): socio_id
+              for socio_id, nome in db.query(models.Socio.id, models.Socio.nome)}
+    clientes = _mapa_clientes(db)
+    existentes = {
+        (data, _normalizar_nome(cliente), centavos)
+        for data, cliente, centavos in db.query(
+            models.Entrada.data, models.Entrada.cliente, models.Entrada.valor_centavos
+        )
+    }
+    conta_caixa = crud_plano_contas.buscar_conta_por_codigo(db, "1.1.1.1")
+    conta_receita = crud_plano_contas.buscar_conta_por_codigo(db, "4.1.1")
+    if not conta_caixa or not conta_receita:
+        raise ValueError("Contas de Caixa ou Receita não encontradas no plano de contas")
+    contas = (conta_caixa.id, conta_receita.id)
+
+    resultado = {
+        "linhas": 0,
+        "validas": 0,
+        "importadas": 0,
+        "duplicadas": 0,
+        "invalidas": 0,
+        "erros": [],
+        "meses": [],
+        "dry_run": dry_run,
+    }
+    datas = set()
+    lote: List[Dict] = []
+    try:
+        for numero, bruto in iterar_csv_contabilidade(abrir_texto_csv(arquivo)):
+            resultado["linhas"] += 1
+            linha, erros = _validar_linha(bruto, socios)
+            if erros:
+                resultado["invalidas"] += 1
+                if len(resultado["erros"]) < LIMITE_ERROS:
+                    resultado["erros"].append({"linha": numero, "erros": erros})
                 continue
-            pct_str = row[i].strip() if i < len(row) else ""
-            pct_mil = _parse_percent_to_mil(pct_str)
-            if pct_mil is None:
+            resultado["validas"] += 1
+            chave = (linha["data"], _normalizar_nome(linha["cliente"]), linha["valor_centavos"])
+            if chave in existentes:
+                resultado["duplicadas"] += 1
                 continue
-            participacoes.append({"socio_nome": nome_coluna, "percentual_mil": pct_mil})
-
-        entries.append({
-            "cliente_nome": cliente_nome,
-            "data": data_dt,
-            "valor_centavos": valor_centavos,
-            "participacoes": participacoes
-        })
-    return entries
+            linha["cliente_id"] = clientes.get(_normalizar_nome(linha["cliente"]))
+            datas.add(linha["data"])
+            lote.append(linha)
+            if len(lote) >= tamanho_lote:
+                # Com erros já encontrados a transação não será gravada: só valida o resto
+                if not dry_run and (ignorar_invalidas or not resultado["invalidas"]):
+                    _inserir_lote(db, lote, contas)
+                resultado["importadas"] += len(lote)
+                lote = []
+        if lote and not dry_run and (ignorar_invalidas or not resultado["invalidas"]):
+            _inserir_lote(db, lote, contas)
+        resultado["importadas"] += len(lote)
+
+        gravar = not dry_run and (ignorar_invalidas or not resultado["invalidas"])
+        if not gravar:
+            db.rollback()
+            if not dry_run:
+                resultado["importadas"] = 0
+        elif resultado["importadas"]:
+            crud_resumo_mensal.atualizar_resumo_datas(db, datas)
+            db.commit()
+            eventos.publicar("lancamentos", "lote")
+    except Exception:
+        db.rollback()
+        raise
+
+    resultado["meses"] = sorted({d.strftime("%Y-%m") for d in datas})
+    return resultado
@@ -1,19 +1,21 @@
-from fastapi import FastAPI, Depends, HTTPException, APIRouter, Query, Body, Path, Header
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, Query, Body, Path, Header, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path as PathLib
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
 from typing import Optional, List
 from database.database import SessionLocal, engine, Base
-from database import crud_clientes, crud_processos, crud_tarefas, crud_andamentos, crud_anexos, crud_pagamentos, crud_usuarios, crud_contabilidade, crud_municipios, crud_feriados, crud_plano_contas, models # Import models first
-from .import_contabilidade import carregar_csv_contabilidade
+from database import crud_clientes, crud_processos, crud_tarefas, crud_andamentos, crud_anexos, crud_pagamentos, crud_usuarios, crud_contabilidade, crud_municipios, crud_feriados, crud_plano_contas, crud_resumo_mensal, crud_contribuicoes, crud_dashboard, crud_busca, crud_processo_resumo, crud_alertas_prazo, agendador_prazos, eventos, crud_sincronizacao, crud_tarefa_eventos, crud_jobs, fila_jobs, models # Import models first
+from .import_contabilidade import carregar_csv_contabilidade, importar_honorarios_csv
 from backend import schemas # Then import schemas
 from backend import config_data # Import config data
 from utils import prazos, exportacao  # Import utils
+from utils.dinheiro import para_reais
+from utils.paginacao import HEADER_PROXIMO_CURSOR
+from reports import demonstrativos, execucao as execucao_relatorios
+from starlette.concurrency import run_in_threadpool
 from datetime import date as date_type, datetime
-import time  # Add this import for timing
 
 # Routers - NÃO criar app aqui, apenas roteadores (será feito em main.py da raiz)
 api_router = APIRouter(prefix="/api")
@@ -62,9 +64,41 @@ def get_db():
         db.close()
 
 
+def _resposta_listagem(response: Response, itens, proximo_cursor: Optional[str], schema_resumo=None):
+    """Publica o cursor da próxima página no header; a projeção resumida é serializada direto"""
+    headers = {HEADER_PROXIMO_CURSOR: proximo_cursor} if proximo_cursor else {}
+    if schema_resumo is not None:
+        conteudo = [schema_resumo.model_validate(i).model_dump(mode="json") for i in itens]
+        return JSONResponse(content=conteudo, headers=headers)
+    response.headers.update(headers)
+    return itens
+
+
 @api_router.get("/clientes", response_model=list[schemas.Cliente])
-def listar_clientes(db: Session = Depends(get_db)):
-    return crud_clientes.listar_clientes(db)
+def listar_clientes(
+    response: Response,
+    tipo_pessoa: Optional[str] = None,
+    uf: Optional[str] = None,
+    cidade: Optional[str] = None,
+    ordenar: str = Query("nome", description="nome ou id; prefixo - para decrescente"),
+    cursor: Optional[str] = Query(None, description="Valor do header X-Proximo-Cursor da página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Tamanho da página; sem limit retorna todos"),
+    resumo: bool = Query(False, description="Retorna apenas os campos de identificação e contato"),
+    db: Session = Depends(get_db)
+):
+    """Lista clientes com filtros e paginação por cursor (próxima página no header X-Proximo-Cursor)."""
+    try:
+        clientes, proximo = crud_clientes.listar_clientes_paginado(
+            db,
+            filtros={"tipo_pessoa": tipo_pessoa, "uf": uf.upper() if uf else None, "cidade": cidade},
+            ordenar=ordenar,
+            cursor=cursor,
+            limit=limit,
+            resumo=resumo,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _resposta_listagem(response, clientes, proximo, schemas.ClienteResumo if resumo else None)
 
 
 @api_router.get("/clientes/{cliente_id}", response_model=schemas.Cliente)
@@ -105,10 +139,24 @@ def deletar_cliente(cliente_id: int, db: Session = Depends(get_db)):
 from fastapi import UploadFile, File
 from typing import List
 
-# Endpoints de import CSV comentados (substituídos por cadastro manual de Entradas)
-# @api_router.post("/contabilidade/import", response_model=List[dict])
-# def import_contabilidade(file: UploadFile = File(...), db: Session = Depends(get_db)):
-#     ...
+@api_router.post("/contabilidade/import", response_model=schemas.ImportacaoHonorariosResultado)
+def import_contabilidade(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    ignorar_invalidas: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Importa o histórico de honorários (CSV com Cliente;Data;Valor;<sócios...>).
+    dry_run valida o arquivo inteiro sem gravar; com erros nada é gravado,
+    a menos que ignorar_invalidas seja informado.
+    """
+    try:
+        return importar_honorarios_csv(
+            db, file.file, dry_run=dry_run, ignorar_invalidas=ignorar_invalidas
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # @api_router.get("/contabilidade/recebimentos", response_model=List[dict])
 # def listar_recebimentos(db: Session = Depends(get_db)):
@@ -359,6 +407,14 @@ def criar_entrada(entrada: schemas.EntradaCreate, db: Session = Depends(get_db))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@api_router.post("/contabilidade/entradas/bulk", response_model=List[schemas.Entrada])
+def criar_entradas_lote(entradas: List[schemas.EntradaCreate], lancar: bool = True, db: Session = Depends(get_db)):
+    """Cria várias entradas (e seus lançamentos de receita) numa única transação"""
+    try:
+        return crud_contabilidade.create_entradas_lote(db, entradas, lancar=lancar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @api_router.put("/contabilidade/entradas/{entrada_id}", response_model=schemas.Entrada)
 def atualizar_entrada(entrada_id: int, entrada: schemas.EntradaCreate, db: Session = Depends(get_db)):
     try:
@@ -394,6 +450,14 @@ def criar_despesa(despesa: schemas.DespesaCreate, db: Session = Depends(get_db))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@api_router.post("/contabilidade/despesas/bulk", response_model=List[schemas.Despesa])
+def criar_despesas_lote(despesas: List[schemas.DespesaCreate], lancar: bool = True, db: Session = Depends(get_db)):
+    """Cria várias despesas (e seus lançamentos) numa única transação"""
+    try:
+        return crud_contabilidade.create_despesas_lote(db, despesas, lancar=lancar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @api_router.put("/contabilidade/despesas/{despesa_id}", response_model=schemas.Despesa)
 def atualizar_despesa(despesa_id: int, despesa: schemas.DespesaCreate, db: Session = Depends(get_db)):
     try:
@@ -444,209 +508,47 @@ def limpar_registros_orfaos(db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
- # --- Previsão da Operação ---
-@api_router.get("/contabilidade/previsao-operacao")
-def listar_previsao_operacao_ano(year: int, calcular_tempo_real: bool = False, db: Session = Depends(get_db)):
-    """Retorna Previsão da Operação dos 12 meses do ano especificado."""
-    from utils.datas import meses_do_ano, inicio_do_mes, fim_do_mes, ultimos_12_meses
-    from utils.simples import calcular_faixa_simples, calcular_imposto_simples
-    from sqlalchemy import func
+ # --- Resumo Mensal (entradas e despesas agregadas) ---
+@api_router.get("/contabilidade/resumo-mensal")
+def listar_resumo_mensal_ano(year: int, db: Session = Depends(get_db)):
+    """Retorna receita, despesas e contribuição por sócio de cada mês do ano (lido do resumo mensal)."""
+    from utils.datas import meses_do_ano
     
     meses = meses_do_ano(year)
+    resumos = crud_resumo_mensal.listar_resumo_meses(db, meses)
+    contribuicoes = crud_contribuicoes.contribuicoes_por_mes(db, meses)
     
     resultado = []
     for mes in meses:
-        previsao = crud_contabilidade.get_previsao_operacao_mensal(db, mes)
-        
-        # Se está consolidado, retornar dados consolidados
-        if previsao and previsao.consolidado:
-            pro_labore_liquido = float(previsao.pro_labore or 0) - float(previsao.inss_pessoal or 0)
-            reserva_legal = float(previsao.lucro_liquido or 0) * 0.10
-            lucro_distribuivel = float(previsao.lucro_liquido or 0) - reserva_legal
-            
-            resultado.append({
-                "mes": previsao.mes,
-                "receita_bruta": float(previsao.receita_bruta or 0),
-                "receita_12m": float(previsao.receita_12m or 0),
-                "aliquota": float(previsao.aliquota or 0),
-                "aliquota_efetiva": float(previsao.aliquota_efetiva or 0),
-                "deducao": float(previsao.deducao or 0),
-                "imposto": float(previsao.imposto or 0),
-                "despesas_gerais": float(previsao.despesas_gerais or 0),
-                "pro_labore_bruto": float(previsao.pro_labore or 0),
-                "inss_pessoal": float(previsao.inss_pessoal or 0),
-                "pro_labore_liquido": round(pro_labore_liquido, 2),
-                "inss_patronal": float(previsao.inss_patronal or 0),
-                "inss_total": float(previsao.inss_patronal or 0) + float(previsao.inss_pessoal or 0),
-                "lucro_liquido": float(previsao.lucro_liquido or 0),
-                "reserva_legal": round(reserva_legal, 2),
-                "lucro_distribuivel": round(lucro_distribuivel, 2),
-                "consolidado": True
-            })
-        # Se não está consolidado e foi pedido cálculo em tempo real
-        elif calcular_tempo_real:
-            inicio = inicio_do_mes(mes)
-            fim = fim_do_mes(mes)
-            
-            # Calcular receita bruta do mês
-            receita_bruta = db.query(func.sum(models.Entrada.valor)).filter(
-                models.Entrada.data >= inicio,
-                models.Entrada.data <= fim
-            ).scalar() or 0.0
-            
-            # Calcular receita acumulada 12 meses
-            meses_12 = ultimos_12_meses(mes)
-            receita_12m = 0.0
-            for mes_ant in meses_12:
-                inicio_ant = inicio_do_mes(mes_ant)
-                fim_ant = fim_do_mes(mes_ant)
-                receita_mes_ant = db.query(func.sum(models.Entrada.valor)).filter(
-                    models.Entrada.data >= inicio_ant,
-                    models.Entrada.data <= fim_ant
-                ).scalar() or 0.0
-                receita_12m += receita_mes_ant
-            
-            # Calcular faixa Simples e alíquotas
-            try:
-                aliquota, deducao, aliquota_efetiva = calcular_faixa_simples(receita_12m, inicio, db)
-            except (ValueError, Exception):
-                aliquota = 0.045  # 4.5% primeira faixa como padrão
-                deducao = 0.0
-                aliquota_efetiva = 0.0
-            
-            # Calcular imposto do mês
-            imposto = calcular_imposto_simples(receita_bruta, aliquota_efetiva)
-            
-            # Calcular despesas gerais do mês
-            despesas_gerais = db.query(func.sum(models.Despesa.valor)).filter(
-                models.Despesa.data >= inicio,
-                models.Despesa.data <= fim
-            ).scalar() or 0.0
-            
-            # Calcular lucro bruto (antes de pró-labore e INSS)
-            lucro_bruto = receita_bruta - imposto - despesas_gerais
-            
-            # Encontrar sócio administrador e seu percentual de contribuição
-            admin_socio = db.query(models.Socio).filter(
-                models.Socio.funcao.ilike('%administrador%')
-            ).first()
-            
-            percentual_contrib_admin = 100.0  # Default se não tiver sócio admin
-            
-            if admin_socio:
-                # Calcular contribuição do admin no mês
-                entradas_mes = db.query(models.Entrada).filter(
-                    models.Entrada.data >= inicio,
-                    models.Entrada.data <= fim
-                ).all()
-                
-                contribuicao_admin = 0.0
-                faturamento_total = 0.0
-                
-                for entrada in entradas_mes:
-                    faturamento_total += float(entrada.valor or 0)
-                    entrada_socio = db.query(models.EntradaSocio).filter(
-                        models.EntradaSocio.entrada_id == entrada.id,
-                        models.EntradaSocio.socio_id == admin_socio.id
-                    ).first()
-                    
-                    if entrada_socio:
-                        percentual = float(entrada_socio.percentual or 0)
-                        contribuicao_admin += float(entrada.valor or 0) * (percentual / 100)
-                
-                if faturamento_total > 0:
-                    percentual_contrib_admin = (contribuicao_admin / faturamento_total) * 100
-            
-            # Calcular pró-labore e INSS de forma iterativa
-            config = crud_contabilidade.get_configuracao(db)
-            salario_minimo = config.salario_minimo if config else 1518.0
-            
-            # Obter a faixa do Simples para cálculo iterativo
-            try:
-                faixa_simples = db.query(models.SimplesFaixa).filter(
-                    models.SimplesFaixa.vigencia_inicio <= inicio,
-                    (models.SimplesFaixa.vigencia_fim.is_(None)) | (models.SimplesFaixa.vigencia_fim >= inicio)
-                ).order_by(models.SimplesFaixa.ordem).first()
-            except Exception:
-                faixa_simples = None
-
-            if faixa_simples:
-                pro_labore, inss_patronal, inss_pessoal, lucro_liquido = crud_contabilidade.calcular_pro_labore_iterativo(
-                    db, receita_bruta, receita_12m, faixa_simples, despesas_gerais,
-                    percentual_contrib_admin=percentual_contrib_admin,
-                    salario_minimo=salario_minimo
-                )
-            else:
-                # Fallback: cálculo simples
-                percentual_total = 0.05 + (0.85 * percentual_contrib_admin / 100.0)
-                lucro_liquido_temp = lucro_bruto / (1 + percentual_total * 0.20)
-                pro_labore = min(lucro_liquido_temp * percentual_total, salario_minimo)
-                inss_pessoal = pro_labore * 0.11
-                inss_patronal = pro_labore * 0.20
-                lucro_liquido = lucro_bruto - inss_patronal
-            
-            # Calcular reserva legal 10% e lucro distribuível
-            # Garantir que lucro_liquido seja um número válido
-            lucro_liquido = float(lucro_liquido) if lucro_liquido is not None else 0.0
-            reserva_legal = lucro_liquido * 0.10
-            lucro_distribuivel = lucro_liquido - reserva_legal
-            
-            # Calcular pró-labore líquido
-            pro_labore_liquido = pro_labore - inss_pessoal
-            
-            # Função auxiliar para garantir valores numéricos válidos
-            def safe_round(val, decimals=2):
-                try:
-                    if val is None or (isinstance(val, float) and (val != val)):  # None ou NaN
-                        return 0.0
-                    return round(float(val), decimals)
-                except (ValueError, TypeError):
-                    return 0.0
-            
-            resultado.append({
-                "mes": mes,
-                "receita_bruta": safe_round(receita_bruta),
-                "receita_12m": safe_round(receita_12m),
-                "aliquota": safe_round(aliquota, 4),
-                "aliquota_efetiva": safe_round(aliquota_efetiva, 4),
-                "deducao": safe_round(deducao),
-                "imposto": safe_round(imposto),
-                "despesas_gerais": safe_round(despesas_gerais),
-                "pro_labore_bruto": safe_round(pro_labore),
-                "inss_pessoal": safe_round(inss_pessoal),
-                "pro_labore_liquido": safe_round(pro_labore_liquido),
-                "inss_patronal": safe_round(inss_patronal),
-                "inss_total": safe_round(inss_patronal + inss_pessoal),
-                "lucro_liquido": safe_round(lucro_liquido),
-                "reserva_legal": safe_round(reserva_legal),
-                "lucro_distribuivel": safe_round(lucro_distribuivel),
-                "consolidado": False
-            })
-        else:
-            # Se não consolidado e não pediu cálculo, retornar estrutura vazia
-            resultado.append({
-                "mes": mes,
-                "receita_bruta": 0.0,
-                "receita_12m": 0.0,
-                "aliquota": 0.0,
-                "aliquota_efetiva": 0.0,
-                "deducao": 0.0,
-                "imposto": 0.0,
-                "pro_labore_bruto": 0.0,
-                "inss_pessoal": 0.0,
-                "pro_labore_liquido": 0.0,
-                "inss_patronal": 0.0,
-                "inss_total": 0.0,
-                "despesas_gerais": 0.0,
-                "lucro_liquido": 0.0,
-                "reserva_legal": 0.0,
-                "lucro_distribuivel": 0.0,
-                "consolidado": False
-            })
-    
+        resumo = resumos.get(mes)
+        resultado.append({
+            "mes": mes,
+            "receita_bruta": para_reais(resumo.receita_centavos) if resumo else 0.0,
+            "despesas": para_reais(resumo.despesas_centavos) if resumo else 0.0,
+            "qtd_entradas": resumo.qtd_entradas if resumo else 0,
+            "qtd_despesas": resumo.qtd_despesas if resumo else 0,
+            "socios": [
+                {"socio_id": socio_id, "contribuicao": valor}
+                for socio_id, valor in contribuicoes[mes].items()
+            ]
+        })
     return resultado
 
 
+@api_router.post("/contabilidade/resumo-mensal/reconstruir")
+def reconstruir_resumo_mensal(db: Session = Depends(get_db)):
+    """Recalcula todo o resumo mensal a partir das entradas e despesas."""
+    meses = crud_resumo_mensal.reconstruir_resumo_mensal(db)
+    return {"status": "ok", "meses_recalculados": meses}
+
+
+ # --- Previsão da Operação ---
+@api_router.get("/contabilidade/previsao-operacao")
+def listar_previsao_operacao_ano(year: int, calcular_tempo_real: bool = False, db: Session = Depends(get_db)):
+    """Retorna Previsão da Operação dos 12 meses do ano especificado."""
+    return crud_contabilidade.calcular_previsao_operacao_ano(db, year, calcular_tempo_real)
+
+
 # --- Distribuição de Lucros ---
 @api_router.get("/contabilidade/lucros")
 def listar_lucros_ano(year: int, calcular_tempo_real: bool = True, db: Session = Depends(get_db)):
@@ -658,24 +560,44 @@ def listar_lucros_ano(year: int, calcular_tempo_real: bool = True, db: Session =
     - 10% do lucro líquido para fundo
     - 85% do lucro líquido distribuído entre sócios conforme participação nas entradas
     """
-    from utils.datas import meses_do_ano
+    from utils.datas import meses_do_ano, inicio_do_mes
+    from utils.simples import obter_tabela_simples
     
     meses = meses_do_ano(year)
     
+    # Receita 12m e faixa do Simples de todos os meses em uma chamada
+    receitas_12m = crud_resumo_mensal.receitas_12_meses(db, meses)
+    aliquotas_mes = dict(zip(meses, obter_tabela_simples(db).resolver_meses(
+        [receitas_12m[m] for m in meses],
+        [inicio_do_mes(m) for m in meses],
+        padrao=(0.045, 0.0, 0.0)
+    )))
+    
+    # Participação de cada sócio nas entradas de cada mês (uma consulta para o ano)
+    percentuais_mes = crud_contribuicoes.percentuais_por_mes(db, meses)
+    
     # Buscar todos os sócios
     socios = crud_contabilidade.get_socios(db)
     
     # Preparar cabeçalhos dos sócios
     socios_headers = [{"id": s.id, "nome": s.nome} for s in socios]
     
+    # Previsões, resumos, sócio administrador e configuração do ano lidos
+    # antes do laço (uma consulta cada)
+    previsoes = crud_contabilidade.listar_previsoes_operacao_mensal(db, meses)
+    if calcular_tempo_real:
+        resumos = crud_resumo_mensal.listar_resumo_meses(db, meses)
+        admin_socio = db.query(models.Socio).filter(
+            models.Socio.funcao.ilike('%administrador%')
+        ).first()
+        config = crud_contabilidade.get_configuracao(db)
+        salario_minimo = config.salario_minimo if config else 1518.0
+    
     resultado_meses = []
     
     for mes in meses:
-        # Extrair ano e mês do formato "YYYY-MM"
-        year_int, month_int = map(int, mes.split('-'))
-        
         # Buscar Previsão da Operação consolidada
-        previsao = crud_contabilidade.get_previsao_operacao_mensal(db, mes)
+        previsao = previsoes.get(mes)
         
         consolidado = False
         lucro_liquido = 0.0
@@ -686,44 +608,20 @@ def listar_lucros_ano(year: int, calcular_tempo_real: bool = True, db: Session =
             consolidado = True
         elif calcular_tempo_real:
             # Calcular em tempo real
-            from utils.datas import inicio_do_mes, fim_do_mes, ultimos_12_meses
-            from utils.simples import calcular_faixa_simples, calcular_imposto_simples
-            from sqlalchemy import func
+            from utils.simples import calcular_imposto_simples
             
             inicio = inicio_do_mes(mes)
-            fim = fim_do_mes(mes)
             
-            # Calcular receita bruta do mês
-            receita_bruta = db.query(func.sum(models.Entrada.valor)).filter(
-                models.Entrada.data >= inicio,
-                models.Entrada.data <= fim
-            ).scalar() or 0.0
+            # Receita bruta e despesas gerais do mês (resumo pré-carregado)
+            resumo = resumos.get(mes)
+            receita_bruta = para_reais(resumo.receita_centavos) if resumo else 0.0
+            despesas_gerais = para_reais(resumo.despesas_centavos) if resumo else 0.0
             
-            # Calcular receita acumulada 12 meses
-            meses_12 = ultimos_12_meses(mes)
-            receita_12m = 0.0
-            for mes_ant in meses_12:
-                inicio_ant = inicio_do_mes(mes_ant)
-                fim_ant = fim_do_mes(mes_ant)
-                receita_mes_ant = db.query(func.sum(models.Entrada.valor)).filter(
-                    models.Entrada.data >= inicio_ant,
-                    models.Entrada.data <= fim_ant
-                ).scalar() or 0.0
-                receita_12m += receita_mes_ant
+            # Receita acumulada 12 meses (pré-calculada)
+            receita_12m = receitas_12m[mes]
             
-            # Calcular despesas gerais do mês
-            despesas_gerais = db.query(func.sum(models.Despesa.valor)).filter(
-                models.Despesa.data >= inicio,
-                models.Despesa.data <= fim
-            ).scalar() or 0.0
-            
-            # Calcular faixa Simples e alíquotas
-            try:
-                aliquota, deducao, aliquota_efetiva = calcular_faixa_simples(receita_12m, inicio, db)
-            except (ValueError, Exception):
-                aliquota = 0.045
-                deducao = 0.0
-                aliquota_efetiva = 0.0
+            # Faixa Simples e alíquotas (pré-calculadas)
+            aliquota, deducao, aliquota_efetiva = aliquotas_mes[mes]
             
             # Calcular imposto do mês
             imposto = calcular_imposto_simples(receita_bruta, aliquota_efetiva)
@@ -731,46 +629,16 @@ def listar_lucros_ano(year: int, calcular_tempo_real: bool = True, db: Session =
             # Calcular lucro bruto
             lucro_bruto = receita_bruta - imposto - despesas_gerais
             
-            # Encontrar sócio administrador
-            admin_socio = db.query(models.Socio).filter(
-                models.Socio.funcao.ilike('%administrador%')
-            ).first()
-            
+            # Percentual de contribuição do sócio administrador no mês
             percentual_contrib_admin = 100.0
             
             if admin_socio:
-                entradas_mes = db.query(models.Entrada).filter(
-                    models.Entrada.data >= inicio,
-                    models.Entrada.data <= fim
-                ).all()
-                
-                contribuicao_admin = 0.0
-                faturamento_total = 0.0
-                
-                for entrada in entradas_mes:
-                    faturamento_total += float(entrada.valor or 0)
-                    entrada_socio = db.query(models.EntradaSocio).filter(
-                        models.EntradaSocio.entrada_id == entrada.id,
-                        models.EntradaSocio.socio_id == admin_socio.id
-                    ).first()
-                    
-                    if entrada_socio:
-                        percentual = float(entrada_socio.percentual or 0)
-                        contribuicao_admin += float(entrada.valor or 0) * (percentual / 100)
-                
-                if faturamento_total > 0:
-                    percentual_contrib_admin = (contribuicao_admin / faturamento_total) * 100
-            
-            # Obter configuração para salário mínimo
-            config = crud_contabilidade.get_configuracao(db)
-            salario_minimo = config.salario_minimo if config else 1518.0
+                if receita_bruta > 0:
+                    percentual_contrib_admin = percentuais_mes[mes].get(admin_socio.id, 0.0)
             
             # Obter a faixa do Simples para cálculo iterativo
             try:
-                faixa_simples = db.query(models.SimplesFaixa).filter(
-                    models.SimplesFaixa.vigencia_inicio <= inicio,
-                    (models.SimplesFaixa.vigencia_fim.is_(None)) | (models.SimplesFaixa.vigencia_fim >= inicio)
-                ).order_by(models.SimplesFaixa.ordem).first()
+                faixa_simples = obter_tabela_simples(db).faixa_inicial(inicio)
             except Exception:
                 faixa_simples = None
 
@@ -801,7 +669,7 @@ def listar_lucros_ano(year: int, calcular_tempo_real: bool = True, db: Session =
         socios_distribuicao = []
         
         for socio in socios:
-            percentual = crud_contabilidade.calcular_percentual_participacao_socio(db, socio.id, mes)
+            percentual = percentuais_mes[mes].get(socio.id, 0.0)
             valor = disponivel_85p * (percentual / 100.0)
             
             socios_distribuicao.append({
@@ -846,8 +714,8 @@ def obter_pro_labore_socio(
       ]
     }
     """
-    from utils.datas import meses_do_ano, inicio_do_mes, fim_do_mes, ultimos_12_meses
-    from utils.simples import calcular_faixa_simples, calcular_imposto_simples
+    from utils.datas import meses_do_ano, inicio_do_mes
+    from utils.simples import calcular_faixa_simples, calcular_imposto_simples, obter_tabela_simples
 
     socio = crud_contabilidade.get_socio(db, socio_id)
     if not socio:
@@ -867,23 +735,10 @@ def obter_pro_labore_socio(
         previsao = crud_contabilidade.get_previsao_operacao_mensal(db, mes_str)
 
         inicio = inicio_do_mes(mes_str)
-        fim = fim_do_mes(mes_str)
 
         # Faturamento total do mês e contribuição do sócio nas entradas
-        entradas_mes = db.query(models.Entrada).filter(
-            models.Entrada.data >= inicio,
-            models.Entrada.data <= fim
-        ).all()
-
-        faturamento_total = sum(float(e.valor or 0) for e in entradas_mes)
-        contribuicao_socio = 0.0
-        for e in entradas_mes:
-            es = db.query(models.EntradaSocio).filter(
-                models.EntradaSocio.entrada_id == e.id,
-                models.EntradaSocio.socio_id == socio_id
-            ).first()
-            if es:
-                contribuicao_socio += float(e.valor or 0) * (float(es.percentual or 0) / 100.0)
+        faturamento_total = crud_resumo_mensal.receita_mes(db, mes_str)
+        contribuicao_socio = crud_contribuicoes.contribuicao_socio(db, socio_id, mes_str)
 
         percentual_contrib = (contribuicao_socio / faturamento_total * 100.0) if faturamento_total > 0 else 0.0
 
@@ -895,20 +750,10 @@ def obter_pro_labore_socio(
         else:
             # Cálculo em tempo real replicando o de Previsão da Operação
             # Receita do mês
-            receita_bruta = db.query(func.sum(models.Entrada.valor)).filter(
-                models.Entrada.data >= inicio,
-                models.Entrada.data <= fim
-            ).scalar() or 0.0
+            receita_bruta = crud_resumo_mensal.receita_mes(db, mes_str)
 
             # Receita acumulada 12 meses
-            receita_12m = 0.0
-            for m12 in ultimos_12_meses(mes_str):
-                i12 = inicio_do_mes(m12)
-                f12 = fim_do_mes(m12)
-                receita_12m += db.query(func.sum(models.Entrada.valor)).filter(
-                    models.Entrada.data >= i12,
-                    models.Entrada.data <= f12
-                ).scalar() or 0.0
+            receita_12m = crud_resumo_mensal.receita_12_meses(db, mes_str)
 
             try:
                 _, _, aliquota_efetiva = calcular_faixa_simples(receita_12m, inicio, db)
@@ -916,17 +761,11 @@ def obter_pro_labore_socio(
                 aliquota_efetiva = 0.0
 
             imposto = calcular_imposto_simples(receita_bruta, aliquota_efetiva)
-            despesas_gerais = db.query(func.sum(models.Despesa.valor)).filter(
-                models.Despesa.data >= inicio,
-                models.Despesa.data <= fim
-            ).scalar() or 0.0
+            despesas_gerais = crud_resumo_mensal.despesas_mes(db, mes_str)
             
             # Obter a faixa do Simples para cálculo iterativo
             try:
-                faixa_simples = db.query(models.SimplesFaixa).filter(
-                    models.SimplesFaixa.vigencia_inicio <= inicio,
-                    (models.SimplesFaixa.vigencia_fim.is_(None)) | (models.SimplesFaixa.vigencia_fim >= inicio)
-                ).order_by(models.SimplesFaixa.ordem).first()
+                faixa_simples = obter_tabela_simples(db).faixa_inicial(inicio)
             except Exception:
                 faixa_simples = None
 
@@ -1048,95 +887,10 @@ def desconsolidar_previsao_operacao(mes: str, db: Session = Depends(get_db)):
 def obter_dashboard_summary(db: Session = Depends(get_db)):
     """
     Retorna um resumo dos dados contábeis para o dashboard.
-    Inclui: balanço patrimonial, lucros e fundos, distribuição de sócios.
+    Inclui: balanço patrimonial, lucros e fundos, DRE do ano, distribuição de sócios.
+    Servido do cache enquanto os dados contábeis não mudarem.
     """
-    from sqlalchemy import func
-    from datetime import datetime
-    
-    # Obter ano e mês atuais
-    agora = datetime.now()
-    ano_atual = agora.year
-    mes_atual = agora.month
-    
-    # Buscar todas as Previsões da Operação consolidadas do ano atual
-    previsoes = db.query(models.PrevisaoOperacaoMensal).filter(
-        models.PrevisaoOperacaoMensal.mes.like(f"{ano_atual}-%"),
-        models.PrevisaoOperacaoMensal.consolidado == True
-    ).all()
-    
-    # Somar lucros líquidos consolidados
-    lucro_liquido_total = sum(previsao.lucro_liquido for previsao in previsoes)
-    reserva_total = sum((previsao.lucro_liquido or 0.0) * 0.10 for previsao in previsoes)
-    pro_labore_total = sum(previsao.pro_labore or 0.0 for previsao in previsoes)
-    
-    # Buscar fundos
-    fundo_reserva = crud_contabilidade.get_or_create_fundo(db, "Fundo de Reserva")
-    fundo_investimento = crud_contabilidade.get_or_create_fundo(db, "Fundo de Investimento")
-    
-    # Calcular saldos dos sócios (simplificado - seria necessário implementar lógica de distribuição)
-    socios = crud_contabilidade.get_socios(db)
-    lucro_distribuivel = lucro_liquido_total - reserva_total - pro_labore_total
-    
-    saldo_socios = 0.0
-    for socio in socios:
-        perc = socio.percentual or 0.0
-        # Aceita percentuais em decimal (0-1) ou inteiro (0-100)
-        if perc > 1:
-            perc = perc / 100.0
-        saldo_socios += lucro_distribuivel * perc
-    
-    # Balanço Patrimonial - usar função do sistema ao invés de cálculo manual
-    balanco = crud_plano_contas.gerar_balanco_patrimonial(db, mes_atual, ano_atual)
-    ativo = balanco["totais"]["ativo"]
-    passivo = balanco["totais"]["passivo"]
-    patrimonio_liquido = balanco["totais"]["patrimonioLiquido"]
-    
-    # DRE Data (para gráfico)
-    receita_bruta_total = sum(dre.receita_bruta for dre in dres)
-    despesas_total = sum(dre.despesas_gerais for dre in dres)
-    impostos_total = sum(dre.imposto for dre in dres)
-    inss_total = sum((dre.inss_patronal + dre.inss_pessoal) for dre in dres)
-    
-    lucro_bruto = receita_bruta_total - despesas_total
-    
-    dre_data = [
-        {"name": "Receita Bruta", "valor": receita_bruta_total},
-        {"name": "Despesas", "valor": -despesas_total},
-        {"name": "Lucro Bruto", "valor": lucro_bruto},
-        {"name": "Impostos", "valor": -(impostos_total + inss_total)},
-        {"name": "Lucro Líquido", "valor": lucro_liquido_total}
-    ]
-    
-    # Distribuição de Sócios (para gráfico)
-    distribuicao_socios = []
-    for socio in socios:
-        usuario = db.query(models.Usuario).filter(models.Usuario.id == socio.usuario_id).first()
-        nome_socio = usuario.nome if usuario else f"Sócio {socio.id}"
-        perc = socio.percentual or 0.0
-        if perc > 1:
-            perc = perc / 100.0
-        valor_socio = lucro_distribuivel * perc
-        distribuicao_socios.append({
-            "name": nome_socio,
-            "value": valor_socio
-        })
-    
-    return {
-        "balancoPatrimonial": {
-            "ativo": ativo,
-            "passivo": passivo,
-            "patrimonioLiquido": patrimonio_liquido
-        },
-        "lucros": {
-            "disponiveis": lucro_distribuivel,
-            "distribuidos": saldo_socios,
-            "fundoReserva": fundo_reserva.saldo,
-            "proLabore": pro_labore_total
-        },
-        "dreData": dre_data,
-        "distribuicaoSocios": distribuicao_socios,
-        "ano": ano_atual
-    }
+    return crud_dashboard.obter_dashboard(db)
 
 # --- Faixas Simples ---
 @api_router.get("/contabilidade/simples-faixas")
@@ -1227,7 +981,9 @@ def inicializar_faixas_simples_endpoint(db: Session = Depends(get_db)):
 @api_router.get("/contabilidade/plano-contas")
 def listar_plano_contas(apenas_ativas: bool = True, db: Session = Depends(get_db)):
     """Lista todas as contas do plano de contas"""
-    contas = crud_plano_contas.listar_plano_contas(db, apenas_ativas)
+    indice = crud_plano_contas.obter_indice_plano_contas(db)
+    contas = indice.todas(apenas_ativas=apenas_ativas)
+    saldos = crud_plano_contas.calcular_saldos_contas(db)
     return [
         {
             "id": c.id,
@@ -1239,7 +995,7 @@ def listar_plano_contas(apenas_ativas: bool = True, db: Session = Depends(get_db
             "pai_id": c.pai_id,
             "aceita_lancamento": c.aceita_lancamento,
             "ativo": c.ativo,
-            "saldo": crud_plano_contas.calcular_saldo_conta(db, c.id)
+            "saldo": saldos.get(c.id, 0.0)
         }
         for c in contas
     ]
@@ -1248,7 +1004,7 @@ def listar_plano_contas(apenas_ativas: bool = True, db: Session = Depends(get_db
 @api_router.get("/contabilidade/plano-contas/{conta_id}")
 def buscar_conta(conta_id: int, db: Session = Depends(get_db)):
     """Busca uma conta específica"""
-    conta = crud_plano_contas.buscar_conta_por_id(db, conta_id)
+    conta = crud_plano_contas.obter_conta_cache_por_id(db, conta_id)
     if not conta:
         raise HTTPException(status_code=404, detail="Conta não encontrada")
     
@@ -1310,6 +1066,47 @@ def gerar_dfc(
     return dfc
 
 
+@api_router.get("/contabilidade/relatorios/{relatorio}")
+async def baixar_relatorio_contabil(
+    relatorio: str = Path(..., description="balanco, dmpl, dfc, dre ou razao"),
+    formato: str = Query("xlsx", description="xlsx ou pdf"),
+    ano: Optional[int] = Query(None, ge=2000),
+    mes_inicio: Optional[int] = Query(None, ge=1, le=12),
+    mes_fim: Optional[int] = Query(None, ge=1, le=12),
+    ano_fim: Optional[int] = Query(None, ge=2000),
+    conta_id: Optional[int] = None,
+    data_inicio: Optional[date_type] = None,
+    data_fim: Optional[date_type] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Demonstrativo contábil (Balanço, DMPL, DFC, DRE/previsão ou razão) em
+    Excel ou PDF, com uma coluna por mês do intervalo. Gerado num processo
+    separado e guardado em cache até o razão mudar (header X-Relatorio-Cache).
+    """
+    try:
+        parametros = demonstrativos.normalizar_parametros(
+            relatorio, ano, mes_inicio, mes_fim, ano_fim, conta_id, data_inicio, data_fim
+        )
+        if formato not in execucao_relatorios.FORMATOS:
+            raise ValueError(f"Formato inválido. Use: {', '.join(execucao_relatorios.FORMATOS)}")
+        versao = await run_in_threadpool(execucao_relatorios.versao_razao, db)
+        url_banco = db.get_bind().url.render_as_string(hide_password=False)
+        caminho, em_cache = await execucao_relatorios.obter_relatorio(
+            url_banco, relatorio, formato, parametros, versao
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    sufixo = "_".join(str(v) for v in parametros.values() if v is not None)
+    return FileResponse(
+        caminho,
+        media_type=execucao_relatorios.FORMATOS[formato],
+        filename=f"{relatorio}_{sufixo}.{formato}",
+        headers={"X-Relatorio-Cache": "HIT" if em_cache else "MISS"},
+    )
+
+
 # ===== SISTEMA DE PROVISÕES E PAGAMENTOS PARCIAIS =====
 
 @api_router.get("/contabilidade/saldos-disponiveis/{mes}/{ano}", response_model=schemas.SaldosDisponiveisMes)
@@ -1771,35 +1568,21 @@ def _calcular_dre_mes(db: Session, year: int, month: int):
     Função auxiliar para calcular DRE de um mês específico em tempo real.
     Retorna um dicionário com os valores calculados ou None se não houver movimentação.
     """
-    from utils.datas import inicio_do_mes, fim_do_mes, ultimos_12_meses
-    from utils.simples import calcular_faixa_simples, calcular_imposto_simples
-    from sqlalchemy import func
+    from utils.datas import inicio_do_mes
+    from utils.simples import calcular_faixa_simples, calcular_imposto_simples, obter_tabela_simples
     
     mes_str = f"{year}-{str(month).zfill(2)}"
     inicio = inicio_do_mes(mes_str)
-    fim = fim_do_mes(mes_str)
     
     # Calcular receita bruta do mês
-    receita_bruta = db.query(func.sum(models.Entrada.valor)).filter(
-        models.Entrada.data >= inicio,
-        models.Entrada.data <= fim
-    ).scalar() or 0.0
+    receita_bruta = crud_resumo_mensal.receita_mes(db, mes_str)
     
     # Se não há receita, não calcular DRE
     if receita_bruta == 0:
         return None
     
     # Calcular receita acumulada 12 meses
-    meses_12 = ultimos_12_meses(mes_str)
-    receita_12m = 0.0
-    for mes_ant in meses_12:
-        inicio_ant = inicio_do_mes(mes_ant)
-        fim_ant = fim_do_mes(mes_ant)
-        receita_mes_ant = db.query(func.sum(models.Entrada.valor)).filter(
-            models.Entrada.data >= inicio_ant,
-            models.Entrada.data <= fim_ant
-        ).scalar() or 0.0
-        receita_12m += receita_mes_ant
+    receita_12m = crud_resumo_mensal.receita_12_meses(db, mes_str)
     
     # Calcular faixa Simples e alíquotas
     try:
@@ -1813,10 +1596,7 @@ def _calcular_dre_mes(db: Session, year: int, month: int):
     imposto = calcular_imposto_simples(receita_bruta, aliquota_efetiva)
     
     # Calcular despesas gerais do mês
-    despesas_gerais = db.query(func.sum(models.Despesa.valor)).filter(
-        models.Despesa.data >= inicio,
-        models.Despesa.data <= fim
-    ).scalar() or 0.0
+    despesas_gerais = crud_resumo_mensal.despesas_mes(db, mes_str)
     
     # Calcular lucro bruto (antes de pró-labore e INSS)
     lucro_bruto = receita_bruta - imposto - despesas_gerais
@@ -1830,27 +1610,8 @@ def _calcular_dre_mes(db: Session, year: int, month: int):
     
     if admin_socio:
         # Calcular contribuição do admin no mês
-        entradas_mes = db.query(models.Entrada).filter(
-            models.Entrada.data >= inicio,
-            models.Entrada.data <= fim
-        ).all()
-        
-        contribuicao_admin = 0.0
-        faturamento_total = 0.0
-        
-        for entrada in entradas_mes:
-            faturamento_total += float(entrada.valor or 0)
-            entrada_socio = db.query(models.EntradaSocio).filter(
-                models.EntradaSocio.entrada_id == entrada.id,
-                models.EntradaSocio.socio_id == admin_socio.id
-            ).first()
-            
-            if entrada_socio:
-                percentual = float(entrada_socio.percentual or 0)
-                contribuicao_admin += float(entrada.valor or 0) * (percentual / 100)
-        
-        if faturamento_total > 0:
-            percentual_contrib_admin = (contribuicao_admin / faturamento_total) * 100
+        if receita_bruta > 0:
+            percentual_contrib_admin = crud_contribuicoes.percentual_contribuicao(db, admin_socio.id, mes_str)
     
     # Calcular pró-labore e INSS de forma iterativa
     config = crud_contabilidade.get_configuracao(db)
@@ -1858,10 +1619,7 @@ def _calcular_dre_mes(db: Session, year: int, month: int):
     
     # Obter a faixa do Simples para cálculo iterativo
     try:
-        faixa_simples = db.query(models.SimplesFaixa).filter(
-            models.SimplesFaixa.vigencia_inicio <= inicio,
-            (models.SimplesFaixa.vigencia_fim.is_(None)) | (models.SimplesFaixa.vigencia_fim >= inicio)
-        ).order_by(models.SimplesFaixa.ordem).first()
+        faixa_simples = obter_tabela_simples(db).faixa_inicial(inicio)
     except Exception:
         faixa_simples = None
 
@@ -1898,6 +1656,134 @@ def _calcular_dre_mes(db: Session, year: int, month: int):
     }
 
 
+def _calcular_matriz_pro_labore(db: Session, year: int, socios: List[models.Socio]) -> dict:
+    """
+    Calcula o pró-labore/lucro de cada sócio em cada mês do ano.
+
+    Uma passagem de DRE por mês (consolidada em PrevisaoOperacaoMensal ou
+    calculada em tempo real) e uma consulta agregada de contribuições
+    (EntradaSocio ⋈ Entrada agrupado por sócio e mês) servem todos os sócios.
+    Retorna {socio_id: [linha_mes, ...]}; meses sem movimentação são omitidos.
+    """
+    from utils.datas import meses_do_ano
+
+    meses = meses_do_ano(year)
+    previsoes = {
+        p.mes: p for p in db.query(models.PrevisaoOperacaoMensal).filter(
+            models.PrevisaoOperacaoMensal.mes.in_(meses)
+        ).all()
+    }
+    resumos = crud_resumo_mensal.listar_resumo_meses(db, meses)
+    contribuicoes = crud_contribuicoes.contribuicoes_por_mes(db, meses)
+
+    matriz = {s.id: [] for s in socios}
+
+    for month, mes_str in enumerate(meses, start=1):
+        # DRE do mês: consolidada ou calculada em tempo real
+        previsao = previsoes.get(mes_str)
+        if previsao and previsao.consolidado:
+            lucro_liquido = float(previsao.lucro_liquido or 0)
+            dre_pro_labore = float(previsao.pro_labore or 0)
+            dre_inss_patronal = float(previsao.inss_patronal or 0)
+            dre_inss_pessoal = float(previsao.inss_pessoal or 0)
+        else:
+            dre_calculado = _calcular_dre_mes(db, year, month)
+            if not dre_calculado:
+                # Sem movimentação no mês, pular
+                continue
+            lucro_liquido = dre_calculado["lucro_liquido"]
+            dre_pro_labore = dre_calculado["pro_labore_bruto"]
+            dre_inss_patronal = dre_calculado["inss_patronal"]
+            dre_inss_pessoal = dre_calculado["inss_pessoal"]
+
+        resumo = resumos.get(mes_str)
+        faturamento_total = para_reais(resumo.receita_centavos) if resumo else 0.0
+
+        # Calcular fundo de reserva (10% do lucro líquido)
+        fundo_reserva = lucro_liquido * 0.10
+        lucro_disponivel_total = lucro_liquido * 0.85  # 85% disponível
+
+        for socio in socios:
+            if faturamento_total == 0:
+                # Sem faturamento, não há contribuição
+                matriz[socio.id].append({
+                    "mes": month,
+                    "ano": year,
+                    "faturamento_total": 0,
+                    "contribuicao_socio": 0,
+                    "percentual_contribuicao": 0,
+                    "lucro_liquido": lucro_liquido,
+                    "pro_labore_bruto": 0,
+                    "fundo_reserva": 0,
+                    "lucro_disponivel_total": 0,
+                    "lucro_disponivel_socio": 0,
+                    "pro_labore_liquido": 0,
+                    "inss_patronal": 0,
+                    "lucro_final_socio": 0
+                })
+                continue
+
+            contribuicao_socio = contribuicoes[mes_str].get(socio.id, 0.0)
+            percentual_contribuicao = contribuicao_socio / faturamento_total * 100
+
+            pro_labore_bruto_total = 0.0
+            inss_patronal_total = 0.0
+            inss_pessoal_total = 0.0
+            pro_labore_liquido = 0.0
+
+            if 'administrador' in (socio.funcao or '').lower():
+                # Para o administrador, pegar o pró-labore calculado na DRE
+                pro_labore_bruto_total = dre_pro_labore
+                inss_patronal_total = dre_inss_patronal
+                inss_pessoal_total = dre_inss_pessoal
+                # O lucro do administrador É o pró-labore líquido
+                pro_labore_liquido = pro_labore_bruto_total - inss_pessoal_total
+                lucro_final_socio = pro_labore_liquido
+            else:
+                # Para sócios não-administradores, distribuir o lucro disponível
+                lucro_final_socio = lucro_disponivel_total * (percentual_contribuicao / 100)
+
+            matriz[socio.id].append({
+                "mes": month,
+                "ano": year,
+                "faturamento_total": round(faturamento_total, 2),
+                "contribuicao_socio": round(contribuicao_socio, 2),
+                "percentual_contribuicao": round(percentual_contribuicao, 2),
+                "lucro_liquido": round(lucro_liquido, 2),
+                "pro_labore_bruto": round(pro_labore_bruto_total, 2),
+                "inss_pessoal": round(inss_pessoal_total, 2),
+                "inss_patronal": round(inss_patronal_total, 2),
+                "pro_labore_liquido": round(pro_labore_liquido, 2),
+                "fundo_reserva": round(fundo_reserva, 2),
+                "lucro_disponivel_total": round(lucro_disponivel_total, 2),
+                "lucro_final_socio": round(lucro_final_socio, 2)
+            })
+
+    return matriz
+
+
+@api_router.get("/contabilidade/pro-labore-matriz")
+def obter_matriz_pro_labore(
+    year: int = Query(..., ge=2000),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna o pró-labore/lucro de todos os sócios em todos os meses do ano
+    numa única resposta (mesmas linhas de /contabilidade/pro-labore/{socio_id}).
+    """
+    socios = crud_contabilidade.get_socios(db)
+    matriz = _calcular_matriz_pro_labore(db, year, socios)
+    return {
+        "ano": year,
+        "socios": [{
+            "socio_id": s.id,
+            "socio_nome": s.nome,
+            "funcao": s.funcao,
+            "meses": matriz[s.id]
+        } for s in socios]
+    }
+
+
 @api_router.get("/contabilidade/pro-labore/{socio_id}")
 def calcular_pro_labore_socio(
     socio_id: int,
@@ -1917,147 +1803,135 @@ def calcular_pro_labore_socio(
     6. Lucro final = lucro_disponivel_socio - pro_labore_liquido - inss_patronal
     
     IMPORTANTE: Calcula DRE automaticamente em tempo real se não existir consolidado.
+    Para todos os sócios de uma vez, usar /contabilidade/pro-labore-matriz.
     """
     # Verificar se o sócio existe
     socio = db.query(models.Socio).filter(models.Socio.id == socio_id).first()
     if not socio:
         raise HTTPException(status_code=404, detail="Sócio não encontrado")
     
-    resultado = []
-    
-    for month in range(1, 13):
-        # Buscar DRE do mês (formato: "YYYY-MM")
-        mes_str = f"{year}-{str(month).zfill(2)}"
-        dre = db.query(models.DREMensal).filter(
-            models.DREMensal.mes == mes_str
-        ).first()
-        
-        # Se não tiver DRE ou não estiver consolidado, calcular em tempo real
-        lucro_liquido = 0
-        if dre and dre.consolidado:
-            # Usar DRE consolidado
-            lucro_liquido = float(dre.lucro_liquido or 0)
-        else:
-            # Calcular DRE em tempo real
-            dre_calculado = _calcular_dre_mes(db, year, month)
-            if dre_calculado:
-                lucro_liquido = dre_calculado["lucro_liquido"]
-            else:
-                # Sem movimentação no mês, pular
-                continue
-        
-        # Calcular faturamento total do mês
-        entradas_mes = db.query(models.Entrada).filter(
-            extract('year', models.Entrada.data) == year,
-            extract('month', models.Entrada.data) == month
-        ).all()
-        
-        faturamento_total = sum(float(entrada.valor or 0) for entrada in entradas_mes)
-        
-        if faturamento_total == 0:
-            # Sem faturamento, não há contribuição
-            resultado.append({
-                "mes": month,
-                "ano": year,
-                "faturamento_total": 0,
-                "contribuicao_socio": 0,
-                "percentual_contribuicao": 0,
-                "lucro_liquido": lucro_liquido,
-                "pro_labore_bruto": 0,
-                "fundo_reserva": 0,
-                "lucro_disponivel_total": 0,
-                "lucro_disponivel_socio": 0,
-                "pro_labore_liquido": 0,
-                "inss_patronal": 0,
-                "lucro_final_socio": 0
-            })
-            continue
-        
-        # Calcular contribuição do sócio (soma de entrada.valor * percentual)
-        contribuicao_socio = 0
-        for entrada in entradas_mes:
-            # Buscar o percentual do sócio nesta entrada
-            entrada_socio = db.query(models.EntradaSocio).filter(
-                models.EntradaSocio.entrada_id == entrada.id,
-                models.EntradaSocio.socio_id == socio_id
-            ).first()
-            
-            if entrada_socio:
-                # Percentual já está no formato correto (50 = 50%, 1 = 1%, 0.5 = 0.5%)
-                percentual = float(entrada_socio.percentual or 0)
-                contribuicao_socio += float(entrada.valor or 0) * (percentual / 100)
-        
-        # Percentual de contribuição do sócio no mês (já em formato percentual 0-100)
-        percentual_contribuicao = (contribuicao_socio / faturamento_total * 100) if faturamento_total > 0 else 0
-        
-        # Verificar se este sócio é o administrador
-        is_admin = socio and 'administrador' in (socio.funcao or '').lower()
-        
-        # Calcular fundo de reserva (10% do lucro líquido)
-        fundo_reserva = lucro_liquido * 0.10
-        lucro_disponivel_total = lucro_liquido * 0.85  # 85% disponível
-        
-        # Inicializar variáveis
-        pro_labore_bruto_total = 0.0
-        inss_patronal_total = 0.0
-        inss_pessoal_total = 0.0
-        pro_labore_liquido = 0.0
-        lucro_final_socio = 0.0
-        
-        if is_admin:
-            # Para o administrador, pegar o pró-labore calculado na DRE
-            if dre and dre.consolidado:
-                pro_labore_bruto_total = float(dre.pro_labore or 0)
-                inss_patronal_total = float(dre.inss_patronal or 0)
-                inss_pessoal_total = float(dre.inss_pessoal or 0)
-            elif dre_calculado:
-                pro_labore_bruto_total = dre_calculado.get("pro_labore", 0)
-                inss_patronal_total = dre_calculado.get("inss_patronal", 0)
-                inss_pessoal_total = dre_calculado.get("inss_pessoal", 0)
-            
-            # Pró-labore líquido = bruto - INSS pessoal
-            pro_labore_liquido = pro_labore_bruto_total - inss_pessoal_total
-            # O lucro do administrador É o pró-labore líquido
-            lucro_final_socio = pro_labore_liquido
-        else:
-            # Para sócios não-administradores, distribuir o lucro disponível
-            lucro_final_socio = lucro_disponivel_total * (percentual_contribuicao / 100)
-        
-        resultado.append({
-            "mes": month,
-            "ano": year,
-            "faturamento_total": round(faturamento_total, 2),
-            "contribuicao_socio": round(contribuicao_socio, 2),
-            "percentual_contribuicao": round(percentual_contribuicao, 2),
-            "lucro_liquido": round(lucro_liquido, 2),
-            "pro_labore_bruto": round(pro_labore_bruto_total, 2),
-            "inss_pessoal": round(inss_pessoal_total, 2),
-            "inss_patronal": round(inss_patronal_total, 2),
-            "pro_labore_liquido": round(pro_labore_liquido, 2),
-            "fundo_reserva": round(fundo_reserva, 2),
-            "lucro_disponivel_total": round(lucro_disponivel_total, 2),
-            "lucro_final_socio": round(lucro_final_socio, 2)
-        })
+    matriz = _calcular_matriz_pro_labore(db, year, [socio])
     
     return {
         "socio_id": socio_id,
         "socio_nome": socio.nome,
         "ano": year,
-        "meses": resultado
+        "meses": matriz[socio_id]
     }
 
 
+# Busca textual
+@api_router.get("/busca")
+def buscar(
+    q: str = Query(..., min_length=1),
+    tipos: Optional[str] = Query(None, description="Lista separada por vírgula: processo,cliente,tarefa,andamento,anexo"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Busca em processos, clientes, tarefas, andamentos e texto dos anexos, ordenada por relevância."""
+    lista_tipos = [t.strip() for t in tipos.split(",") if t.strip()] if tipos else None
+    try:
+        return crud_busca.buscar(db, q, lista_tipos, skip=skip, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@api_router.get("/eventos")
+async def fluxo_eventos(
+    topicos: Optional[str] = Query(None, description="Separados por vírgula: tarefas,plano_contas,lancamentos,operacoes"),
+    last_event_id: Optional[int] = Header(None),
+):
+    """Stream SSE de alterações (tópico, ação e ids) publicadas após cada commit."""
+    lista_topicos = [t.strip() for t in topicos.split(",")] if topicos else None
+    try:
+        assinante = eventos.assinar(lista_topicos, ultimo_id=last_event_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        eventos.fluxo_sse(assinante),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api_router.get("/sync/{recurso}", response_model=schemas.SincronizacaoResponse)
+def sincronizar_recurso(
+    recurso: str,
+    since: Optional[datetime] = Query(None, description="proximo_since da sincronização anterior (ISO 8601)"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Linhas alteradas desde `since` e ids excluídos (tombstones), para sincronização incremental."""
+    try:
+        return crud_sincronizacao.listar_alteracoes(db, recurso, since=since, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # Processos endpoints
 @api_router.get("/processos", response_model=list[schemas.Processo])
-def listar_processos(db: Session = Depends(get_db)):
-    start_time = time.time()  # Start timing
-    processos = db.query(models.Processo).options(
-        joinedload(models.Processo.cliente),
-        joinedload(models.Processo.municipio)
-    ).all()
-    end_time = time.time()  # End timing
-    print(f"Query execution time: {end_time - start_time} seconds")  # Log the time
-    return processos
+def listar_processos(
+    response: Response,
+    status: Optional[str] = None,
+    fase: Optional[str] = None,
+    classe: Optional[str] = None,
+    esfera_justica: Optional[str] = None,
+    municipio_id: Optional[int] = None,
+    uf: Optional[str] = None,
+    cliente_id: Optional[int] = None,
+    ordenar: str = Query("id", description="id, numero ou data_abertura; prefixo - para decrescente"),
+    cursor: Optional[str] = Query(None, description="Valor do header X-Proximo-Cursor da página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Tamanho da página; sem limit retorna todos"),
+    resumo: bool = Query(False, description="Retorna a projeção da listagem em vez do objeto completo"),
+    db: Session = Depends(get_db)
+):
+    """Lista processos com filtros e paginação por cursor (próxima página no header X-Proximo-Cursor)."""
+    filtros = {
+        "status": status,
+        "fase": fase,
+        "classe": classe,
+        "esfera_justica": esfera_justica,
+        "municipio_id": municipio_id,
+        "cliente_id": cliente_id,
+    }
+    try:
+        processos, proximo = crud_processos.listar_processos_paginado(
+            db, filtros=filtros, uf=uf, ordenar=ordenar, cursor=cursor, limit=limit, resumo=resumo
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _resposta_listagem(response, processos, proximo, schemas.ProcessoResumo if resumo else None)
+
+
+@api_router.get("/processos/resumos", response_model=List[schemas.ResumoProcessoResponse])
+def listar_resumos_processos(
+    ids: str = Query(..., description="Ids separados por vírgula (até 500)"),
+    db: Session = Depends(get_db)
+):
+    """Tarefas abertas, próximo prazo fatal, último andamento e pagamentos de vários processos."""
+    try:
+        lista_ids = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids deve ser uma lista de inteiros separados por vírgula")
+    if len(lista_ids) > 500:
+        raise HTTPException(status_code=400, detail="Informe no máximo 500 processos por requisição")
+    return crud_processo_resumo.listar_resumos_processos(db, lista_ids)
+
+
+@api_router.post("/processos/resumos/reconstruir")
+def reconstruir_resumos_processos(db: Session = Depends(get_db)):
+    """Recalcula o resumo de atividade de todos os processos a partir das tabelas de origem."""
+    total = crud_processo_resumo.reconstruir_resumo_processos(db)
+    return {"status": "ok", "processos": total}
+
+
+@api_router.get("/processos/{processo_id}/resumo", response_model=schemas.ResumoProcessoResponse)
+def obter_resumo_processo(processo_id: int, db: Session = Depends(get_db)):
+    if not db.query(models.Processo.id).filter(models.Processo.id == processo_id).first():
+        raise HTTPException(status_code=404, detail="Processo não encontrado")
+    return crud_processo_resumo.obter_resumo_processo(db, processo_id)
 
 
 @api_router.get("/processos/{processo_id}", response_model=schemas.Processo)
@@ -2143,12 +2017,212 @@ def listar_tarefas_com_filtros(
     )
 
 
+@api_router.get("/tarefas/exportar/excel")
+def exportar_tarefas_excel(
+    tipo_tarefa_id: Optional[int] = None,
+    processo_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    classe: Optional[str] = None,
+    esfera_justica: Optional[str] = None,
+    municipio_id: Optional[int] = None,
+    uf: Optional[str] = None,
+    responsavel_id: Optional[int] = None,
+    status: Optional[str] = None,
+    prazo_vencido: bool = False,
+    data_inicio: Optional[date_type] = None,
+    data_fim: Optional[date_type] = None,
+    db: Session = Depends(get_db)
+):
+    """Exporta as tarefas filtradas (mesmos filtros de /tarefas/filtros) para Excel, por streaming."""
+    linhas = crud_tarefas.consultar_tarefas_exportacao(
+        db,
+        tipo_tarefa_id=tipo_tarefa_id,
+        processo_id=processo_id,
+        cliente_id=cliente_id,
+        classe=classe,
+        esfera_justica=esfera_justica,
+        municipio_id=municipio_id,
+        uf=uf,
+        responsavel_id=responsavel_id,
+        status=status,
+        prazo_vencido=prazo_vencido,
+        data_inicio=data_inicio,
+        data_fim=data_fim
+    )
+    caminho = exportacao.gerar_arquivo_tarefas_excel(linhas)
+    nome = f"tarefas_{date_type.today().strftime('%Y%m%d')}.xlsx"
+    return StreamingResponse(
+        exportacao.iterar_arquivo(caminho),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
+
+
+@api_router.get("/tarefas/exportar/pdf")
+async def exportar_tarefas_pdf(
+    tipo_tarefa_id: Optional[int] = None,
+    processo_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    classe: Optional[str] = None,
+    esfera_justica: Optional[str] = None,
+    municipio_id: Optional[int] = None,
+    uf: Optional[str] = None,
+    responsavel_id: Optional[int] = None,
+    status: Optional[str] = None,
+    prazo_vencido: bool = False,
+    data_inicio: Optional[date_type] = None,
+    data_fim: Optional[date_type] = None,
+    db: Session = Depends(get_db)
+):
+    """Relatório PDF das tarefas filtradas, gerado num processo separado e enviado por streaming."""
+    filtros = {
+        "tipo_tarefa_id": tipo_tarefa_id,
+        "processo_id": processo_id,
+        "cliente_id": cliente_id,
+        "classe": classe,
+        "esfera_justica": esfera_justica,
+        "municipio_id": municipio_id,
+        "uf": uf,
+        "responsavel_id": responsavel_id,
+        "status": status,
+        "prazo_vencido": prazo_vencido,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+    }
+    url_banco = db.get_bind().url.render_as_string(hide_password=False)
+    caminho = await exportacao.executar_em_processo(exportacao.gerar_arquivo_tarefas_pdf, url_banco, filtros)
+    nome = f"tarefas_{date_type.today().strftime('%Y%m%d')}.pdf"
+    return StreamingResponse(
+        exportacao.iterar_arquivo(caminho),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
+
+
 @api_router.get("/tarefas/estatisticas", response_model=schemas.EstatisticasTarefas)
 def obter_estatisticas_tarefas(db: Session = Depends(get_db)):
     """Retorna estatísticas gerais de tarefas."""
     return crud_tarefas.obter_estatisticas_tarefas(db)
 
 
+@api_router.get("/tarefas/alertas-prazo", response_model=List[schemas.AlertaPrazoResponse])
+def listar_alertas_prazo(
+    apenas_nao_lidos: bool = True,
+    responsavel_id: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Alertas de prazo emitidos pelo agendador, do mais recente para o mais antigo."""
+    return crud_alertas_prazo.listar_alertas(db, apenas_nao_lidos, responsavel_id, skip, limit)
+
+
+@api_router.post("/tarefas/alertas-prazo/{alerta_id}/lido", response_model=schemas.AlertaPrazoResponse)
+def marcar_alerta_prazo_lido(alerta_id: int, db: Session = Depends(get_db)):
+    alerta = crud_alertas_prazo.marcar_alerta_lido(db, alerta_id)
+    if not alerta:
+        raise HTTPException(status_code=404, detail="Alerta não encontrado")
+    return alerta
+
+
+@api_router.get("/tarefas/agendador-prazos", response_model=schemas.SituacaoAgendadorPrazos)
+def situacao_agendador_prazos():
+    """Situação do agendador de alertas de prazo (tarefas monitoradas e próximo disparo)."""
+    agendador = agendador_prazos.obter_agendador()
+    if agendador is None:
+        return {"ativo": False, "tarefas_monitoradas": 0, "prazos_monitorados": 0, "proximo_disparo": None}
+    return agendador.situacao()
+
+
+# ===== JOBS EM SEGUNDO PLANO =====
+
+def _job_com_progresso(job: models.Job) -> models.Job:
+    """Sobrepõe o progresso em memória de um job executado neste processo"""
+    fila = fila_jobs.obter_fila()
+    atual = fila.progresso_em_memoria(job.id) if fila and job.status == crud_jobs.STATUS_EXECUTANDO else None
+    if atual:
+        job.progresso = max(job.progresso or 0, atual["progresso"])
+        job.mensagem = atual["mensagem"] or job.mensagem
+    return job
+
+
+@api_router.post("/jobs", response_model=schemas.JobResponse, status_code=202)
+def criar_job(
+    job: schemas.JobCreate,
+    db: Session = Depends(get_db),
+    x_user_id: Optional[str] = Header(None, alias="X-User-Id")
+):
+    """Envia um job para a fila; acompanhe em GET /jobs/{id} e baixe em /jobs/{id}/resultado."""
+    try:
+        criado_por_id = int(x_user_id) if x_user_id else None
+        return crud_jobs.criar_job(db, job.tipo, job.parametros, criado_por_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@api_router.get("/jobs", response_model=List[schemas.JobResponse])
+def listar_jobs(
+    status: Optional[str] = None,
+    tipo: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Jobs do mais recente para o mais antigo, filtrados por status e tipo."""
+    try:
+        return [_job_com_progresso(j) for j in crud_jobs.listar_jobs(db, status, tipo, skip, limit)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@api_router.get("/jobs/tipos", response_model=List[schemas.TipoJobResponse])
+def listar_tipos_job():
+    """Tipos de job disponíveis."""
+    return fila_jobs.tipos_registrados()
+
+
+@api_router.get("/jobs/fila", response_model=schemas.SituacaoFilaJobs)
+def situacao_fila_jobs():
+    """Situação dos executores de jobs deste processo."""
+    fila = fila_jobs.obter_fila()
+    if fila is None:
+        return {"ativo": False, "executor": None, "executores": 0, "em_execucao": []}
+    return fila.situacao()
+
+
+@api_router.get("/jobs/{job_id}", response_model=schemas.JobResponse)
+def obter_job(job_id: int, db: Session = Depends(get_db)):
+    """Status, progresso e resultado (JSON) do job."""
+    job = crud_jobs.obter_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return _job_com_progresso(job)
+
+
+@api_router.get("/jobs/{job_id}/resultado")
+def baixar_resultado_job(job_id: int, db: Session = Depends(get_db)):
+    """Arquivo gerado pelo job (ou o resultado JSON, para jobs sem arquivo)."""
+    job = crud_jobs.obter_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if job.status != crud_jobs.STATUS_CONCLUIDO:
+        raise HTTPException(status_code=409, detail=f"Job {job.status}: resultado indisponível")
+    if not job.arquivo:
+        return JSONResponse(content=job.resultado)
+    if not PathLib(job.arquivo).exists():
+        raise HTTPException(status_code=410, detail="Arquivo do job expirado")
+    return FileResponse(job.arquivo, media_type=job.tipo_arquivo, filename=job.nome_arquivo)
+
+
+@api_router.post("/jobs/{job_id}/cancelar", response_model=schemas.JobResponse)
+def cancelar_job(job_id: int, db: Session = Depends(get_db)):
+    """Cancela o job pendente ou pede o cancelamento do job em execução."""
+    job = crud_jobs.solicitar_cancelamento(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
 @api_router.get("/tarefas/metricas-responsavel", response_model=List[schemas.MetricasResponsavel])
 def obter_metricas_por_responsavel(db: Session = Depends(get_db)):
     """Retorna métricas de desempenho por responsável."""
@@ -2161,6 +2235,44 @@ def obter_tempo_medio_por_tipo(db: Session = Depends(get_db)):
     return crud_tarefas.obter_tempo_medio_por_tipo(db)
 
 
+@api_router.get("/tarefas/eventos", response_model=List[schemas.TarefaEventoResponse])
+def listar_eventos_tarefas(
+    usuario_id: Optional[int] = None,
+    etapa: Optional[str] = Query(None, description="Etapa de destino da transição"),
+    inicio: Optional[date_type] = None,
+    fim: Optional[date_type] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Transições de workflow filtradas por usuário, etapa e período, das mais recentes."""
+    return crud_tarefa_eventos.listar_eventos(db, usuario_id, etapa, inicio, fim, skip, limit)
+
+
+@api_router.get("/tarefas/analise/vazao", response_model=List[schemas.VazaoEtapa])
+def obter_vazao_por_etapa(
+    inicio: Optional[date_type] = None,
+    fim: Optional[date_type] = None,
+    agrupar: Optional[str] = Query(None, description="dia, semana ou mes"),
+    db: Session = Depends(get_db)
+):
+    """Transições que chegaram a cada etapa do workflow no período."""
+    try:
+        return crud_tarefa_eventos.vazao_por_etapa(db, inicio, fim, agrupar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@api_router.get("/tarefas/analise/tempo-ciclo", response_model=List[schemas.TempoCicloEtapa])
+def obter_tempo_ciclo_por_etapa(
+    inicio: Optional[date_type] = None,
+    fim: Optional[date_type] = None,
+    db: Session = Depends(get_db)
+):
+    """Tempo de permanência em cada etapa do workflow (horas)."""
+    return crud_tarefa_eventos.tempo_ciclo_por_etapa(db, inicio, fim)
+
+
 @api_router.get("/tarefas/{tarefa_id}", response_model=schemas.Tarefa)
 def get_tarefa(tarefa_id: int, db: Session = Depends(get_db)):
     t = crud_tarefas.buscar_tarefa(tarefa_id, db)
@@ -2169,6 +2281,14 @@ def get_tarefa(tarefa_id: int, db: Session = Depends(get_db)):
     return t
 
 
+@api_router.get("/tarefas/{tarefa_id}/eventos", response_model=List[schemas.TarefaEventoResponse])
+def listar_eventos_da_tarefa(tarefa_id: int, db: Session = Depends(get_db)):
+    """Histórico de workflow da tarefa, em ordem cronológica."""
+    if not crud_tarefas.buscar_tarefa(tarefa_id, db):
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return crud_tarefa_eventos.listar_eventos_tarefa(db, tarefa_id)
+
+
 @api_router.get("/tarefas/{tarefa_id}/derivadas", response_model=List[schemas.TarefaResponse])
 def listar_tarefas_derivadas(tarefa_id: int, recursivo: bool = False, db: Session = Depends(get_db)):
     """Lista tarefas derivadas de uma tarefa."""
@@ -2266,6 +2386,97 @@ def criar_anexo_api(a: schemas.AnexoCreate, db: Session = Depends(get_db)):
     return na
 
 
+from fastapi import Form, Request
+from utils import armazenamento_anexos, extracao_anexos
+
+
+@api_router.post("/anexos/upload", response_model=schemas.Anexo)
+def enviar_anexo(
+    arquivo: UploadFile = File(...),
+    processo_id: Optional[int] = Form(None),
+    andamento_id: Optional[int] = Form(None),
+    criado_por: Optional[int] = Form(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Upload multipart de um anexo. O arquivo é copiado em blocos para o
+    armazenamento por conteúdo; um conteúdo já existente não é gravado de novo.
+    """
+    try:
+        return crud_anexos.criar_anexo_de_arquivo(
+            db, arquivo.file, arquivo.filename, arquivo.content_type,
+            processo_id=processo_id, andamento_id=andamento_id, criado_por=criado_por,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@api_router.get("/anexos/{anexo_id}/download")
+def baixar_anexo(anexo_id: int, request: Request, db: Session = Depends(get_db)):
+    """Download do anexo, com suporte a Range (206) e ETag pelo hash do conteúdo"""
+    anexo = crud_anexos.buscar_anexo(anexo_id, db)
+    if not anexo:
+        raise HTTPException(status_code=404, detail="Anexo não encontrado")
+    caminho = anexo.caminho_arquivo
+    if not caminho or not PathLib(caminho).is_file():
+        raise HTTPException(status_code=404, detail="Arquivo do anexo não encontrado")
+    mime = anexo.mime or "application/octet-stream"
+    nome = anexo.nome_arquivo or PathLib(caminho).name
+    headers = {"Accept-Ranges": "bytes"}
+    etag = f'"{anexo.hash_sha256}"' if anexo.hash_sha256 else None
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "private, max-age=86400"
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+
+    tamanho = PathLib(caminho).stat().st_size
+    faixa = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if faixa and (if_range is None or if_range == etag):
+        try:
+            intervalo = armazenamento_anexos.intervalo_bytes(faixa, tamanho)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{tamanho}"})
+        if intervalo:
+            inicio, fim = intervalo
+            headers["Content-Range"] = f"bytes {inicio}-{fim}/{tamanho}"
+            headers["Content-Length"] = str(fim - inicio + 1)
+            return StreamingResponse(
+                armazenamento_anexos.ler_intervalo(caminho, inicio, fim),
+                status_code=206, media_type=mime, headers=headers,
+            )
+    return FileResponse(caminho, media_type=mime, filename=nome, headers=headers,
+                        content_disposition_type="inline")
+
+
+@api_router.get("/anexos/{anexo_id}/miniatura")
+def miniatura_anexo(anexo_id: int, db: Session = Depends(get_db)):
+    """Miniatura PNG da primeira página, lida do cache de extração"""
+    anexo = crud_anexos.buscar_anexo(anexo_id, db)
+    if not anexo:
+        raise HTTPException(status_code=404, detail="Anexo não encontrado")
+    if not anexo.tem_miniatura:
+        raise HTTPException(status_code=404, detail="Miniatura indisponível")
+    caminho = extracao_anexos.caminho_miniatura(anexo.hash_sha256)
+    if not PathLib(caminho).is_file():
+        raise HTTPException(status_code=404, detail="Miniatura indisponível")
+    return FileResponse(caminho, media_type="image/png",
+                        headers={"ETag": f'"{anexo.hash_sha256}"', "Cache-Control": "private, max-age=86400"})
+
+
+@api_router.get("/anexos/{anexo_id}/texto", response_model=schemas.AnexoTexto)
+def texto_anexo(anexo_id: int, db: Session = Depends(get_db)):
+    """Texto extraído do anexo (cache de extração); vazio enquanto a extração não termina"""
+    anexo = crud_anexos.buscar_anexo(anexo_id, db)
+    if not anexo:
+        raise HTTPException(status_code=404, detail="Anexo não encontrado")
+    texto = None
+    if anexo.extracao_status == extracao_anexos.STATUS_CONCLUIDA:
+        texto = extracao_anexos.ler_texto(anexo.hash_sha256)
+    return {"id": anexo.id, "extracao_status": anexo.extracao_status, "paginas": anexo.paginas, "texto": texto}
+
+
 @api_router.delete("/anexos/{anexo_id}")
 def deletar_anexo_api(anexo_id: int, db: Session = Depends(get_db)):
     crud_anexos.deletar_anexo(anexo_id, db)
@@ -2621,19 +2832,18 @@ def classificar_intimacao(
         )
     
     # Avança workflow para "intimacao_classificada"
+    etapa_anterior = tarefa.etapa_workflow_atual
     tarefa.etapa_workflow_atual = "intimacao_classificada"
     
-    # Adiciona ao histórico
-    historico = tarefa.workflow_historico or []
-    historico.append({
-        "etapa_anterior": "analise_pendente",
-        "etapa_nova": "intimacao_classificada",
-        "usuario_id": usuario_id,
-        "usuario_nome": "Usuário",  # TODO: buscar nome real
-        "timestamp": datetime.utcnow().isoformat(),
-        "acao": f"Intimação classificada como: {classificacao.classificacao_intimacao.value}"
-    })
-    tarefa.workflow_historico = historico
+    # Registra a transição em tarefa_evento
+    usuario = crud_usuarios.buscar_usuario(db, usuario_id)
+    crud_tarefa_eventos.registrar_evento_tarefa(
+        db, tarefa, "intimacao_classificada", usuario_id,
+        usuario.nome if usuario else "Desconhecido",
+        f"Intimação classificada como: {classificacao.classificacao_intimacao.value}",
+        etapa_anterior=etapa_anterior,
+        tipo="classificacao",
+    )
     
     db.commit()
     db.refresh(tarefa)
@@ -37,6 +37,21 @@ class Cliente(ClienteBase):
     class Config:
         from_attributes = True
 
+class ClienteResumo(BaseModel):
+    """Projeção da listagem de clientes (?resumo=true)"""
+    id: int
+    nome: Optional[str] = None
+    nome_fantasia: Optional[str] = None
+    cpf_cnpj: Optional[str] = None
+    tipo_pessoa: Optional[str] = None
+    telefone: Optional[str] = None
+    email: Optional[str] = None
+    cidade: Optional[str] = None
+    uf: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 
 # ==================== SCHEMAS DE MUNICÍPIO (ANTES DE PROCESSO) ====================
 
@@ -91,6 +106,42 @@ class Processo(ProcessoBase):
     class Config:
         from_attributes = True
 
+class ProcessoResumo(BaseModel):
+    """Projeção da listagem de processos (?resumo=true), sem o grafo de objetos"""
+    id: int
+    numero: Optional[str] = None
+    autor: Optional[str] = None
+    reu: Optional[str] = None
+    status: Optional[str] = None
+    fase: Optional[str] = None
+    classe: Optional[str] = None
+    esfera_justica: Optional[str] = None
+    data_abertura: Optional[str] = None
+    cliente_id: Optional[int] = None
+    cliente_nome: Optional[str] = None
+    municipio_id: Optional[int] = None
+    municipio_nome: Optional[str] = None
+    uf: Optional[str] = None
+    # Atividade (processo_resumo)
+    tarefas_abertas: int = 0
+    proximo_prazo_fatal: Optional[date] = None
+    ultimo_andamento: Optional[date] = None
+    total_pagamentos: float = 0.0
+
+    class Config:
+        from_attributes = True
+
+class ResumoProcessoResponse(BaseModel):
+    """Agregados de atividade de um processo"""
+    processo_id: int
+    tarefas_abertas: int = 0
+    total_tarefas: int = 0
+    proximo_prazo_fatal: Optional[date] = None
+    ultimo_andamento: Optional[date] = None
+    qtd_andamentos: int = 0
+    total_pagamentos: float = 0.0
+    qtd_pagamentos: int = 0
+
 
 # Schemas de Tarefa e Andamento movidos para o final do arquivo com correções
 
@@ -110,11 +161,23 @@ class AnexoCreate(AnexoBase):
 class Anexo(AnexoBase):
     id: int
     criado_em: Optional[datetime] = None
+    blob_id: Optional[int] = None
+    hash_sha256: Optional[str] = None
+    extracao_status: Optional[str] = None
+    paginas: Optional[int] = None
+    tem_miniatura: bool = False
 
     class Config:
         from_attributes = True
 
 
+class AnexoTexto(BaseModel):
+    id: int
+    extracao_status: Optional[str] = None
+    paginas: Optional[int] = None
+    texto: Optional[str] = None
+
+
 class PagamentoBase(BaseModel):
     descricao: Optional[str] = None
     valor: float
@@ -251,6 +314,20 @@ class Entrada(EntradaBase):
     class Config:
         from_attributes = True
 
+class ImportacaoErroLinha(BaseModel):
+    linha: int
+    erros: List[str]
+
+class ImportacaoHonorariosResultado(BaseModel):
+    linhas: int
+    validas: int
+    importadas: int
+    duplicadas: int
+    invalidas: int
+    erros: List[ImportacaoErroLinha] = []
+    meses: List[str] = []
+    dry_run: bool
+
 
 # Schemas para Despesa
 class DespesaBase(BaseModel):
@@ -445,6 +522,34 @@ class WorkflowHistoricoItem(BaseModel):
     timestamp: str
     acao: str
 
+class TarefaEventoResponse(BaseModel):
+    id: int
+    tarefa_id: int
+    tipo: str
+    etapa_anterior: Optional[str] = None
+    etapa_nova: str
+    usuario_id: Optional[int] = None
+    usuario_nome: Optional[str] = None
+    acao: Optional[str] = None
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+class VazaoEtapa(BaseModel):
+    periodo: Optional[str] = None
+    etapa: str
+    transicoes: int
+    tarefas: int
+
+class TempoCicloEtapa(BaseModel):
+    etapa: str
+    concluidas: int
+    em_andamento: int
+    tempo_medio_horas: Optional[float] = None
+    tempo_minimo_horas: Optional[float] = None
+    tempo_maximo_horas: Optional[float] = None
+
 class TarefaResponse(TarefaBase):
     id: int
     etapa_workflow_atual: str
@@ -525,6 +630,71 @@ class EstatisticasTarefas(BaseModel):
     proximas_vencer: int
     por_tipo: List[EstatisticasPorTipo]
 
+class AlertaPrazoResponse(BaseModel):
+    id: int
+    tarefa_id: int
+    processo_id: Optional[int] = None
+    responsavel_id: Optional[int] = None
+    tipo_prazo: str
+    prazo: date
+    nivel: int
+    mensagem: str
+    lido: bool
+    criado_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class SituacaoAgendadorPrazos(BaseModel):
+    ativo: bool
+    tarefas_monitoradas: int
+    prazos_monitorados: int
+    proximo_disparo: Optional[date] = None
+
+class SincronizacaoResponse(BaseModel):
+    recurso: str
+    alterados: List[dict]
+    excluidos: List[int]
+    recarregar: bool  # True: descartar a cópia local e recarregar sem since
+    proximo_cursor: Optional[str] = None
+    proximo_since: datetime
+    servidor_em: datetime
+
+class JobCreate(BaseModel):
+    tipo: str
+    parametros: dict = {}
+
+class JobResponse(BaseModel):
+    id: int
+    tipo: str
+    status: str  # pendente, executando, concluido, erro, cancelado
+    parametros: Optional[dict] = None
+    progresso: int
+    mensagem: Optional[str] = None
+    resultado: Optional[object] = None  # JSON do job; arquivos em /jobs/{id}/resultado
+    nome_arquivo: Optional[str] = None
+    tipo_arquivo: Optional[str] = None
+    erro: Optional[str] = None
+    tentativas: int
+    cancelamento_solicitado: bool
+    criado_por_id: Optional[int] = None
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class TipoJobResponse(BaseModel):
+    tipo: str
+    descricao: str
+
+class SituacaoFilaJobs(BaseModel):
+    ativo: bool
+    executor: Optional[str] = None
+    executores: int
+    em_execucao: List[dict]
+
 class MetricasResponsavel(BaseModel):
     responsavel: str
     responsavel_id: int
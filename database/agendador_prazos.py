@@ -0,0 +1,365 @@
+"""
+Agendador de alertas de prazo das tarefas.
+
+Mantém em memória um heap mínimo com o próximo disparo de cada prazo
+(administrativo e fatal) das tarefas abertas. Uma thread dorme até a data
+do topo do heap, emite os alertas vencidos e agenda o nível seguinte do
+mesmo prazo (ANTECEDENCIAS), sem varrer a tabela de tarefas.
+
+O heap é atualizado de forma incremental a cada commit que inclui, altera
+ou exclui tarefas (eventos do SQLAlchemy). Entradas antigas não são
+removidas do heap: cada prazo tem uma geração, e entradas de geração
+anterior são descartadas ao chegar ao topo. Na inicialização o heap é
+reconstruído com uma única consulta no índice parcial das tarefas abertas.
+
+Cada alerta é gravado em alertas_prazo (notificação no sistema), impresso
+no log e, se GESTOR_WEBHOOK_PRAZOS estiver definido, enviado por POST
+JSON para essa URL.
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import urllib.request
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, or_, text
+from sqlalchemy.orm import Session
+
+from database import models
+from database.crud_processo_resumo import STATUS_TAREFA_FECHADA
+
+# Dias de antecedência de cada alerta, por tipo de prazo (-1 = dia seguinte: vencido)
+ANTECEDENCIAS = {
+    "administrativo": (2, 0, -1),
+    "fatal": (5, 2, 1, 0, -1),
+}
+
+HABILITADO = os.getenv("GESTOR_AGENDADOR_PRAZOS", "1") != "0"
+URL_WEBHOOK = os.getenv("GESTOR_WEBHOOK_PRAZOS")
+INTERVALO_MAXIMO = 3600  # segundos entre verificações sem alterações (virada do dia)
+
+# Mesma condição do índice parcial idx_tarefa_prazos_abertas
+_FILTRO_ABERTAS = "status IS NULL OR status NOT IN ('Concluída', 'Cancelada')"
+
+_ALTERACOES = "prazos_alterados"
+_RECARREGAR = "prazos_recarregar"
+
+# (data de disparo, tarefa_id, tipo de prazo, geração, prazo, índice do nível)
+Entrada = Tuple[date, int, str, int, date, int]
+
+
+def _data_disparo(prazo: date, tipo: str, indice: int) -> date:
+    return prazo - timedelta(days=ANTECEDENCIAS[tipo][indice])
+
+
+def _indice_inicial(prazo: date, tipo: str, hoje: date) -> int:
+    """Último nível já alcançado (alerta atual) ou o primeiro, se nenhum foi alcançado"""
+    indice = 0
+    for i in range(len(ANTECEDENCIAS[tipo])):
+        if _data_disparo(prazo, tipo, i) <= hoje:
+            indice = i
+    return indice
+
+
+def _mensagem(tarefa_id: int, processo_id: Optional[int], tipo: str, prazo: date, nivel: int) -> str:
+    if nivel > 0:
+        situacao = f"vence em {nivel} dia(s)"
+    elif nivel == 0:
+        situacao = "vence hoje"
+    else:
+        situacao = "vencido"
+    processo = f" (processo {processo_id})" if processo_id else ""
+    return f"Tarefa {tarefa_id}{processo}: prazo {tipo} de {prazo:%d/%m/%Y} {situacao}"
+
+
+def dados_tarefa(tarefa) -> Optional[dict]:
+    """Dados acompanhados pelo agendador; None se a tarefa não tem prazo aberto"""
+    if tarefa.status in STATUS_TAREFA_FECHADA:
+        return None
+    if tarefa.prazo_administrativo is None and tarefa.prazo_fatal is None:
+        return None
+    return {
+        "processo_id": tarefa.processo_id,
+        "responsavel_id": tarefa.responsavel_id,
+        "administrativo": tarefa.prazo_administrativo,
+        "fatal": tarefa.prazo_fatal,
+    }
+
+
+class AgendadorPrazos:
+    def __init__(self, fabrica_sessao: Callable[[], Session], hoje: Callable[[], date] = date.today):
+        self._fabrica_sessao = fabrica_sessao
+        self._hoje = hoje
+        self._heap: List[Entrada] = []
+        self._tarefas: Dict[int, dict] = {}
+        self._geracoes: Dict[Tuple[int, str], int] = {}
+        self._contador = itertools.count()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.carregado = False
+
+    # ----- estado -----
+
+    def _registrar(self, tarefa_id: int, dados: Optional[dict], hoje: date) -> None:
+        """Atualiza uma tarefa no estado em memória (chamar com o lock)"""
+        anterior = self._tarefas.pop(tarefa_id, None)
+        if dados is not None:
+            self._tarefas[tarefa_id] = dados
+        for tipo in ANTECEDENCIAS:
+            prazo = dados[tipo] if dados else None
+            if prazo is not None and anterior is not None and anterior[tipo] == prazo:
+                continue  # entrada do heap continua válida
+            self._geracoes.pop((tarefa_id, tipo), None)
+            if prazo is None:
+                continue
+            geracao = next(self._contador)
+            self._geracoes[(tarefa_id, tipo)] = geracao
+            indice = _indice_inicial(prazo, tipo, hoje)
+            heapq.heappush(self._heap, (_data_disparo(prazo, tipo, indice), tarefa_id, tipo, geracao, prazo, indice))
+
+    def _compactar(self) -> None:
+        # Descarta entradas obsoletas quando passam a dominar o heap
+        if len(self._heap) > 2 * len(self._geracoes) + 1000:
+            self._heap = [e for e in self._heap if self._geracoes.get((e[1], e[2])) == e[3]]
+            heapq.heapify(self._heap)
+
+    def carregar(self) -> int:
+        """Reconstrói o heap a partir das tarefas abertas com prazo. Retorna quantas"""
+        db = self._fabrica_sessao()
+        try:
+            linhas = db.query(
+                models.Tarefa.id,
+                models.Tarefa.processo_id,
+                models.Tarefa.responsavel_id,
+                models.Tarefa.prazo_administrativo,
+                models.Tarefa.prazo_fatal,
+            ).filter(
+                text(_FILTRO_ABERTAS),
+                or_(models.Tarefa.prazo_fatal.isnot(None), models.Tarefa.prazo_administrativo.isnot(None))
+            ).all()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._heap = []
+            self._tarefas = {}
+            self._geracoes = {}
+            hoje = self._hoje()
+            for l in linhas:
+                self._registrar(l.id, {
+                    "processo_id": l.processo_id,
+                    "responsavel_id": l.responsavel_id,
+                    "administrativo": l.prazo_administrativo,
+                    "fatal": l.prazo_fatal,
+                }, hoje)
+            self.carregado = True
+        self._acordar.set()
+        return len(linhas)
+
+    def atualizar(self, alteracoes: Dict[int, Optional[dict]]) -> None:
+        """Aplica tarefas incluídas/alteradas (dados) ou excluídas/fechadas (None)"""
+        if not self.carregado:
+            return
+        with self._lock:
+            hoje = self._hoje()
+            for tarefa_id, dados in alteracoes.items():
+                self._registrar(tarefa_id, dados, hoje)
+            self._compactar()
+        self._acordar.set()
+
+    def situacao(self) -> dict:
+        with self._lock:
+            proximo = min(
+                (e[0] for e in self._heap if self._geracoes.get((e[1], e[2])) == e[3]), default=None
+            )
+            return {
+                "ativo": self._thread is not None and self._thread.is_alive(),
+                "tarefas_monitoradas": len(self._tarefas),
+                "prazos_monitorados": len(self._geracoes),
+                "proximo_disparo": proximo,
+            }
+
+    # ----- disparo -----
+
+    def processar_vencidos(self) -> int:
+        """Emite os alertas com data de disparo até hoje. Retorna quantos foram gravados"""
+        hoje = self._hoje()
+        disparos = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= hoje:
+                _, tarefa_id, tipo, geracao, prazo, indice = heapq.heappop(self._heap)
+                if self._geracoes.get((tarefa_id, tipo)) != geracao:
+                    continue  # prazo alterado ou tarefa fechada depois do agendamento
+                disparos.append((tarefa_id, dict(self._tarefas[tarefa_id]), tipo, prazo, ANTECEDENCIAS[tipo][indice]))
+                if indice + 1 < len(ANTECEDENCIAS[tipo]):
+                    heapq.heappush(self._heap, (
+                        _data_disparo(prazo, tipo, indice + 1), tarefa_id, tipo, geracao, prazo, indice + 1
+                    ))
+                else:
+                    self._geracoes.pop((tarefa_id, tipo), None)
+        return self._emitir(disparos) if disparos else 0
+
+    def _emitir(self, disparos) -> int:
+        db = self._fabrica_sessao()
+        novos: List[models.AlertaPrazo] = []
+        try:
+            for tarefa_id, dados, tipo, prazo, nivel in disparos:
+                # Após reinício o nível atual pode já ter sido emitido
+                existe = db.query(models.AlertaPrazo.id).filter(
+                    models.AlertaPrazo.tarefa_id == tarefa_id,
+                    models.AlertaPrazo.tipo_prazo == tipo,
+                    models.AlertaPrazo.prazo == prazo,
+                    models.AlertaPrazo.nivel == nivel
+                ).first()
+                if existe:
+                    continue
+                alerta = models.AlertaPrazo(
+                    tarefa_id=tarefa_id,
+                    processo_id=dados["processo_id"],
+                    responsavel_id=dados["responsavel_id"],
+                    tipo_prazo=tipo,
+                    prazo=prazo,
+                    nivel=nivel,
+                    mensagem=_mensagem(tarefa_id, dados["processo_id"], tipo, prazo, nivel),
+                )
+                db.add(alerta)
+                novos.append(alerta)
+            db.commit()
+            payload = [{
+                "id": a.id,
+                "tarefa_id": a.tarefa_id,
+                "processo_id": a.processo_id,
+                "responsavel_id": a.responsavel_id,
+                "tipo_prazo": a.tipo_prazo,
+                "prazo": a.prazo.isoformat(),
+                "nivel": a.nivel,
+                "mensagem": a.mensagem,
+            } for a in novos]
+        finally:
+            db.close()
+
+        for item in payload:
+            print(f"⏰ {item['mensagem']}")
+        if payload and URL_WEBHOOK:
+            self._enviar_webhook(payload)
+        return len(payload)
+
+    def _enviar_webhook(self, payload: List[dict]) -> None:
+        requisicao = urllib.request.Request(
+            URL_WEBHOOK,
+            data=json.dumps({"alertas": payload}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            urllib.request.urlopen(requisicao, timeout=5).close()
+        except Exception as e:
+            print(f"Aviso: falha ao enviar alertas de prazo ao webhook: {e}")
+
+    # ----- thread -----
+
+    def _segundos_ate_proximo(self) -> float:
+        with self._lock:
+            if not self._heap:
+                return INTERVALO_MAXIMO
+            disparo = datetime.combine(self._heap[0][0], time.min)
+        return min(INTERVALO_MAXIMO, max(1.0, (disparo - datetime.now()).total_seconds()))
+
+    def _executar(self) -> None:
+        while not self._parar.is_set():
+            try:
+                if not self.carregado:
+                    self.carregar()
+                self.processar_vencidos()
+            except Exception as e:
+                print(f"Aviso: falha no agendador de prazos: {e}")
+            self._acordar.wait(self._segundos_ate_proximo())
+            self._acordar.clear()
+
+    def iniciar(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="agendador-prazos", daemon=True)
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_agendador: Optional[AgendadorPrazos] = None
+
+
+def obter_agendador() -> Optional[AgendadorPrazos]:
+    return _agendador
+
+
+def iniciar_agendador(fabrica_sessao: Callable[[], Session]) -> Optional[AgendadorPrazos]:
+    """Cria e inicia o agendador da aplicação (no-op se GESTOR_AGENDADOR_PRAZOS=0)"""
+    global _agendador
+    if not HABILITADO:
+        return None
+    if _agendador is None:
+        _agendador = AgendadorPrazos(fabrica_sessao)
+    _agendador.iniciar()
+    return _agendador
+
+
+def parar_agendador() -> None:
+    global _agendador
+    if _agendador is not None:
+        _agendador.parar()
+        _agendador = None
+
+
+# ===== EVENTOS =====
+
+def _marcar_tarefa(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(_ALTERACOES, {})[target.id] = dados_tarefa(target)
+
+
+def _marcar_tarefa_excluida(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(_ALTERACOES, {})[target.id] = None
+
+
+event.listen(models.Tarefa, "after_insert", _marcar_tarefa)
+event.listen(models.Tarefa, "after_update", _marcar_tarefa)
+event.listen(models.Tarefa, "after_delete", _marcar_tarefa_excluida)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _alteracao_em_lote(contexto):
+    if contexto.mapper.class_ is models.Tarefa:
+        contexto.session.info[_RECARREGAR] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_alteracoes(session):
+    alteracoes = session.info.pop(_ALTERACOES, None)
+    recarregar = session.info.pop(_RECARREGAR, False)
+    if _agendador is None:
+        return
+    if recarregar:
+        _agendador.carregar()
+    elif alteracoes:
+        _agendador.atualizar(alteracoes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _transacao_desfeita(session):
+    session.info.pop(_ALTERACOES, None)
+    session.info.pop(_RECARREGAR, None)
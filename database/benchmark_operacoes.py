@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark do motor de operações contábeis (executar_operacao).
+
+Cria um banco SQLite temporário com o plano de contas padrão, executa um
+ciclo repetido de operações e mede operações/segundo e comandos SQL por
+operação.
+
+Uso:
+    python database/benchmark_operacoes.py [--ciclos 200] [--sem-cache]
+
+--sem-cache invalida o cache do plano de contas antes de cada operação,
+simulando a resolução de contas a frio (comportamento anterior ao cache).
+"""
+import sys
+import os
+import time
+import tempfile
+import argparse
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import models
+from database import crud_contabilidade
+from database import crud_plano_contas
+from database.init_plano_contas import inicializar_plano_contas
+
+# Ciclo que exercita débito/crédito simples e validações de saldo
+CICLO = [
+    ("REC_HON", 1000.0),
+    ("SEPARAR_OBRIGACOES_FISCAIS", 150.0),
+    ("PROVISIONAR_SIMPLES", 60.0),
+    ("RESGATAR_CDB_OBRIGACOES_FISCAIS", 60.0),
+    ("PAGAR_SIMPLES", 60.0),
+    ("SEPARAR_PRO_LABORE", 200.0),
+]
+
+
+def _preparar_banco(caminho: str):
+    engine = create_engine(f"sqlite:///{caminho}")
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    db = Session()
+    try:
+        inicializar_plano_contas(db)
+        for ordem, (codigo, _) in enumerate(CICLO):
+            db.add(models.Operacao(codigo=codigo, nome=codigo, ativo=True, ordem=ordem))
+        db.commit()
+    finally:
+        db.close()
+    return engine, Session
+
+
+def executar_benchmark(ciclos: int, sem_cache: bool = False) -> dict:
+    fd, caminho = tempfile.mkstemp(suffix=".db", prefix="bench_operacoes_")
+    os.close(fd)
+    engine, Session = _preparar_banco(caminho)
+
+    comandos = {"total": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        comandos["total"] += 1
+
+    invalidar = getattr(crud_plano_contas, "invalidar_cache_plano_contas", None)
+    db = Session()
+    try:
+        data = date.today()
+        total_ops = 0
+        comandos["total"] = 0
+        inicio = time.perf_counter()
+        for _ in range(ciclos):
+            for codigo, valor in CICLO:
+                if sem_cache and invalidar:
+                    invalidar()
+                crud_contabilidade.executar_operacao(db, codigo, valor, data)
+                total_ops += 1
+        duracao = time.perf_counter() - inicio
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(caminho)
+
+    return {
+        "operacoes": total_ops,
+        "segundos": duracao,
+        "ops_por_segundo": total_ops / duracao if duracao else 0.0,
+        "comandos_por_operacao": comandos["total"] / total_ops if total_ops else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de executar_operacao")
+    parser.add_argument("--ciclos", type=int, default=200)
+    parser.add_argument("--sem-cache", action="store_true")
+    args = parser.parse_args()
+
+    r = executar_benchmark(args.ciclos, args.sem_cache)
+    print("=" * 60)
+    print(f"Operações executadas : {r['operacoes']}")
+    print(f"Tempo total          : {r['segundos']:.2f} s")
+    print(f"Operações/segundo    : {r['ops_por_segundo']:.1f}")
+    print(f"Comandos SQL/operação: {r['comandos_por_operacao']:.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Alertas de prazo de tarefas (tabela alertas_prazo).
+
+Os alertas são gravados pelo agendador de prazos (agendador_prazos.py);
+aqui ficam a listagem e a marcação como lido.
+"""
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from database import models
+
+
+def listar_alertas(
+    db: Session,
+    apenas_nao_lidos: bool = True,
+    responsavel_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 50
+) -> List[models.AlertaPrazo]:
+    """Lista alertas do mais recente para o mais antigo"""
+    query = db.query(models.AlertaPrazo)
+    if apenas_nao_lidos:
+        query = query.filter(models.AlertaPrazo.lido == False)
+    if responsavel_id is not None:
+        query = query.filter(models.AlertaPrazo.responsavel_id == responsavel_id)
+    return query.order_by(
+        models.AlertaPrazo.criado_em.desc(), models.AlertaPrazo.id.desc()
+    ).offset(skip).limit(limit).all()
+
+
+def marcar_alerta_lido(db: Session, alerta_id: int) -> Optional[models.AlertaPrazo]:
+    alerta = db.query(models.AlertaPrazo).filter(models.AlertaPrazo.id == alerta_id).first()
+    if alerta and not alerta.lido:
+        alerta.lido = True
+        db.commit()
+        db.refresh(alerta)
+    return alerta
@@ -1,7 +1,36 @@
-from database.models import Anexo
-from sqlalchemy.orm import Session
-from datetime import datetime
+"""
+Anexos de processos e andamentos.
+
+Arquivos enviados pelo upload ficam no armazenamento por conteúdo
+(utils.armazenamento_anexos): cada conteúdo distinto é gravado uma vez e a
+tabela arquivo_blob conta quantos anexos apontam para ele. Excluir um anexo
+só decrementa a contagem; o arquivo é apagado pelo coletor
+(coletar_blobs_orfaos) depois de um período de carência sem referências.
+
+Anexos antigos, registrados só com caminho_arquivo, continuam funcionando
+como antes (blob_id nulo).
+
+Texto e miniatura de cada conteúdo são extraídos em segundo plano pelo job
+"extrair_anexos" (utils.extracao_anexos, com cache em disco pelo hash) e o
+texto alimenta a busca textual; um conteúdo já extraído é indexado na hora
+do upload, sem novo processamento.
+"""
+import mimetypes
 import os
+import time
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from database import crud_busca
+from database.models import Anexo, ArquivoBlob, Andamento, Job, Processo
+from utils import armazenamento_anexos as armazenamento
+from utils import extracao_anexos as extracao
+
+# Horas sem referências antes de um blob ser apagado do disco
+CARENCIA_COLETA_HORAS = 24
 
 
 def criar_anexo(processo_id: int = None, andamento_id: int = None,
@@ -18,17 +47,83 @@ def criar_anexo(processo_id: int = None, andamento_id: int = None,
         criado_em=datetime.utcnow()
     )
     db.add(a)
+    db.flush()
+    indexar_anexo(db, a)
     db.commit()
     db.refresh(a)
     return a
 
 
+def criar_anexo_de_arquivo(db: Session, origem: BinaryIO, nome_original: str,
+                           mime: Optional[str] = None, processo_id: int = None,
+                           andamento_id: int = None, criado_por: int = None) -> Anexo:
+    """
+    Grava o conteúdo de origem (lido em blocos) no armazenamento por
+    conteúdo e cria o anexo. Um conteúdo já armazenado não é gravado de novo:
+    o anexo aponta para o blob existente e a contagem de referências sobe.
+    """
+    if processo_id is None and andamento_id is None:
+        raise ValueError("Informe o processo ou o andamento do anexo")
+    if processo_id is not None and not db.query(Processo.id).filter(Processo.id == processo_id).first():
+        raise ValueError("Processo não encontrado")
+    if andamento_id is not None and not db.query(Andamento.id).filter(Andamento.id == andamento_id).first():
+        raise ValueError("Andamento não encontrado")
+    mime = mime or mimetypes.guess_type(nome_original or "")[0] or "application/octet-stream"
+
+    temporario, hash_sha256, tamanho = armazenamento.gravar_temporario(origem)
+    try:
+        with armazenamento.trava():
+            agora = datetime.utcnow()
+            atualizados = db.execute(
+                update(ArquivoBlob)
+                .where(ArquivoBlob.hash_sha256 == hash_sha256)
+                .values(referencias=ArquivoBlob.referencias + 1, atualizado_em=agora)
+            ).rowcount
+            if atualizados:
+                blob_id = db.query(ArquivoBlob.id).filter(ArquivoBlob.hash_sha256 == hash_sha256).scalar()
+            else:
+                blob = ArquivoBlob(hash_sha256=hash_sha256, tamanho=tamanho, mime=mime,
+                                   referencias=1, criado_em=agora, atualizado_em=agora)
+                db.add(blob)
+                db.flush()
+                blob_id = blob.id
+            caminho = armazenamento.efetivar(temporario, hash_sha256)
+            anexo = Anexo(
+                processo_id=processo_id,
+                andamento_id=andamento_id,
+                nome_original=nome_original,
+                caminho_arquivo=caminho,
+                mime=mime,
+                tamanho=tamanho,
+                criado_por=criado_por,
+                criado_em=agora,
+                blob_id=blob_id,
+            )
+            db.add(anexo)
+            db.flush()
+            indexar_anexo(db, anexo)
+            db.commit()
+    except BaseException:
+        db.rollback()
+        # Blob já efetivado sem registro fica para o coletor
+        armazenamento.remover_arquivo(temporario)
+        raise
+    db.refresh(anexo)
+    if anexo.blob.extracao_status == extracao.STATUS_PENDENTE:
+        agendar_extracao(db)
+    return anexo
+
+
 def listar_anexos_do_processo(processo_id: int, db: Session):
-    return db.query(Anexo).filter(Anexo.processo_id == processo_id).order_by(Anexo.criado_em.desc()).all()
+    return db.query(Anexo).options(joinedload(Anexo.blob)).filter(
+        Anexo.processo_id == processo_id
+    ).order_by(Anexo.criado_em.desc()).all()
 
 
 def listar_anexos_do_andamento(andamento_id: int, db: Session):
-    return db.query(Anexo).filter(Anexo.andamento_id == andamento_id).order_by(Anexo.criado_em.desc()).all()
+    return db.query(Anexo).options(joinedload(Anexo.blob)).filter(
+        Anexo.andamento_id == andamento_id
+    ).order_by(Anexo.criado_em.desc()).all()
 
 
 def buscar_anexo(id: int, db: Session):
@@ -40,8 +135,17 @@ def deletar_anexo(id: int, db: Session):
     if not a:
         return False
     caminho = a.caminho_arquivo
+    blob_id = a.blob_id
     db.delete(a)
+    if blob_id is not None:
+        db.execute(
+            update(ArquivoBlob)
+            .where(ArquivoBlob.id == blob_id)
+            .values(referencias=ArquivoBlob.referencias - 1, atualizado_em=datetime.utcnow())
+        )
     db.commit()
+    if blob_id is not None:
+        return True
     try:
         if caminho and os.path.exists(caminho):
             os.remove(caminho)
@@ -50,3 +154,112 @@ def deletar_anexo(id: int, db: Session):
         print(f"Erro ao deletar arquivo físico: {e}")
         pass
     return True
+
+
+# ===== EXTRAÇÃO E BUSCA =====
+
+def indexar_anexo(db: Session, anexo: Anexo, texto: Optional[str] = None) -> None:
+    """
+    Grava o anexo na busca textual: nome do arquivo e o texto extraído (lido
+    do cache quando não informado). Sem commit.
+    """
+    if texto is None and anexo.blob is not None and anexo.blob.extracao_status == extracao.STATUS_CONCLUIDA:
+        texto = extracao.ler_texto(anexo.blob.hash_sha256)
+    processo_id = anexo.processo_id
+    if processo_id is None and anexo.andamento is not None:
+        processo_id = anexo.andamento.processo_id
+    crud_busca.indexar_registro(db, "anexo", anexo.id, processo_id, anexo.nome_arquivo, texto or "")
+
+
+def blobs_para_extracao(db: Session, reprocessar: bool = False) -> List[int]:
+    """Blobs em uso a extrair: só os pendentes, ou todos com reprocessar"""
+    consulta = db.query(ArquivoBlob.id).filter(ArquivoBlob.referencias > 0)
+    if not reprocessar:
+        consulta = consulta.filter(ArquivoBlob.extracao_status == extracao.STATUS_PENDENTE)
+    return [blob_id for (blob_id,) in consulta.order_by(ArquivoBlob.id)]
+
+
+def registrar_extracao(db: Session, blob_id: int, metadados: Dict) -> int:
+    """Grava o resultado da extração no blob e reindexa seus anexos. Retorna quantos anexos"""
+    blob = db.get(ArquivoBlob, blob_id)
+    if blob is None:
+        return 0
+    blob.extracao_status = metadados["status"]
+    blob.paginas = metadados.get("paginas")
+    blob.tem_miniatura = bool(metadados.get("miniatura"))
+    texto = None
+    if blob.extracao_status == extracao.STATUS_CONCLUIDA:
+        texto = extracao.ler_texto(blob.hash_sha256)
+    anexos = db.query(Anexo).options(joinedload(Anexo.andamento)).filter(Anexo.blob_id == blob_id).all()
+    for anexo in anexos:
+        indexar_anexo(db, anexo, texto or "")
+    db.commit()
+    return len(anexos)
+
+
+def agendar_extracao(db: Session) -> Optional[int]:
+    """
+    Garante um job "extrair_anexos" pendente quando há blobs a extrair (um
+    único job atende todos). Retorna o id do job, ou None se nada a fazer.
+    """
+    from database import crud_jobs
+
+    if not db.query(ArquivoBlob.id).filter(
+        ArquivoBlob.referencias > 0, ArquivoBlob.extracao_status == extracao.STATUS_PENDENTE
+    ).first():
+        return None
+    pendente = db.query(Job.id).filter(
+        Job.tipo == "extrair_anexos", Job.status == crud_jobs.STATUS_PENDENTE
+    ).first()
+    if pendente:
+        return pendente.id
+    return crud_jobs.criar_job(db, "extrair_anexos").id
+
+
+def coletar_blobs_orfaos(db: Session, carencia_horas: float = CARENCIA_COLETA_HORAS) -> Dict[str, int]:
+    """
+    Apaga do disco os blobs sem anexos há mais de carencia_horas, os
+    arquivos de blob sem registro no banco (upload interrompido) e os
+    temporários antigos. Antes, recalcula as contagens de referências a
+    partir dos anexos, corrigindo qualquer divergência.
+    """
+    contagem = select(func.count(Anexo.id)).where(Anexo.blob_id == ArquivoBlob.id).scalar_subquery()
+    db.execute(update(ArquivoBlob).where(ArquivoBlob.referencias != contagem).values(referencias=contagem))
+    db.commit()
+
+    limite = datetime.utcnow() - timedelta(hours=carencia_horas)
+    candidatos = db.query(ArquivoBlob.id, ArquivoBlob.hash_sha256).filter(
+        ArquivoBlob.referencias <= 0, ArquivoBlob.atualizado_em < limite
+    ).all()
+
+    resultado = {"blobs_removidos": 0, "arquivos_sem_registro": 0, "bytes_liberados": 0}
+    for blob_id, hash_sha256 in candidatos:
+        with armazenamento.trava():
+            # Condicional: um upload pode ter voltado a referenciar o blob
+            apagados = db.query(ArquivoBlob).filter(
+                ArquivoBlob.id == blob_id,
+                ArquivoBlob.referencias <= 0,
+                ~select(Anexo.id).where(Anexo.blob_id == blob_id).exists(),
+            ).delete(synchronize_session=False)
+            db.commit()
+            if apagados:
+                resultado["blobs_removidos"] += 1
+                resultado["bytes_liberados"] += armazenamento.remover_arquivo(
+                    armazenamento.caminho_blob(hash_sha256)
+                )
+                extracao.remover_cache(hash_sha256)
+
+    limite_arquivo = time.time() - carencia_horas * 3600
+    registrados = {h for (h,) in db.query(ArquivoBlob.hash_sha256)}
+    for hash_sha256, caminho, modificado_em in armazenamento.listar_blobs():
+        if hash_sha256 in registrados or modificado_em >= limite_arquivo:
+            continue
+        with armazenamento.trava():
+            if db.query(ArquivoBlob.id).filter(ArquivoBlob.hash_sha256 == hash_sha256).first():
+                continue
+            resultado["arquivos_sem_registro"] += 1
+            resultado["bytes_liberados"] += armazenamento.remover_arquivo(caminho)
+            extracao.remover_cache(hash_sha256)
+
+    armazenamento.limpar_temporarios(carencia_horas * 3600)
+    return resultado
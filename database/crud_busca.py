@@ -0,0 +1,315 @@
+"""
+Busca textual em processos, clientes, tarefas e andamentos.
+
+No SQLite o índice é a tabela virtual FTS5 busca_fts (tokenizer unicode61
+sem acentos, com índice de prefixo), mantida por triggers nas tabelas de
+origem; criação e carga inicial ficam em migrar_indice_busca.py. O rowid
+de cada linha do índice é id * FATOR_ROWID + código do tipo, de modo que os
+triggers removem a linha antiga por chave primária.
+
+Anexos são indexados pela aplicação (indexar_registro), pois o texto vem do
+cache de extração em disco e não de uma coluna; o trigger só remove a linha
+quando o anexo é excluído.
+
+Em bancos sem FTS5 (ou antes da migração) a busca usa LIKE nas mesmas
+colunas, com ordenação simples pelo número de colunas que casaram.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text, or_, and_
+from sqlalchemy.orm import Session
+
+from database import models
+
+TABELA_FTS = "busca_fts"
+FATOR_ROWID = 8  # maior que o número de tipos (códigos 0..7)
+
+# tipo → tabela de origem, código do rowid, colunas vigiadas pelos triggers e
+# expressões SQL ({p} = prefixo new./old./vazio) de título e conteúdo
+FONTES = {
+    "processo": {
+        "tabela": "processos",
+        "codigo": 0,
+        "colunas": ["numero", "autor", "reu", "vara", "observacoes"],
+        "processo_id": "{p}id",
+        "titulo": ["{p}numero"],
+        "conteudo": ["{p}autor", "{p}reu", "{p}vara", "{p}observacoes"],
+    },
+    "cliente": {
+        "tabela": "clientes",
+        "codigo": 1,
+        "colunas": ["nome", "nome_fantasia", "cpf_cnpj"],
+        "processo_id": "NULL",
+        "titulo": ["{p}nome"],
+        # CPF/CNPJ também sem pontuação, para buscar só pelos dígitos
+        "conteudo": [
+            "{p}nome_fantasia", "{p}cpf_cnpj",
+            "REPLACE(REPLACE(REPLACE({p}cpf_cnpj, '.', ''), '-', ''), '/', '')",
+        ],
+    },
+    "tarefa": {
+        "tabela": "tarefas",
+        "codigo": 2,
+        "colunas": ["processo_id", "descricao_complementar", "conteudo_intimacao"],
+        "processo_id": "{p}processo_id",
+        "titulo": ["{p}descricao_complementar"],
+        "conteudo": ["{p}conteudo_intimacao"],
+    },
+    "andamento": {
+        "tabela": "andamentos",
+        "codigo": 3,
+        "colunas": ["processo_id", "descricao_complementar"],
+        "processo_id": "{p}processo_id",
+        "titulo": ["''"],
+        "conteudo": ["{p}descricao_complementar"],
+    },
+}
+
+# Tipos alimentados pela aplicação: tabela de origem e código do rowid
+FONTES_EXTERNAS = {
+    "anexo": {"tabela": "anexos", "codigo": 4},
+}
+
+TIPOS = list(FONTES) + list(FONTES_EXTERNAS)
+_TIPO_POR_CODIGO = {f["codigo"]: tipo for tipo, f in {**FONTES, **FONTES_EXTERNAS}.items()}
+
+# Peso das colunas (titulo, conteudo) no bm25
+PESO_TITULO = 5.0
+PESO_CONTEUDO = 1.0
+
+
+# ===== DDL (usada por migrar_indice_busca) =====
+
+def _concatenar(expressoes: List[str], prefixo: str) -> str:
+    partes = [f"COALESCE({e.format(p=prefixo)}, '')" for e in expressoes]
+    return " || ' ' || ".join(partes)
+
+
+def _valores(tipo: str, prefixo: str) -> str:
+    f = FONTES[tipo]
+    return (
+        f"{prefixo}id * {FATOR_ROWID} + {f['codigo']}, '{tipo}', {prefixo}id, "
+        f"{f['processo_id'].format(p=prefixo)}, "
+        f"{_concatenar(f['titulo'], prefixo)}, {_concatenar(f['conteudo'], prefixo)}"
+    )
+
+
+def sql_criar_tabela() -> str:
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+        "tipo UNINDEXED, registro_id UNINDEXED, processo_id UNINDEXED, titulo, conteudo, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+    )
+
+
+def sql_triggers() -> List[str]:
+    comandos = []
+    colunas_fts = "rowid, tipo, registro_id, processo_id, titulo, conteudo"
+    for tipo, f in FONTES.items():
+        tabela, codigo = f["tabela"], f["codigo"]
+        comandos.append(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_{tabela}_ai AFTER INSERT ON {tabela} BEGIN "
+            f"INSERT INTO {TABELA_FTS} ({colunas_fts}) VALUES ({_valores(tipo, 'new.')}); END"
+        )
+        comandos.append(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_{tabela}_ad AFTER DELETE ON {tabela} BEGIN "
+            f"DELETE FROM {TABELA_FTS} WHERE rowid = old.id * {FATOR_ROWID} + {codigo}; END"
+        )
+        comandos.append(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_{tabela}_au "
+            f"AFTER UPDATE OF {', '.join(f['colunas'])} ON {tabela} BEGIN "
+            f"DELETE FROM {TABELA_FTS} WHERE rowid = old.id * {FATOR_ROWID} + {codigo}; "
+            f"INSERT INTO {TABELA_FTS} ({colunas_fts}) VALUES ({_valores(tipo, 'new.')}); END"
+        )
+    for f in FONTES_EXTERNAS.values():
+        comandos.append(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_{f['tabela']}_ad AFTER DELETE ON {f['tabela']} BEGIN "
+            f"DELETE FROM {TABELA_FTS} WHERE rowid = old.id * {FATOR_ROWID} + {f['codigo']}; END"
+        )
+    return comandos
+
+
+def sql_indexar_externo() -> List[str]:
+    """Comandos (parâmetros nomeados) que substituem a linha de um registro de FONTES_EXTERNAS"""
+    return [
+        f"DELETE FROM {TABELA_FTS} WHERE rowid = :rowid",
+        f"INSERT INTO {TABELA_FTS} (rowid, tipo, registro_id, processo_id, titulo, conteudo) "
+        "VALUES (:rowid, :tipo, :registro_id, :processo_id, :titulo, :conteudo)",
+    ]
+
+
+def parametros_indexar_externo(tipo: str, registro_id: int, processo_id: Optional[int],
+                               titulo: str, conteudo: str) -> Dict[str, Any]:
+    return {
+        "rowid": registro_id * FATOR_ROWID + FONTES_EXTERNAS[tipo]["codigo"],
+        "tipo": tipo,
+        "registro_id": registro_id,
+        "processo_id": processo_id,
+        "titulo": titulo or "",
+        "conteudo": conteudo or "",
+    }
+
+
+def sql_popular() -> List[str]:
+    colunas_fts = "rowid, tipo, registro_id, processo_id, titulo, conteudo"
+    return [
+        f"INSERT INTO {TABELA_FTS} ({colunas_fts}) SELECT {_valores(tipo, '')} FROM {f['tabela']}"
+        for tipo, f in FONTES.items()
+    ]
+
+
+# ===== CONSULTA =====
+
+def _sem_acentos(texto: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", texto)
+        if not unicodedata.combining(c)
+    )
+
+
+def _termos(consulta: str) -> List[str]:
+    """Quebra a consulta em termos (palavras ou números com pontuação interna)"""
+    return [t for t in re.findall(r"\w+(?:[./-]\w+)*", consulta or "") if t]
+
+
+def expressao_fts(consulta: str) -> Optional[str]:
+    """Converte texto livre em expressão MATCH: todos os termos, com prefixo"""
+    termos = _termos(consulta)
+    if not termos:
+        return None
+    return " AND ".join(f'"{t}"*' for t in termos)
+
+
+_fts_por_bind: Dict[int, bool] = {}
+
+
+def indice_fts_disponivel(db: Session) -> bool:
+    """Indica se o banco possui a tabela FTS5 de busca (resultado memorizado por engine)"""
+    bind = db.get_bind()
+    chave = id(bind)
+    if chave not in _fts_por_bind:
+        if bind.dialect.name != "sqlite":
+            _fts_por_bind[chave] = False
+        else:
+            _fts_por_bind[chave] = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                {"nome": TABELA_FTS}
+            ).first() is not None
+    return _fts_por_bind[chave]
+
+
+def _buscar_fts(db: Session, consulta: str, tipos: List[str], skip: int, limit: int) -> Dict[str, Any]:
+    expressao = expressao_fts(consulta)
+    if not expressao:
+        return {"total": 0, "itens": []}
+
+    parametros = {"expr": expressao, "skip": skip, "limit": limit}
+    filtro_tipo = ""
+    if set(tipos) != set(TIPOS):
+        nomes = [f":tipo{i}" for i in range(len(tipos))]
+        filtro_tipo = f" AND tipo IN ({', '.join(nomes)})"
+        parametros.update({f"tipo{i}": t for i, t in enumerate(tipos)})
+
+    total = db.execute(
+        text(f"SELECT COUNT(*) FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH :expr{filtro_tipo}"),
+        parametros
+    ).scalar()
+
+    linhas = db.execute(text(
+        f"SELECT tipo, registro_id, processo_id, titulo, "
+        f"snippet({TABELA_FTS}, -1, '[', ']', '…', 12) AS trecho, "
+        f"bm25({TABELA_FTS}, 0, 0, 0, {PESO_TITULO}, {PESO_CONTEUDO}) AS relevancia "
+        f"FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH :expr{filtro_tipo} "
+        f"ORDER BY relevancia LIMIT :limit OFFSET :skip"
+    ), parametros).all()
+
+    return {
+        "total": total or 0,
+        "itens": [{
+            "tipo": l.tipo,
+            "id": l.registro_id,
+            "processo_id": l.processo_id,
+            "titulo": l.titulo,
+            "trecho": l.trecho,
+            # bm25 é negativo: quanto menor, mais relevante
+            "relevancia": round(-l.relevancia, 4),
+        } for l in linhas]
+    }
+
+
+# Colunas do modelo usadas no fallback sem FTS: (titulo, conteudo, processo_id)
+_COLUNAS_FALLBACK = {
+    "processo": (models.Processo, [models.Processo.numero],
+                 [models.Processo.autor, models.Processo.reu, models.Processo.vara, models.Processo.observacoes]),
+    "cliente": (models.Cliente, [models.Cliente.nome],
+                [models.Cliente.nome_fantasia, models.Cliente.cpf_cnpj]),
+    "tarefa": (models.Tarefa, [models.Tarefa.descricao_complementar],
+               [models.Tarefa.conteudo_intimacao]),
+    "andamento": (models.Andamento, [], [models.Andamento.descricao_complementar]),
+    # Sem FTS o texto extraído não está no banco: busca só pelo nome do arquivo
+    "anexo": (models.Anexo, [models.Anexo.nome_arquivo], []),
+}
+
+
+def _buscar_like(db: Session, consulta: str, tipos: List[str], skip: int, limit: int) -> Dict[str, Any]:
+    termos = _termos(consulta)
+    if not termos:
+        return {"total": 0, "itens": []}
+    termos_normalizados = [_sem_acentos(t).lower() for t in termos]
+
+    resultados = []
+    for tipo in tipos:
+        modelo, colunas_titulo, colunas_conteudo = _COLUNAS_FALLBACK[tipo]
+        colunas = colunas_titulo + colunas_conteudo
+        filtros = [or_(*[c.ilike(f"%{t}%") for c in colunas]) for t in termos]
+        for registro in db.query(modelo).filter(and_(*filtros)).all():
+            titulo = " ".join(str(getattr(registro, c.key) or "") for c in colunas_titulo)
+            conteudo = " ".join(str(getattr(registro, c.key) or "") for c in colunas_conteudo)
+            titulo_n = _sem_acentos(titulo).lower()
+            conteudo_n = _sem_acentos(conteudo).lower()
+            relevancia = sum(
+                PESO_TITULO * (t in titulo_n) + PESO_CONTEUDO * (t in conteudo_n)
+                for t in termos_normalizados
+            )
+            resultados.append({
+                "tipo": tipo,
+                "id": registro.id,
+                "processo_id": registro.id if tipo == "processo" else getattr(registro, "processo_id", None),
+                "titulo": titulo,
+                "trecho": conteudo[:200],
+                "relevancia": relevancia,
+            })
+
+    resultados.sort(key=lambda r: (-r["relevancia"], r["tipo"], r["id"]))
+    return {"total": len(resultados), "itens": resultados[skip:skip + limit]}
+
+
+def indexar_registro(db: Session, tipo: str, registro_id: int, processo_id: Optional[int],
+                     titulo: str, conteudo: str) -> None:
+    """Grava (ou substitui) a linha de um registro de FONTES_EXTERNAS no índice. Sem commit"""
+    if not indice_fts_disponivel(db):
+        return
+    parametros = parametros_indexar_externo(tipo, registro_id, processo_id, titulo, conteudo)
+    for comando in sql_indexar_externo():
+        db.execute(text(comando), parametros)
+
+
+def buscar(
+    db: Session,
+    consulta: str,
+    tipos: Optional[List[str]] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """
+    Busca textual ordenada por relevância, com casamento por prefixo e sem
+    diferenciar acentos. Retorna {"total", "itens"}.
+    """
+    tipos = [t for t in (tipos or TIPOS) if t in TIPOS]
+    if not tipos:
+        raise ValueError(f"Tipos de busca inválidos. Use: {', '.join(TIPOS)}")
+    if indice_fts_disponivel(db):
+        return _buscar_fts(db, consulta, tipos, skip, limit)
+    return _buscar_like(db, consulta, tipos, skip, limit)
@@ -1,5 +1,16 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from . import models
+from utils.paginacao import paginar, coluna_ordenacao
+
+# Chaves de ordenação aceitas na listagem (com índice (coluna, id))
+ORDENACOES_CLIENTE = {
+    "nome": models.Cliente.nome,
+    "id": models.Cliente.id,
+}
+
+# Filtros de igualdade aceitos na listagem
+FILTROS_CLIENTE = ("tipo_pessoa", "uf", "cidade")
 
 
 def criar_cliente(db: Session, **kwargs):
@@ -15,6 +26,44 @@ def listar_clientes(db: Session):
     return db.query(models.Cliente).order_by(models.Cliente.nome).all()
 
 
+def listar_clientes_paginado(
+    db: Session,
+    filtros: Optional[dict] = None,
+    ordenar: str = "nome",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    resumo: bool = False,
+):
+    """
+    Lista clientes com filtros, ordenação e paginação por cursor.
+
+    Retorna (itens, próximo cursor). Com resumo=True apenas os campos de
+    identificação e contato são lidos.
+    """
+    coluna, descendente = coluna_ordenacao(ordenar, ORDENACOES_CLIENTE)
+
+    if resumo:
+        query = db.query(
+            models.Cliente.id,
+            models.Cliente.nome,
+            models.Cliente.nome_fantasia,
+            models.Cliente.cpf_cnpj,
+            models.Cliente.tipo_pessoa,
+            models.Cliente.telefone,
+            models.Cliente.email,
+            models.Cliente.cidade,
+            models.Cliente.uf,
+        )
+    else:
+        query = db.query(models.Cliente)
+
+    for nome, valor in (filtros or {}).items():
+        if nome in FILTROS_CLIENTE and valor is not None:
+            query = query.filter(getattr(models.Cliente, nome) == valor)
+
+    return paginar(query, coluna, models.Cliente.id, cursor, limit, descendente)
+
+
 def buscar_cliente_por_id(cliente_id: int, db: Session):
     return db.query(models.Cliente).filter(models.Cliente.id == cliente_id).first()
 
@@ -1,13 +1,17 @@
 """
 CRUD operations para Contabilidade (Sócios, Entradas, Despesas, Operações)
 """
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy import func, and_, or_
 from database import models
 from database import crud_plano_contas
+from database import crud_resumo_mensal
+from database import crud_contribuicoes
 from typing import List, Optional, Dict, Any
 from datetime import date as date_type, datetime, timedelta
 from decimal import Decimal
+from utils.dinheiro import para_centavos, para_reais
+from utils.simples import invalidar_tabela_simples
 
 
 # ==================== SÓCIOS ====================
@@ -320,11 +324,89 @@ def create_entrada(db: Session, entrada: Any) -> models.Entrada:
             db.add(entrada_socio)
             socios_adicionados.add(chave)
     
+    crud_resumo_mensal.atualizar_resumo_datas(db, [db_entrada.data])
     db.commit()
     db.refresh(db_entrada)
     return db_entrada
 
 
+# Itens aceitos por requisição nas criações em lote
+LIMITE_LOTE = 1000
+
+
+def _validar_lote(itens: List[Any], nome: str) -> None:
+    if not itens:
+        raise ValueError(f"Informe ao menos uma {nome}")
+    if len(itens) > LIMITE_LOTE:
+        raise ValueError(f"Máximo de {LIMITE_LOTE} itens por lote")
+
+
+def _socios_inexistentes(db: Session, socio_ids: set) -> set:
+    if not socio_ids:
+        return set()
+    existentes = {i for (i,) in db.query(models.Socio.id).filter(models.Socio.id.in_(socio_ids))}
+    return socio_ids - existentes
+
+
+def create_entradas_lote(db: Session, entradas: List[Any], lancar: bool = True) -> List[models.Entrada]:
+    """
+    Cria várias entradas numa única transação (ex.: extrato do mês).
+
+    Todos os itens são validados antes de gravar; qualquer erro rejeita o
+    lote inteiro, com a posição de cada item inválido na mensagem. Com
+    lancar=True cada entrada já recebe o lançamento de receita
+    (ver crud_plano_contas.lancar_entradas_honorarios_lote).
+    """
+    _validar_lote(entradas, "entrada")
+    inexistentes = _socios_inexistentes(db, {s.socio_id for e in entradas for s in e.socios})
+
+    erros = []
+    for posicao, entrada in enumerate(entradas, start=1):
+        if not (entrada.cliente or "").strip():
+            erros.append(f"Entrada {posicao}: cliente vazio")
+        if entrada.valor is None or entrada.valor <= 0:
+            erros.append(f"Entrada {posicao}: valor deve ser maior que zero")
+        ids = [s.socio_id for s in entrada.socios]
+        if len(ids) != len(set(ids)):
+            erros.append(f"Entrada {posicao}: sócio repetido")
+        for socio_id in sorted(set(ids) & inexistentes):
+            erros.append(f"Entrada {posicao}: sócio {socio_id} não encontrado")
+        if any(not 0 <= s.percentual <= 100 for s in entrada.socios):
+            erros.append(f"Entrada {posicao}: percentual fora de 0–100")
+        elif sum(s.percentual for s in entrada.socios) > 100.01:
+            erros.append(f"Entrada {posicao}: soma dos percentuais acima de 100%")
+    if erros:
+        raise ValueError("; ".join(erros))
+
+    db_entradas = []
+    for entrada in entradas:
+        db_entrada = models.Entrada(
+            cliente=entrada.cliente,
+            cliente_id=entrada.cliente_id,
+            data=entrada.data,
+            valor=entrada.valor,
+            socios=[
+                models.EntradaSocio(socio_id=s.socio_id, percentual=s.percentual)
+                for s in entrada.socios
+            ]
+        )
+        db_entradas.append(db_entrada)
+    db.add_all(db_entradas)
+    db.flush()  # ids para os lançamentos
+
+    if lancar:
+        crud_plano_contas.lancar_entradas_honorarios_lote(db, db_entradas)
+    crud_resumo_mensal.atualizar_resumo_datas(db, [e.data for e in db_entradas])
+    db.commit()
+
+    ids = [e.id for e in db_entradas]
+    por_id = {e.id: e for e in db.query(models.Entrada).options(
+        selectinload(models.Entrada.socios).joinedload(models.EntradaSocio.socio),
+        selectinload(models.Entrada.cliente_rel),
+    ).filter(models.Entrada.id.in_(ids))}
+    return [por_id[i] for i in ids]
+
+
 def get_entrada(db: Session, entrada_id: int) -> Optional[models.Entrada]:
     """Busca uma entrada por ID"""
     return db.query(models.Entrada).filter(models.Entrada.id == entrada_id).first()
@@ -341,6 +423,7 @@ def update_entrada(db: Session, entrada_id: int, entrada: Any) -> Optional[model
     if not db_entrada:
         return None
     
+    data_anterior = db_entrada.data
     db_entrada.cliente = entrada.cliente
     db_entrada.cliente_id = entrada.cliente_id
     db_entrada.data = entrada.data
@@ -359,6 +442,7 @@ def update_entrada(db: Session, entrada_id: int, entrada: Any) -> Optional[model
         )
         db.add(entrada_socio)
     
+    crud_resumo_mensal.atualizar_resumo_datas(db, [data_anterior, db_entrada.data])
     db.commit()
     db.refresh(db_entrada)
     return db_entrada
@@ -370,7 +454,9 @@ def delete_entrada(db: Session, entrada_id: int) -> bool:
     if not db_entrada:
         return False
     
+    data_entrada = db_entrada.data
     db.delete(db_entrada)
+    crud_resumo_mensal.atualizar_resumo_datas(db, [data_entrada])
     db.commit()
     return True
 
@@ -411,11 +497,60 @@ def create_despesa(db: Session, despesa: Any) -> models.Despesa:
             db.add(despesa_socio)
             responsaveis_adicionados.add(chave)
     
+    crud_resumo_mensal.atualizar_resumo_datas(db, [db_despesa.data])
     db.commit()
     db.refresh(db_despesa)
     return db_despesa
 
 
+def create_despesas_lote(db: Session, despesas: List[Any], lancar: bool = True) -> List[models.Despesa]:
+    """
+    Cria várias despesas numa única transação, no mesmo esquema de
+    create_entradas_lote. Com lancar=True cada despesa recebe o lançamento
+    D despesa / C Caixa (ver crud_plano_contas.lancar_despesas_lote).
+    """
+    _validar_lote(despesas, "despesa")
+    inexistentes = _socios_inexistentes(db, {r.socio_id for d in despesas for r in d.responsaveis})
+
+    erros = []
+    for posicao, despesa in enumerate(despesas, start=1):
+        if despesa.valor is None or despesa.valor <= 0:
+            erros.append(f"Despesa {posicao}: valor deve ser maior que zero")
+        ids = {r.socio_id for r in despesa.responsaveis}
+        for socio_id in sorted(ids & inexistentes):
+            erros.append(f"Despesa {posicao}: sócio {socio_id} não encontrado")
+    if erros:
+        raise ValueError("; ".join(erros))
+
+    db_despesas = []
+    for despesa in despesas:
+        db_despesa = models.Despesa(
+            data=despesa.data,
+            especie=despesa.especie,
+            tipo=despesa.tipo,
+            descricao=despesa.descricao,
+            valor=despesa.valor,
+            responsaveis=[
+                models.DespesaSocio(socio_id=socio_id)
+                for socio_id in dict.fromkeys(r.socio_id for r in despesa.responsaveis)
+            ]
+        )
+        db_despesas.append(db_despesa)
+    db.add_all(db_despesas)
+    db.flush()
+
+    if lancar:
+        crud_plano_contas.lancar_despesas_lote(db, db_despesas)
+    crud_resumo_mensal.atualizar_resumo_datas(db, [d.data for d in db_despesas])
+    db.commit()
+
+    ids = [d.id for d in db_despesas]
+    por_id = {d.id: d for d in db.query(models.Despesa).options(
+        selectinload(models.Despesa.responsaveis).joinedload(models.DespesaSocio.socio),
+    ).filter(models.Despesa.id.in_(ids))}
+    return [por_id[i] for i in ids]
+
+
 def get_despesa(db: Session, despesa_id: int) -> Optional[models.Despesa]:
     """Busca uma despesa por ID"""
     return db.query(models.Despesa).filter(models.Despesa.id == despesa_id).first()
@@ -432,6 +567,7 @@ def update_despesa(db: Session, despesa_id: int, despesa: Any) -> Optional[model
     if not db_despesa:
         return None
     
+    data_anterior = db_despesa.data
     db_despesa.data = despesa.data
     db_despesa.especie = despesa.especie
     db_despesa.tipo = despesa.tipo
@@ -450,6 +586,7 @@ def update_despesa(db: Session, despesa_id: int, despesa: Any) -> Optional[model
         )
         db.add(despesa_socio)
     
+    crud_resumo_mensal.atualizar_resumo_datas(db, [data_anterior, db_despesa.data])
     db.commit()
     db.refresh(db_despesa)
     return db_despesa
@@ -461,7 +598,9 @@ def delete_despesa(db: Session, despesa_id: int) -> bool:
     if not db_despesa:
         return False
     
+    data_despesa = db_despesa.data
     db.delete(db_despesa)
+    crud_resumo_mensal.atualizar_resumo_datas(db, [data_despesa])
     db.commit()
     return True
 
@@ -508,6 +647,7 @@ def create_simples_faixa(db: Session, faixa_data: Any) -> models.SimplesFaixa:
     )
     db.add(db_faixa)
     db.commit()
+    invalidar_tabela_simples()
     db.refresh(db_faixa)
     return db_faixa
 
@@ -532,6 +672,7 @@ def update_simples_faixa(db: Session, faixa_id: int, faixa_data: Any) -> Optiona
         db_faixa.ordem = faixa_data.ordem
     
     db.commit()
+    invalidar_tabela_simples()
     db.refresh(db_faixa)
     return db_faixa
 
@@ -544,21 +685,23 @@ def delete_simples_faixa(db: Session, faixa_id: int) -> bool:
     
     db.delete(db_faixa)
     db.commit()
+    invalidar_tabela_simples()
     return True
 
 
 # ==================== VALIDAÇÃO EQUAÇÃO CONTÁBIL ====================
 
 def validar_equacao_contabil(db: Session) -> Dict[str, Any]:
-    """Valida a equação contábil: Ativo = Passivo + PL"""
-    contas = crud_plano_contas.listar_plano_contas(db)
+    """Valida a equação contábil: Ativo = Passivo + PL (somas exatas em centavos)"""
+    contas = crud_plano_contas.obter_indice_plano_contas(db).todas(apenas_ativas=True)
+    saldos = crud_plano_contas.calcular_saldos_contas_centavos(db)
     
-    total_ativo = 0.0
-    total_passivo = 0.0
-    total_pl = 0.0
+    total_ativo = 0
+    total_passivo = 0
+    total_pl = 0
     
     for conta in contas:
-        saldo = crud_plano_contas.calcular_saldo_conta(db, conta.id)
+        saldo = saldos.get(conta.id, 0)
         if conta.tipo == 'Ativo':
             total_ativo += saldo
         elif conta.tipo == 'Passivo':
@@ -567,14 +710,13 @@ def validar_equacao_contabil(db: Session) -> Dict[str, Any]:
             total_pl += saldo
     
     diferenca = total_ativo - (total_passivo + total_pl)
-    balanceado = abs(diferenca) < 0.01
     
     return {
-        "ativo": total_ativo,
-        "passivo": total_passivo,
-        "patrimonio_liquido": total_pl,
-        "diferenca": diferenca,
-        "balanceado": balanceado
+        "ativo": para_reais(total_ativo),
+        "passivo": para_reais(total_passivo),
+        "patrimonio_liquido": para_reais(total_pl),
+        "diferenca": para_reais(diferenca),
+        "balanceado": diferenca == 0
     }
 
 
@@ -587,9 +729,206 @@ def listar_operacoes_disponiveis(db: Session) -> List[models.Operacao]:
     ).order_by(models.Operacao.ordem).all()
 
 
-def _buscar_conta_por_codigo(db: Session, codigo: str) -> Optional[models.PlanoDeContas]:
-    """Busca conta pelo código"""
-    return crud_plano_contas.buscar_conta_por_codigo(db, codigo)
+def _buscar_conta_por_codigo(db: Session, codigo: str) -> Optional[crud_plano_contas.ContaResumo]:
+    """Busca conta pelo código (via cache do plano de contas)"""
+    return crud_plano_contas.obter_conta_cache(db, codigo)
+
+
+# ----- Registro declarativo das operações simples -----
+#
+# Cada operação simples gera um único lançamento D-debito / C-credito.
+# "validar_saldo" lista as contas que precisam cobrir o valor antes do
+# lançamento, na ordem em que são verificadas:
+#   (lado, tipo_mensagem, titulo, dica)
+# lado: "debito" ou "credito"; tipo_mensagem: "saldo" (dinheiro disponível)
+# ou "obrigacao" (passivo a ser baixado).
+
+OPERACOES_SIMPLES: Dict[str, Dict[str, Any]] = {
+    "REC_HON": {
+        "debito": ("1.1.1.1", "Caixa Corrente"),
+        "credito": ("4.1.1", "Receita"),
+        "historico": "Recebimento de honorários",
+    },
+    "PROVISIONAR_SIMPLES": {
+        "debito": ("5.3.1", "Despesa Simples"),
+        "credito": ("2.1.2.1", "Simples a Recolher"),
+        "historico": "Provisão de Simples Nacional",
+    },
+    "SEPARAR_OBRIGACOES_FISCAIS": {
+        "debito": ("1.1.1.2.1", "CDB - Obrigações Fiscais"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Aplicação em CDB - Obrigações Fiscais (INSS + Simples)",
+        "validar_saldo": [
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente para separar obrigações fiscais.",
+             "Execute REC_HON (Receber Honorários) primeiro para ter saldo disponível."),
+        ],
+    },
+    "SEPARAR_PRO_LABORE": {
+        "debito": ("1.1.1.2.2", "CDB - Reserva de Lucros"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Aplicação em CDB - Reserva de Lucros (pró-labore)",
+        "validar_saldo": [
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente para separar pró-labore.",
+             "Execute REC_HON (Receber Honorários) primeiro para ter saldo disponível."),
+        ],
+    },
+    "RESGATAR_CDB_OBRIGACOES_FISCAIS": {
+        "debito": ("1.1.1.1", "Caixa Corrente"),
+        "credito": ("1.1.1.2.1", "CDB - Obrigações Fiscais"),
+        "historico": "Resgate de CDB - Obrigações Fiscais",
+        "validar_saldo": [
+            ("credito", "saldo", "Saldo insuficiente em CDB - Obrigações Fiscais.",
+             "Execute SEPARAR_OBRIGACOES_FISCAIS primeiro para ter saldo no CDB."),
+        ],
+    },
+    "RESGATAR_CDB_LUCROS": {
+        "debito": ("1.1.1.1", "Caixa Corrente"),
+        "credito": ("1.1.1.2.2", "CDB - Reserva de Lucros"),
+        "historico": "Resgate de CDB - Reserva de Lucros",
+        "validar_saldo": [
+            ("credito", "saldo", "Saldo insuficiente em CDB - Reserva de Lucros.",
+             "Execute SEPARAR_PRO_LABORE ou APLICAR_LUCROS_CDB primeiro para ter saldo no CDB."),
+        ],
+    },
+    "PAGAR_SIMPLES": {
+        "debito": ("2.1.2.1", "Simples a Recolher"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Pagamento de Simples Nacional",
+        "validar_saldo": [
+            ("debito", "obrigacao", "Obrigação insuficiente em Simples a Recolher.",
+             "Execute PROVISIONAR_SIMPLES antes de pagar o Simples Nacional."),
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente.",
+             "Execute RESGATAR_CDB_OBRIGACOES_FISCAIS primeiro para ter saldo no caixa."),
+        ],
+    },
+    "PAGAR_PRO_LABORE": {
+        "debito": ("2.1.3.1", "Pró-labore a Pagar"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Pagamento de pró-labore",
+        "validar_saldo": [
+            ("debito", "obrigacao", "Obrigação insuficiente em Pró-labore a Pagar.",
+             "Execute PRO_LABORE (provisão) antes de pagar o pró-labore."),
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente.",
+             "Execute RESGATAR_CDB_LUCROS primeiro para ter saldo no caixa."),
+        ],
+    },
+    "PRO_LABORE": {
+        "debito": ("5.1.1", "INSS Pessoal"),
+        "credito": ("2.1.3.1", "Pró-labore a Pagar"),
+        "historico": "Provisão de pró-labore",
+    },
+    "INSS_PESSOAL": {
+        "debito": ("5.1.1", "INSS Pessoal"),
+        "credito": ("2.1.2.2", "INSS a Recolher"),
+        "historico": "INSS pessoal sobre pró-labore",
+    },
+    "INSS_PATRONAL": {
+        "debito": ("5.1.3", "INSS Patronal"),
+        "credito": ("2.1.2.2", "INSS a Recolher"),
+        "historico": "INSS patronal",
+    },
+    "PAGAR_INSS": {
+        "debito": ("2.1.2.2", "INSS a Recolher"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Pagamento de INSS",
+        "validar_saldo": [
+            ("debito", "obrigacao", "Obrigação insuficiente em INSS a Recolher.",
+             "Execute INSS_PESSOAL ou INSS_PATRONAL antes de pagar o INSS."),
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente.",
+             "Execute RESGATAR_CDB_OBRIGACOES_FISCAIS primeiro para ter saldo no caixa."),
+        ],
+    },
+    "APLICAR_LUCROS_CDB": {
+        "debito": ("1.1.1.2.2", "CDB - Reserva de Lucros"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Aplicação de lucros em CDB - aguardando distribuição",
+        "validar_saldo": [
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente para aplicar lucros em CDB.",
+             "Execute APURAR_RESULTADO primeiro para ter lucros disponíveis."),
+        ],
+    },
+    "DISTRIBUIR_LUCROS": {
+        "debito": ("3.3", "Lucros Acumulados"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Distribuição de lucros",
+        "validar_saldo": [
+            ("debito", "saldo", "Saldo insuficiente em Lucros Acumulados.", None),
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente para distribuir lucros.", None),
+        ],
+    },
+    "PAGAR_DESPESA_FUNDO": {
+        "debito": ("5.2", "Despesas Operacionais"),
+        "credito": ("1.1.1.1", "Caixa Corrente"),
+        "historico": "Pagamento de despesa",
+        "validar_saldo": [
+            ("credito", "saldo", "Saldo insuficiente em Caixa Corrente para pagar despesa.", None),
+        ],
+    },
+}
+
+
+def _mensagem_saldo_insuficiente(tipo: str, titulo: str, dica: Optional[str], saldo: float, valor: float) -> str:
+    """Monta a mensagem padrão de saldo/obrigação insuficiente"""
+    if tipo == "obrigacao":
+        mensagem = (
+            f"📋 {titulo}\n"
+            f"Saldo da obrigação: R$ {saldo:.2f}\n"
+            f"Valor solicitado: R$ {valor:.2f}"
+        )
+    else:
+        mensagem = (
+            f"💰 {titulo}\n"
+            f"Saldo disponível: R$ {saldo:.2f}\n"
+            f"Valor solicitado: R$ {valor:.2f}\n"
+            f"Faltam: R$ {valor - saldo:.2f}"
+        )
+    if dica:
+        mensagem += f"\n\n💡 Dica: {dica}"
+    return mensagem
+
+
+def _executar_operacao_simples(db: Session, op: models.OperacaoContabil, definicao: Dict[str, Any], valor: float, data: date_type, historico: Optional[str]):
+    """Executa uma operação do registro OPERACOES_SIMPLES (um lançamento D/C)"""
+    (codigo_debito, nome_debito) = definicao["debito"]
+    (codigo_credito, nome_credito) = definicao["credito"]
+    contas = {
+        "debito": _buscar_conta_por_codigo(db, codigo_debito),
+        "credito": _buscar_conta_por_codigo(db, codigo_credito),
+    }
+    
+    if not contas["debito"] or not contas["credito"]:
+        raise ValueError(
+            f"Contas {codigo_debito} ({nome_debito}) ou {codigo_credito} ({nome_credito}) não encontradas"
+        )
+    
+    valor_centavos = para_centavos(valor)
+    for lado, tipo, titulo, dica in definicao.get("validar_saldo", ()):
+        saldo_centavos = crud_plano_contas.calcular_saldo_conta_centavos(db, contas[lado].id)
+        if saldo_centavos < valor_centavos:
+            raise ValueError(_mensagem_saldo_insuficiente(tipo, titulo, dica, para_reais(saldo_centavos), valor))
+    
+    lancamento = crud_plano_contas.criar_lancamento(
+        db=db,
+        data=data,
+        conta_debito_id=contas["debito"].id,
+        conta_credito_id=contas["credito"].id,
+        valor=valor,
+        historico=historico or definicao["historico"],
+        automatico=True,
+        editavel=True,
+        criado_por=op.criado_por_id,
+        commit=False
+    )
+    lancamento.operacao_contabil_id = op.id
+    lancamento.referencia_mes = op.mes_referencia
+
+
+def _executar_rendimento_cdb_descricao(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
+    """RECONHECER_RENDIMENTO_CDB: extrai o tipo de CDB da descrição ('Tipo: RESERVA_LUCROS')"""
+    tipo_cdb = historico.split(':')[1].strip() if historico and ':' in historico else None
+    if not tipo_cdb:
+        raise ValueError("RECONHECER_RENDIMENTO_CDB requer especificar o tipo de CDB (OBRIGACOES_FISCAIS, RESERVA_LUCROS ou RESERVA_LEGAL) no campo descrição. Formato: 'Tipo: RESERVA_LUCROS'")
+    _executar_reconhecer_rendimento_cdb(db, op, valor, data, None, tipo_cdb)
 
 
 def executar_operacao(
@@ -602,8 +941,18 @@ def executar_operacao(
     criado_por_id: Optional[int] = None
 ) -> models.OperacaoContabil:
     """
-    Executa uma operação contábil padronizada gerando os lançamentos correspondentes
+    Executa uma operação contábil padronizada gerando os lançamentos correspondentes.
+    
+    Operações simples são resolvidas pelo registro OPERACOES_SIMPLES; as que
+    criam subcontas ou geram vários lançamentos ficam em OPERACOES_ESPECIAIS.
+    Tudo o que a operação grava (registro, subcontas criadas e lançamentos)
+    fica numa única transação, confirmada só aqui: os handlers chamam os
+    auxiliares de crud_plano_contas com commit=False, e uma validação que
+    falhe no meio desfaz a operação inteira.
     """
+    definicao = OPERACOES_SIMPLES.get(operacao_codigo)
+    handler = OPERACOES_ESPECIAIS.get(operacao_codigo)
+    
     # Buscar operação
     operacao = db.query(models.Operacao).filter(
         models.Operacao.codigo == operacao_codigo,
@@ -613,6 +962,9 @@ def executar_operacao(
     if not operacao:
         raise ValueError(f"Operação '{operacao_codigo}' não encontrada ou inativa")
     
+    if definicao is None and handler is None:
+        raise ValueError(f"Operação '{operacao_codigo}' não implementada")
+    
     # Calcular mês de referência
     mes_referencia = data.strftime("%Y-%m")
     
@@ -628,107 +980,23 @@ def executar_operacao(
         cancelado=False
     )
     db.add(operacao_contabil)
-    db.flush()
-    
-    # Executar lançamentos conforme operação
-    if operacao_codigo == "REC_HON":
-        _executar_rec_hon(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "APLICAR_RESERVA_CDB":
-        _executar_reservar_fundo(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "PROVISIONAR_SIMPLES":
-        _executar_provisionar_simples(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "SEPARAR_OBRIGACOES_FISCAIS":
-        _executar_separar_obrigacoes_fiscais(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "SEPARAR_PRO_LABORE":
-        _executar_separar_pro_labore(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "RESGATAR_CDB_OBRIGACOES_FISCAIS":
-        _executar_resgatar_cdb_obrigacoes_fiscais(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "RESGATAR_CDB_LUCROS":
-        _executar_resgatar_cdb_lucros(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "PAGAR_SIMPLES":
-        _executar_pagar_simples(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "PAGAR_PRO_LABORE":
-        _executar_pagar_pro_labore(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "PRO_LABORE":
-        _executar_pro_labore(db, operacao_contabil, valor, data, descricao, criado_por_id)
-
-    elif operacao_codigo == "INSS_PESSOAL":
-        _executar_inss_pessoal(db, operacao_contabil, valor, data, descricao, criado_por_id)
-    
-    elif operacao_codigo == "INSS_PATRONAL":
-        _executar_inss_patronal(db, operacao_contabil, valor, data, descricao, criado_por_id)
-    
-    elif operacao_codigo == "PAGAR_INSS":
-        _executar_pagar_inss(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "APLICAR_LUCROS_CDB":
-        _executar_aplicar_lucros_cdb(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "ADIANTAR_LUCROS":
-        _executar_adiantar_lucros(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "DISTRIBUIR_LUCROS":
-        _executar_distribuir_lucros(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "PAGAR_DESPESA_FUNDO":
-        _executar_pagar_despesa_fundo(db, operacao_contabil, valor, data, descricao, criado_por_id)
-    
-    elif operacao_codigo == "RESGATAR_CDB_RESERVA":
-        _executar_baixar_fundo(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "RECONHECER_RESERVA_LEGAL":
-        _executar_reconhecer_reserva_legal(db, operacao_contabil, valor, data, descricao)
-    
-    elif operacao_codigo == "RECONHECER_RENDIMENTO_CDB":
-        # Requer tipo_cdb como parâmetro adicional
-        tipo_cdb = descricao.split(':')[1].strip() if descricao and ':' in descricao else None
-        if not tipo_cdb:
-            raise ValueError("RECONHECER_RENDIMENTO_CDB requer especificar o tipo de CDB (OBRIGACOES_FISCAIS, RESERVA_LUCROS ou RESERVA_LEGAL) no campo descrição. Formato: 'Tipo: RESERVA_LUCROS'")
-        _executar_reconhecer_rendimento_cdb(db, operacao_contabil, valor, data, None, tipo_cdb)
-    
-    elif operacao_codigo == "APURAR_RESULTADO":
-        _executar_apurar_resultado(db, operacao_contabil, valor, data, descricao)
-    
-    else:
-        raise ValueError(f"Operação '{operacao_codigo}' não implementada")
+    try:
+        db.flush()
+        
+        # Executar lançamentos conforme operação
+        if definicao is not None:
+            _executar_operacao_simples(db, operacao_contabil, definicao, valor, data, descricao)
+        else:
+            handler(db, operacao_contabil, valor, data, descricao)
+    except Exception:
+        db.rollback()
+        raise
     
     db.commit()
     db.refresh(operacao_contabil)
     return operacao_contabil
 
 
-def _executar_rec_hon(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """REC_HON: D-Caixa Corrente / C-Receita"""
-    conta_caixa = _buscar_conta_por_codigo(db, "1.1.1.1")
-    conta_receita = _buscar_conta_por_codigo(db, "4.1.1")
-    
-    if not conta_caixa or not conta_receita:
-        raise ValueError("Contas 1.1.1.1 (Caixa Corrente) ou 4.1.1 (Receita) não encontradas")
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_caixa.id,
-        conta_credito_id=conta_receita.id,
-        valor=valor,
-        historico=historico or "Recebimento de honorários",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
 def _executar_reservar_fundo(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
     """
     APLICAR_RESERVA_CDB: D-CDB Reserva Legal / C-Caixa Corrente
@@ -751,7 +1019,7 @@ def _executar_reservar_fundo(db: Session, op: models.OperacaoContabil, valor: fl
     
     # Criar/obter subconta de CDB específica do sócio
     # Formato: 1.1.1.2.3.{socio_id} - CDB Reserva Legal - {Nome}
-    subconta_cdb = crud_plano_contas._criar_subconta_cdb_reserva_socio(db, op.socio_id)
+    subconta_cdb = crud_plano_contas._criar_subconta_cdb_reserva_socio(db, op.socio_id, commit=False)
     
     # Buscar Caixa Corrente
     conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
@@ -781,7 +1049,8 @@ def _executar_reservar_fundo(db: Session, op: models.OperacaoContabil, valor: fl
         historico=historico or f"Aplicação em CDB - reserva legal {op.socio.nome if op.socio else 'N/A'}",
         automatico=True,
         editavel=True,
-        criado_por=op.criado_por_id
+        criado_por=op.criado_por_id,
+        commit=False
     )
     lancamento.operacao_contabil_id = op.id
     lancamento.referencia_mes = op.mes_referencia
@@ -825,7 +1094,7 @@ def _executar_reconhecer_reserva_legal(db: Session, op: models.OperacaoContabil,
         )
     
     # Criar/obter subconta de reserva do sócio
-    subconta_reserva = crud_plano_contas._criar_subconta_reserva_socio(db, op.socio_id)
+    subconta_reserva = crud_plano_contas._criar_subconta_reserva_socio(db, op.socio_id, commit=False)
     
     # Lançamento: D-Lucros Acumulados / C-Reserva do Sócio (PL)
     # Move lucro para reserva específica do sócio no PL
@@ -838,194 +1107,8 @@ def _executar_reconhecer_reserva_legal(db: Session, op: models.OperacaoContabil,
         historico=historico or f"Constituição de reserva legal - {op.socio.nome if op.socio else 'N/A'}",
         automatico=True,
         editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_pro_labore(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str], criado_por: Optional[int]):
-    """PRO_LABORE: D-Despesa INSS Pessoal / C-Pró-labore a Pagar"""
-    conta_despesa_pl = _buscar_conta_por_codigo(db, "5.1.1")
-    conta_passivo = _buscar_conta_por_codigo(db, "2.1.3.1")
-    
-    if not conta_despesa_pl or not conta_passivo:
-        raise ValueError("Contas 5.1.1 (INSS Pessoal) ou 2.1.3.1 (Pró-labore a Pagar) não encontradas")
-    
-    # Lançamento de provisão (não é pagamento)
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_despesa_pl.id,
-        conta_credito_id=conta_passivo.id,
-        valor=valor,
-        historico=historico or "Provisão de pró-labore",
-        automatico=True,
-        editavel=True,
-        criado_por=criado_por
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_inss_pessoal(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str], criado_por: Optional[int]):
-    """INSS_PESSOAL: D-Despesa INSS Pessoal / C-INSS a Recolher"""
-    conta_despesa_pl = _buscar_conta_por_codigo(db, "5.1.1")
-    conta_inss = _buscar_conta_por_codigo(db, "2.1.2.2")
-    
-    if not conta_despesa_pl or not conta_inss:
-        raise ValueError("Contas 5.1.1 (INSS Pessoal) ou 2.1.2.2 (INSS a Recolher) não encontradas")
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_despesa_pl.id,
-        conta_credito_id=conta_inss.id,
-        valor=valor,
-        historico=historico or "INSS pessoal sobre pró-labore",
-        automatico=True,
-        editavel=True,
-        criado_por=criado_por
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_inss_patronal(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str], criado_por: Optional[int]):
-    """INSS_PATRONAL: D-Despesa INSS Patronal / C-INSS a Recolher"""
-    conta_despesa_inss = _buscar_conta_por_codigo(db, "5.1.3")
-    conta_inss = _buscar_conta_por_codigo(db, "2.1.2.2")
-    
-    if not conta_despesa_inss or not conta_inss:
-        raise ValueError("Contas 5.1.3 (INSS Patronal) ou 2.1.2.2 (INSS a Recolher) não encontradas")
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_despesa_inss.id,
-        conta_credito_id=conta_inss.id,
-        valor=valor,
-        historico=historico or "INSS patronal",
-        automatico=True,
-        editavel=True,
-        criado_por=criado_por
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_pagar_inss(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """PAGAR_INSS: D-INSS a Recolher / C-Caixa Corrente
-    Pagamento sai do Caixa Corrente (user deve resgatar CDB antes se necessário)
-    """
-    conta_inss = _buscar_conta_por_codigo(db, "2.1.2.2")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_inss or not conta_caixa_corrente:
-        raise ValueError("Contas 2.1.2.2 (INSS a Recolher) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo de INSS a Recolher
-    saldo_inss = crud_plano_contas.calcular_saldo_conta(db, conta_inss.id)
-    if saldo_inss < valor:
-        raise ValueError(
-            f"📋 Obrigação insuficiente em INSS a Recolher.\n"
-            f"Saldo da obrigação: R$ {saldo_inss:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n\n"
-            f"💡 Dica: Execute INSS_PESSOAL ou INSS_PATRONAL antes de pagar o INSS."
-        )
-    
-    # Validar saldo em Caixa Corrente
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa_corrente.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}\n\n"
-            f"💡 Dica: Execute RESGATAR_CDB_OBRIGACOES_FISCAIS primeiro para ter saldo no caixa."
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_inss.id,
-        conta_credito_id=conta_caixa_corrente.id,
-        valor=valor,
-        historico=historico or "Pagamento de INSS",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_distribuir_lucros(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """DISTRIBUIR_LUCROS: D-Lucros Acum. / C-Caixa Corrente"""
-    conta_lucros = _buscar_conta_por_codigo(db, "3.3")
-    conta_caixa = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_lucros or not conta_caixa:
-        raise ValueError("Contas 3.3 (Lucros Acumulados) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo de lucros
-    saldo_lucros = crud_plano_contas.calcular_saldo_conta(db, conta_lucros.id)
-    if saldo_lucros < valor:
-        raise ValueError(f"Saldo insuficiente em Lucros Acumulados. Saldo: R$ {saldo_lucros:.2f}, Valor: R$ {valor:.2f}")
-    
-    # Validar saldo em Caixa Corrente (precisa ter dinheiro para distribuir)
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente para distribuir lucros.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}"
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_lucros.id,
-        conta_credito_id=conta_caixa.id,
-        valor=valor,
-        historico=historico or "Distribuição de lucros",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_pagar_despesa_fundo(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str], criado_por: Optional[int]):
-    """PAGAR_DESPESA_FUNDO: D-Outras Despesas / C-Caixa Corrente"""
-    conta_despesas = _buscar_conta_por_codigo(db, "5.2")
-    conta_caixa = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_despesas or not conta_caixa:
-        raise ValueError("Contas 5.2 (Despesas Operacionais) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo em Caixa Corrente
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente para pagar despesa.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}"
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_despesas.id,
-        conta_credito_id=conta_caixa.id,
-        valor=valor,
-        historico=historico or "Pagamento de despesa",
-        automatico=True,
-        editavel=True,
-        criado_por=criado_por
+        criado_por=op.criado_por_id,
+        commit=False
     )
     lancamento.operacao_contabil_id = op.id
     lancamento.referencia_mes = op.mes_referencia
@@ -1103,7 +1186,8 @@ def _executar_baixar_fundo(db: Session, op: models.OperacaoContabil, valor: floa
         historico=historico or f"Resgate de CDB - reserva legal {op.socio.nome if op.socio else 'N/A'}",
         automatico=True,
         editavel=True,
-        criado_por=op.criado_por_id
+        criado_por=op.criado_por_id,
+        commit=False
     )
     lancamento1.operacao_contabil_id = op.id
     lancamento1.referencia_mes = op.mes_referencia
@@ -1118,7 +1202,8 @@ def _executar_baixar_fundo(db: Session, op: models.OperacaoContabil, valor: floa
         historico=historico or f"Reversão de reserva legal - {op.socio.nome if op.socio else 'N/A'}",
         automatico=True,
         editavel=True,
-        criado_por=op.criado_por_id
+        criado_por=op.criado_por_id,
+        commit=False
     )
     lancamento2.operacao_contabil_id = op.id
     lancamento2.referencia_mes = op.mes_referencia
@@ -1170,7 +1255,8 @@ def _executar_apurar_resultado(
         db=db,
         mes=mes_ref,
         valor_resultado=valor,
-        recriar=True  # Permite sobrescrever se necessário
+        recriar=True,  # Permite sobrescrever se necessário
+        commit=False
     )
     
     if lancamento:
@@ -1178,309 +1264,10 @@ def _executar_apurar_resultado(
         lancamento.operacao_contabil_id = op.id
         lancamento.referencia_mes = mes_ref
         lancamento.historico = historico or f"Apuração do resultado - {mes_ref}"
-        db.commit()
     else:
         raise ValueError("Falha ao criar lançamento de apuração")
 
 
-def _executar_provisionar_simples(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """PROVISIONAR_SIMPLES: D-Despesa Simples / C-Simples a Recolher"""
-    conta_despesa = _buscar_conta_por_codigo(db, "5.3.1")
-    conta_passivo = _buscar_conta_por_codigo(db, "2.1.2.1")
-    
-    if not conta_despesa or not conta_passivo:
-        raise ValueError("Contas 5.3.1 (Despesa Simples) ou 2.1.2.1 (Simples a Recolher) não encontradas")
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_despesa.id,
-        conta_credito_id=conta_passivo.id,
-        valor=valor,
-        historico=historico or "Provisão de Simples Nacional",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_separar_obrigacoes_fiscais(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """SEPARAR_OBRIGACOES_FISCAIS: D-CDB - Obrigações Fiscais / C-Caixa Corrente
-    Aplicação direta de dinheiro em CDB para INSS + Simples Nacional
-    """
-    conta_cdb_obrigacoes = _buscar_conta_por_codigo(db, "1.1.1.2.1")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_cdb_obrigacoes or not conta_caixa_corrente:
-        raise ValueError("Contas 1.1.1.2.1 (CDB - Obrigações Fiscais) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo em Caixa Corrente
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa_corrente.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente para separar obrigações fiscais.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}\n\n"
-            f"💡 Dica: Execute REC_HON (Receber Honorários) primeiro para ter saldo disponível."
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_cdb_obrigacoes.id,
-        conta_credito_id=conta_caixa_corrente.id,
-        valor=valor,
-        historico=historico or "Aplicação em CDB - Obrigações Fiscais (INSS + Simples)",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_separar_pro_labore(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """SEPARAR_PRO_LABORE: D-CDB - Reserva de Lucros / C-Caixa Corrente
-    Aplicação direta de dinheiro em CDB para pró-labore
-    """
-    conta_cdb_pl = _buscar_conta_por_codigo(db, "1.1.1.2.2")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_cdb_pl or not conta_caixa_corrente:
-        raise ValueError("Contas 1.1.1.2.2 (CDB - Reserva de Lucros) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo em Caixa Corrente
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa_corrente.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente para separar pró-labore.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}\n\n"
-            f"💡 Dica: Execute REC_HON (Receber Honorários) primeiro para ter saldo disponível."
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_cdb_pl.id,
-        conta_credito_id=conta_caixa_corrente.id,
-        valor=valor,
-        historico=historico or "Aplicação em CDB - Reserva de Lucros (pró-labore)",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_pagar_simples(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """PAGAR_SIMPLES: D-Simples a Recolher / C-Caixa Corrente
-    Pagamento sai do Caixa Corrente (user deve resgatar CDB antes se necessário)
-    """
-    conta_passivo = _buscar_conta_por_codigo(db, "2.1.2.1")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_passivo or not conta_caixa_corrente:
-        raise ValueError("Contas 2.1.2.1 (Simples a Recolher) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo em Simples a Recolher
-    saldo_passivo = crud_plano_contas.calcular_saldo_conta(db, conta_passivo.id)
-    if saldo_passivo < valor:
-        raise ValueError(
-            f"📋 Obrigação insuficiente em Simples a Recolher.\n"
-            f"Saldo da obrigação: R$ {saldo_passivo:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n\n"
-            f"💡 Dica: Execute PROVISIONAR_SIMPLES antes de pagar o Simples Nacional."
-        )
-    
-    # Validar saldo em Caixa Corrente
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa_corrente.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}\n\n"
-            f"💡 Dica: Execute RESGATAR_CDB_OBRIGACOES_FISCAIS primeiro para ter saldo no caixa."
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_passivo.id,
-        conta_credito_id=conta_caixa_corrente.id,
-        valor=valor,
-        historico=historico or "Pagamento de Simples Nacional",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_pagar_pro_labore(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """PAGAR_PRO_LABORE: D-Pró-labore a Pagar / C-Caixa Corrente
-    Pagamento sai do Caixa Corrente (user deve resgatar CDB antes se necessário)
-    """
-    conta_passivo = _buscar_conta_por_codigo(db, "2.1.3.1")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_passivo or not conta_caixa_corrente:
-        raise ValueError("Contas 2.1.3.1 (Pró-labore a Pagar) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo em Pró-labore a Pagar
-    saldo_passivo = crud_plano_contas.calcular_saldo_conta(db, conta_passivo.id)
-    if saldo_passivo < valor:
-        raise ValueError(
-            f"📋 Obrigação insuficiente em Pró-labore a Pagar.\n"
-            f"Saldo da obrigação: R$ {saldo_passivo:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n\n"
-            f"💡 Dica: Execute PRO_LABORE (provisão) antes de pagar o pró-labore."
-        )
-    
-    # Validar saldo em Caixa Corrente
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa_corrente.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}\n\n"
-            f"💡 Dica: Execute RESGATAR_CDB_LUCROS primeiro para ter saldo no caixa."
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_passivo.id,
-        conta_credito_id=conta_caixa_corrente.id,
-        valor=valor,
-        historico=historico or "Pagamento de pró-labore",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_resgatar_cdb_obrigacoes_fiscais(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """RESGATAR_CDB_OBRIGACOES_FISCAIS: D-Caixa Corrente / C-CDB - Obrigações Fiscais
-    Resgatar CDB de obrigações fiscais para o caixa corrente antes de pagar INSS/Simples
-    """
-    conta_cdb = _buscar_conta_por_codigo(db, "1.1.1.2.1")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_cdb or not conta_caixa_corrente:
-        raise ValueError("Contas 1.1.1.2.1 (CDB - Obrigações Fiscais) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo no CDB
-    saldo_cdb = crud_plano_contas.calcular_saldo_conta(db, conta_cdb.id)
-    if saldo_cdb < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em CDB - Obrigações Fiscais.\n"
-            f"Saldo disponível: R$ {saldo_cdb:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_cdb:.2f}\n\n"
-            f"💡 Dica: Execute SEPARAR_OBRIGACOES_FISCAIS primeiro para ter saldo no CDB."
-        )
-    
-    # Lançamento: D-Caixa Corrente / C-CDB
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_caixa_corrente.id,
-        conta_credito_id=conta_cdb.id,
-        valor=valor,
-        historico=historico or "Resgate de CDB - Obrigações Fiscais",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_aplicar_lucros_cdb(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """APLICAR_LUCROS_CDB: D-CDB - Reserva de Lucros / C-Caixa Corrente
-    Aplicar dinheiro destinado à distribuição de lucros em CDB
-    """
-    conta_cdb_lucros = _buscar_conta_por_codigo(db, "1.1.1.2.2")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_cdb_lucros or not conta_caixa_corrente:
-        raise ValueError("Contas 1.1.1.2.2 (CDB - Reserva de Lucros) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo em Caixa Corrente
-    saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa_corrente.id)
-    if saldo_caixa < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em Caixa Corrente para aplicar lucros em CDB.\n"
-            f"Saldo disponível: R$ {saldo_caixa:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_caixa:.2f}\n\n"
-            f"💡 Dica: Execute APURAR_RESULTADO primeiro para ter lucros disponíveis."
-        )
-    
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_cdb_lucros.id,
-        conta_credito_id=conta_caixa_corrente.id,
-        valor=valor,
-        historico=historico or "Aplicação de lucros em CDB - aguardando distribuição",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
-def _executar_resgatar_cdb_lucros(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
-    """RESGATAR_CDB_LUCROS: D-Caixa Corrente / C-CDB - Reserva de Lucros
-    Resgatar CDB de reserva de lucros para o caixa corrente antes de pagar pró-labore ou distribuir lucros.
-    Esta operação unifica o resgate tanto para pró-labore quanto para lucros.
-    """
-    conta_cdb = _buscar_conta_por_codigo(db, "1.1.1.2.2")
-    conta_caixa_corrente = _buscar_conta_por_codigo(db, "1.1.1.1")
-    
-    if not conta_cdb or not conta_caixa_corrente:
-        raise ValueError("Contas 1.1.1.2.2 (CDB - Reserva de Lucros) ou 1.1.1.1 (Caixa Corrente) não encontradas")
-    
-    # Validar saldo no CDB
-    saldo_cdb = crud_plano_contas.calcular_saldo_conta(db, conta_cdb.id)
-    if saldo_cdb < valor:
-        raise ValueError(
-            f"💰 Saldo insuficiente em CDB - Reserva de Lucros.\n"
-            f"Saldo disponível: R$ {saldo_cdb:.2f}\n"
-            f"Valor solicitado: R$ {valor:.2f}\n"
-            f"Faltam: R$ {valor - saldo_cdb:.2f}\n\n"
-            f"💡 Dica: Execute SEPARAR_PRO_LABORE ou APLICAR_LUCROS_CDB primeiro para ter saldo no CDB."
-        )
-    
-    # Lançamento: D-Caixa Corrente / C-CDB
-    lancamento = crud_plano_contas.criar_lancamento(
-        db=db,
-        data=data,
-        conta_debito_id=conta_caixa_corrente.id,
-        conta_credito_id=conta_cdb.id,
-        valor=valor,
-        historico=historico or "Resgate de CDB - Reserva de Lucros",
-        automatico=True,
-        editavel=True,
-        criado_por=op.criado_por_id
-    )
-    lancamento.operacao_contabil_id = op.id
-    lancamento.referencia_mes = op.mes_referencia
-
-
 def _executar_adiantar_lucros(db: Session, op: models.OperacaoContabil, valor: float, data: date_type, historico: Optional[str]):
     """ADIANTAR_LUCROS: Distribuir lucros antecipadamente usando reserva individual do sócio"""
     if not op.socio_id:
@@ -1530,7 +1317,8 @@ def _executar_adiantar_lucros(db: Session, op: models.OperacaoContabil, valor: f
         historico=historico or f"Adiantamento de lucros - {op.socio.nome if op.socio else 'N/A'}",
         automatico=True,
         editavel=True,
-        criado_por=op.criado_por_id
+        criado_por=op.criado_por_id,
+        commit=False
     )
     lancamento.operacao_contabil_id = op.id
     lancamento.referencia_mes = op.mes_referencia
@@ -1564,8 +1352,8 @@ def _executar_reconhecer_rendimento_cdb(db: Session, op: models.OperacaoContabil
     # Se for RESERVA_LEGAL, distribuir proporcionalmente entre subcontas dos sócios
     if tipo_cdb == 'RESERVA_LEGAL':
         # Buscar todas as subcontas de CDB Reserva Legal (1.1.1.2.3.*)
-        todas_contas = crud_plano_contas.listar_plano_contas(db, apenas_ativas=True)
-        subcontas_cdb = [c for c in todas_contas if c.codigo.startswith("1.1.1.2.3.") and c.aceita_lancamento]
+        indice = crud_plano_contas.obter_indice_plano_contas(db)
+        subcontas_cdb = [c for c in indice.com_prefixo("1.1.1.2.3.", apenas_ativas=True) if c.aceita_lancamento]
         
         if not subcontas_cdb:
             raise ValueError(
@@ -1573,23 +1361,31 @@ def _executar_reconhecer_rendimento_cdb(db: Session, op: models.OperacaoContabil
                 "Execute APLICAR_RESERVA_CDB primeiro para criar as subcontas dos sócios."
             )
         
-        # Calcular saldo total e proporções
-        saldos = {sc: crud_plano_contas.calcular_saldo_conta(db, sc.id) for sc in subcontas_cdb}
+        # Calcular saldo total e proporções (em centavos)
+        saldos = {sc: crud_plano_contas.calcular_saldo_conta_centavos(db, sc.id) for sc in subcontas_cdb}
         saldo_total = sum(saldos.values())
         
         if saldo_total <= 0:
             raise ValueError(
-                f"Saldo total em CDB Reserva Legal é zero ou negativo (R$ {saldo_total:.2f}). "
+                f"Saldo total em CDB Reserva Legal é zero ou negativo (R$ {para_reais(saldo_total):.2f}). "
                 "Não é possível distribuir rendimentos."
             )
         
+        # Rateio pelo maior resto: as parcelas somam exatamente o rendimento
+        valor_centavos = para_centavos(valor)
+        positivos = [(sc, saldo) for sc, saldo in saldos.items() if saldo > 0]
+        alvo = valor_centavos * sum(saldo for _, saldo in positivos) // saldo_total
+        parcelas = {sc: valor_centavos * saldo // saldo_total for sc, saldo in positivos}
+        restos = sorted(positivos, key=lambda p: (valor_centavos * p[1]) % saldo_total, reverse=True)
+        for sc, _ in restos[:alvo - sum(parcelas.values())]:
+            parcelas[sc] += 1
+        
         # Distribuir rendimento proporcionalmente
-        for subconta, saldo in saldos.items():
-            if saldo <= 0:
-                continue
-            
+        for subconta, saldo in positivos:
             proporcao = saldo / saldo_total
-            valor_proporcional = valor * proporcao
+            valor_proporcional = para_reais(parcelas[subconta])
+            if parcelas[subconta] <= 0:
+                continue
             
             # Extrair socio_id do código da subconta (1.1.1.2.3.{socio_id})
             socio_id = int(subconta.codigo.split('.')[-1])
@@ -1606,7 +1402,8 @@ def _executar_reconhecer_rendimento_cdb(db: Session, op: models.OperacaoContabil
                 historico=historico or f"Rendimento CDB Reserva Legal - {nome_socio} ({proporcao*100:.2f}%)",
                 automatico=True,
                 editavel=True,
-                criado_por=op.criado_por_id
+                criado_por=op.criado_por_id,
+                commit=False
             )
             lancamento.operacao_contabil_id = op.id
             lancamento.referencia_mes = op.mes_referencia
@@ -1627,12 +1424,24 @@ def _executar_reconhecer_rendimento_cdb(db: Session, op: models.OperacaoContabil
             historico=historico or f"Rendimento de {nome_cdb}",
             automatico=True,
             editavel=True,
-            criado_por=op.criado_por_id
+            criado_por=op.criado_por_id,
+            commit=False
         )
         lancamento.operacao_contabil_id = op.id
         lancamento.referencia_mes = op.mes_referencia
 
 
+# Operações que criam subcontas, geram vários lançamentos ou têm regras próprias
+OPERACOES_ESPECIAIS = {
+    "APLICAR_RESERVA_CDB": _executar_reservar_fundo,
+    "RECONHECER_RESERVA_LEGAL": _executar_reconhecer_reserva_legal,
+    "RESGATAR_CDB_RESERVA": _executar_baixar_fundo,
+    "ADIANTAR_LUCROS": _executar_adiantar_lucros,
+    "RECONHECER_RENDIMENTO_CDB": _executar_rendimento_cdb_descricao,
+    "APURAR_RESULTADO": _executar_apurar_resultado,
+}
+
+
 def listar_historico_operacoes(
     db: Session,
     mes_referencia: Optional[str] = None,
@@ -1699,6 +1508,16 @@ def get_previsao_operacao_mensal(db: Session, mes: str) -> Optional[models.Previ
     ).first()
 
 
+def listar_previsoes_operacao_mensal(db: Session, meses: List[str]) -> Dict[str, models.PrevisaoOperacaoMensal]:
+    """Busca as previsões de vários meses em uma consulta, indexadas por mês"""
+    if not meses:
+        return {}
+    previsoes = db.query(models.PrevisaoOperacaoMensal).filter(
+        models.PrevisaoOperacaoMensal.mes.in_(meses)
+    ).all()
+    return {p.mes: p for p in previsoes}
+
+
 def consolidar_previsao_operacao_mes(db: Session, mes: str, forcar_recalculo: bool = False) -> models.PrevisaoOperacaoMensal:
     """Consolida a previsão da operação para um mês"""
     previsao = get_previsao_operacao_mensal(db, mes)
@@ -1735,40 +1554,177 @@ def desconsolidar_previsao_operacao_mes(db: Session, mes: str) -> Optional[model
     return previsao
 
 
-def calcular_percentual_participacao_socio(db: Session, socio_id: int, mes: str) -> float:
-    """Calcula o percentual de participação de um sócio nas entradas de um mês"""
-    # Extrair ano e mês
-    ano, mes_num = map(int, mes.split('-'))
-    data_inicio = date_type(ano, mes_num, 1)
-    
-    # Último dia do mês
-    if mes_num == 12:
-        data_fim = date_type(ano + 1, 1, 1) - timedelta(days=1)
-    else:
-        data_fim = date_type(ano, mes_num + 1, 1) - timedelta(days=1)
-    
-    # Buscar entradas do mês
-    entradas = db.query(models.Entrada).filter(
-        models.Entrada.data >= data_inicio,
-        models.Entrada.data <= data_fim
-    ).all()
-    
-    total_entradas = sum(e.valor for e in entradas)
-    if total_entradas == 0:
-        return 0.0
-    
-    # Calcular contribuição do sócio
-    contribuicao_socio = 0.0
-    for entrada in entradas:
-        entrada_socio = db.query(models.EntradaSocio).filter(
-            models.EntradaSocio.entrada_id == entrada.id,
-            models.EntradaSocio.socio_id == socio_id
+def calcular_previsao_operacao_ano(db: Session, year: int, calcular_tempo_real: bool = False) -> List[Dict[str, Any]]:
+    """
+    Previsão da Operação (DRE mensal) dos 12 meses do ano: dados consolidados
+    quando houver; senão, cálculo em tempo real (se pedido) ou estrutura zerada.
+    """
+    from utils.datas import meses_do_ano, inicio_do_mes
+    from utils.simples import calcular_imposto_simples, obter_tabela_simples
+    
+    meses = meses_do_ano(year)
+    
+    # Receita 12m e faixa do Simples de todos os meses em uma chamada
+    receitas_12m = crud_resumo_mensal.receitas_12_meses(db, meses)
+    aliquotas_mes = dict(zip(meses, obter_tabela_simples(db).resolver_meses(
+        [receitas_12m[m] for m in meses],
+        [inicio_do_mes(m) for m in meses],
+        padrao=(0.045, 0.0, 0.0)  # 4.5% primeira faixa como padrão
+    )))
+    
+    # Previsões, resumos, sócio administrador, participações e configuração
+    # do ano inteiro lidos antes do laço (uma consulta cada)
+    previsoes = listar_previsoes_operacao_mensal(db, meses)
+    if calcular_tempo_real:
+        resumos = crud_resumo_mensal.listar_resumo_meses(db, meses)
+        admin_socio = db.query(models.Socio).filter(
+            models.Socio.funcao.ilike('%administrador%')
         ).first()
-        
-        if entrada_socio:
-            contribuicao_socio += entrada.valor * (entrada_socio.percentual / 100.0)
+        percentuais_mes = crud_contribuicoes.percentuais_por_mes(db, meses) if admin_socio else {}
+        config = get_configuracao(db)
+        salario_minimo = config.salario_minimo if config else 1518.0
     
-    return (contribuicao_socio / total_entradas) * 100.0
+    resultado = []
+    for mes in meses:
+        previsao = previsoes.get(mes)
+        
+        # Se está consolidado, retornar dados consolidados
+        if previsao and previsao.consolidado:
+            pro_labore_liquido = float(previsao.pro_labore or 0) - float(previsao.inss_pessoal or 0)
+            reserva_legal = float(previsao.lucro_liquido or 0) * 0.10
+            lucro_distribuivel = float(previsao.lucro_liquido or 0) - reserva_legal
+            
+            resultado.append({
+                "mes": previsao.mes,
+                "receita_bruta": float(previsao.receita_bruta or 0),
+                "receita_12m": float(previsao.receita_12m or 0),
+                "aliquota": float(previsao.aliquota or 0),
+                "aliquota_efetiva": float(previsao.aliquota_efetiva or 0),
+                "deducao": float(previsao.deducao or 0),
+                "imposto": float(previsao.imposto or 0),
+                "despesas_gerais": float(previsao.despesas_gerais or 0),
+                "pro_labore_bruto": float(previsao.pro_labore or 0),
+                "inss_pessoal": float(previsao.inss_pessoal or 0),
+                "pro_labore_liquido": round(pro_labore_liquido, 2),
+                "inss_patronal": float(previsao.inss_patronal or 0),
+                "inss_total": float(previsao.inss_patronal or 0) + float(previsao.inss_pessoal or 0),
+                "lucro_liquido": float(previsao.lucro_liquido or 0),
+                "reserva_legal": round(reserva_legal, 2),
+                "lucro_distribuivel": round(lucro_distribuivel, 2),
+                "consolidado": True
+            })
+        # Se não está consolidado e foi pedido cálculo em tempo real
+        elif calcular_tempo_real:
+            inicio = inicio_do_mes(mes)
+            
+            # Receita bruta e despesas gerais do mês (resumo pré-carregado)
+            resumo = resumos.get(mes)
+            receita_bruta = para_reais(resumo.receita_centavos) if resumo else 0.0
+            despesas_gerais = para_reais(resumo.despesas_centavos) if resumo else 0.0
+            
+            # Receita acumulada 12 meses e faixa Simples (pré-calculadas)
+            receita_12m = receitas_12m[mes]
+            aliquota, deducao, aliquota_efetiva = aliquotas_mes[mes]
+            
+            # Calcular imposto do mês
+            imposto = calcular_imposto_simples(receita_bruta, aliquota_efetiva)
+            
+            # Calcular lucro bruto (antes de pró-labore e INSS)
+            lucro_bruto = receita_bruta - imposto - despesas_gerais
+            
+            # Percentual de contribuição do sócio administrador no mês
+            percentual_contrib_admin = 100.0  # Default se não tiver sócio admin
+            
+            if admin_socio:
+                if receita_bruta > 0:
+                    percentual_contrib_admin = percentuais_mes.get(mes, {}).get(admin_socio.id, 0.0)
+            
+            # Obter a faixa do Simples para cálculo iterativo
+            try:
+                faixa_simples = obter_tabela_simples(db).faixa_inicial(inicio)
+            except Exception:
+                faixa_simples = None
+
+            if faixa_simples:
+                pro_labore, inss_patronal, inss_pessoal, lucro_liquido = calcular_pro_labore_iterativo(
+                    db, receita_bruta, receita_12m, faixa_simples, despesas_gerais,
+                    percentual_contrib_admin=percentual_contrib_admin,
+                    salario_minimo=salario_minimo
+                )
+            else:
+                # Fallback: cálculo simples
+                percentual_total = 0.05 + (0.85 * percentual_contrib_admin / 100.0)
+                lucro_liquido_temp = lucro_bruto / (1 + percentual_total * 0.20)
+                pro_labore = min(lucro_liquido_temp * percentual_total, salario_minimo)
+                inss_pessoal = pro_labore * 0.11
+                inss_patronal = pro_labore * 0.20
+                lucro_liquido = lucro_bruto - inss_patronal
+            
+            # Calcular reserva legal 10% e lucro distribuível
+            # Garantir que lucro_liquido seja um número válido
+            lucro_liquido = float(lucro_liquido) if lucro_liquido is not None else 0.0
+            reserva_legal = lucro_liquido * 0.10
+            lucro_distribuivel = lucro_liquido - reserva_legal
+            
+            # Calcular pró-labore líquido
+            pro_labore_liquido = pro_labore - inss_pessoal
+            
+            # Função auxiliar para garantir valores numéricos válidos
+            def safe_round(val, decimals=2):
+                try:
+                    if val is None or (isinstance(val, float) and (val != val)):  # None ou NaN
+                        return 0.0
+                    return round(float(val), decimals)
+                except (ValueError, TypeError):
+                    return 0.0
+            
+            resultado.append({
+                "mes": mes,
+                "receita_bruta": safe_round(receita_bruta),
+                "receita_12m": safe_round(receita_12m),
+                "aliquota": safe_round(aliquota, 4),
+                "aliquota_efetiva": safe_round(aliquota_efetiva, 4),
+                "deducao": safe_round(deducao),
+                "imposto": safe_round(imposto),
+                "despesas_gerais": safe_round(despesas_gerais),
+                "pro_labore_bruto": safe_round(pro_labore),
+                "inss_pessoal": safe_round(inss_pessoal),
+                "pro_labore_liquido": safe_round(pro_labore_liquido),
+                "inss_patronal": safe_round(inss_patronal),
+                "inss_total": safe_round(inss_patronal + inss_pessoal),
+                "lucro_liquido": safe_round(lucro_liquido),
+                "reserva_legal": safe_round(reserva_legal),
+                "lucro_distribuivel": safe_round(lucro_distribuivel),
+                "consolidado": False
+            })
+        else:
+            # Se não consolidado e não pediu cálculo, retornar estrutura vazia
+            resultado.append({
+                "mes": mes,
+                "receita_bruta": 0.0,
+                "receita_12m": 0.0,
+                "aliquota": 0.0,
+                "aliquota_efetiva": 0.0,
+                "deducao": 0.0,
+                "imposto": 0.0,
+                "pro_labore_bruto": 0.0,
+                "inss_pessoal": 0.0,
+                "pro_labore_liquido": 0.0,
+                "inss_patronal": 0.0,
+                "inss_total": 0.0,
+                "despesas_gerais": 0.0,
+                "lucro_liquido": 0.0,
+                "reserva_legal": 0.0,
+                "lucro_distribuivel": 0.0,
+                "consolidado": False
+            })
+    
+    return resultado
+
+
+def calcular_percentual_participacao_socio(db: Session, socio_id: int, mes: str) -> float:
+    """Calcula o percentual de participação de um sócio nas entradas de um mês"""
+    return crud_contribuicoes.percentual_contribuicao(db, socio_id, mes)
 
 
 def calcular_pro_labore_iterativo(
@@ -1870,10 +1826,10 @@ def calcular_dmpl(db: Session, ano_inicio: int, ano_fim: int) -> Dict[str, Any]:
     que afetam contas do Patrimônio Líquido (tipo='PL')
     """
     # Buscar contas PL
-    contas_pl = db.query(models.PlanoDeContas).filter(
-        models.PlanoDeContas.tipo == 'PL',
-        models.PlanoDeContas.ativo == True
-    ).all()
+    contas_pl = [
+        c for c in crud_plano_contas.obter_indice_plano_contas(db).todas(apenas_ativas=True)
+        if c.tipo == 'PL'
+    ]
     
     if not contas_pl:
         return {
@@ -1916,14 +1872,15 @@ def calcular_dmpl(db: Session, ano_inicio: int, ano_fim: int) -> Dict[str, Any]:
     }
 
 
-def _calcular_saldos_pl(db: Session, contas_pl: List[models.PlanoDeContas], data_inicio: Optional[date_type], data_fim: Optional[date_type]) -> Dict[str, float]:
+def _calcular_saldos_pl(db: Session, contas_pl: List[crud_plano_contas.ContaResumo], data_inicio: Optional[date_type], data_fim: Optional[date_type]) -> Dict[str, float]:
     """Calcula saldos por subgrupo do PL"""
     capital_social = 0.0
     reservas = 0.0
     lucros_acumulados = 0.0
+    saldos = crud_plano_contas.calcular_saldos_contas(db, data_inicio, data_fim)
     
     for conta in contas_pl:
-        saldo = crud_plano_contas.calcular_saldo_conta(db, conta.id, data_inicio, data_fim)
+        saldo = saldos.get(conta.id, 0.0)
         
         if conta.codigo.startswith("3.1"):  # Capital Social
             capital_social += saldo
@@ -1940,12 +1897,15 @@ def _calcular_saldos_pl(db: Session, contas_pl: List[models.PlanoDeContas], data
     }
 
 
-def _extrair_movimentacoes_pl(db: Session, contas_pl: List[models.PlanoDeContas], data_inicio: date_type, data_fim: date_type) -> List[Dict[str, Any]]:
+def _extrair_movimentacoes_pl(db: Session, contas_pl: List[crud_plano_contas.ContaResumo], data_inicio: date_type, data_fim: date_type) -> List[Dict[str, Any]]:
     """Extrai movimentações do PL no período por tipo de operação"""
     contas_pl_ids = [c.id for c in contas_pl]
+    indice = crud_plano_contas.obter_indice_plano_contas(db)
     
-    # Buscar lançamentos que afetam PL
-    lancamentos = db.query(models.LancamentoContabil).filter(
+    # Buscar lançamentos que afetam PL (operação carregada junto)
+    lancamentos = db.query(models.LancamentoContabil).options(
+        joinedload(models.LancamentoContabil.operacao_contabil).joinedload(models.OperacaoContabil.operacao)
+    ).filter(
         models.LancamentoContabil.data >= data_inicio,
         models.LancamentoContabil.data <= data_fim,
         or_(
@@ -1974,8 +1934,8 @@ def _extrair_movimentacoes_pl(db: Session, contas_pl: List[models.PlanoDeContas]
             }
         
         # Calcular impacto no subgrupo
-        conta_debito = lanc.conta_debito
-        conta_credito = lanc.conta_credito
+        conta_debito = indice.por_id(lanc.conta_debito_id)
+        conta_credito = indice.por_id(lanc.conta_credito_id)
         
         # Se débito é PL, diminui; se crédito é PL, aumenta
         if conta_debito.tipo == 'PL':
@@ -2017,7 +1977,7 @@ def calcular_dfc(db: Session, mes: int, ano: int) -> Dict[str, Any]:
     que afetam a conta Caixa (1.1.1)
     """
     # Buscar conta Caixa
-    conta_caixa = crud_plano_contas.buscar_conta_por_codigo(db, "1.1.1")
+    conta_caixa = crud_plano_contas.obter_conta_cache(db, "1.1.1")
     if not conta_caixa:
         raise ValueError("Conta 1.1.1 (Caixa e Bancos) não encontrada")
     
@@ -2072,6 +2032,7 @@ def calcular_dfc(db: Session, mes: int, ano: int) -> Dict[str, Any]:
 
 def _classificar_fluxo_operacional(db: Session, lancamentos: List[models.LancamentoContabil], conta_caixa_id: int) -> Dict[str, float]:
     """Classifica fluxos operacionais"""
+    indice = crud_plano_contas.obter_indice_plano_contas(db)
     recebimentos_clientes = 0.0
     pagamentos_fornecedores = 0.0
     pagamentos_salarios = 0.0
@@ -2080,7 +2041,7 @@ def _classificar_fluxo_operacional(db: Session, lancamentos: List[models.Lancame
     outras_despesas = 0.0
     
     for lanc in lancamentos:
-        contraparte = lanc.conta_debito if lanc.conta_credito_id == conta_caixa_id else lanc.conta_credito
+        contraparte = indice.por_id(lanc.conta_debito_id if lanc.conta_credito_id == conta_caixa_id else lanc.conta_credito_id)
         valor_fluxo = lanc.valor if lanc.conta_debito_id == conta_caixa_id else -lanc.valor
         
         # Classificar por tipo de conta
@@ -2113,13 +2074,14 @@ def _classificar_fluxo_operacional(db: Session, lancamentos: List[models.Lancame
 
 def _classificar_fluxo_investimento(db: Session, lancamentos: List[models.LancamentoContabil], conta_caixa_id: int) -> Dict[str, float]:
     """Classifica fluxos de investimento"""
+    indice = crud_plano_contas.obter_indice_plano_contas(db)
     aquisicao_imobilizado = 0.0
     venda_imobilizado = 0.0
     aplicacoes_financeiras = 0.0
     resgate_aplicacoes = 0.0
     
     for lanc in lancamentos:
-        contraparte = lanc.conta_debito if lanc.conta_credito_id == conta_caixa_id else lanc.conta_credito
+        contraparte = indice.por_id(lanc.conta_debito_id if lanc.conta_credito_id == conta_caixa_id else lanc.conta_credito_id)
         valor_fluxo = lanc.valor if lanc.conta_debito_id == conta_caixa_id else -lanc.valor
         
         # Classificar por conta
@@ -2142,13 +2104,14 @@ def _classificar_fluxo_investimento(db: Session, lancamentos: List[models.Lancam
 
 def _classificar_fluxo_financiamento(db: Session, lancamentos: List[models.LancamentoContabil], conta_caixa_id: int) -> Dict[str, float]:
     """Classifica fluxos de financiamento"""
+    indice = crud_plano_contas.obter_indice_plano_contas(db)
     aumento_capital = 0.0
     emprestimos_obtidos = 0.0
     pagamento_emprestimos = 0.0
     distribuicao_dividendos = 0.0
     
     for lanc in lancamentos:
-        contraparte = lanc.conta_debito if lanc.conta_credito_id == conta_caixa_id else lanc.conta_credito
+        contraparte = indice.por_id(lanc.conta_debito_id if lanc.conta_credito_id == conta_caixa_id else lanc.conta_credito_id)
         valor_fluxo = lanc.valor if lanc.conta_debito_id == conta_caixa_id else -lanc.valor
         
         # Classificar por tipo PL ou passivo não circulante
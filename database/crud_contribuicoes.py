@@ -0,0 +1,122 @@
+"""
+Contribuição dos sócios na receita mensal.
+
+contribuição(sócio, mês) = Σ entrada.valor × entrada_socio.percentual / 100
+
+Todo cálculo de "parcela do sócio X na receita do mês M" passa por este
+módulo. Por padrão as leituras usam o resumo persistido (resumo_mensal e
+resumo_mensal_socio, recalculado a cada gravação de entradas e seus
+sócios); com usar_resumo=False a agregação é feita direto nas entradas,
+numa única consulta agrupada por sócio e mês.
+"""
+from datetime import date
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import models
+from utils.datas import inicio_do_mes, fim_do_mes
+from utils.dinheiro import para_centavos, para_reais
+
+
+def _mes_entrada():
+    return func.strftime('%Y-%m', models.Entrada.data)
+
+
+def agregar_contribuicoes(db: Session, data_inicio: date, data_fim: date) -> Dict[Tuple[str, int], int]:
+    """
+    Contribuição de cada sócio em cada mês do período, em centavos, numa
+    única consulta: SUM(valor × percentual / 100) GROUP BY sócio, mês.
+    """
+    mes = _mes_entrada()
+    linhas = db.query(
+        mes,
+        models.EntradaSocio.socio_id,
+        func.sum(models.Entrada.valor_centavos * models.EntradaSocio.percentual)
+    ).join(
+        models.Entrada, models.Entrada.id == models.EntradaSocio.entrada_id
+    ).filter(
+        models.Entrada.data >= data_inicio,
+        models.Entrada.data <= data_fim
+    ).group_by(mes, models.EntradaSocio.socio_id).all()
+    # soma = Σ centavos × percentual; dividir por 100 (percentual) e converter
+    return {(m, socio_id): para_centavos((soma or 0) / 10000) for m, socio_id, soma in linhas}
+
+
+def _agregar_receitas(db: Session, data_inicio: date, data_fim: date) -> Dict[str, int]:
+    mes = _mes_entrada()
+    linhas = db.query(mes, func.sum(models.Entrada.valor_centavos)).filter(
+        models.Entrada.data >= data_inicio,
+        models.Entrada.data <= data_fim
+    ).group_by(mes).all()
+    return {m: int(total or 0) for m, total in linhas}
+
+
+def _contribuicoes_centavos(
+    db: Session, meses: List[str], usar_resumo: bool
+) -> Tuple[Dict[str, int], Dict[str, Dict[int, int]]]:
+    """Retorna (receita por mês, {mês: {sócio: contribuição}}) em centavos"""
+    receitas: Dict[str, int] = {}
+    contribuicoes: Dict[str, Dict[int, int]] = {mes: {} for mes in meses}
+    if not meses:
+        return receitas, contribuicoes
+
+    if usar_resumo:
+        # Uma consulta: contribuições por sócio com a receita do mês ao lado
+        linhas = []
+        for mes, socio_id, centavos, receita in db.query(
+            models.ResumoMensalSocio.mes,
+            models.ResumoMensalSocio.socio_id,
+            models.ResumoMensalSocio.contribuicao_centavos,
+            models.ResumoMensal.receita_centavos
+        ).outerjoin(
+            models.ResumoMensal, models.ResumoMensal.mes == models.ResumoMensalSocio.mes
+        ).filter(models.ResumoMensalSocio.mes.in_(meses)):
+            receitas[mes] = receita or 0
+            linhas.append((mes, socio_id, centavos))
+    else:
+        data_inicio = inicio_do_mes(min(meses))
+        data_fim = fim_do_mes(max(meses))
+        receitas = _agregar_receitas(db, data_inicio, data_fim)
+        linhas = [(m, s, c) for (m, s), c in agregar_contribuicoes(db, data_inicio, data_fim).items()]
+
+    for mes, socio_id, centavos in linhas:
+        if mes in contribuicoes:
+            contribuicoes[mes][socio_id] = centavos or 0
+    return receitas, contribuicoes
+
+
+def contribuicoes_por_mes(db: Session, meses: List[str], usar_resumo: bool = True) -> Dict[str, Dict[int, float]]:
+    """Contribuição em reais de cada sócio em cada mês: {mês: {socio_id: valor}}"""
+    _, contribuicoes = _contribuicoes_centavos(db, meses, usar_resumo)
+    return {
+        mes: {socio_id: para_reais(c) for socio_id, c in por_socio.items()}
+        for mes, por_socio in contribuicoes.items()
+    }
+
+
+def percentuais_por_mes(db: Session, meses: List[str], usar_resumo: bool = True) -> Dict[str, Dict[int, float]]:
+    """
+    Percentual (0-100) da receita de cada mês trazido por cada sócio:
+    {mês: {socio_id: percentual}}. Meses sem receita ficam vazios.
+    """
+    receitas, contribuicoes = _contribuicoes_centavos(db, meses, usar_resumo)
+    resultado: Dict[str, Dict[int, float]] = {}
+    for mes, por_socio in contribuicoes.items():
+        receita = receitas.get(mes) or 0
+        resultado[mes] = (
+            {socio_id: c / receita * 100.0 for socio_id, c in por_socio.items()}
+            if receita else {}
+        )
+    return resultado
+
+
+def contribuicao_socio(db: Session, socio_id: int, mes: str, usar_resumo: bool = True) -> float:
+    """Contribuição do sócio na receita do mês, em reais"""
+    return contribuicoes_por_mes(db, [mes], usar_resumo)[mes].get(socio_id, 0.0)
+
+
+def percentual_contribuicao(db: Session, socio_id: int, mes: str, usar_resumo: bool = True) -> float:
+    """Percentual (0-100) da receita do mês trazido pelo sócio; 0.0 se não houve receita"""
+    return percentuais_por_mes(db, [mes], usar_resumo)[mes].get(socio_id, 0.0)
@@ -0,0 +1,214 @@
+"""
+Resumo do dashboard contábil (/contabilidade/dashboard-summary).
+
+Cada bloco do dashboard (totais do balanço, lucros e fundos, barras da DRE
+e distribuição entre sócios) é calculado a partir de agregados, com um
+número fixo de consultas independente da quantidade de contas e sócios.
+A distribuição entre sócios divide o lucro de cada mês pela contribuição
+de cada sócio na receita do mês (crud_contribuicoes), como a matriz de
+pró-labore e os lucros.
+
+O resultado fica em cache por (ano, mês) e versão dos dados contábeis.
+Qualquer commit que altere lançamentos, plano de contas, previsões,
+fundos, sócios ou o resumo mensal incrementa a versão e agenda o recálculo em segundo
+plano, para que a próxima requisição já encontre o cache atualizado. Isso
+vale também para INSERT/UPDATE/DELETE em lote executados pela sessão
+(insert(tabela) da importação de honorários, query.update), que não passam
+pelos eventos do mapper.
+"""
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import models
+from database import crud_contribuicoes, crud_plano_contas
+from utils.datas import fim_do_mes
+
+# Modelos cujas alterações invalidam o dashboard
+MODELOS_DASHBOARD = (
+    models.LancamentoContabil,
+    models.PlanoDeContas,
+    models.PrevisaoOperacaoMensal,
+    models.Fundo,
+    models.Socio,
+    models.Usuario,
+    models.ResumoMensal,
+    models.ResumoMensalSocio,
+)
+TABELAS_DASHBOARD = frozenset(modelo.__tablename__ for modelo in MODELOS_DASHBOARD)
+
+# Permite desligar o recálculo em segundo plano (scripts, bancos temporários)
+ATUALIZAR_EM_SEGUNDO_PLANO = True
+
+_lock = threading.Lock()
+_versao = 0
+_cache: Dict[Tuple[int, int], Tuple[int, Dict[str, Any]]] = {}
+_atualizacao_pendente = False
+
+
+def versao_dados_dashboard() -> int:
+    """Versão atual dos dados contábeis usados pelo dashboard"""
+    return _versao
+
+
+def invalidar_cache_dashboard() -> None:
+    """Descarta o dashboard em cache (recalculado no próximo acesso)"""
+    global _versao
+    with _lock:
+        _versao += 1
+        _cache.clear()
+
+
+def _marcar_alteracao(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["dashboard_alterado"] = True
+
+
+for _modelo in MODELOS_DASHBOARD:
+    event.listen(_modelo, "after_insert", _marcar_alteracao)
+    event.listen(_modelo, "after_update", _marcar_alteracao)
+    event.listen(_modelo, "after_delete", _marcar_alteracao)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _alteracao_em_lote(estado):
+    # Comandos DML da sessão, ORM ou Core (insert(Modelo.__table__))
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        if getattr(estado.statement.table, "name", None) in TABELAS_DASHBOARD:
+            estado.session.info["dashboard_alterado"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _fim_transacao(session):
+    if session.info.pop("dashboard_alterado", False):
+        invalidar_cache_dashboard()
+        if ATUALIZAR_EM_SEGUNDO_PLANO and session.bind is not None:
+            _agendar_atualizacao(session.bind)
+
+
+@event.listens_for(Session, "after_rollback")
+def _transacao_desfeita(session):
+    session.info.pop("dashboard_alterado", None)
+
+
+def _agendar_atualizacao(bind) -> None:
+    global _atualizacao_pendente
+    with _lock:
+        if _atualizacao_pendente:
+            return
+        _atualizacao_pendente = True
+    threading.Thread(target=_atualizar_em_segundo_plano, args=(bind,), daemon=True).start()
+
+
+def _atualizar_em_segundo_plano(bind) -> None:
+    global _atualizacao_pendente
+    with _lock:
+        # Commits feitos durante o cálculo agendam uma nova atualização
+        _atualizacao_pendente = False
+    db = Session(bind=bind, autoflush=False)
+    try:
+        obter_dashboard(db)
+    except Exception as e:
+        print(f"Aviso: falha ao atualizar dashboard em segundo plano: {e}")
+    finally:
+        db.close()
+
+
+def calcular_dashboard(db: Session, ano: int, mes: int) -> Dict[str, Any]:
+    """Calcula todos os blocos do dashboard (sem cache)"""
+    # Totais do balanço patrimonial no fim do mês (saldos em lote)
+    totais = crud_plano_contas.calcular_totais_balanco(db, fim_do_mes(f"{ano}-{mes:02d}"))
+
+    # Previsões da operação consolidadas do ano (DRE mensal)
+    previsoes = db.query(models.PrevisaoOperacaoMensal).filter(
+        models.PrevisaoOperacaoMensal.mes.like(f"{ano}-%"),
+        models.PrevisaoOperacaoMensal.consolidado == True
+    ).all()
+
+    lucro_liquido_total = sum(p.lucro_liquido or 0.0 for p in previsoes)
+    reserva_total = sum((p.lucro_liquido or 0.0) * 0.10 for p in previsoes)
+    pro_labore_total = sum(p.pro_labore or 0.0 for p in previsoes)
+    lucro_distribuivel = lucro_liquido_total - reserva_total - pro_labore_total
+
+    # Fundos (somente leitura: fundo inexistente conta como saldo zero)
+    fundos = dict(db.query(models.Fundo.nome, models.Fundo.saldo).filter(
+        models.Fundo.nome.in_(["Fundo de Reserva", "Fundo de Investimento"])
+    ).all())
+
+    # Sócios com o nome do usuário vinculado numa única consulta
+    socios = db.query(models.Socio, models.Usuario.nome).outerjoin(
+        models.Usuario, models.Usuario.id == models.Socio.usuario_id
+    ).order_by(models.Socio.id).all()
+
+    # Lucro distribuível de cada mês dividido pela contribuição de cada sócio
+    # na receita do mês (resumo_mensal_socio), como em /contabilidade/lucros
+    percentuais = crud_contribuicoes.percentuais_por_mes(db, [p.mes for p in previsoes])
+    valores_socios: Dict[int, float] = {}
+    for p in previsoes:
+        distribuivel_mes = (p.lucro_liquido or 0.0) * 0.90 - (p.pro_labore or 0.0)
+        for socio_id, percentual in percentuais[p.mes].items():
+            valores_socios[socio_id] = valores_socios.get(socio_id, 0.0) + distribuivel_mes * percentual / 100.0
+
+    distribuicao_socios = []
+    saldo_socios = 0.0
+    for socio, nome_usuario in socios:
+        valor_socio = valores_socios.get(socio.id, 0.0)
+        saldo_socios += valor_socio
+        distribuicao_socios.append({
+            "name": nome_usuario or f"Sócio {socio.id}",
+            "value": valor_socio
+        })
+
+    # DRE do ano (para gráfico), a partir das mesmas previsões consolidadas
+    receita_bruta_total = sum(p.receita_bruta or 0.0 for p in previsoes)
+    despesas_total = sum(p.despesas_gerais or 0.0 for p in previsoes)
+    impostos_total = sum(p.imposto or 0.0 for p in previsoes)
+    inss_total = sum((p.inss_patronal or 0.0) + (p.inss_pessoal or 0.0) for p in previsoes)
+    lucro_bruto = receita_bruta_total - despesas_total
+
+    dre_data = [
+        {"name": "Receita Bruta", "valor": receita_bruta_total},
+        {"name": "Despesas", "valor": -despesas_total},
+        {"name": "Lucro Bruto", "valor": lucro_bruto},
+        {"name": "Impostos", "valor": -(impostos_total + inss_total)},
+        {"name": "Lucro Líquido", "valor": lucro_liquido_total}
+    ]
+
+    return {
+        "balancoPatrimonial": {
+            "ativo": totais["ativo"],
+            "passivo": totais["passivo"],
+            "patrimonioLiquido": totais["patrimonioLiquido"]
+        },
+        "lucros": {
+            "disponiveis": lucro_distribuivel,
+            "distribuidos": saldo_socios,
+            "fundoReserva": fundos.get("Fundo de Reserva", 0.0),
+            "proLabore": pro_labore_total
+        },
+        "dreData": dre_data,
+        "distribuicaoSocios": distribuicao_socios,
+        "ano": ano
+    }
+
+
+def obter_dashboard(db: Session, agora: Optional[datetime] = None) -> Dict[str, Any]:
+    """Retorna o dashboard do mês corrente, do cache quando a versão dos dados não mudou"""
+    agora = agora or datetime.now()
+    chave = (agora.year, agora.month)
+
+    versao = _versao
+    em_cache = _cache.get(chave)
+    if em_cache is not None and em_cache[0] == versao:
+        return em_cache[1]
+
+    dados = calcular_dashboard(db, agora.year, agora.month)
+    with _lock:
+        # Só publica se ninguém alterou os dados durante o cálculo
+        if versao == _versao:
+            _cache[chave] = (versao, dados)
+    return dados
@@ -0,0 +1,118 @@
+"""
+Jobs em segundo plano (tabela job): inclusão, consulta e cancelamento.
+
+A execução fica em database.fila_jobs; aqui estão só as operações usadas
+pelos endpoints. Um job pendente cancelado não chega a rodar; um job em
+execução recebe o pedido de cancelamento e para no próximo ponto de
+verificação (atualização de progresso).
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from database import models
+
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+STATUS_CANCELADO = "cancelado"
+STATUS_FINAIS = (STATUS_CONCLUIDO, STATUS_ERRO, STATUS_CANCELADO)
+STATUS = (STATUS_PENDENTE, STATUS_EXECUTANDO) + STATUS_FINAIS
+
+# Jobs finalizados (e seus arquivos) mais antigos que isto são removidos
+RETENCAO_JOBS_DIAS = 7
+
+
+def criar_job(
+    db: Session,
+    tipo: str,
+    parametros: Optional[Dict[str, Any]] = None,
+    criado_por_id: Optional[int] = None,
+) -> models.Job:
+    """Registra o job como pendente; a fila o executa assim que houver um executor livre"""
+    from database import fila_jobs
+
+    parametros = fila_jobs.validar_parametros(tipo, parametros or {})
+    job = models.Job(
+        tipo=tipo,
+        status=STATUS_PENDENTE,
+        parametros=parametros,
+        criado_por_id=criado_por_id,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    fila_jobs.notificar_novo_job()
+    return job
+
+
+def obter_job(db: Session, job_id: int) -> Optional[models.Job]:
+    return db.query(models.Job).filter(models.Job.id == job_id).first()
+
+
+def listar_jobs(
+    db: Session,
+    status: Optional[str] = None,
+    tipo: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[models.Job]:
+    """Jobs do mais recente para o mais antigo"""
+    if status is not None and status not in STATUS:
+        raise ValueError(f"Status inválido. Use: {', '.join(STATUS)}")
+    query = db.query(models.Job)
+    if status:
+        query = query.filter(models.Job.status == status)
+    if tipo:
+        query = query.filter(models.Job.tipo == tipo)
+    return query.order_by(models.Job.id.desc()).offset(skip).limit(limit).all()
+
+
+def solicitar_cancelamento(db: Session, job_id: int) -> Optional[models.Job]:
+    """
+    Cancela o job pendente na hora; para um job em execução, registra o
+    pedido (o executor finaliza como cancelado). Jobs finalizados não mudam.
+    """
+    from database import fila_jobs
+
+    job = obter_job(db, job_id)
+    if job is None:
+        return None
+    # Em memória primeiro: o job em execução neste processo para sem esperar o banco
+    fila_jobs.notificar_cancelamento(job_id)
+    if job.status == STATUS_PENDENTE:
+        # Condicional: um executor pode ter assumido o job neste intervalo
+        atualizados = db.query(models.Job).filter(
+            models.Job.id == job_id, models.Job.status == STATUS_PENDENTE
+        ).update({
+            models.Job.status: STATUS_CANCELADO,
+            models.Job.cancelamento_solicitado: True,
+            models.Job.concluido_em: datetime.utcnow(),
+        }, synchronize_session=False)
+        if not atualizados:
+            db.query(models.Job).filter(models.Job.id == job_id).update(
+                {models.Job.cancelamento_solicitado: True}, synchronize_session=False
+            )
+    elif job.status == STATUS_EXECUTANDO:
+        job.cancelamento_solicitado = True
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def remover_jobs_antigos(db: Session, dias: int = RETENCAO_JOBS_DIAS) -> int:
+    """Remove jobs finalizados há mais de `dias` dias e os arquivos gerados. Retorna quantos"""
+    limite = datetime.utcnow() - timedelta(days=dias)
+    antigos = db.query(models.Job).filter(
+        models.Job.status.in_(STATUS_FINAIS),
+        models.Job.concluido_em < limite,
+    ).all()
+    for job in antigos:
+        if job.arquivo and os.path.exists(job.arquivo):
+            os.remove(job.arquivo)
+        db.delete(job)
+    db.commit()
+    return len(antigos)
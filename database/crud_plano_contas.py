@@ -1,12 +1,150 @@
 """
 CRUD operations para Plano de Contas e Lançamentos Contábeis
 """
+import threading
+from bisect import bisect_left
 from sqlalchemy.orm import Session
+from sqlalchemy import event, func, case
 from database import models
-from typing import List, Optional
+from utils.dinheiro import para_reais
+from typing import List, Optional, Dict, NamedTuple
 from datetime import date as date_type, datetime
 
 
+# ===== ÍNDICE EM MEMÓRIA DO PLANO DE CONTAS =====
+
+class ContaResumo(NamedTuple):
+    """Dados imutáveis de uma conta, independentes de sessão"""
+    id: int
+    codigo: str
+    descricao: str
+    tipo: str
+    natureza: str
+    nivel: int
+    pai_id: Optional[int]
+    aceita_lancamento: bool
+    ativo: bool
+
+
+class PlanoContasIndex:
+    """
+    Retrato imutável do plano de contas com buscas em memória:
+    código → conta, id → conta, pai → filhos e busca por prefixo de código.
+    
+    Uma instância nunca é alterada; escritas no plano de contas invalidam
+    o índice global e a próxima chamada a obter_indice_plano_contas
+    carrega uma nova versão.
+    """
+
+    def __init__(self, contas: List[ContaResumo], versao: int):
+        self.versao = versao
+        self._ordenadas = sorted(contas, key=lambda c: c.codigo)
+        self._codigos = [c.codigo for c in self._ordenadas]
+        self._por_codigo = {c.codigo: c for c in self._ordenadas}
+        self._por_id = {c.id: c for c in self._ordenadas}
+        self._filhos: Dict[Optional[int], List[ContaResumo]] = {}
+        for c in self._ordenadas:
+            self._filhos.setdefault(c.pai_id, []).append(c)
+
+    def __len__(self) -> int:
+        return len(self._ordenadas)
+
+    def por_codigo(self, codigo: str) -> Optional[ContaResumo]:
+        return self._por_codigo.get(codigo)
+
+    def por_id(self, conta_id: Optional[int]) -> Optional[ContaResumo]:
+        return self._por_id.get(conta_id)
+
+    def filhos(self, conta_id: Optional[int]) -> List[ContaResumo]:
+        """Filhos diretos da conta (None = contas raiz), ordenados por código"""
+        return list(self._filhos.get(conta_id, ()))
+
+    def com_prefixo(self, prefixo: str, apenas_ativas: bool = False) -> List[ContaResumo]:
+        """Contas cujo código começa com o prefixo (equivale a LIKE 'prefixo%')"""
+        inicio = bisect_left(self._codigos, prefixo)
+        resultado = []
+        for conta in self._ordenadas[inicio:]:
+            if not conta.codigo.startswith(prefixo):
+                break
+            if apenas_ativas and not conta.ativo:
+                continue
+            resultado.append(conta)
+        return resultado
+
+    def todas(self, apenas_ativas: bool = False) -> List[ContaResumo]:
+        if apenas_ativas:
+            return [c for c in self._ordenadas if c.ativo]
+        return list(self._ordenadas)
+
+
+_indice_lock = threading.Lock()
+_indice_versao = 0
+_indice: Optional[PlanoContasIndex] = None
+
+
+def invalidar_cache_plano_contas() -> None:
+    """Descarta o índice do plano de contas (recarregado no próximo acesso)"""
+    global _indice, _indice_versao
+    with _indice_lock:
+        _indice_versao += 1
+        _indice = None
+
+
+@event.listens_for(models.PlanoDeContas, "after_insert")
+@event.listens_for(models.PlanoDeContas, "after_update")
+@event.listens_for(models.PlanoDeContas, "after_delete")
+def _plano_contas_alterado(mapper, connection, target):
+    # Invalida já no flush e marca a sessão para invalidar de novo no
+    # commit/rollback (outra sessão pode ter recarregado nesse intervalo)
+    invalidar_cache_plano_contas()
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["plano_contas_alterado"] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _fim_transacao(session):
+    if session.info.pop("plano_contas_alterado", False):
+        invalidar_cache_plano_contas()
+
+
+def obter_indice_plano_contas(db: Session) -> PlanoContasIndex:
+    """Retorna o índice vigente, carregando o plano de contas numa única consulta se necessário"""
+    global _indice
+    indice = _indice
+    if indice is not None:
+        return indice
+
+    versao = _indice_versao
+    c = models.PlanoDeContas
+    linhas = db.query(
+        c.id, c.codigo, c.descricao, c.tipo, c.natureza,
+        c.nivel, c.pai_id, c.aceita_lancamento, c.ativo
+    ).all()
+    indice = PlanoContasIndex([ContaResumo(*l) for l in linhas], versao)
+    with _indice_lock:
+        # Só publica se ninguém invalidou durante a carga
+        if versao == _indice_versao:
+            _indice = indice
+    return indice
+
+
+def versao_plano_contas() -> int:
+    """Versão atual do plano de contas (incrementada a cada alteração)"""
+    return _indice_versao
+
+
+def obter_conta_cache(db: Session, codigo: str) -> Optional[ContaResumo]:
+    """Busca uma conta pelo código no índice do plano de contas"""
+    return obter_indice_plano_contas(db).por_codigo(codigo)
+
+
+def obter_conta_cache_por_id(db: Session, conta_id: int) -> Optional[ContaResumo]:
+    """Busca uma conta pelo ID no índice do plano de contas"""
+    return obter_indice_plano_contas(db).por_id(conta_id)
+
+
 # ===== PLANO DE CONTAS =====
 
 def listar_plano_contas(db: Session, apenas_ativas: bool = True) -> List[models.PlanoDeContas]:
@@ -18,13 +156,22 @@ def listar_plano_contas(db: Session, apenas_ativas: bool = True) -> List[models.
 
 
 def buscar_conta_por_codigo(db: Session, codigo: str) -> Optional[models.PlanoDeContas]:
-    """Busca uma conta pelo código"""
-    return db.query(models.PlanoDeContas).filter(models.PlanoDeContas.codigo == codigo).first()
+    """Busca uma conta pelo código
+
+    O código é resolvido pelo índice em memória; o objeto ORM vem do
+    identity map da sessão quando já carregado.
+    """
+    conta = obter_conta_cache(db, codigo)
+    if not conta:
+        return None
+    return db.get(models.PlanoDeContas, conta.id)
 
 
 def buscar_conta_por_id(db: Session, conta_id: int) -> Optional[models.PlanoDeContas]:
     """Busca uma conta pelo ID"""
-    return db.query(models.PlanoDeContas).filter(models.PlanoDeContas.id == conta_id).first()
+    if not obter_conta_cache_por_id(db, conta_id):
+        return None
+    return db.get(models.PlanoDeContas, conta_id)
 
 
 def _get_or_create_conta(
@@ -36,11 +183,13 @@ def _get_or_create_conta(
     nivel: int,
     pai_codigo: Optional[str] = None,
     aceita_lancamento: bool = True,
+    commit: bool = True,
 ) -> models.PlanoDeContas:
     """Obtém uma conta por código ou cria caso não exista.
 
     Observação: mantém o padrão já usado no init, com natureza
-    como rótulo completo ("Devedora"/"Credora").
+    como rótulo completo ("Devedora"/"Credora"). Com commit=False a conta
+    nova só é enviada ao banco (flush), na transação do chamador.
     """
     conta = buscar_conta_por_codigo(db, codigo)
     if conta:
@@ -57,12 +206,15 @@ def _get_or_create_conta(
     )
     # Definir pai, se informado e existir
     if pai_codigo:
-        pai = buscar_conta_por_codigo(db, pai_codigo)
+        pai = obter_conta_cache(db, pai_codigo)
         if pai:
             conta.pai_id = pai.id
     db.add(conta)
-    db.commit()
-    db.refresh(conta)
+    if commit:
+        db.commit()
+        db.refresh(conta)
+    else:
+        db.flush()
     return conta
 
 
@@ -74,13 +226,15 @@ def _ultimo_dia_mes(ano: int, mes: int) -> date_type:
 
 def _criar_subconta_reserva_socio(
     db: Session,
-    socio_id: int
+    socio_id: int,
+    commit: bool = True
 ) -> models.PlanoDeContas:
     """
     Cria dinamicamente uma subconta de reserva para um sócio específico.
     Formato: 3.2.1.{socio_id} - Reserva - {Nome do Sócio}
     
     A subconta é criada automaticamente na primeira execução de RESERVAR_FUNDO.
+    Com commit=False as alterações só são enviadas ao banco (flush).
     """
     socio = db.query(models.Socio).filter(models.Socio.id == socio_id).first()
     if not socio:
@@ -102,7 +256,7 @@ def _criar_subconta_reserva_socio(
     if conta_pai.aceita_lancamento:
         # Transformar em sintética se ainda não for
         conta_pai.aceita_lancamento = False
-        db.commit()
+        db.flush()
     
     # Criar subconta analítica
     subconta = models.PlanoDeContas(
@@ -116,21 +270,26 @@ def _criar_subconta_reserva_socio(
         pai_id=conta_pai.id
     )
     db.add(subconta)
-    db.commit()
-    db.refresh(subconta)
+    if commit:
+        db.commit()
+        db.refresh(subconta)
+    else:
+        db.flush()
     
     return subconta
 
 
 def _criar_subconta_cdb_reserva_socio(
     db: Session,
-    socio_id: int
+    socio_id: int,
+    commit: bool = True
 ) -> models.PlanoDeContas:
     """
     Cria dinamicamente uma subconta de CDB Reserva Legal para um sócio específico.
     Formato: 1.1.1.2.3.{socio_id} - CDB Reserva Legal - {Nome do Sócio}
     
     Permite rastreamento de quanto cada sócio tem aplicado em CDB.
+    Com commit=False as alterações só são enviadas ao banco (flush).
     """
     socio = db.query(models.Socio).filter(models.Socio.id == socio_id).first()
     if not socio:
@@ -152,7 +311,7 @@ def _criar_subconta_cdb_reserva_socio(
     if conta_pai.aceita_lancamento:
         # Transformar em sintética se ainda não for
         conta_pai.aceita_lancamento = False
-        db.commit()
+        db.flush()
     
     # Criar subconta analítica
     subconta = models.PlanoDeContas(
@@ -166,8 +325,11 @@ def _criar_subconta_cdb_reserva_socio(
         pai_id=conta_pai.id
     )
     db.add(subconta)
-    db.commit()
-    db.refresh(subconta)
+    if commit:
+        db.commit()
+        db.refresh(subconta)
+    else:
+        db.flush()
     
     return subconta
 
@@ -186,9 +348,18 @@ def _obter_subconta_reserva_socio(
     return buscar_conta_por_codigo(db, codigo_subconta)
 
 
-def calcular_saldo_conta(db: Session, conta_id: int, data_inicio: Optional[date_type] = None, data_fim: Optional[date_type] = None) -> float:
+def _saldo_por_natureza(conta: ContaResumo, debitos: int, creditos: int) -> int:
+    # Normalizar para aceitar "D"/"Devedora" e "C"/"Credora"
+    natureza_normalizada = conta.natureza.upper() if conta.natureza else ""
+    if natureza_normalizada in ("D", "DEVEDORA"):
+        return debitos - creditos
+    else:  # Credora
+        return creditos - debitos
+
+
+def calcular_saldo_conta_centavos(db: Session, conta_id: int, data_inicio: Optional[date_type] = None, data_fim: Optional[date_type] = None) -> int:
     """
-    Calcula o saldo de uma conta considerando sua natureza (Devedora ou Credora)
+    Calcula o saldo de uma conta em centavos considerando sua natureza (Devedora ou Credora)
     
     Natureza Devedora (Ativo, Despesa):
         Saldo = Σ Débitos - Σ Créditos
@@ -196,39 +367,70 @@ def calcular_saldo_conta(db: Session, conta_id: int, data_inicio: Optional[date_
     Natureza Credora (Passivo, PL, Receita):
         Saldo = Σ Créditos - Σ Débitos
     """
-    conta = buscar_conta_por_id(db, conta_id)
+    conta = obter_conta_cache_por_id(db, conta_id)
     if not conta:
-        return 0.0
-    
-    # Query para débitos
-    query_debitos = db.query(models.LancamentoContabil).filter(
-        models.LancamentoContabil.conta_debito_id == conta_id
-    )
-    if data_inicio:
-        query_debitos = query_debitos.filter(models.LancamentoContabil.data >= data_inicio)
-    if data_fim:
-        query_debitos = query_debitos.filter(models.LancamentoContabil.data <= data_fim)
-    
-    total_debitos = sum(lanc.valor for lanc in query_debitos.all())
-    
-    # Query para créditos
-    query_creditos = db.query(models.LancamentoContabil).filter(
-        models.LancamentoContabil.conta_credito_id == conta_id
+        return 0
+    
+    # Débitos e créditos somados no banco (inteiros) em uma única consulta
+    lanc = models.LancamentoContabil
+    query = db.query(
+        func.coalesce(func.sum(case((lanc.conta_debito_id == conta_id, lanc.valor_centavos), else_=0)), 0),
+        func.coalesce(func.sum(case((lanc.conta_credito_id == conta_id, lanc.valor_centavos), else_=0)), 0)
+    ).filter(
+        (lanc.conta_debito_id == conta_id) | (lanc.conta_credito_id == conta_id)
     )
     if data_inicio:
-        query_creditos = query_creditos.filter(models.LancamentoContabil.data >= data_inicio)
+        query = query.filter(lanc.data >= data_inicio)
     if data_fim:
-        query_creditos = query_creditos.filter(models.LancamentoContabil.data <= data_fim)
-    
-    total_creditos = sum(lanc.valor for lanc in query_creditos.all())
+        query = query.filter(lanc.data <= data_fim)
     
-    # Calcular saldo conforme natureza (Devedora ou Credora)
-    # Normalizar para aceitar "D"/"Devedora" e "C"/"Credora"
-    natureza_normalizada = conta.natureza.upper() if conta.natureza else ""
-    if natureza_normalizada in ("D", "DEVEDORA"):
-        return total_debitos - total_creditos
-    else:  # Credora
-        return total_creditos - total_debitos
+    total_debitos, total_creditos = query.one()
+    return _saldo_por_natureza(conta, int(total_debitos), int(total_creditos))
+
+
+def calcular_saldo_conta(db: Session, conta_id: int, data_inicio: Optional[date_type] = None, data_fim: Optional[date_type] = None) -> float:
+    """Saldo da conta em reais (ver calcular_saldo_conta_centavos)"""
+    return para_reais(calcular_saldo_conta_centavos(db, conta_id, data_inicio, data_fim))
+
+
+def calcular_saldos_contas_centavos(db: Session, data_inicio: Optional[date_type] = None, data_fim: Optional[date_type] = None) -> Dict[int, int]:
+    """
+    Calcula o saldo em centavos de todas as contas com movimento em duas
+    consultas agregadas (débitos e créditos agrupados por conta), aplicando a
+    natureza de cada conta pelo índice do plano de contas. Contas sem
+    movimento não aparecem no dict.
+    """
+    lanc = models.LancamentoContabil
+    
+    def _totais(coluna_conta):
+        query = db.query(coluna_conta, func.sum(lanc.valor_centavos)).group_by(coluna_conta)
+        if data_inicio:
+            query = query.filter(lanc.data >= data_inicio)
+        if data_fim:
+            query = query.filter(lanc.data <= data_fim)
+        return dict(query.all())
+    
+    debitos = _totais(lanc.conta_debito_id)
+    creditos = _totais(lanc.conta_credito_id)
+    indice = obter_indice_plano_contas(db)
+    
+    saldos = {}
+    for conta_id in set(debitos) | set(creditos):
+        conta = indice.por_id(conta_id)
+        if not conta:
+            continue
+        saldos[conta_id] = _saldo_por_natureza(
+            conta, int(debitos.get(conta_id) or 0), int(creditos.get(conta_id) or 0)
+        )
+    return saldos
+
+
+def calcular_saldos_contas(db: Session, data_inicio: Optional[date_type] = None, data_fim: Optional[date_type] = None) -> Dict[int, float]:
+    """Saldos de todas as contas com movimento, em reais (ver calcular_saldos_contas_centavos)"""
+    return {
+        conta_id: para_reais(centavos)
+        for conta_id, centavos in calcular_saldos_contas_centavos(db, data_inicio, data_fim).items()
+    }
 
 
 # ===== LANÇAMENTOS CONTÁBEIS =====
@@ -244,13 +446,18 @@ def criar_lancamento(
     editavel: bool = True,
     criado_por: Optional[int] = None,
     entrada_id: Optional[int] = None,
-    despesa_id: Optional[int] = None
+    despesa_id: Optional[int] = None,
+    commit: bool = True
 ) -> models.LancamentoContabil:
-    """Cria um lançamento contábil"""
+    """Cria um lançamento contábil
+
+    Com commit=False o lançamento fica pendente na sessão, para que o
+    chamador grave vários lançamentos numa única transação.
+    """
     
     # Validar contas
-    conta_debito = buscar_conta_por_id(db, conta_debito_id)
-    conta_credito = buscar_conta_por_id(db, conta_credito_id)
+    conta_debito = obter_conta_cache_por_id(db, conta_debito_id)
+    conta_credito = obter_conta_cache_por_id(db, conta_credito_id)
     
     if not conta_debito or not conta_credito:
         raise ValueError("Conta de débito ou crédito não encontrada")
@@ -278,8 +485,9 @@ def criar_lancamento(
     )
     
     db.add(lancamento)
-    db.commit()
-    db.refresh(lancamento)
+    if commit:
+        db.commit()
+        db.refresh(lancamento)
     return lancamento
 
 
@@ -580,6 +788,7 @@ def registrar_fechamento_resultado(
     mes: str,
     valor_resultado: float,
     recriar: bool = False,
+    commit: bool = True,
 ) -> Optional[models.LancamentoContabil]:
     """Registra lançamento de fechamento do resultado para o mês (YYYY-MM).
 
@@ -588,6 +797,8 @@ def registrar_fechamento_resultado(
     - Se valor < 0: D 3.3 / C 4.9.9
     - Se valor ~ 0: não lança
     - Idempotente por mês: ao recriar, remove existentes do tipo 'fechamento_resultado'.
+    - Com commit=False nada é confirmado (flush), para o chamador gravar a
+      operação inteira numa única transação.
     """
     if not mes or len(mes) != 7 or mes[4] != '-':
         raise ValueError("Parâmetro 'mes' deve estar no formato YYYY-MM")
@@ -615,6 +826,7 @@ def registrar_fechamento_resultado(
         nivel=3,
         pai_codigo="4",
         aceita_lancamento=True,
+        commit=commit,
     )
 
     historico = f"Fechamento do resultado do mês {mes}"
@@ -644,8 +856,11 @@ def registrar_fechamento_resultado(
         existente.conta_credito_id = conta_credito_id
         existente.data = data_lcto
         existente.editado_em = datetime.utcnow()
-        db.commit()
-        db.refresh(existente)
+        if commit:
+            db.commit()
+            db.refresh(existente)
+        else:
+            db.flush()
         return existente
     else:
         # INSERT: criar novo lançamento
@@ -661,8 +876,11 @@ def registrar_fechamento_resultado(
             referencia_mes=mes,
         )
         db.add(lanc)
-        db.commit()
-        db.refresh(lanc)
+        if commit:
+            db.commit()
+            db.refresh(lanc)
+        else:
+            db.flush()
         return lanc
 
 def lancar_entrada_honorarios(db: Session, entrada_id: int) -> List[models.LancamentoContabil]:
@@ -816,8 +1034,159 @@ def lancar_despesa(db: Session, despesa_id: int) -> models.LancamentoContabil:
     )
 
 
+def _conta_para_lancamento(db: Session, codigo: str) -> ContaResumo:
+    conta = obter_conta_cache(db, codigo)
+    if not conta:
+        raise ValueError(f"Conta {codigo} não encontrada no plano de contas")
+    if not conta.aceita_lancamento:
+        raise ValueError(f"Conta {conta.codigo} - {conta.descricao} não aceita lançamentos (conta sintética)")
+    return conta
+
+
+def lancar_entradas_honorarios_lote(db: Session, entradas: List[models.Entrada]) -> List[models.LancamentoContabil]:
+    """
+    Versão em lote de lancar_entrada_honorarios para entradas recém-criadas
+    (já com id): as contas são resolvidas uma vez para todas. Debita a conta
+    analítica Caixa Corrente (1.1.1.1), pois 1.1.1 é sintética. Sem commit.
+    """
+    conta_caixa = _conta_para_lancamento(db, "1.1.1.1")
+    conta_receita = _conta_para_lancamento(db, "4.1.1")
+    lancamentos = [
+        models.LancamentoContabil(
+            data=entrada.data,
+            conta_debito_id=conta_caixa.id,
+            conta_credito_id=conta_receita.id,
+            valor=entrada.valor,
+            historico=f"Recebimento de honorários - {entrada.cliente}",
+            automatico=True,
+            editavel=False,
+            entrada_id=entrada.id,
+            tipo_lancamento='efetivo',
+            referencia_mes=entrada.data.strftime("%Y-%m")
+        )
+        for entrada in entradas
+    ]
+    db.add_all(lancamentos)
+    return lancamentos
+
+
+def lancar_despesas_lote(db: Session, despesas: List[models.Despesa]) -> List[models.LancamentoContabil]:
+    """
+    Versão em lote de lancar_despesa para despesas recém-criadas (já com id).
+    A conta de cada combinação descrição/tipo é determinada uma única vez e
+    as contas vêm do índice em memória. Credita Caixa Corrente (1.1.1.1).
+    Sem commit.
+    """
+    conta_caixa = _conta_para_lancamento(db, "1.1.1.1")
+    contas: Dict[tuple, ContaResumo] = {}
+    lancamentos = []
+    for despesa in despesas:
+        chave = (despesa.descricao, despesa.tipo)
+        if chave not in contas:
+            contas[chave] = _conta_para_lancamento(
+                db, _determinar_conta_despesa(descricao=despesa.descricao, tipo=despesa.tipo)
+            )
+        historico = f"Pagamento - {despesa.tipo or 'Despesa'}"
+        if despesa.descricao:
+            historico += f" - {despesa.descricao}"
+        lancamentos.append(models.LancamentoContabil(
+            data=despesa.data,
+            conta_debito_id=contas[chave].id,
+            conta_credito_id=conta_caixa.id,
+            valor=despesa.valor,
+            historico=historico,
+            automatico=True,
+            editavel=True,
+            despesa_id=despesa.id
+        ))
+    db.add_all(lancamentos)
+    return lancamentos
+
+
 # ===== BALANÇO PATRIMONIAL =====
 
+def _hierarquia_balanco(indice: PlanoContasIndex, saldos: Dict[int, float], conta_pai_codigo: str):
+    """Constrói a hierarquia de contas ativas de um grupo do balanço (1, 2, 3, 4 ou 5)"""
+    contas = indice.com_prefixo(conta_pai_codigo, apenas_ativas=True)
+    
+    # Organizar em estrutura hierárquica
+    estrutura = []
+    contas_dict = {}
+    for c in contas:
+        saldo_base = saldos.get(c.id, 0.0)
+        
+        # Para contas do PL (grupo 3) com natureza DEVEDORA (contas redutoras como 3.4.1),
+        # inverter o sinal para que subtraiam do PL ao invés de somar
+        if conta_pai_codigo == "3" and c.natureza and c.natureza.upper() in ("D", "DEVEDORA"):
+            saldo_final = -saldo_base
+        else:
+            saldo_final = saldo_base
+        
+        contas_dict[c.codigo] = {
+            "id": c.id,
+            "codigo": c.codigo,
+            "nome": c.descricao,
+            "natureza": c.natureza,
+            "nivel": c.nivel,
+            "aceita_lancamento": c.aceita_lancamento,
+            "saldo": saldo_final,
+            "subgrupos": []
+        }
+    
+    # Conectar pais e filhos
+    for codigo, conta_data in contas_dict.items():
+        if len(codigo) == 1:  # Conta raiz (1, 2, 3, 4, 5)
+            estrutura.append(conta_data)
+        else:
+            # Encontrar pai (remover último segmento)
+            partes = codigo.split('.')
+            if len(partes) > 1:
+                codigo_pai = '.'.join(partes[:-1])
+            else:
+                codigo_pai = codigo[:-1] if len(codigo) > 1 else None
+            
+            if codigo_pai and codigo_pai in contas_dict:
+                contas_dict[codigo_pai]["subgrupos"].append(conta_data)
+    
+    _atualizar_saldos_sinteticos(estrutura)
+    return estrutura
+
+
+def _atualizar_saldos_sinteticos(grupos):
+    """Atualiza saldos das contas sintéticas somando seus filhos"""
+    for grupo in grupos:
+        if grupo["subgrupos"]:
+            # Primeiro atualiza os filhos recursivamente
+            _atualizar_saldos_sinteticos(grupo["subgrupos"])
+            # Se não aceita lançamento, é sintética - calcula saldo pela soma dos filhos
+            if not grupo["aceita_lancamento"]:
+                grupo["saldo"] = sum(sub["saldo"] for sub in grupo["subgrupos"])
+
+
+def _total_grupos(grupos) -> float:
+    """Soma os saldos do primeiro nível (as sintéticas já agregaram seus filhos)"""
+    return sum(grupo["saldo"] for grupo in grupos)
+
+
+def calcular_totais_balanco(db: Session, data_fim: date_type, saldos: Optional[Dict[int, float]] = None) -> Dict[str, float]:
+    """
+    Totais do Balanço Patrimonial (ativo, passivo, PL) na data, sem montar a
+    resposta completa. Mesmas regras de gerar_balanco_patrimonial.
+    """
+    indice = obter_indice_plano_contas(db)
+    if saldos is None:
+        saldos = calcular_saldos_contas(db, data_fim=data_fim)
+    total_ativo = _total_grupos(_hierarquia_balanco(indice, saldos, "1"))
+    total_passivo = _total_grupos(_hierarquia_balanco(indice, saldos, "2"))
+    total_pl = _total_grupos(_hierarquia_balanco(indice, saldos, "3"))
+    return {
+        "ativo": total_ativo,
+        "passivo": total_passivo,
+        "patrimonioLiquido": total_pl,
+        "passivoMaisPl": total_passivo + total_pl
+    }
+
+
 def gerar_balanco_patrimonial(db: Session, mes: int, ano: int):
     """
     Gera o Balanço Patrimonial com hierarquia de contas.
@@ -826,9 +1195,6 @@ def gerar_balanco_patrimonial(db: Session, mes: int, ano: int):
     Se o mês NÃO está consolidado, mostra valores de impostos em tempo real
     (provisionados mas não pagos) nas contas 2.1.4 (Simples) e 2.1.5 (INSS).
     """
-    from datetime import date as date_type
-    from database import crud_contabilidade
-    
     # Data limite para cálculo dos saldos (último dia do mês)
     import calendar
     ultimo_dia = calendar.monthrange(ano, mes)[1]
@@ -837,114 +1203,23 @@ def gerar_balanco_patrimonial(db: Session, mes: int, ano: int):
     
     # Cálculo sempre baseado nos lançamentos contábeis registrados
     mes_consolidado = True
-    ajustes_tempo_real = {}
-    alertas = []
     
-    def construir_hierarquia(conta_pai_codigo: str, inverter_sinal: bool = False):
-        """Constrói hierarquia recursiva de contas
-        
-        Args:
-            conta_pai_codigo: Código da conta raiz
-            inverter_sinal: Se True, inverte o sinal dos saldos (usado para Passivo e PL)
-        """
-        contas = db.query(models.PlanoDeContas).filter(
-            models.PlanoDeContas.codigo.like(f"{conta_pai_codigo}%"),
-            models.PlanoDeContas.ativo == True
-        ).order_by(models.PlanoDeContas.codigo).all()
-        
-        # Organizar em estrutura hierárquica
-        estrutura = []
-        contas_dict = {}
-        for c in contas:
-            saldo_base = calcular_saldo_conta(db, c.id, data_fim=data_fim)
-            
-            # Para contas do PL (grupo 3) com natureza DEVEDORA (contas redutoras como 3.4.1),
-            # inverter o sinal para que subtraiam do PL ao invés de somar
-            if conta_pai_codigo == "3" and c.natureza and c.natureza.upper() in ("D", "DEVEDORA"):
-                saldo_final = -saldo_base
-            else:
-                saldo_final = -saldo_base if inverter_sinal else saldo_base
-            
-            contas_dict[c.codigo] = {
-                "id": c.id,
-                "codigo": c.codigo,
-                "nome": c.descricao,
-                "natureza": c.natureza,
-                "nivel": c.nivel,
-                "aceita_lancamento": c.aceita_lancamento,
-                "saldo": saldo_final,
-                "subgrupos": []
-            }
-        
-        # Conectar pais e filhos
-        for codigo, conta_data in contas_dict.items():
-            if len(codigo) == 1:  # Conta raiz (1, 2, 3, 4, 5)
-                estrutura.append(conta_data)
-            else:
-                # Encontrar pai (remover último segmento)
-                partes = codigo.split('.')
-                if len(partes) > 1:
-                    codigo_pai = '.'.join(partes[:-1])
-                else:
-                    codigo_pai = codigo[:-1] if len(codigo) > 1 else None
-                
-                if codigo_pai and codigo_pai in contas_dict:
-                    contas_dict[codigo_pai]["subgrupos"].append(conta_data)
-        
-        return estrutura
-    
-    def atualizar_saldos_sinteticos(grupos):
-        """Atualiza saldos das contas sintéticas somando seus filhos"""
-        for grupo in grupos:
-            if grupo["subgrupos"]:
-                # Primeiro atualiza os filhos recursivamente
-                atualizar_saldos_sinteticos(grupo["subgrupos"])
-                # Se não aceita lançamento, é sintética - calcula saldo pela soma dos filhos
-                if not grupo["aceita_lancamento"]:
-                    grupo["saldo"] = sum(sub["saldo"] for sub in grupo["subgrupos"])
+    # Contas pelo índice em memória; saldos de todas as contas em lote
+    indice = obter_indice_plano_contas(db)
+    saldos = calcular_saldos_contas(db, data_fim=data_fim)
     
     # Gerar estruturas usando sinal natural do razão
     # Ativo: natureza devedora (positivo)
     # Passivo/PL: natureza credora (negativo no razão, mas apresentado como positivo)
-    ativo = construir_hierarquia("1", inverter_sinal=False)
-    passivo = construir_hierarquia("2", inverter_sinal=False)
-    patrimonio_liquido = construir_hierarquia("3", inverter_sinal=False)
-    
-    # Calcular resultado do período (Receitas - Despesas)
-    receitas = construir_hierarquia("4", inverter_sinal=False)
-    despesas = construir_hierarquia("5", inverter_sinal=False)
-    
-    def calcular_saldo_grupo(grupos):
-        """Calcula saldo total de um grupo"""
-        total = 0.0
-        for grupo in grupos:
-            if grupo["aceita_lancamento"]:
-                total += grupo["saldo"]
-            if grupo["subgrupos"]:
-                total += calcular_saldo_grupo(grupo["subgrupos"])
-        return total
-    
     # Resultado do período já está registrado no razão via fechamento_resultado
     # A conta 3.3 (Lucros Acumulados) já contém o saldo correto via lançamentos contábeis
-    # Não é necessário calcular ou adicionar manualmente
-    
-    # Atualizar saldos das contas sintéticas
-    atualizar_saldos_sinteticos(ativo)
-    atualizar_saldos_sinteticos(passivo)
-    atualizar_saldos_sinteticos(patrimonio_liquido)
-    
-    # Calcular totais recursivamente
-    def calcular_total_recursivo(grupos):
-        """Calcula total somando saldos já calculados (sintéticas já agregadas)"""
-        total = 0.0
-        for grupo in grupos:
-            # Apenas somar os saldos do primeiro nível (grupos raiz), pois sintéticas já agregaram seus filhos
-            total += grupo["saldo"]
-        return total
-    
-    total_ativo = calcular_total_recursivo(ativo)
-    total_passivo = calcular_total_recursivo(passivo)
-    total_pl = calcular_total_recursivo(patrimonio_liquido)
+    ativo = _hierarquia_balanco(indice, saldos, "1")
+    passivo = _hierarquia_balanco(indice, saldos, "2")
+    patrimonio_liquido = _hierarquia_balanco(indice, saldos, "3")
+    
+    total_ativo = _total_grupos(ativo)
+    total_passivo = _total_grupos(passivo)
+    total_pl = _total_grupos(patrimonio_liquido)
     
     # O cálculo de saldo já considera a natureza da conta:
     # - Ativo (Devedora): Débitos - Créditos = positivo quando há saldo devedor
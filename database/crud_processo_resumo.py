@@ -0,0 +1,231 @@
+"""
+Resumo de atividade por processo (tabela processo_resumo).
+
+Para cada processo: tarefas abertas, próximo prazo fatal entre elas, data
+do último andamento e total de pagamentos. A listagem e o detalhe de
+processos leem esses agregados em vez de buscar tarefas, andamentos e
+pagamentos inteiros.
+
+A manutenção é feita por eventos: qualquer flush que inclua, altere ou
+exclua tarefas, andamentos ou pagamentos recalcula, na mesma transação,
+apenas os processos afetados (uma instrução INSERT ... SELECT agrupada).
+Atualizações e exclusões em lote via Query reconstroem o resumo inteiro.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, event, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from database import models
+
+# Tarefas nestes status não contam como abertas
+STATUS_TAREFA_FECHADA = ("Concluída", "Cancelada")
+
+# Modelo → colunas cuja alteração muda o resumo do processo
+COLUNAS_VIGIADAS = {
+    models.Tarefa: ("processo_id", "status", "prazo_fatal"),
+    models.Andamento: ("processo_id", "data"),
+    models.Pagamento: ("processo_id", "valor"),
+}
+
+# Limite de ids por instrução (parâmetros do SQLite)
+_LOTE_IDS = 500
+
+_PENDENTES = "processo_resumo_pendentes"
+
+
+# ===== RECÁLCULO =====
+
+def _sql_recalcular(ids: Optional[List[int]] = None):
+    """INSERT ... SELECT dos agregados dos processos informados (todos se ids=None)"""
+    tarefas = models.Tarefa.__table__
+    andamentos = models.Andamento.__table__
+    pagamentos = models.Pagamento.__table__
+    processos = models.Processo.__table__
+
+    aberta = or_(tarefas.c.status.is_(None), tarefas.c.status.notin_(STATUS_TAREFA_FECHADA))
+    por_tarefa = select(
+        tarefas.c.processo_id,
+        func.count().label("total"),
+        func.sum(case((aberta, 1), else_=0)).label("abertas"),
+        func.min(case((aberta, tarefas.c.prazo_fatal))).label("prazo"),
+    ).group_by(tarefas.c.processo_id)
+    por_andamento = select(
+        andamentos.c.processo_id,
+        func.count().label("qtd"),
+        func.max(andamentos.c.data).label("ultimo"),
+    ).group_by(andamentos.c.processo_id)
+    por_pagamento = select(
+        pagamentos.c.processo_id,
+        func.count().label("qtd"),
+        func.sum(pagamentos.c.valor).label("total"),
+    ).group_by(pagamentos.c.processo_id)
+
+    if ids is not None:
+        por_tarefa = por_tarefa.where(tarefas.c.processo_id.in_(ids))
+        por_andamento = por_andamento.where(andamentos.c.processo_id.in_(ids))
+        por_pagamento = por_pagamento.where(pagamentos.c.processo_id.in_(ids))
+
+    t = por_tarefa.subquery()
+    a = por_andamento.subquery()
+    pg = por_pagamento.subquery()
+
+    origem = select(
+        processos.c.id,
+        func.coalesce(t.c.abertas, 0),
+        func.coalesce(t.c.total, 0),
+        t.c.prazo,
+        a.c.ultimo,
+        func.coalesce(a.c.qtd, 0),
+        func.coalesce(pg.c.total, 0.0),
+        func.coalesce(pg.c.qtd, 0),
+        func.current_timestamp(),
+    ).select_from(
+        processos
+        .outerjoin(t, t.c.processo_id == processos.c.id)
+        .outerjoin(a, a.c.processo_id == processos.c.id)
+        .outerjoin(pg, pg.c.processo_id == processos.c.id)
+    )
+    if ids is not None:
+        origem = origem.where(processos.c.id.in_(ids))
+
+    resumo = models.ResumoProcesso.__table__
+    return insert(resumo).from_select([
+        "processo_id", "tarefas_abertas", "total_tarefas", "proximo_prazo_fatal",
+        "ultimo_andamento", "qtd_andamentos", "total_pagamentos", "qtd_pagamentos",
+        "atualizado_em",
+    ], origem)
+
+
+def sql_reconstruir() -> List[str]:
+    """Comandos SQL (SQLite) que recalculam todo o resumo; usados pela migração"""
+    from sqlalchemy.dialects import sqlite
+    dialeto = sqlite.dialect()
+    return [
+        str(delete(models.ResumoProcesso.__table__).compile(dialect=dialeto)),
+        str(_sql_recalcular().compile(dialect=dialeto, compile_kwargs={"literal_binds": True})),
+    ]
+
+
+def recalcular_resumo_processos(conexao, processo_ids: Iterable[int]) -> None:
+    """
+    Recalcula o resumo dos processos informados (sem commit).
+
+    Aceita Session ou Connection; processos excluídos perdem a linha de resumo.
+    """
+    ids = sorted({i for i in processo_ids if i is not None})
+    resumo = models.ResumoProcesso.__table__
+    for inicio in range(0, len(ids), _LOTE_IDS):
+        lote = ids[inicio:inicio + _LOTE_IDS]
+        conexao.execute(delete(resumo).where(resumo.c.processo_id.in_(lote)))
+        conexao.execute(_sql_recalcular(lote))
+
+
+def reconstruir_resumo_processos(db: Session) -> int:
+    """Reconstrói o resumo de todos os processos. Retorna a quantidade de linhas"""
+    db.execute(delete(models.ResumoProcesso.__table__))
+    db.execute(_sql_recalcular())
+    db.commit()
+    return db.query(func.count(models.ResumoProcesso.processo_id)).scalar() or 0
+
+
+# ===== EVENTOS =====
+
+def _pendentes(session: Session) -> set:
+    return session.info.setdefault(_PENDENTES, set())
+
+
+def _marcar_inclusao_exclusao(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _pendentes(session).add(target.processo_id)
+
+
+def _marcar_alteracao(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    estado = inspect(target)
+    historicos = [estado.attrs[c].history for c in COLUNAS_VIGIADAS[mapper.class_]]
+    if not any(h.has_changes() for h in historicos):
+        return
+    # processo_id é a primeira coluna vigiada: o processo anterior também muda
+    _pendentes(session).update(historicos[0].deleted)
+    _pendentes(session).add(target.processo_id)
+
+
+def _marcar_processo_excluido(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _pendentes(session).add(target.id)
+
+
+for _modelo in COLUNAS_VIGIADAS:
+    event.listen(_modelo, "after_insert", _marcar_inclusao_exclusao)
+    event.listen(_modelo, "after_update", _marcar_alteracao)
+    event.listen(_modelo, "after_delete", _marcar_inclusao_exclusao)
+event.listen(models.Processo, "after_delete", _marcar_processo_excluido)
+
+
+@event.listens_for(Session, "after_flush")
+def _recalcular_apos_flush(session, contexto_flush):
+    ids = session.info.pop(_PENDENTES, None)
+    if ids:
+        recalcular_resumo_processos(session.connection(), ids)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _alteracao_em_lote(contexto):
+    # Sem saber quais processos foram afetados, recalcula todos
+    if contexto.mapper.class_ in COLUNAS_VIGIADAS or contexto.mapper.class_ is models.Processo:
+        conexao = contexto.session.connection()
+        conexao.execute(delete(models.ResumoProcesso.__table__))
+        conexao.execute(_sql_recalcular())
+
+
+@event.listens_for(Session, "after_rollback")
+def _transacao_desfeita(session):
+    session.info.pop(_PENDENTES, None)
+
+
+# ===== LEITURA =====
+
+def _como_dict(processo_id: int, resumo: Optional[models.ResumoProcesso]) -> Dict[str, Any]:
+    if resumo is None:
+        return {
+            "processo_id": processo_id,
+            "tarefas_abertas": 0,
+            "total_tarefas": 0,
+            "proximo_prazo_fatal": None,
+            "ultimo_andamento": None,
+            "qtd_andamentos": 0,
+            "total_pagamentos": 0.0,
+            "qtd_pagamentos": 0,
+        }
+    return {
+        "processo_id": resumo.processo_id,
+        "tarefas_abertas": resumo.tarefas_abertas,
+        "total_tarefas": resumo.total_tarefas,
+        "proximo_prazo_fatal": resumo.proximo_prazo_fatal,
+        "ultimo_andamento": resumo.ultimo_andamento,
+        "qtd_andamentos": resumo.qtd_andamentos,
+        "total_pagamentos": resumo.total_pagamentos,
+        "qtd_pagamentos": resumo.qtd_pagamentos,
+    }
+
+
+def listar_resumos_processos(db: Session, processo_ids: List[int]) -> List[Dict[str, Any]]:
+    """Resumo de vários processos numa consulta, na ordem dos ids (zerado se não houver atividade)"""
+    ids = list(dict.fromkeys(processo_ids))
+    resumos: Dict[int, models.ResumoProcesso] = {}
+    for inicio in range(0, len(ids), _LOTE_IDS):
+        lote = ids[inicio:inicio + _LOTE_IDS]
+        for r in db.query(models.ResumoProcesso).filter(models.ResumoProcesso.processo_id.in_(lote)):
+            resumos[r.processo_id] = r
+    return [_como_dict(i, resumos.get(i)) for i in ids]
+
+
+def obter_resumo_processo(db: Session, processo_id: int) -> Dict[str, Any]:
+    """Resumo de atividade de um processo"""
+    return listar_resumos_processos(db, [processo_id])[0]
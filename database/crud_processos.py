@@ -1,5 +1,23 @@
+from typing import Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 from . import models, crud_clientes
+from utils.paginacao import paginar, coluna_ordenacao
+
+# Chaves de ordenação aceitas na listagem (todas com índice (coluna, id))
+ORDENACOES_PROCESSO = {
+    "id": models.Processo.id,
+    "numero": models.Processo.numero,
+    "data_abertura": models.Processo.data_abertura,
+}
+
+# Filtros de igualdade aceitos na listagem
+FILTROS_PROCESSO = ("status", "fase", "classe", "esfera_justica", "municipio_id", "cliente_id")
+
+# Filtros com poucos valores distintos: ordenando por outra coluna que não o
+# id, é mais rápido percorrer o índice da ordenação e descartar as linhas do
+# que ler o índice do filtro e ordenar milhares de linhas em memória
+FILTROS_POUCO_SELETIVOS = ("status", "fase", "classe", "esfera_justica")
 
 def buscar_processo(db: Session, processo_id: int):
     """Busca um processo pelo ID."""
@@ -13,6 +31,76 @@ def listar_processos(db: Session):
     # A relação com o cliente é carregada automaticamente pelo SQLAlchemy/Pydantic.
     return db.query(models.Processo).all()
 
+def listar_processos_paginado(
+    db: Session,
+    filtros: Optional[dict] = None,
+    uf: Optional[str] = None,
+    ordenar: str = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    resumo: bool = False,
+):
+    """
+    Lista processos com filtros, ordenação e paginação por cursor.
+
+    Retorna (itens, próximo cursor). Com resumo=True os itens são linhas com
+    apenas os campos da listagem (nome do cliente e município e agregados de
+    processo_resumo inclusos), sem carregar os objetos relacionados.
+    """
+    coluna, descendente = coluna_ordenacao(ordenar, ORDENACOES_PROCESSO)
+
+    if resumo:
+        query = db.query(
+            models.Processo.id,
+            models.Processo.numero,
+            models.Processo.autor,
+            models.Processo.reu,
+            models.Processo.status,
+            models.Processo.fase,
+            models.Processo.classe,
+            models.Processo.esfera_justica,
+            models.Processo.data_abertura,
+            models.Processo.cliente_id,
+            models.Cliente.nome.label("cliente_nome"),
+            models.Processo.municipio_id,
+            models.Municipio.nome.label("municipio_nome"),
+            models.Municipio.uf.label("uf"),
+            func.coalesce(models.ResumoProcesso.tarefas_abertas, 0).label("tarefas_abertas"),
+            models.ResumoProcesso.proximo_prazo_fatal,
+            models.ResumoProcesso.ultimo_andamento,
+            func.coalesce(models.ResumoProcesso.total_pagamentos, 0.0).label("total_pagamentos"),
+        ).outerjoin(
+            models.Cliente, models.Cliente.id == models.Processo.cliente_id
+        ).outerjoin(
+            models.Municipio, models.Municipio.id == models.Processo.municipio_id
+        ).outerjoin(
+            models.ResumoProcesso, models.ResumoProcesso.processo_id == models.Processo.id
+        )
+    else:
+        query = db.query(models.Processo).options(
+            joinedload(models.Processo.cliente),
+            joinedload(models.Processo.municipio)
+        )
+
+    percorrer_ordenacao = coluna is not models.Processo.id
+    for campo, valor in (filtros or {}).items():
+        if campo in FILTROS_PROCESSO and valor is not None:
+            filtro = getattr(models.Processo, campo)
+            if percorrer_ordenacao and campo in FILTROS_POUCO_SELETIVOS:
+                # "coluna || ''" impede o SQLite de usar o índice do filtro
+                filtro = filtro.op("||")("")
+            query = query.filter(filtro == valor)
+    if uf:
+        municipio = models.Processo.municipio_id
+        if percorrer_ordenacao:
+            municipio = municipio + 0
+        query = query.filter(municipio.in_(
+            db.query(models.Municipio.id).filter(models.Municipio.uf == uf.upper())
+        ))
+
+    return paginar(query, coluna, models.Processo.id, cursor, limit, descendente)
+
+
 def criar_processo(db: Session, **kwargs):
     """Cria um novo processo."""
     db_processo = models.Processo(**kwargs)
@@ -2,36 +2,42 @@ from datetime import date, timedelta
 from sqlalchemy import func, and_
 from sqlalchemy.orm import Session
 from . import models
+from .crud_plano_contas import obter_indice_plano_contas
+from utils.dinheiro import para_reais
 
 # Helpers to sum by account code prefix
 
+def _ids_prefix(db: Session, prefix: str) -> list:
+    return [c.id for c in obter_indice_plano_contas(db).com_prefixo(prefix)]
+
+
 def _sum_credito_prefix(db: Session, prefix: str, d_ini: date, d_fim: date) -> float:
-    return (
-        db.query(func.coalesce(func.sum(models.LancamentoContabil.valor), 0.0))
+    return para_reais(
+        db.query(func.coalesce(func.sum(models.LancamentoContabil.valor_centavos), 0))
         .filter(
             and_(
                 models.LancamentoContabil.data >= d_ini,
                 models.LancamentoContabil.data <= d_fim,
-                models.LancamentoContabil.conta_credito.has(models.PlanoDeContas.codigo.like(f"{prefix}%")),
+                models.LancamentoContabil.conta_credito_id.in_(_ids_prefix(db, prefix)),
             )
         )
         .scalar()
-        or 0.0
+        or 0
     )
 
 
 def _sum_debito_prefix(db: Session, prefix: str, d_ini: date, d_fim: date) -> float:
-    return (
-        db.query(func.coalesce(func.sum(models.LancamentoContabil.valor), 0.0))
+    return para_reais(
+        db.query(func.coalesce(func.sum(models.LancamentoContabil.valor_centavos), 0))
         .filter(
             and_(
                 models.LancamentoContabil.data >= d_ini,
                 models.LancamentoContabil.data <= d_fim,
-                models.LancamentoContabil.conta_debito.has(models.PlanoDeContas.codigo.like(f"{prefix}%")),
+                models.LancamentoContabil.conta_debito_id.in_(_ids_prefix(db, prefix)),
             )
         )
         .scalar()
-        or 0.0
+        or 0
     )
 
 
@@ -0,0 +1,148 @@
+"""
+Resumo mensal de entradas e despesas (tabelas resumo_mensal e resumo_mensal_socio).
+
+O resumo é mantido de forma incremental pelas funções de CRUD de entradas e
+despesas: a cada inclusão, alteração ou exclusão apenas o(s) mês(es)
+afetado(s) são recalculados. Previsão da operação, lucros e DRE leem o
+resumo em vez de somar as linhas brutas a cada requisição. A leitura das
+contribuições por sócio fica em crud_contribuicoes.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import models
+from utils.datas import formato_mes, inicio_do_mes, fim_do_mes, ultimos_12_meses
+from utils.dinheiro import para_reais
+from database.crud_contribuicoes import agregar_contribuicoes
+
+
+def mes_da_data(data: date) -> str:
+    """Retorna o mês (YYYY-MM) ao qual uma data pertence"""
+    return formato_mes(data)
+
+
+def recalcular_resumo_mes(db: Session, mes: str) -> models.ResumoMensal:
+    """
+    Recalcula o resumo de um mês a partir de entradas e despesas.
+
+    Não faz commit: deve ser chamada dentro da transação que alterou os dados.
+    """
+    db.flush()
+    inicio = inicio_do_mes(mes)
+    fim = fim_do_mes(mes)
+
+    receita, qtd_entradas = db.query(
+        func.coalesce(func.sum(models.Entrada.valor_centavos), 0),
+        func.count(models.Entrada.id)
+    ).filter(
+        models.Entrada.data >= inicio,
+        models.Entrada.data <= fim
+    ).one()
+
+    despesas, qtd_despesas = db.query(
+        func.coalesce(func.sum(models.Despesa.valor_centavos), 0),
+        func.count(models.Despesa.id)
+    ).filter(
+        models.Despesa.data >= inicio,
+        models.Despesa.data <= fim
+    ).one()
+
+    contribuicoes = agregar_contribuicoes(db, inicio, fim)
+
+    resumo = db.query(models.ResumoMensal).filter(models.ResumoMensal.mes == mes).first()
+    if not resumo:
+        resumo = models.ResumoMensal(mes=mes)
+        db.add(resumo)
+    resumo.receita_centavos = int(receita or 0)
+    resumo.despesas_centavos = int(despesas or 0)
+    resumo.qtd_entradas = int(qtd_entradas or 0)
+    resumo.qtd_despesas = int(qtd_despesas or 0)
+
+    db.query(models.ResumoMensalSocio).filter(
+        models.ResumoMensalSocio.mes == mes
+    ).delete(synchronize_session=False)
+    for (_, socio_id), centavos in contribuicoes.items():
+        db.add(models.ResumoMensalSocio(
+            mes=mes,
+            socio_id=socio_id,
+            contribuicao_centavos=centavos
+        ))
+
+    db.flush()
+    return resumo
+
+
+def atualizar_resumo_datas(db: Session, datas: Iterable[Optional[date]]) -> None:
+    """Recalcula o resumo de cada mês distinto das datas informadas (sem commit)"""
+    for mes in sorted({mes_da_data(d) for d in datas if d}):
+        recalcular_resumo_mes(db, mes)
+
+
+def reconstruir_resumo_mensal(db: Session) -> int:
+    """Reconstrói todo o resumo a partir das entradas e despesas. Retorna a quantidade de meses"""
+    db.query(models.ResumoMensalSocio).delete(synchronize_session=False)
+    db.query(models.ResumoMensal).delete(synchronize_session=False)
+
+    datas = [d for (d,) in db.query(models.Entrada.data).distinct()]
+    datas += [d for (d,) in db.query(models.Despesa.data).distinct()]
+    meses = sorted({mes_da_data(d) for d in datas if d})
+    for mes in meses:
+        recalcular_resumo_mes(db, mes)
+
+    db.commit()
+    return len(meses)
+
+
+# ==================== LEITURA ====================
+
+def obter_resumo_mes(db: Session, mes: str) -> Optional[models.ResumoMensal]:
+    """Busca o resumo de um mês (None se não houve movimentação)"""
+    return db.query(models.ResumoMensal).filter(models.ResumoMensal.mes == mes).first()
+
+
+def listar_resumo_meses(db: Session, meses: List[str]) -> Dict[str, models.ResumoMensal]:
+    """Busca o resumo de vários meses em uma consulta, indexado por mês"""
+    if not meses:
+        return {}
+    resumos = db.query(models.ResumoMensal).filter(models.ResumoMensal.mes.in_(meses)).all()
+    return {r.mes: r for r in resumos}
+
+
+def receita_mes(db: Session, mes: str) -> float:
+    """Receita bruta (soma das entradas) do mês"""
+    resumo = obter_resumo_mes(db, mes)
+    return para_reais(resumo.receita_centavos) if resumo else 0.0
+
+
+def despesas_mes(db: Session, mes: str) -> float:
+    """Soma das despesas do mês"""
+    resumo = obter_resumo_mes(db, mes)
+    return para_reais(resumo.despesas_centavos) if resumo else 0.0
+
+
+def receita_12_meses(db: Session, mes: str) -> float:
+    """Receita acumulada dos últimos 12 meses (incluindo o mês de referência)"""
+    total = db.query(func.sum(models.ResumoMensal.receita_centavos)).filter(
+        models.ResumoMensal.mes.in_(ultimos_12_meses(mes))
+    ).scalar()
+    return para_reais(total)
+
+
+def receitas_12_meses(db: Session, meses: List[str]) -> Dict[str, float]:
+    """Receita acumulada de 12 meses para cada mês da lista, lendo o resumo numa única consulta"""
+    if not meses:
+        return {}
+    janelas = {mes: ultimos_12_meses(mes) for mes in meses}
+    primeiro = min(j[0] for j in janelas.values())
+    ultimo = max(meses)
+    receitas = dict(db.query(models.ResumoMensal.mes, models.ResumoMensal.receita_centavos).filter(
+        models.ResumoMensal.mes >= primeiro,
+        models.ResumoMensal.mes <= ultimo
+    ).all())
+    return {
+        mes: para_reais(sum(receitas.get(m) or 0 for m in janela))
+        for mes, janela in janelas.items()
+    }
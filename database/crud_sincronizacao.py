@@ -0,0 +1,156 @@
+"""
+Sincronização incremental (delta) por marca d'água de atualizado_em.
+
+O cliente guarda o "proximo_since" da última sincronização e pede apenas o
+que mudou depois dele: linhas incluídas/alteradas (ordenadas por
+atualizado_em, id, paginadas por cursor sobre os índices
+(atualizado_em, id)) e os ids excluídos, lidos do registro de exclusões
+(tombstones) mantido por eventos na mesma transação da exclusão.
+
+Exclusões em lote via Query gravam um tombstone sem id: o cliente deve
+recarregar o recurso inteiro ("recarregar": true). O mesmo vale para um
+since anterior à retenção dos tombstones.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+
+from database import models
+from utils.paginacao import paginar
+
+# Recurso da URL → modelo sincronizável (todos com atualizado_em)
+RECURSOS = {
+    "processos": models.Processo,
+    "clientes": models.Cliente,
+    "tarefas": models.Tarefa,
+    "entradas": models.Entrada,
+    "despesas": models.Despesa,
+    "lancamentos": models.LancamentoContabil,
+    "aportes": models.AporteCapital,
+    "pagamentos_pendentes": models.PagamentoPendente,
+    "ativos_imobilizados": models.AtivoImobilizado,
+    "operacoes": models.Operacao,
+}
+_TABELAS_SINCRONIZADAS = {m.__tablename__ for m in RECURSOS.values()}
+
+# Recuo do próximo since: cobre transações que gravaram atualizado_em antes
+# do início da consulta, mas só fizeram commit depois dela
+MARGEM_SEGUNDOS = 5
+# Tombstones mais antigos que isto são apagados pela migração
+RETENCAO_EXCLUSOES_DIAS = 90
+
+
+# ===== REGISTRO DE EXCLUSÕES =====
+
+def _registrar_exclusao(mapper, connection, target):
+    connection.execute(insert(models.RegistroExclusao.__table__).values(
+        tabela=mapper.class_.__tablename__,
+        registro_id=target.id,
+        excluido_em=datetime.utcnow(),
+    ))
+
+
+for _modelo in RECURSOS.values():
+    event.listen(_modelo, "after_delete", _registrar_exclusao)
+
+
+@event.listens_for(Session, "after_bulk_delete")
+def _exclusao_em_lote(contexto):
+    tabela = contexto.mapper.class_.__tablename__
+    if tabela in _TABELAS_SINCRONIZADAS:
+        # Ids desconhecidos: tombstone sem id força o cliente a recarregar
+        contexto.session.connection().execute(insert(models.RegistroExclusao.__table__).values(
+            tabela=tabela, registro_id=None, excluido_em=datetime.utcnow(),
+        ))
+
+
+def _tocar_pai(tabela_pai, coluna_fk: str):
+    """Rateio de sócios alterado: a entrada/despesa conta como alterada"""
+    def ouvinte(mapper, connection, target):
+        pai_id = getattr(target, coluna_fk)
+        if pai_id is not None:
+            connection.execute(
+                update(tabela_pai).where(tabela_pai.c.id == pai_id).values(atualizado_em=datetime.utcnow())
+            )
+    return ouvinte
+
+
+for _filho, _pai, _fk in (
+    (models.EntradaSocio, models.Entrada.__table__, "entrada_id"),
+    (models.DespesaSocio, models.Despesa.__table__, "despesa_id"),
+):
+    for _evento in ("after_insert", "after_update", "after_delete"):
+        event.listen(_filho, _evento, _tocar_pai(_pai, _fk))
+
+
+# ===== CONSULTA =====
+
+def _normalizar_since(since: Optional[datetime]) -> Optional[datetime]:
+    # atualizado_em é gravado em UTC sem fuso
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def _como_dict(obj) -> Dict[str, Any]:
+    return {c.key: getattr(obj, c.key) for c in obj.__mapper__.column_attrs}
+
+
+def listar_alteracoes(
+    db: Session,
+    recurso: str,
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = 500,
+) -> Dict[str, Any]:
+    """
+    Linhas do recurso alteradas a partir de since, ids excluídos e marcas
+    para a próxima chamada. Sem since, devolve todas as linhas (carga inicial).
+
+    As exclusões vêm apenas na primeira página (sem cursor); as páginas
+    seguintes repetem o mesmo since. O cliente guarda "proximo_since" da
+    primeira página e o usa depois de consumir todas.
+    """
+    modelo = RECURSOS.get(recurso)
+    if modelo is None:
+        raise ValueError(f"Recurso inválido. Use: {', '.join(RECURSOS)}")
+
+    agora = datetime.utcnow()
+    since = _normalizar_since(since)
+
+    query = db.query(modelo)
+    if since is not None:
+        query = query.filter(modelo.atualizado_em >= since)
+    linhas, proximo_cursor = paginar(query, modelo.atualizado_em, modelo.id, cursor, limit)
+
+    excluidos = []
+    recarregar = False
+    if since is not None and not cursor:
+        if since < agora - timedelta(days=RETENCAO_EXCLUSOES_DIAS):
+            recarregar = True
+        registros = (
+            db.query(models.RegistroExclusao.registro_id)
+            .filter(
+                models.RegistroExclusao.tabela == modelo.__tablename__,
+                models.RegistroExclusao.excluido_em >= since,
+            )
+            .order_by(models.RegistroExclusao.excluido_em, models.RegistroExclusao.id)
+        )
+        for (registro_id,) in registros:
+            if registro_id is None:
+                recarregar = True
+            else:
+                excluidos.append(registro_id)
+        excluidos = list(dict.fromkeys(excluidos))
+
+    return {
+        "recurso": recurso,
+        "alterados": [_como_dict(linha) for linha in linhas],
+        "excluidos": excluidos,
+        "recarregar": recarregar,
+        "proximo_cursor": proximo_cursor,
+        "proximo_since": agora - timedelta(seconds=MARGEM_SEGUNDOS),
+        "servidor_em": agora,
+    }
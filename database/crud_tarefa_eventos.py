@@ -0,0 +1,175 @@
+"""
+Eventos de workflow das tarefas (tabela tarefa_evento, somente inclusão).
+
+Cada avanço de etapa ou classificação de intimação grava uma linha, em vez
+de reescrever o antigo JSON workflow_historico da tarefa. Os índices
+(tarefa_id, timestamp), (usuario_id, timestamp) e (etapa_nova, timestamp)
+atendem às consultas por tarefa, por usuário e às métricas por etapa, que
+são calculadas em SQL (agregação e funções de janela).
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import models
+
+# Agrupamento → formato strftime do período
+PERIODOS = {
+    "dia": "%Y-%m-%d",
+    "semana": "%Y-W%W",
+    "mes": "%Y-%m",
+}
+
+
+def registrar_evento_tarefa(
+    db: Session,
+    tarefa: models.Tarefa,
+    etapa_nova: str,
+    usuario_id: Optional[int],
+    usuario_nome: Optional[str],
+    acao: Optional[str],
+    etapa_anterior: Optional[str] = None,
+    tipo: str = "workflow",
+) -> models.TarefaEvento:
+    """Registra uma transição da tarefa (sem commit)"""
+    evento = models.TarefaEvento(
+        tipo=tipo,
+        etapa_anterior=etapa_anterior,
+        etapa_nova=etapa_nova,
+        usuario_id=usuario_id,
+        usuario_nome=usuario_nome,
+        acao=acao,
+        timestamp=datetime.utcnow(),
+    )
+    tarefa.eventos.append(evento)
+    return evento
+
+
+def _filtrar_periodo(query, inicio: Optional[date], fim: Optional[date]):
+    # fim inclusivo: até o fim do dia
+    if inicio:
+        query = query.filter(models.TarefaEvento.timestamp >= datetime.combine(inicio, time.min))
+    if fim:
+        query = query.filter(models.TarefaEvento.timestamp < datetime.combine(fim + timedelta(days=1), time.min))
+    return query
+
+
+def listar_eventos_tarefa(db: Session, tarefa_id: int) -> List[models.TarefaEvento]:
+    return (
+        db.query(models.TarefaEvento)
+        .filter(models.TarefaEvento.tarefa_id == tarefa_id)
+        .order_by(models.TarefaEvento.timestamp, models.TarefaEvento.id)
+        .all()
+    )
+
+
+def listar_eventos(
+    db: Session,
+    usuario_id: Optional[int] = None,
+    etapa: Optional[str] = None,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[models.TarefaEvento]:
+    """Transições filtradas por usuário, etapa de destino e período, das mais recentes"""
+    query = db.query(models.TarefaEvento)
+    if usuario_id is not None:
+        query = query.filter(models.TarefaEvento.usuario_id == usuario_id)
+    if etapa:
+        query = query.filter(models.TarefaEvento.etapa_nova == etapa)
+    query = _filtrar_periodo(query, inicio, fim)
+    return (
+        query.order_by(models.TarefaEvento.timestamp.desc(), models.TarefaEvento.id.desc())
+        .offset(skip).limit(limit).all()
+    )
+
+
+def vazao_por_etapa(
+    db: Session,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    agrupar: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Vazão: transições que chegaram a cada etapa (e tarefas distintas) no
+    período, opcionalmente por dia, semana ou mês.
+    """
+    if agrupar is not None and agrupar not in PERIODOS:
+        raise ValueError(f"Agrupamento inválido. Use: {', '.join(PERIODOS)}")
+
+    ev = models.TarefaEvento
+    colunas = [
+        ev.etapa_nova.label("etapa"),
+        func.count(ev.id).label("transicoes"),
+        func.count(func.distinct(ev.tarefa_id)).label("tarefas"),
+    ]
+    grupos = [ev.etapa_nova]
+    if agrupar:
+        periodo = func.strftime(PERIODOS[agrupar], ev.timestamp)
+        colunas.insert(0, periodo.label("periodo"))
+        grupos.insert(0, periodo)
+
+    query = _filtrar_periodo(db.query(*colunas), inicio, fim).group_by(*grupos).order_by(*grupos)
+    return [
+        {
+            "periodo": getattr(linha, "periodo", None),
+            "etapa": linha.etapa,
+            "transicoes": linha.transicoes,
+            "tarefas": linha.tarefas,
+        }
+        for linha in query
+    ]
+
+
+def tempo_ciclo_por_etapa(
+    db: Session,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Tempo de permanência em cada etapa (horas), da entrada na etapa até a
+    transição seguinte da mesma tarefa. Entradas no período sem transição
+    seguinte contam como em andamento.
+    """
+    ev = models.TarefaEvento
+    # Filtro de período aplicado depois da janela: a saída pode estar fora dele
+    janela = db.query(
+        ev.etapa_nova.label("etapa"),
+        ev.timestamp.label("entrada"),
+        func.lead(ev.timestamp).over(
+            partition_by=ev.tarefa_id, order_by=(ev.timestamp, ev.id)
+        ).label("saida"),
+    ).subquery()
+
+    horas = (func.julianday(janela.c.saida) - func.julianday(janela.c.entrada)) * 24
+    query = db.query(
+        janela.c.etapa,
+        func.count(janela.c.saida).label("concluidas"),
+        (func.count() - func.count(janela.c.saida)).label("em_andamento"),
+        func.avg(horas).label("media"),
+        func.min(horas).label("minimo"),
+        func.max(horas).label("maximo"),
+    )
+    if inicio:
+        query = query.filter(janela.c.entrada >= datetime.combine(inicio, time.min))
+    if fim:
+        query = query.filter(janela.c.entrada < datetime.combine(fim + timedelta(days=1), time.min))
+    query = query.group_by(janela.c.etapa).order_by(janela.c.etapa)
+
+    def _arredondar(valor):
+        return round(valor, 2) if valor is not None else None
+
+    return [
+        {
+            "etapa": linha.etapa,
+            "concluidas": linha.concluidas,
+            "em_andamento": linha.em_andamento,
+            "tempo_medio_horas": _arredondar(linha.media),
+            "tempo_minimo_horas": _arredondar(linha.minimo),
+            "tempo_maximo_horas": _arredondar(linha.maximo),
+        }
+        for linha in query
+    ]
@@ -1,4 +1,6 @@
-from database.models import Tarefa, Processo, Cliente, Municipio
+from database.models import Tarefa, TipoTarefa, Processo, Cliente, Municipio, Usuario
+from database.crud_tarefa_eventos import registrar_evento_tarefa
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, date
 from typing import List, Optional, Dict
@@ -104,17 +106,10 @@ def avancar_workflow_tarefa(
     etapa_anterior = tarefa.etapa_workflow_atual
     tarefa.etapa_workflow_atual = nova_etapa
     
-    # Adiciona entrada no histórico
-    historico = tarefa.workflow_historico or []
-    historico.append({
-        "etapa_anterior": etapa_anterior,
-        "etapa_nova": nova_etapa,
-        "usuario_id": usuario_id,
-        "usuario_nome": usuario_nome,
-        "timestamp": datetime.utcnow().isoformat(),
-        "acao": acao
-    })
-    tarefa.workflow_historico = historico
+    # Registra a transição em tarefa_evento
+    registrar_evento_tarefa(
+        db, tarefa, nova_etapa, usuario_id, usuario_nome, acao, etapa_anterior=etapa_anterior
+    )
     
     tarefa.atualizado_em = datetime.utcnow()
     db.commit()
@@ -224,8 +219,8 @@ def listar_tarefas_derivadas(tarefa_id: int, db: Session, recursivo: bool = Fals
     return derivadas
 
 
-def listar_tarefas_com_filtros(
-    db: Session,
+def _aplicar_filtros_tarefa(
+    query,
     tipo_tarefa_id: Optional[int] = None,
     processo_id: Optional[int] = None,
     cliente_id: Optional[int] = None,
@@ -238,40 +233,8 @@ def listar_tarefas_com_filtros(
     prazo_vencido: bool = False,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None
-) -> List[Tarefa]:
-    """
-    Lista tarefas com filtros avançados incluindo dados de processo/cliente.
-    
-    Args:
-        db: Sessão do banco de dados
-        tipo_tarefa_id: Filtro por tipo de tarefa
-        processo_id: Filtro por processo específico
-        cliente_id: Filtro por cliente
-        classe: Filtro por classe processual
-        esfera_justica: Filtro por esfera de justiça
-        municipio_id: Filtro por município
-        uf: Filtro por UF
-        responsavel_id: Filtro por responsável
-        status: Filtro por status
-        prazo_vencido: Se True, apenas tarefas com prazo fatal vencido
-        data_inicio: Data inicial de criação
-        data_fim: Data final de criação
-    
-    Returns:
-        Lista de tarefas filtradas
-    """
-    query = db.query(Tarefa).join(
-        Processo, Tarefa.processo_id == Processo.id, isouter=True
-    ).join(
-        Cliente, Processo.cliente_id == Cliente.id, isouter=True
-    ).join(
-        Municipio, Processo.municipio_id == Municipio.id, isouter=True
-    ).options(
-        joinedload(Tarefa.processo),
-        joinedload(Tarefa.tipo_tarefa),
-        joinedload(Tarefa.responsavel)
-    )
-    
+):
+    """Filtros de listar_tarefas_com_filtros; a query deve ter Processo e Municipio em join."""
     # Aplicar filtros
     if tipo_tarefa_id:
         query = query.filter(Tarefa.tipo_tarefa_id == tipo_tarefa_id)
@@ -310,10 +273,106 @@ def listar_tarefas_com_filtros(
     if data_fim:
         query = query.filter(Tarefa.criado_em <= data_fim)
     
+    return query
+
+
+def listar_tarefas_com_filtros(
+    db: Session,
+    tipo_tarefa_id: Optional[int] = None,
+    processo_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    classe: Optional[str] = None,
+    esfera_justica: Optional[str] = None,
+    municipio_id: Optional[int] = None,
+    uf: Optional[str] = None,
+    responsavel_id: Optional[int] = None,
+    status: Optional[str] = None,
+    prazo_vencido: bool = False,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None
+) -> List[Tarefa]:
+    """
+    Lista tarefas com filtros avançados incluindo dados de processo/cliente.
+    
+    Args:
+        db: Sessão do banco de dados
+        tipo_tarefa_id: Filtro por tipo de tarefa
+        processo_id: Filtro por processo específico
+        cliente_id: Filtro por cliente
+        classe: Filtro por classe processual
+        esfera_justica: Filtro por esfera de justiça
+        municipio_id: Filtro por município
+        uf: Filtro por UF
+        responsavel_id: Filtro por responsável
+        status: Filtro por status
+        prazo_vencido: Se True, apenas tarefas com prazo fatal vencido
+        data_inicio: Data inicial de criação
+        data_fim: Data final de criação
+    
+    Returns:
+        Lista de tarefas filtradas
+    """
+    query = db.query(Tarefa).join(
+        Processo, Tarefa.processo_id == Processo.id, isouter=True
+    ).join(
+        Cliente, Processo.cliente_id == Cliente.id, isouter=True
+    ).join(
+        Municipio, Processo.municipio_id == Municipio.id, isouter=True
+    ).options(
+        joinedload(Tarefa.processo),
+        joinedload(Tarefa.tipo_tarefa),
+        joinedload(Tarefa.responsavel)
+    )
+    query = _aplicar_filtros_tarefa(
+        query, tipo_tarefa_id, processo_id, cliente_id, classe, esfera_justica,
+        municipio_id, uf, responsavel_id, status, prazo_vencido, data_inicio, data_fim
+    )
+    
     # Ordena por prazo fatal (mais urgentes primeiro)
     return query.order_by(Tarefa.prazo_fatal.asc()).all()
 
 
+# Linhas buscadas por vez na exportação
+LOTE_EXPORTACAO = 1000
+
+
+def consultar_tarefas_exportacao(db: Session, **filtros):
+    """
+    Projeção das colunas exportadas (mesmos filtros de listar_tarefas_com_filtros)
+    numa única consulta com joins, lida em lotes de LOTE_EXPORTACAO linhas.
+
+    Retorna um iterável de linhas com: id, tipo, processo, cliente,
+    responsavel, prazo_administrativo, prazo_fatal, status, etapa_workflow,
+    municipio, uf, criado_em.
+    """
+    query = db.query(
+        Tarefa.id,
+        TipoTarefa.nome.label("tipo"),
+        Processo.numero.label("processo"),
+        Cliente.nome.label("cliente"),
+        Usuario.nome.label("responsavel"),
+        Tarefa.prazo_administrativo,
+        Tarefa.prazo_fatal,
+        Tarefa.status,
+        Tarefa.etapa_workflow_atual.label("etapa_workflow"),
+        Municipio.nome.label("municipio"),
+        Municipio.uf,
+        Tarefa.criado_em,
+    ).select_from(Tarefa).join(
+        TipoTarefa, Tarefa.tipo_tarefa_id == TipoTarefa.id, isouter=True
+    ).join(
+        Usuario, Tarefa.responsavel_id == Usuario.id, isouter=True
+    ).join(
+        Processo, Tarefa.processo_id == Processo.id, isouter=True
+    ).join(
+        Cliente, Processo.cliente_id == Cliente.id, isouter=True
+    ).join(
+        Municipio, Processo.municipio_id == Municipio.id, isouter=True
+    )
+    query = _aplicar_filtros_tarefa(query, **filtros)
+    return query.order_by(Tarefa.prazo_fatal.asc(), Tarefa.id.asc()).yield_per(LOTE_EXPORTACAO)
+
+
 def obter_estatisticas_tarefas(db: Session) -> dict:
     """
     Retorna estatísticas gerais sobre tarefas.
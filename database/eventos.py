@@ -0,0 +1,188 @@
+"""
+Publicação de eventos de alteração (pub/sub em processo) para o endpoint SSE.
+
+Inclusões, alterações e exclusões de tarefas, plano de contas, lançamentos
+e operações contábeis (executar_operacao, cancelamentos) são capturadas por
+eventos do SQLAlchemy e publicadas somente após o commit, agrupadas por
+tópico e ação: um evento leve com os ids afetados, para que o cliente
+busque apenas as linhas alteradas. Transações desfeitas não publicam nada.
+
+Cada assinante tem uma fila limitada no seu event loop; se o cliente não
+acompanhar, a fila é descartada e ele recebe um evento "reset" (recarregar
+tudo). Os últimos eventos ficam num histórico para retomada da conexão
+pelo header Last-Event-ID.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import models
+
+# Modelo → tópico publicado
+TOPICOS_MODELOS = {
+    models.Tarefa: "tarefas",
+    models.PlanoDeContas: "plano_contas",
+    models.LancamentoContabil: "lancamentos",
+    models.OperacaoContabil: "operacoes",
+}
+TOPICOS = sorted(set(TOPICOS_MODELOS.values()))
+
+TAMANHO_FILA = 256  # eventos pendentes por assinante antes do reset
+TAMANHO_HISTORICO = 1000  # eventos guardados para Last-Event-ID
+INTERVALO_HEARTBEAT = 15.0  # segundos
+
+_PENDENTES = "eventos_pendentes"
+
+_lock = threading.Lock()
+_sequencia = itertools.count(1)
+_historico: deque = deque(maxlen=TAMANHO_HISTORICO)
+_assinantes: set = set()
+
+
+class Assinante:
+    """Fila de eventos de um cliente SSE, consumida no event loop que o criou"""
+
+    def __init__(self, topicos: Optional[Iterable[str]], loop: asyncio.AbstractEventLoop):
+        self.topicos = set(topicos) if topicos else None
+        self.loop = loop
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=TAMANHO_FILA)
+
+    def interessa(self, evento: dict) -> bool:
+        return self.topicos is None or evento["topico"] in self.topicos or evento["topico"] == "*"
+
+    def _entregar(self, evento: dict) -> None:
+        # Executado no loop do assinante
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait(_evento_reset(evento["id"]))
+
+
+def _evento_reset(evento_id: int) -> dict:
+    return {"id": evento_id, "topico": "*", "acao": "reset", "ids": [], "em": datetime.utcnow().isoformat()}
+
+
+def publicar(topico: str, acao: str, ids: Iterable[int] = ()) -> dict:
+    """Publica um evento para os assinantes do tópico. Pode ser chamada de qualquer thread"""
+    with _lock:
+        evento = {
+            "id": next(_sequencia),
+            "topico": topico,
+            "acao": acao,
+            "ids": list(ids),
+            "em": datetime.utcnow().isoformat(),
+        }
+        _historico.append(evento)
+        destinatarios = [a for a in _assinantes if a.interessa(evento)]
+    for assinante in destinatarios:
+        try:
+            assinante.loop.call_soon_threadsafe(assinante._entregar, evento)
+        except RuntimeError:
+            # Loop encerrado sem cancelar a assinatura
+            cancelar(assinante)
+    return evento
+
+
+def assinar(topicos: Optional[List[str]] = None, ultimo_id: Optional[int] = None) -> Assinante:
+    """
+    Cria um assinante no event loop atual. Com ultimo_id, os eventos
+    posteriores do histórico são reenviados (ou um reset, se já saíram dele).
+    """
+    topicos = [t for t in (topicos or []) if t]
+    invalidos = set(topicos) - set(TOPICOS)
+    if invalidos:
+        raise ValueError(f"Tópicos inválidos: {', '.join(sorted(invalidos))}. Use: {', '.join(TOPICOS)}")
+
+    assinante = Assinante(topicos, asyncio.get_running_loop())
+    with _lock:
+        if ultimo_id is not None:
+            primeiro = _historico[0]["id"] if _historico else 1
+            ultimo = _historico[-1]["id"] if _historico else 0
+            if ultimo_id > ultimo or ultimo_id + 1 < primeiro:
+                # Eventos fora do histórico (ou servidor reiniciado): recarregar tudo
+                assinante._entregar(_evento_reset(ultimo))
+            else:
+                for evento in _historico:
+                    if evento["id"] > ultimo_id and assinante.interessa(evento):
+                        assinante._entregar(evento)
+        _assinantes.add(assinante)
+    return assinante
+
+
+def cancelar(assinante: Assinante) -> None:
+    with _lock:
+        _assinantes.discard(assinante)
+
+
+def formatar_sse(evento: dict) -> str:
+    return f"id: {evento['id']}\ndata: {json.dumps(evento, separators=(',', ':'))}\n\n"
+
+
+async def fluxo_sse(assinante: Assinante, intervalo_heartbeat: float = INTERVALO_HEARTBEAT) -> AsyncIterator[str]:
+    """Gera o corpo text/event-stream até o cliente desconectar"""
+    try:
+        # Intervalo de reconexão sugerido ao EventSource
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(assinante.fila.get(), timeout=intervalo_heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield formatar_sse(evento)
+    finally:
+        cancelar(assinante)
+
+
+# ===== CAPTURA DAS ALTERAÇÕES =====
+
+def _registrar(session: Session, topico: str, acao: str, registro_id: Optional[int]) -> None:
+    pendentes: Dict[tuple, dict] = session.info.setdefault(_PENDENTES, {})
+    # dict como conjunto ordenado de ids
+    pendentes.setdefault((topico, acao), {})[registro_id] = None
+
+
+def _capturar(acao: str):
+    def ouvinte(mapper, connection, target):
+        session = Session.object_session(target)
+        if session is not None:
+            _registrar(session, TOPICOS_MODELOS[mapper.class_], acao, target.id)
+    return ouvinte
+
+
+for _modelo in TOPICOS_MODELOS:
+    event.listen(_modelo, "after_insert", _capturar("criado"))
+    event.listen(_modelo, "after_update", _capturar("alterado"))
+    event.listen(_modelo, "after_delete", _capturar("excluido"))
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _alteracao_em_lote(contexto):
+    topico = TOPICOS_MODELOS.get(contexto.mapper.class_)
+    if topico:
+        # Ids desconhecidos: o cliente recarrega a lista do tópico
+        contexto.session.info.setdefault(_PENDENTES, {}).setdefault((topico, "lote"), {})
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_pendentes(session):
+    pendentes = session.info.pop(_PENDENTES, None)
+    if not pendentes:
+        return
+    for (topico, acao), ids in pendentes.items():
+        publicar(topico, acao, [i for i in ids if i is not None])
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(session):
+    session.info.pop(_PENDENTES, None)
@@ -0,0 +1,735 @@
+"""
+Fila de jobs em segundo plano, persistida na tabela job.
+
+Operações longas (previsão anual em tempo real, exportações completas,
+demonstrativos, reconstrução de resumos, feriados recorrentes, verificação
+de aportes, recálculo dos alertas de prazo) são enviadas como jobs e
+acompanhadas por consulta, em vez de rodarem dentro da requisição.
+
+Um conjunto de threads executoras assume os jobs pendentes em ordem de
+chegada (UPDATE condicional em status, seguro com mais de um processo da
+API). Trabalho pesado de CPU (PDF, demonstrativos) vai para o pool de
+processos de relatórios (utils.exportacao). Não há broker externo: a
+própria tabela é a fila.
+
+Progresso e cancelamento são cooperativos: o job chama
+contexto.progresso(), que grava o percentual e levanta JobCancelado se o
+cancelamento foi pedido. Uma thread de manutenção mantém o heartbeat dos
+jobs em execução; jobs cujo executor parou de dar sinal (processo
+encerrado) voltam para a fila até MAX_TENTATIVAS e depois ficam com erro.
+"""
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time as time_mod
+import traceback
+from concurrent.futures import TimeoutError as FuturoTimeout
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database import models
+from database import crud_jobs
+from database import crud_anexos
+
+HABILITADO = os.getenv("GESTOR_FILA_JOBS", "1") != "0"
+EXECUTORES = int(os.getenv("GESTOR_EXECUTORES_JOBS", "2"))
+DIRETORIO_RESULTADOS = os.getenv(
+    "GESTOR_RESULTADOS_JOBS", os.path.join(tempfile.gettempdir(), "gestor_ls_jobs")
+)
+
+INTERVALO_VERIFICACAO = 5.0  # segundos entre buscas de pendentes sem notificação
+INTERVALO_HEARTBEAT = 30.0  # segundos
+LIMITE_HEARTBEAT = 120  # segundos sem heartbeat: executor considerado encerrado
+INTERVALO_PROGRESSO = 1.0  # segundos mínimos entre gravações de progresso
+ESPERA_PROGRESSO_MS = 200  # espera máxima pelo banco ao gravar o progresso
+INTERVALO_LIMPEZA = 3600  # segundos entre remoções de jobs antigos e coletas de anexos órfãos
+MAX_TENTATIVAS = 3
+
+
+class JobCancelado(Exception):
+    """Levantada em contexto.progresso() quando o cancelamento do job foi pedido"""
+
+
+class ResultadoArquivo(NamedTuple):
+    """Retorno de um job que gera arquivo (baixado em /jobs/{id}/resultado)"""
+    caminho: str
+    nome: str
+    tipo: str
+
+
+class TipoJob(NamedTuple):
+    nome: str
+    descricao: str
+    funcao: Callable  # funcao(db, contexto) -> JSON | ResultadoArquivo
+    validar: Optional[Callable]  # validar(parametros) -> parametros normalizados (ValueError)
+
+
+_TIPOS: Dict[str, TipoJob] = {}
+
+
+def tipo_job(nome: str, descricao: str, validar: Optional[Callable] = None):
+    """Decorador que registra a função como tipo de job"""
+    def registrar(funcao):
+        _TIPOS[nome] = TipoJob(nome, descricao, funcao, validar)
+        return funcao
+    return registrar
+
+
+def tipos_registrados() -> List[Dict[str, str]]:
+    return [{"tipo": t.nome, "descricao": t.descricao} for t in _TIPOS.values()]
+
+
+def validar_parametros(tipo: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Parâmetros normalizados (serializáveis em JSON) do tipo; ValueError se inválidos"""
+    if tipo not in _TIPOS:
+        raise ValueError(f"Tipo de job inválido. Use: {', '.join(_TIPOS)}")
+    if not isinstance(parametros, dict):
+        raise ValueError("parametros deve ser um objeto JSON")
+    validar = _TIPOS[tipo].validar
+    return validar(dict(parametros)) if validar else dict(parametros)
+
+
+def _agora() -> datetime:
+    return datetime.utcnow()
+
+
+# ===== CONTEXTO DO JOB =====
+
+class ContextoJob:
+    """Acesso do job em execução a parâmetros, progresso, cancelamento e arquivos"""
+
+    def __init__(self, fila: "FilaJobs", job_id: int, parametros: Dict[str, Any]):
+        self.fila = fila
+        self.job_id = job_id
+        self.parametros = parametros
+        self._ultima_gravacao = 0.0
+        self._cancelado = False
+
+    def cancelamento_solicitado(self) -> bool:
+        if self._cancelado or self.job_id in self.fila._cancelamentos:
+            self._cancelado = True
+        return self._cancelado
+
+    def verificar_cancelamento(self) -> None:
+        if self.cancelamento_solicitado():
+            raise JobCancelado()
+
+    def progresso(self, percentual: float, mensagem: Optional[str] = None, forcar: bool = False) -> None:
+        """
+        Grava o progresso (0-100) e a mensagem, no máximo a cada
+        INTERVALO_PROGRESSO segundos, e levanta JobCancelado se pedido.
+        """
+        agora = time_mod.monotonic()
+        if forcar or agora - self._ultima_gravacao >= INTERVALO_PROGRESSO:
+            self._ultima_gravacao = agora
+            solicitado = self.fila._gravar_progresso(self.job_id, percentual, mensagem)
+            if solicitado:
+                self._cancelado = True
+        self.verificar_cancelamento()
+
+    def caminho_resultado(self, extensao: str) -> str:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        return os.path.join(DIRETORIO_RESULTADOS, f"job_{self.job_id}.{extensao}")
+
+    def url_banco(self, db: Session) -> str:
+        return db.get_bind().url.render_as_string(hide_password=False)
+
+    def executar_em_processo(self, funcao, *args, mensagem: Optional[str] = None):
+        """
+        Executa funcao(*args) no pool de processos de relatórios, aguardando
+        com verificação de cancelamento (o processo não é interrompido; o
+        resultado é descartado).
+        """
+        from utils.exportacao import submeter_em_processo
+
+        futuro = submeter_em_processo(funcao, *args)
+        while True:
+            try:
+                return futuro.result(timeout=INTERVALO_PROGRESSO)
+            except FuturoTimeout:
+                try:
+                    self.progresso(self.fila._progresso_atual.get(self.job_id, 0), mensagem)
+                except JobCancelado:
+                    futuro.cancel()
+                    raise
+
+
+# ===== FILA =====
+
+class FilaJobs:
+    def __init__(self, fabrica_sessao: Callable[[], Session], executores: int = EXECUTORES):
+        self._fabrica_sessao = fabrica_sessao
+        self._quantidade = max(1, executores)
+        self.identificador = f"{socket.gethostname()}:{os.getpid()}"
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._em_execucao: Dict[int, str] = {}  # job_id → tipo
+        self._cancelamentos: set = set()
+        self._progresso_atual: Dict[int, int] = {}
+        self._mensagem_atual: Dict[int, str] = {}
+        self._ultima_limpeza = 0.0
+
+    # ----- persistência -----
+
+    def _gravar_progresso(self, job_id: int, percentual: float, mensagem: Optional[str]) -> bool:
+        """Grava progresso e heartbeat; retorna se o cancelamento foi pedido"""
+        percentual = int(max(0, min(100, percentual)))
+        self._progresso_atual[job_id] = percentual
+        if mensagem is not None:
+            self._mensagem_atual[job_id] = mensagem[:300]
+        db = self._fabrica_sessao()
+        sqlite = db.get_bind().dialect.name == "sqlite"
+        solicitado = False
+        try:
+            solicitado = db.query(models.Job.cancelamento_solicitado).filter(models.Job.id == job_id).scalar()
+            if sqlite:
+                # Sem WAL, a leitura em andamento do próprio job (exportação)
+                # impede a gravação: desiste logo em vez de esperar o timeout
+                db.connection().exec_driver_sql(f"PRAGMA busy_timeout = {ESPERA_PROGRESSO_MS}")
+            valores = {"progresso": percentual, "heartbeat_em": _agora()}
+            if job_id in self._mensagem_atual:
+                valores["mensagem"] = self._mensagem_atual[job_id]
+            db.execute(update(models.Job.__table__).where(models.Job.id == job_id).values(**valores))
+            db.commit()
+            return bool(solicitado)
+        except OperationalError:
+            # Banco ocupado: o progresso em memória continua visível (progresso_em_memoria)
+            db.rollback()
+            return bool(solicitado)
+        finally:
+            if sqlite:
+                try:
+                    db.connection().exec_driver_sql("PRAGMA busy_timeout = 5000")
+                except Exception:
+                    pass
+            db.close()
+
+    def progresso_em_memoria(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Progresso mais recente de um job executado por esta fila (ou None)"""
+        with self._lock:
+            if job_id not in self._em_execucao:
+                return None
+            return {
+                "progresso": self._progresso_atual.get(job_id, 0),
+                "mensagem": self._mensagem_atual.get(job_id),
+            }
+
+    def _assumir_proximo(self) -> Optional[models.Job]:
+        """Marca o próximo pendente como em execução por este executor (ou None)"""
+        db = self._fabrica_sessao()
+        try:
+            while True:
+                candidato = db.query(models.Job.id).filter(
+                    models.Job.status == crud_jobs.STATUS_PENDENTE
+                ).order_by(models.Job.id).first()
+                if candidato is None:
+                    return None
+                agora = _agora()
+                assumidos = db.query(models.Job).filter(
+                    models.Job.id == candidato.id,
+                    models.Job.status == crud_jobs.STATUS_PENDENTE,
+                ).update({
+                    models.Job.status: crud_jobs.STATUS_EXECUTANDO,
+                    models.Job.executor: self.identificador,
+                    models.Job.iniciado_em: agora,
+                    models.Job.heartbeat_em: agora,
+                    models.Job.tentativas: models.Job.tentativas + 1,
+                    models.Job.progresso: 0,
+                    models.Job.erro: None,
+                }, synchronize_session=False)
+                db.commit()
+                if assumidos:
+                    job = db.query(models.Job).filter(models.Job.id == candidato.id).one()
+                    db.expunge(job)
+                    return job
+        finally:
+            db.close()
+
+    def _finalizar(self, job_id: int, **valores) -> None:
+        valores.setdefault("concluido_em", _agora())
+        db = self._fabrica_sessao()
+        try:
+            db.execute(update(models.Job.__table__).where(models.Job.id == job_id).values(**valores))
+            db.commit()
+        finally:
+            db.close()
+
+    def recuperar_orfaos(self) -> int:
+        """Devolve à fila (ou marca com erro) jobs em execução sem heartbeat recente"""
+        limite = _agora() - timedelta(seconds=LIMITE_HEARTBEAT)
+        with self._lock:
+            proprios = list(self._em_execucao)
+        db = self._fabrica_sessao()
+        try:
+            # Os jobs desta fila estão vivos mesmo sem heartbeat gravado (banco ocupado)
+            orfaos = db.query(models.Job).filter(
+                models.Job.status == crud_jobs.STATUS_EXECUTANDO,
+                models.Job.heartbeat_em < limite,
+                models.Job.id.notin_(proprios),
+            ).all()
+            for job in orfaos:
+                if job.cancelamento_solicitado:
+                    job.status = crud_jobs.STATUS_CANCELADO
+                    job.concluido_em = _agora()
+                elif job.tentativas >= MAX_TENTATIVAS:
+                    job.status = crud_jobs.STATUS_ERRO
+                    job.erro = f"Executor {job.executor} interrompido ({job.tentativas} tentativas)"
+                    job.concluido_em = _agora()
+                else:
+                    job.status = crud_jobs.STATUS_PENDENTE
+                    job.executor = None
+            db.commit()
+            if orfaos:
+                self._acordar.set()
+            return len(orfaos)
+        finally:
+            db.close()
+
+    # ----- execução -----
+
+    def executar_job(self, job: models.Job) -> str:
+        """Executa um job já assumido e grava o resultado. Retorna o status final"""
+        tipo = _TIPOS.get(job.tipo)
+        contexto = ContextoJob(self, job.id, job.parametros or {})
+        with self._lock:
+            self._em_execucao[job.id] = job.tipo
+        db = self._fabrica_sessao()
+        try:
+            if tipo is None:
+                raise ValueError(f"Tipo de job desconhecido: {job.tipo}")
+            contexto.verificar_cancelamento()
+            if job.cancelamento_solicitado:
+                raise JobCancelado()
+            resultado = tipo.funcao(db, contexto)
+            if isinstance(resultado, ResultadoArquivo):
+                self._finalizar(
+                    job.id, status=crud_jobs.STATUS_CONCLUIDO, progresso=100, mensagem="Concluído",
+                    arquivo=resultado.caminho, nome_arquivo=resultado.nome, tipo_arquivo=resultado.tipo,
+                )
+            else:
+                self._finalizar(
+                    job.id, status=crud_jobs.STATUS_CONCLUIDO, progresso=100, mensagem="Concluído", resultado=resultado
+                )
+            return crud_jobs.STATUS_CONCLUIDO
+        except JobCancelado:
+            db.rollback()
+            self._remover_arquivos(job.id)
+            self._finalizar(job.id, status=crud_jobs.STATUS_CANCELADO, mensagem="Cancelado")
+            return crud_jobs.STATUS_CANCELADO
+        except Exception as e:
+            db.rollback()
+            self._remover_arquivos(job.id)
+            traceback.print_exc()
+            self._finalizar(job.id, status=crud_jobs.STATUS_ERRO, erro=f"{type(e).__name__}: {e}"[:2000])
+            return crud_jobs.STATUS_ERRO
+        finally:
+            db.close()
+            with self._lock:
+                self._em_execucao.pop(job.id, None)
+                self._cancelamentos.discard(job.id)
+                self._progresso_atual.pop(job.id, None)
+                self._mensagem_atual.pop(job.id, None)
+
+    def _remover_arquivos(self, job_id: int) -> None:
+        prefixo = f"job_{job_id}."
+        if not os.path.isdir(DIRETORIO_RESULTADOS):
+            return
+        for nome in os.listdir(DIRETORIO_RESULTADOS):
+            if nome.startswith(prefixo):
+                os.remove(os.path.join(DIRETORIO_RESULTADOS, nome))
+
+    def processar_pendentes(self) -> int:
+        """Executa pendentes até a fila esvaziar (uso direto, sem threads). Retorna quantos"""
+        total = 0
+        while True:
+            job = self._assumir_proximo()
+            if job is None:
+                return total
+            self.executar_job(job)
+            total += 1
+
+    def _executor(self) -> None:
+        while not self._parar.is_set():
+            try:
+                job = self._assumir_proximo()
+            except Exception as e:
+                print(f"Aviso: falha ao buscar jobs pendentes: {e}")
+                job = None
+            if job is not None:
+                self.executar_job(job)
+                continue
+            self._acordar.wait(INTERVALO_VERIFICACAO)
+            self._acordar.clear()
+
+    def _manutencao(self) -> None:
+        while not self._parar.wait(INTERVALO_HEARTBEAT):
+            try:
+                with self._lock:
+                    ids = list(self._em_execucao)
+                if ids:
+                    db = self._fabrica_sessao()
+                    try:
+                        db.execute(update(models.Job.__table__).where(
+                            models.Job.id.in_(ids)
+                        ).values(heartbeat_em=_agora()))
+                        db.commit()
+                    finally:
+                        db.close()
+                self.recuperar_orfaos()
+                if time_mod.monotonic() - self._ultima_limpeza >= INTERVALO_LIMPEZA:
+                    self._ultima_limpeza = time_mod.monotonic()
+                    db = self._fabrica_sessao()
+                    try:
+                        crud_jobs.remover_jobs_antigos(db)
+                        crud_anexos.coletar_blobs_orfaos(db)
+                        crud_anexos.agendar_extracao(db)
+                    finally:
+                        db.close()
+            except Exception as e:
+                print(f"Aviso: falha na manutenção da fila de jobs: {e}")
+
+    # ----- ciclo de vida -----
+
+    def notificar(self) -> None:
+        self._acordar.set()
+
+    def notificar_cancelamento(self, job_id: int) -> None:
+        with self._lock:
+            if job_id in self._em_execucao:
+                self._cancelamentos.add(job_id)
+
+    def situacao(self) -> dict:
+        with self._lock:
+            em_execucao = [{"job_id": i, "tipo": t} for i, t in self._em_execucao.items()]
+        return {
+            "ativo": any(t.is_alive() for t in self._threads),
+            "executor": self.identificador,
+            "executores": self._quantidade,
+            "em_execucao": em_execucao,
+        }
+
+    def iniciar(self) -> None:
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._parar.clear()
+        self.recuperar_orfaos()
+        self._threads = [
+            threading.Thread(target=self._executor, name=f"fila-jobs-{i + 1}", daemon=True)
+            for i in range(self._quantidade)
+        ]
+        self._threads.append(threading.Thread(target=self._manutencao, name="fila-jobs-manutencao", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def parar(self) -> None:
+        # Jobs em andamento continuam até o fim da thread (daemon); os que não
+        # terminarem voltam à fila pelo heartbeat na próxima inicialização
+        self._parar.set()
+        self._acordar.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+
+_fila: Optional[FilaJobs] = None
+
+
+def obter_fila() -> Optional[FilaJobs]:
+    return _fila
+
+
+def iniciar_fila(fabrica_sessao: Callable[[], Session]) -> Optional[FilaJobs]:
+    """Cria e inicia a fila de jobs da aplicação (no-op se GESTOR_FILA_JOBS=0)"""
+    global _fila
+    if not HABILITADO:
+        return None
+    if _fila is None:
+        _fila = FilaJobs(fabrica_sessao)
+    _fila.iniciar()
+    return _fila
+
+
+def parar_fila() -> None:
+    global _fila
+    if _fila is not None:
+        _fila.parar()
+        _fila = None
+
+
+def notificar_novo_job() -> None:
+    if _fila is not None:
+        _fila.notificar()
+
+
+def notificar_cancelamento(job_id: int) -> None:
+    if _fila is not None:
+        _fila.notificar_cancelamento(job_id)
+
+
+# ===== TIPOS DE JOB =====
+
+def _inteiro(parametros: Dict[str, Any], chave: str, padrao=None, minimo=None, maximo=None) -> Optional[int]:
+    valor = parametros.get(chave, padrao)
+    if valor is None:
+        return None
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{chave} deve ser um número inteiro")
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        raise ValueError(f"{chave} fora do intervalo permitido")
+    return valor
+
+
+def _data_iso(parametros: Dict[str, Any], chave: str) -> Optional[str]:
+    valor = parametros.get(chave)
+    if valor in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(str(valor)).isoformat()
+    except ValueError:
+        raise ValueError(f"{chave} deve ser uma data AAAA-MM-DD")
+
+
+def _validar_previsao(parametros):
+    return {
+        "ano": _inteiro(parametros, "ano", date.today().year, 2000, 2100),
+        "tempo_real": bool(parametros.get("tempo_real", True)),
+    }
+
+
+@tipo_job("previsao_operacao", "Previsão da operação (DRE mensal) do ano", _validar_previsao)
+def _job_previsao_operacao(db: Session, contexto: ContextoJob):
+    from database import crud_contabilidade
+
+    contexto.progresso(5, "Calculando previsão da operação", forcar=True)
+    return crud_contabilidade.calcular_previsao_operacao_ano(
+        db, contexto.parametros["ano"], contexto.parametros["tempo_real"]
+    )
+
+
+FILTROS_TAREFAS = {
+    "tipo_tarefa_id": "int", "processo_id": "int", "cliente_id": "int", "municipio_id": "int",
+    "responsavel_id": "int", "classe": "str", "esfera_justica": "str", "uf": "str", "status": "str",
+    "prazo_vencido": "bool", "data_inicio": "data", "data_fim": "data",
+}
+
+
+def _validar_exportar_tarefas(parametros):
+    formato = parametros.get("formato", "xlsx")
+    if formato not in ("xlsx", "pdf"):
+        raise ValueError("formato deve ser xlsx ou pdf")
+    filtros = parametros.get("filtros") or {}
+    invalidos = set(filtros) - set(FILTROS_TAREFAS)
+    if invalidos:
+        raise ValueError(f"Filtros inválidos: {', '.join(sorted(invalidos))}")
+    normalizados = {}
+    for chave, tipo in FILTROS_TAREFAS.items():
+        if filtros.get(chave) in (None, ""):
+            continue
+        if tipo == "int":
+            normalizados[chave] = _inteiro(filtros, chave)
+        elif tipo == "data":
+            normalizados[chave] = _data_iso(filtros, chave)
+        elif tipo == "bool":
+            normalizados[chave] = bool(filtros[chave])
+        else:
+            normalizados[chave] = str(filtros[chave])
+    return {"formato": formato, "filtros": normalizados}
+
+
+def _filtros_tarefas(filtros: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        chave: date.fromisoformat(valor) if FILTROS_TAREFAS[chave] == "data" else valor
+        for chave, valor in filtros.items()
+    }
+
+
+@tipo_job("exportar_tarefas", "Exportação completa de tarefas (Excel ou PDF)", _validar_exportar_tarefas)
+def _job_exportar_tarefas(db: Session, contexto: ContextoJob):
+    from database import crud_tarefas
+    from utils import exportacao
+
+    formato = contexto.parametros["formato"]
+    filtros = _filtros_tarefas(contexto.parametros["filtros"])
+    destino = contexto.caminho_resultado(formato)
+    nome = f"tarefas_{date.today().strftime('%Y%m%d')}.{formato}"
+
+    if formato == "pdf":
+        temporario = contexto.executar_em_processo(
+            exportacao.gerar_arquivo_tarefas_pdf, contexto.url_banco(db), filtros, mensagem="Gerando PDF"
+        )
+        shutil.move(temporario, destino)
+        return ResultadoArquivo(destino, nome, "application/pdf")
+
+    total = crud_tarefas.consultar_tarefas_exportacao(db, **filtros).count()
+
+    def _linhas():
+        for indice, linha in enumerate(crud_tarefas.consultar_tarefas_exportacao(db, **filtros), start=1):
+            if indice % crud_tarefas.LOTE_EXPORTACAO == 0:
+                contexto.progresso(95 * indice / max(total, 1), f"{indice} de {total} tarefas")
+            yield linha
+
+    exportacao.escrever_tarefas_excel(_linhas(), destino)
+    return ResultadoArquivo(destino, nome, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+def _validar_relatorio_contabil(parametros):
+    from reports import demonstrativos, execucao
+
+    formato = parametros.get("formato", "xlsx")
+    if formato not in execucao.FORMATOS:
+        raise ValueError(f"Formato inválido. Use: {', '.join(execucao.FORMATOS)}")
+    relatorio = parametros.get("relatorio")
+    normalizados = demonstrativos.normalizar_parametros(
+        relatorio,
+        _inteiro(parametros, "ano", minimo=2000),
+        _inteiro(parametros, "mes_inicio", minimo=1, maximo=12),
+        _inteiro(parametros, "mes_fim", minimo=1, maximo=12),
+        _inteiro(parametros, "ano_fim", minimo=2000),
+        _inteiro(parametros, "conta_id"),
+        date.fromisoformat(_data_iso(parametros, "data_inicio")) if parametros.get("data_inicio") else None,
+        date.fromisoformat(_data_iso(parametros, "data_fim")) if parametros.get("data_fim") else None,
+    )
+    return {"relatorio": relatorio, "formato": formato, "parametros": normalizados}
+
+
+@tipo_job("relatorio_contabil", "Demonstrativo contábil (balanco, dmpl, dfc, dre, razao)", _validar_relatorio_contabil)
+def _job_relatorio_contabil(db: Session, contexto: ContextoJob):
+    from reports import execucao
+
+    relatorio = contexto.parametros["relatorio"]
+    formato = contexto.parametros["formato"]
+    parametros = contexto.parametros["parametros"]
+
+    # Mesmo cache em disco do download direto
+    versao = execucao.versao_razao(db)
+    em_cache = execucao.caminho_cache(relatorio, formato, execucao.chave_cache(relatorio, formato, parametros, versao))
+    if not os.path.exists(em_cache):
+        contexto.executar_em_processo(
+            execucao.gerar_arquivo_relatorio, contexto.url_banco(db), relatorio, formato, parametros, em_cache,
+            mensagem="Gerando demonstrativo",
+        )
+    destino = contexto.caminho_resultado(formato)
+    shutil.copyfile(em_cache, destino)
+    sufixo = "_".join(str(v) for v in parametros.values() if v is not None)
+    return ResultadoArquivo(destino, f"{relatorio}_{sufixo}.{formato}", execucao.FORMATOS[formato])
+
+
+@tipo_job("reconstruir_resumo_mensal", "Reconstrução do resumo mensal de entradas e despesas")
+def _job_reconstruir_resumo_mensal(db: Session, contexto: ContextoJob):
+    from database import crud_resumo_mensal
+
+    contexto.progresso(5, "Reconstruindo resumo mensal", forcar=True)
+    return {"meses": crud_resumo_mensal.reconstruir_resumo_mensal(db)}
+
+
+@tipo_job("reconstruir_resumo_processos", "Reconstrução do resumo de tarefas por processo")
+def _job_reconstruir_resumo_processos(db: Session, contexto: ContextoJob):
+    from database import crud_processo_resumo
+
+    contexto.progresso(5, "Reconstruindo resumo dos processos", forcar=True)
+    return {"processos": crud_processo_resumo.reconstruir_resumo_processos(db)}
+
+
+def _validar_feriados(parametros):
+    ano = _inteiro(parametros, "ano", date.today().year + 1, 2000, 2100)
+    ano_fim = _inteiro(parametros, "ano_fim", ano, ano, 2100)
+    return {"ano": ano, "ano_fim": ano_fim}
+
+
+@tipo_job("feriados_recorrentes", "Geração dos feriados recorrentes para um ou mais anos", _validar_feriados)
+def _job_feriados_recorrentes(db: Session, contexto: ContextoJob):
+    from database import crud_feriados
+
+    anos = list(range(contexto.parametros["ano"], contexto.parametros["ano_fim"] + 1))
+    criados = {}
+    for indice, ano in enumerate(anos):
+        contexto.progresso(100 * indice / len(anos), f"Ano {ano}", forcar=True)
+        criados[str(ano)] = crud_feriados.processar_feriados_recorrentes(ano, db)
+    return {"criados": criados}
+
+
+def _validar_aportes(parametros):
+    return {"corrigir": bool(parametros.get("corrigir", False))}
+
+
+@tipo_job("verificar_aportes", "Verificação (e correção) de aportes sem lançamento contábil", _validar_aportes)
+def _job_verificar_aportes(db: Session, contexto: ContextoJob):
+    from database import verificar_aportes
+
+    contexto.progresso(5, "Verificando aportes", forcar=True)
+    pendentes = verificar_aportes.listar_aportes_sem_lancamento(db)
+    corrigidos = 0
+    if pendentes and contexto.parametros["corrigir"]:
+        contexto.progresso(50, f"Criando {len(pendentes)} lançamento(s)", forcar=True)
+        corrigidos = verificar_aportes.criar_lancamentos_aportes(db, pendentes)
+    return {
+        "aportes_sem_lancamento": [
+            {"id": a.id, "data": a.data.isoformat(), "valor": a.valor, "tipo_aporte": a.tipo_aporte}
+            for a in pendentes
+        ],
+        "corrigidos": corrigidos,
+    }
+
+
+@tipo_job("recalcular_alertas_prazo", "Recarga dos prazos monitorados e emissão dos alertas vencidos")
+def _job_recalcular_alertas_prazo(db: Session, contexto: ContextoJob):
+    from database import agendador_prazos
+
+    agendador = agendador_prazos.obter_agendador()
+    if agendador is None:
+        # Agendador desabilitado: usa uma instância temporária, sem thread
+        agendador = agendador_prazos.AgendadorPrazos(contexto.fila._fabrica_sessao)
+    contexto.progresso(10, "Carregando prazos das tarefas abertas", forcar=True)
+    tarefas = agendador.carregar()
+    contexto.progresso(60, "Emitindo alertas vencidos", forcar=True)
+    return {"tarefas_monitoradas": tarefas, "alertas_emitidos": agendador.processar_vencidos()}
+
+
+def _validar_coleta_anexos(parametros):
+    return {"carencia_horas": _inteiro(parametros, "carencia_horas", crud_anexos.CARENCIA_COLETA_HORAS, 0, 24 * 90)}
+
+
+@tipo_job("coletar_anexos_orfaos", "Remoção dos arquivos de anexos sem referências", _validar_coleta_anexos)
+def _job_coletar_anexos_orfaos(db: Session, contexto: ContextoJob):
+    contexto.progresso(5, "Coletando arquivos de anexos órfãos", forcar=True)
+    return crud_anexos.coletar_blobs_orfaos(db, contexto.parametros["carencia_horas"])
+
+
+def _validar_extracao_anexos(parametros):
+    return {"reprocessar": bool(parametros.get("reprocessar", False))}
+
+
+@tipo_job("extrair_anexos", "Extração de texto e miniatura dos anexos (pré-visualização e busca)", _validar_extracao_anexos)
+def _job_extrair_anexos(db: Session, contexto: ContextoJob):
+    from utils import armazenamento_anexos, extracao_anexos
+
+    reprocessar = contexto.parametros["reprocessar"]
+    blob_ids = crud_anexos.blobs_para_extracao(db, reprocessar)
+    resumo = {"arquivos": len(blob_ids), "anexos_indexados": 0}
+    for indice, blob_id in enumerate(blob_ids):
+        contexto.progresso(100 * indice / len(blob_ids), f"Arquivo {indice + 1} de {len(blob_ids)}")
+        blob = db.get(models.ArquivoBlob, blob_id)
+        if blob is None:
+            continue
+        caminho = armazenamento_anexos.caminho_blob(blob.hash_sha256)
+        if os.path.exists(caminho):
+            # Processo separado: PDFs grandes não disputam o GIL com a API
+            metadados = contexto.executar_em_processo(
+                extracao_anexos.extrair, caminho, blob.mime, blob.hash_sha256, reprocessar,
+                mensagem=f"Arquivo {indice + 1} de {len(blob_ids)}",
+            )
+        else:
+            metadados = {"status": extracao_anexos.STATUS_ERRO, "erro": "Arquivo não encontrado"}
+        resumo["anexos_indexados"] += crud_anexos.registrar_extracao(db, blob_id, metadados)
+        resumo[metadados["status"]] = resumo.get(metadados["status"], 0) + 1
+    return resumo
@@ -115,4 +115,7 @@ def inicializar_plano_contas(db: Session):
             conta.pai_id = pai.id
     
     db.commit()
+    # A remoção em lote acima não dispara eventos do ORM: invalidar explicitamente
+    from database.crud_plano_contas import invalidar_cache_plano_contas
+    invalidar_cache_plano_contas()
     print(f"✅ Plano de contas inicializado com {len(contas)} contas")
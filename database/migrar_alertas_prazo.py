@@ -0,0 +1,55 @@
+"""
+Script de migração do agendador de alertas de prazo.
+
+Cria o índice parcial das tarefas abertas com prazo, usado pelo agendador
+para reconstruir o heap na inicialização (a tabela alertas_prazo é criada
+por create_all). É idempotente e é chamado na inicialização da aplicação.
+"""
+import sqlite3
+import os
+
+INDICE = (
+    "CREATE INDEX IF NOT EXISTS idx_tarefa_prazos_abertas "
+    "ON tarefas (prazo_fatal, prazo_administrativo) "
+    "WHERE status IS NULL OR status NOT IN ('Concluída', 'Cancelada')"
+)
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def migrar_alertas_prazo(db_path: str = None, verbose: bool = True):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='tarefas'")
+        if cursor.fetchone() is not None:
+            cursor.execute(INDICE)
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração dos alertas de prazo concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_alertas_prazo()
@@ -0,0 +1,79 @@
+"""
+Script de migração do armazenamento de anexos por conteúdo.
+
+Adiciona a coluna anexos.blob_id e o índice correspondente, e as colunas
+de extração de texto/miniatura em arquivo_blob. A tabela arquivo_blob é
+criada por create_all; anexos antigos ficam com blob_id nulo
+e continuam servidos a partir de caminho_arquivo. É idempotente e é chamado
+na inicialização da aplicação.
+"""
+import sqlite3
+import os
+
+COLUNAS_EXTRACAO = {
+    "extracao_status": "VARCHAR(20) NOT NULL DEFAULT 'pendente'",
+    "paginas": "INTEGER",
+    "tem_miniatura": "BOOLEAN NOT NULL DEFAULT 0",
+}
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def _colunas(cursor, tabela):
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    return {linha[1] for linha in cursor.fetchall()}
+
+
+def migrar_anexos_blob(db_path: str = None, verbose: bool = True):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        colunas = _colunas(cursor, "anexos")
+        if not colunas:
+            return
+        if "blob_id" not in colunas:
+            cursor.execute("ALTER TABLE anexos ADD COLUMN blob_id INTEGER REFERENCES arquivo_blob(id)")
+            if verbose:
+                print("✓ Coluna anexos.blob_id adicionada")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_anexo_blob ON anexos (blob_id)")
+
+        colunas_blob = _colunas(cursor, "arquivo_blob")
+        for coluna, definicao in COLUNAS_EXTRACAO.items():
+            if colunas_blob and coluna not in colunas_blob:
+                cursor.execute(f"ALTER TABLE arquivo_blob ADD COLUMN {coluna} {definicao}")
+                if verbose:
+                    print(f"✓ Coluna arquivo_blob.{coluna} adicionada")
+        if colunas_blob:
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_arquivo_blob_extracao ON arquivo_blob (extracao_status)"
+            )
+
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração do armazenamento de anexos concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_anexos_blob()
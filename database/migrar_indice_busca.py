@@ -0,0 +1,140 @@
+"""
+Script de migração do índice de busca textual (FTS5).
+
+Cria a tabela virtual busca_fts e os triggers que a mantêm em sincronia
+com processos, clientes, tarefas e andamentos, e faz a carga inicial
+quando o índice está vazio. Índices criados com outro FATOR_ROWID (antes
+da inclusão dos anexos) têm os triggers recriados e são recarregados; o
+texto dos anexos volta a partir do cache de extração em disco. É
+idempotente e é chamado na inicialização da aplicação. Se o SQLite não
+tiver FTS5, nada é criado e a busca usa LIKE.
+
+Uso com --reconstruir apaga e recarrega todo o índice.
+"""
+import sqlite3
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.crud_busca import (
+    TABELA_FTS, FATOR_ROWID, FONTES, FONTES_EXTERNAS, sql_criar_tabela, sql_triggers, sql_popular,
+    sql_indexar_externo, parametros_indexar_externo,
+)
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def _fts5_disponivel(cursor):
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp._teste_fts5 USING fts5(x)")
+        cursor.execute("DROP TABLE temp._teste_fts5")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _triggers_desatualizados(cursor):
+    """Triggers existentes gravados com outro FATOR_ROWID"""
+    cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type='trigger' AND name LIKE ?", (f"{TABELA_FTS}_%_ad",)
+    )
+    return any(f"* {FATOR_ROWID} +" not in sql for (sql,) in cursor.fetchall())
+
+
+def _popular_anexos(cursor):
+    """Recoloca no índice o texto já extraído dos anexos (lido do cache em disco)"""
+    from utils import extracao_anexos
+
+    # Colunas criadas por migrar_anexos_blob; sem elas não há texto extraído
+    cursor.execute("PRAGMA table_info(anexos)")
+    if "blob_id" not in {linha[1] for linha in cursor.fetchall()}:
+        return
+    cursor.execute("PRAGMA table_info(arquivo_blob)")
+    if "extracao_status" not in {linha[1] for linha in cursor.fetchall()}:
+        return
+    cursor.execute(
+        "SELECT a.id, COALESCE(a.processo_id, an.processo_id), a.nome_arquivo, b.hash_sha256 "
+        "FROM anexos a JOIN arquivo_blob b ON b.id = a.blob_id "
+        "LEFT JOIN andamentos an ON an.id = a.andamento_id "
+        "WHERE b.extracao_status = ?", (extracao_anexos.STATUS_CONCLUIDA,)
+    )
+    for anexo_id, processo_id, nome, hash_sha256 in cursor.fetchall():
+        parametros = parametros_indexar_externo(
+            "anexo", anexo_id, processo_id, nome, extracao_anexos.ler_texto(hash_sha256)
+        )
+        for comando in sql_indexar_externo():
+            cursor.execute(comando, parametros)
+
+
+def migrar_indice_busca(db_path: str = None, verbose: bool = True, reconstruir: bool = False):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        if not _fts5_disponivel(cursor):
+            if verbose:
+                print("⚠ SQLite sem FTS5: a busca usará LIKE")
+            return
+
+        # Triggers referenciam as tabelas de origem: exigir que existam
+        for f in list(FONTES.values()) + list(FONTES_EXTERNAS.values()):
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (f["tabela"],))
+            if cursor.fetchone() is None:
+                if verbose:
+                    print(f"⚠ Tabela {f['tabela']} ainda não existe; execute create_all antes")
+                return
+
+        if _triggers_desatualizados(cursor):
+            for (nome,) in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE ?", (f"{TABELA_FTS}_%",)
+            ).fetchall():
+                cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+            reconstruir = True
+            if verbose:
+                print(f"✓ Triggers de {TABELA_FTS} recriados (rowid * {FATOR_ROWID})")
+
+        cursor.execute(sql_criar_tabela())
+        for comando in sql_triggers():
+            cursor.execute(comando)
+
+        cursor.execute(f"SELECT COUNT(*) FROM {TABELA_FTS}")
+        vazio = cursor.fetchone()[0] == 0
+        if reconstruir or vazio:
+            cursor.execute(f"DELETE FROM {TABELA_FTS}")
+            for comando in sql_popular():
+                cursor.execute(comando)
+            _popular_anexos(cursor)
+            cursor.execute(f"INSERT INTO {TABELA_FTS} ({TABELA_FTS}) VALUES ('optimize')")
+            cursor.execute(f"SELECT COUNT(*) FROM {TABELA_FTS}")
+            if verbose:
+                print(f"✓ {TABELA_FTS}: {cursor.fetchone()[0]} registro(s) indexado(s)")
+
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração do índice de busca concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_indice_busca(reconstruir="--reconstruir" in sys.argv)
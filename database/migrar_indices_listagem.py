@@ -0,0 +1,80 @@
+"""
+Script de migração dos índices das listagens de processos e clientes.
+
+create_all só cria índices junto com tabelas novas; em bancos existentes
+este script cria os índices compostos (coluna, id) usados pelos filtros e
+pela paginação por cursor de /processos e /clientes. É idempotente e é
+chamado na inicialização da aplicação.
+"""
+import sqlite3
+import os
+
+INDICES = [
+    ("idx_processo_numero", "processos", "numero, id"),
+    ("idx_processo_data_abertura", "processos", "data_abertura, id"),
+    ("idx_processo_status", "processos", "status, id"),
+    ("idx_processo_fase", "processos", "fase, id"),
+    ("idx_processo_classe", "processos", "classe, id"),
+    ("idx_processo_esfera", "processos", "esfera_justica, id"),
+    ("idx_processo_municipio", "processos", "municipio_id, id"),
+    ("idx_processo_cliente", "processos", "cliente_id, id"),
+    ("idx_cliente_nome", "clientes", "nome, id"),
+    ("idx_cliente_uf", "clientes", "uf, nome"),
+    ("idx_cliente_tipo_pessoa", "clientes", "tipo_pessoa, nome"),
+]
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def _tabela_existe(cursor, tabela):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tabela,))
+    return cursor.fetchone() is not None
+
+
+def migrar_indices_listagem(db_path: str = None, verbose: bool = True):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        tabelas_alteradas = set()
+        for nome, tabela, colunas in INDICES:
+            if not _tabela_existe(cursor, tabela):
+                continue
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (nome,))
+            if cursor.fetchone() is None:
+                cursor.execute(f"CREATE INDEX {nome} ON {tabela} ({colunas})")
+                tabelas_alteradas.add(tabela)
+                if verbose:
+                    print(f"✓ Índice {nome} criado")
+        # Estatísticas para o planejador escolher entre os índices novos
+        for tabela in sorted(tabelas_alteradas):
+            cursor.execute(f"ANALYZE {tabela}")
+
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração dos índices de listagem concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_indices_listagem()
@@ -0,0 +1,89 @@
+"""
+Script de migração do resumo de atividade por processo.
+
+Cria os índices por processo em tarefas, andamentos e pagamentos e, se
+processo_resumo estiver vazio enquanto já existem processos, calcula o
+resumo de todos a partir das tabelas de origem. É idempotente e é chamado
+na inicialização da aplicação (a tabela em si é criada por create_all).
+
+Uso com --reconstruir apaga e recalcula todo o resumo.
+"""
+import sqlite3
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.crud_processo_resumo import sql_reconstruir
+
+INDICES = [
+    ("idx_tarefa_processo", "tarefas", "processo_id"),
+    ("idx_andamento_processo", "andamentos", "processo_id, data"),
+    ("idx_pagamento_processo", "pagamentos", "processo_id"),
+]
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def _tabela_existe(cursor, tabela):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tabela,))
+    return cursor.fetchone() is not None
+
+
+def migrar_processo_resumo(db_path: str = None, verbose: bool = True, reconstruir: bool = False):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        for nome, tabela, colunas in INDICES:
+            if _tabela_existe(cursor, tabela):
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})")
+
+        tabelas = ("processo_resumo", "processos", "tarefas", "andamentos", "pagamentos")
+        if not all(_tabela_existe(cursor, t) for t in tabelas):
+            # Tabelas ainda não criadas: create_all cria e os eventos mantêm o resumo
+            conn.commit()
+            return
+
+        cursor.execute("SELECT COUNT(*) FROM processo_resumo")
+        vazio = cursor.fetchone()[0] == 0
+        cursor.execute("SELECT COUNT(*) FROM processos")
+        possui_processos = cursor.fetchone()[0] > 0
+
+        if reconstruir or (vazio and possui_processos):
+            for comando in sql_reconstruir():
+                cursor.execute(comando)
+            cursor.execute("SELECT COUNT(*) FROM processo_resumo")
+            if verbose:
+                print(f"✓ processo_resumo: {cursor.fetchone()[0]} processo(s) calculado(s)")
+        elif verbose:
+            print("✓ processo_resumo já preenchido")
+
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração do resumo de processos concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_processo_resumo(reconstruir="--reconstruir" in sys.argv)
@@ -0,0 +1,111 @@
+"""
+Script de migração para o resumo mensal de entradas e despesas.
+
+Cria os índices por data em entradas e despesas e, se o resumo estiver vazio
+enquanto já existem lançamentos, preenche resumo_mensal e resumo_mensal_socio
+a partir das tabelas brutas. É idempotente e é chamado na inicialização da
+aplicação (as tabelas em si são criadas por create_all).
+
+Uso com --reconstruir apaga e recalcula todo o resumo.
+"""
+import sqlite3
+import os
+import sys
+
+INDICES = [
+    ("idx_entrada_data", "entradas", "data"),
+    ("idx_despesa_data", "despesas", "data"),
+]
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def _tabela_existe(cursor, tabela):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tabela,))
+    return cursor.fetchone() is not None
+
+
+def _preencher_resumo(cursor):
+    cursor.execute("DELETE FROM resumo_mensal_socio")
+    cursor.execute("DELETE FROM resumo_mensal")
+    cursor.execute("""
+        INSERT INTO resumo_mensal (mes, receita_centavos, despesas_centavos, qtd_entradas, qtd_despesas, atualizado_em)
+        SELECT mes, SUM(receita), SUM(despesas), SUM(qtd_e), SUM(qtd_d), CURRENT_TIMESTAMP
+        FROM (
+            SELECT strftime('%Y-%m', data) AS mes, COALESCE(SUM(valor_centavos), 0) AS receita,
+                   0 AS despesas, COUNT(id) AS qtd_e, 0 AS qtd_d
+            FROM entradas GROUP BY strftime('%Y-%m', data)
+            UNION ALL
+            SELECT strftime('%Y-%m', data), 0, COALESCE(SUM(valor_centavos), 0), 0, COUNT(id)
+            FROM despesas GROUP BY strftime('%Y-%m', data)
+        )
+        WHERE mes IS NOT NULL
+        GROUP BY mes
+    """)
+    meses = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO resumo_mensal_socio (mes, socio_id, contribuicao_centavos)
+        SELECT strftime('%Y-%m', e.data), es.socio_id,
+               CAST(ROUND(SUM(e.valor_centavos * es.percentual) / 100.0) AS INTEGER)
+        FROM entradas_socios es
+        JOIN entradas e ON e.id = es.entrada_id
+        WHERE e.data IS NOT NULL
+        GROUP BY strftime('%Y-%m', e.data), es.socio_id
+    """)
+    return meses
+
+
+def migrar_resumo_mensal(db_path: str = None, verbose: bool = True, reconstruir: bool = False):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        for nome, tabela, coluna in INDICES:
+            if _tabela_existe(cursor, tabela):
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({coluna})")
+
+        if not _tabela_existe(cursor, "resumo_mensal") or not _tabela_existe(cursor, "entradas"):
+            # Tabelas ainda não criadas: create_all cria e o CRUD mantém o resumo
+            conn.commit()
+            return
+
+        cursor.execute("SELECT COUNT(*) FROM resumo_mensal")
+        vazio = cursor.fetchone()[0] == 0
+        cursor.execute("SELECT (SELECT COUNT(*) FROM entradas) + (SELECT COUNT(*) FROM despesas)")
+        possui_lancamentos = cursor.fetchone()[0] > 0
+
+        if reconstruir or (vazio and possui_lancamentos):
+            meses = _preencher_resumo(cursor)
+            if verbose:
+                print(f"✓ resumo_mensal: {meses} mês(es) calculado(s)")
+        elif verbose:
+            print("✓ resumo_mensal já preenchido")
+
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração do resumo mensal concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_resumo_mensal(reconstruir="--reconstruir" in sys.argv)
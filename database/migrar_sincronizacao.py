@@ -0,0 +1,101 @@
+"""
+Script de migração da sincronização incremental (?since=).
+
+Adiciona a coluna atualizado_em às tabelas que não a tinham (processos,
+clientes, entradas, despesas, lancamentos_contabeis), preenche as linhas
+existentes (criado_em quando houver, senão o instante da migração) no
+formato com microssegundos que o SQLAlchemy grava, cria os
+índices (atualizado_em, id) de todas as tabelas sincronizáveis e apaga
+tombstones além da retenção. A tabela registro_exclusoes é criada por
+create_all. É idempotente e é chamado na inicialização da aplicação.
+"""
+import sqlite3
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.crud_sincronizacao import RETENCAO_EXCLUSOES_DIAS
+
+# tabela → nome do índice (atualizado_em, id)
+INDICES = {
+    "processos": "idx_processo_atualizado_em",
+    "clientes": "idx_cliente_atualizado_em",
+    "tarefas": "idx_tarefa_atualizado_em",
+    "entradas": "idx_entrada_atualizado_em",
+    "despesas": "idx_despesa_atualizado_em",
+    "lancamentos_contabeis": "idx_lancamento_atualizado_em",
+    "aportes_capital": "idx_aporte_atualizado_em",
+    "pagamentos_pendentes": "idx_pendente_atualizado_em",
+    "ativos_imobilizados": "idx_ativo_atualizado_em",
+    "operacoes": "idx_operacao_atualizado_em",
+}
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def _colunas(cursor, tabela):
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    return {linha[1] for linha in cursor.fetchall()}
+
+
+def migrar_sincronizacao(db_path: str = None, verbose: bool = True):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        for tabela, indice in INDICES.items():
+            colunas = _colunas(cursor, tabela)
+            if not colunas:
+                continue
+            if "atualizado_em" not in colunas:
+                cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN atualizado_em DATETIME")
+                if verbose:
+                    print(f"✓ Coluna {tabela}.atualizado_em adicionada")
+            origem = "COALESCE(criado_em, CURRENT_TIMESTAMP)" if "criado_em" in colunas else "CURRENT_TIMESTAMP"
+            cursor.execute(f"UPDATE {tabela} SET atualizado_em = {origem} WHERE atualizado_em IS NULL")
+            if verbose and cursor.rowcount:
+                print(f"✓ {tabela}: {cursor.rowcount} linha(s) com atualizado_em preenchido")
+            # Mesmo formato texto que o SQLAlchemy grava (com microssegundos):
+            # o cursor de paginação compara (atualizado_em, id) como texto, e
+            # valores sem fração ficariam fora de ordem em relação aos do app
+            cursor.execute(
+                f"UPDATE {tabela} SET atualizado_em = atualizado_em || '.000000' "
+                "WHERE length(atualizado_em) = 19"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {indice} ON {tabela} (atualizado_em, id)")
+
+        if _colunas(cursor, "registro_exclusoes"):
+            cursor.execute(
+                "DELETE FROM registro_exclusoes WHERE excluido_em < datetime('now', ?)",
+                (f"-{RETENCAO_EXCLUSOES_DIAS} days",),
+            )
+
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração da sincronização incremental concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_sincronizacao()
@@ -0,0 +1,105 @@
+"""
+Script de migração do histórico de workflow para a tabela tarefa_evento.
+
+Copia as entradas do antigo campo JSON tarefas.workflow_historico para
+tarefa_evento, apenas para tarefas que ainda não têm eventos (idempotente).
+O JSON é mantido como legado e não é mais gravado. A tabela é criada por
+create_all; o script é chamado na inicialização da aplicação.
+"""
+import json
+import sqlite3
+import os
+from datetime import datetime
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def _tabela_existe(cursor, tabela):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tabela,))
+    return cursor.fetchone() is not None
+
+
+def _timestamp(valor, padrao):
+    """Timestamp ISO do JSON no formato gravado pelo SQLAlchemy (padrao se inválido)"""
+    try:
+        instante = datetime.fromisoformat(str(valor))
+    except (TypeError, ValueError):
+        instante = padrao
+    return instante.replace(tzinfo=None).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def migrar_tarefa_eventos(db_path: str = None, verbose: bool = True):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        if not (_tabela_existe(cursor, "tarefas") and _tabela_existe(cursor, "tarefa_evento")):
+            if verbose:
+                print("⚠ Tabelas tarefas/tarefa_evento ainda não existem; execute create_all antes")
+            return
+
+        cursor.execute("PRAGMA table_info(tarefas)")
+        if "workflow_historico" not in {linha[1] for linha in cursor.fetchall()}:
+            return
+
+        cursor.execute("""
+            SELECT t.id, t.workflow_historico, t.criado_em FROM tarefas t
+            WHERE t.workflow_historico IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM tarefa_evento e WHERE e.tarefa_id = t.id)
+        """)
+        inseridos = 0
+        for tarefa_id, bruto, criado_em in cursor.fetchall():
+            try:
+                historico = json.loads(bruto) if isinstance(bruto, str) else bruto
+            except ValueError:
+                continue
+            if not isinstance(historico, list):
+                continue
+            try:
+                padrao = datetime.fromisoformat(criado_em) if criado_em else datetime.utcnow()
+            except ValueError:
+                padrao = datetime.utcnow()
+            for item in historico:
+                if not isinstance(item, dict) or not item.get("etapa_nova"):
+                    continue
+                tipo = "classificacao" if item["etapa_nova"] == "intimacao_classificada" else "workflow"
+                cursor.execute(
+                    "INSERT INTO tarefa_evento (tarefa_id, tipo, etapa_anterior, etapa_nova, "
+                    "usuario_id, usuario_nome, acao, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        tarefa_id, tipo, item.get("etapa_anterior"), item["etapa_nova"],
+                        item.get("usuario_id"), item.get("usuario_nome"), item.get("acao"),
+                        _timestamp(item.get("timestamp"), padrao),
+                    ),
+                )
+                inseridos += 1
+
+        conn.commit()
+        if verbose:
+            print(f"✓ {inseridos} evento(s) de workflow migrado(s) para tarefa_evento")
+            print("\n✓ Migração do histórico de workflow concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_tarefa_eventos()
@@ -0,0 +1,75 @@
+"""
+Script de migração para armazenar valores monetários em centavos inteiros.
+
+Adiciona a coluna valor_centavos em lancamentos_contabeis, entradas e
+despesas e a preenche a partir de valor (reais). Também normaliza valor
+para exatamente valor_centavos / 100. É idempotente: pode ser executado
+várias vezes e é chamado na inicialização da aplicação.
+"""
+import sqlite3
+import os
+
+TABELAS = ["lancamentos_contabeis", "entradas", "despesas"]
+
+
+def _localizar_banco():
+    possible_paths = [
+        '/app/gestor_ls.db',
+        'gestor_ls.db',
+        os.path.join(os.path.dirname(__file__), '..', 'gestor_ls.db'),
+        os.path.join(os.path.dirname(__file__), 'gestor_ls.db'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return '/app/gestor_ls.db'  # Default
+
+
+def migrar_valores_centavos(db_path: str = None, verbose: bool = True):
+    db_path = db_path or _localizar_banco()
+    if verbose:
+        print(f"Conectando ao banco de dados: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        for tabela in TABELAS:
+            cursor.execute(f"PRAGMA table_info({tabela})")
+            columns = [row[1] for row in cursor.fetchall()]
+            if not columns:
+                # Tabela ainda não criada: create_all já cria com a coluna
+                continue
+
+            if 'valor_centavos' not in columns:
+                if verbose:
+                    print(f"Adicionando coluna valor_centavos em {tabela}...")
+                cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN valor_centavos INTEGER")
+
+            # Preencher a partir de valor (arredondamento para o centavo mais próximo)
+            cursor.execute(
+                f"UPDATE {tabela} SET valor_centavos = CAST(ROUND(valor * 100) AS INTEGER) "
+                f"WHERE valor_centavos IS NULL AND valor IS NOT NULL"
+            )
+            preenchidas = cursor.rowcount
+            # Normalizar valor para o espelho exato em centavos
+            cursor.execute(
+                f"UPDATE {tabela} SET valor = valor_centavos / 100.0 "
+                f"WHERE valor_centavos IS NOT NULL AND valor != valor_centavos / 100.0"
+            )
+            if verbose:
+                print(f"✓ {tabela}: {preenchidas} registro(s) convertido(s), {cursor.rowcount} normalizado(s)")
+
+        conn.commit()
+        if verbose:
+            print("\n✓ Migração de valores em centavos concluída!")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\n✗ Erro durante a migração: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrar_valores_centavos()
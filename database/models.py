@@ -10,11 +10,20 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     Index,
-    JSON
+    JSON,
+    text
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym, validates
 from database.database import Base
 from datetime import datetime
+from utils.dinheiro import para_centavos, para_reais
+
+
+def _sincronizar_centavos(obj, valor):
+    """Mantém valor_centavos em sincronia com valor (reais) e normaliza valor para centavos exatos"""
+    centavos = para_centavos(valor)
+    obj.valor_centavos = centavos
+    return None if centavos is None else para_reais(centavos)
 
 
 class Usuario(Base):
@@ -32,6 +41,12 @@ class Usuario(Base):
 
 class Cliente(Base):
     __tablename__ = "clientes"
+    __table_args__ = (
+        Index('idx_cliente_nome', 'nome', 'id'),
+        Index('idx_cliente_uf', 'uf', 'nome'),
+        Index('idx_cliente_tipo_pessoa', 'tipo_pessoa', 'nome'),
+        Index('idx_cliente_atualizado_em', 'atualizado_em', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
@@ -52,6 +67,7 @@ class Cliente(Base):
     cidade = Column(String)
     uf = Column(String(2))
     cep = Column(String)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     processos = relationship("Processo", back_populates="cliente", cascade="all, delete-orphan")
 
 class Municipio(Base):
@@ -95,6 +111,18 @@ class Feriado(Base):
 
 class Processo(Base):
     __tablename__ = "processos"
+    __table_args__ = (
+        # Índices compostos com id: servem ao filtro e à paginação por cursor
+        Index('idx_processo_numero', 'numero', 'id'),
+        Index('idx_processo_data_abertura', 'data_abertura', 'id'),
+        Index('idx_processo_status', 'status', 'id'),
+        Index('idx_processo_fase', 'fase', 'id'),
+        Index('idx_processo_classe', 'classe', 'id'),
+        Index('idx_processo_esfera', 'esfera_justica', 'id'),
+        Index('idx_processo_municipio', 'municipio_id', 'id'),
+        Index('idx_processo_cliente', 'cliente_id', 'id'),
+        Index('idx_processo_atualizado_em', 'atualizado_em', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     numero = Column(String)
@@ -115,6 +143,7 @@ class Processo(Base):
     data_abertura = Column(String)
     data_fechamento = Column(String)
     cliente_id = Column(Integer, ForeignKey("clientes.id"))
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     cliente = relationship("Cliente", back_populates="processos")
     municipio = relationship("Municipio", back_populates="processos")
     andamentos = relationship("Andamento", cascade="all, delete-orphan")
@@ -124,6 +153,9 @@ class Processo(Base):
 
 class Pagamento(Base):
     __tablename__ = "pagamentos"
+    __table_args__ = (
+        Index('idx_pagamento_processo', 'processo_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     descricao = Column(String)
@@ -157,6 +189,9 @@ class ParticipacaoSocio(Base):
 
 class Andamento(Base):
     __tablename__ = "andamentos"
+    __table_args__ = (
+        Index('idx_andamento_processo', 'processo_id', 'data'),
+    )
 
     id = Column(Integer, primary_key=True)
     processo_id = Column(Integer, ForeignKey("processos.id"))
@@ -177,6 +212,13 @@ class Tarefa(Base):
         Index('idx_tarefa_prazo_fatal', 'prazo_fatal'),
         Index('idx_tarefa_status', 'status'),
         Index('idx_tarefa_responsavel', 'responsavel_id'),
+        Index('idx_tarefa_processo', 'processo_id'),
+        Index('idx_tarefa_atualizado_em', 'atualizado_em', 'id'),
+        # Tarefas abertas com prazo: carga do agendador de alertas de prazo
+        Index(
+            'idx_tarefa_prazos_abertas', 'prazo_fatal', 'prazo_administrativo',
+            sqlite_where=text("status IS NULL OR status NOT IN ('Concluída', 'Cancelada')")
+        ),
     )
 
     id = Column(Integer, primary_key=True)
@@ -191,7 +233,8 @@ class Tarefa(Base):
     
     # Campos de workflow
     etapa_workflow_atual = Column(String(50), default="analise_pendente")
-    workflow_historico = Column(JSON, nullable=True)  # [{etapa, usuario_id, usuario_nome, timestamp, acao}]
+    # Legado: histórico migrado para tarefa_evento; não é mais gravado
+    workflow_historico_legado = Column("workflow_historico", JSON, nullable=True)
     
     # Campos específicos de intimação
     conteudo_intimacao = Column(Text, nullable=True)
@@ -211,22 +254,106 @@ class Tarefa(Base):
     tipo_tarefa = relationship("TipoTarefa")
     responsavel = relationship("Usuario", back_populates="tarefas")
     tarefa_origem = relationship("Tarefa", remote_side=[id], backref="tarefas_derivadas")
+    eventos = relationship(
+        "TarefaEvento", back_populates="tarefa", cascade="all, delete-orphan",
+        order_by="(TarefaEvento.timestamp, TarefaEvento.id)", lazy="selectin",
+    )
+
+    @property
+    def workflow_historico(self):
+        """Histórico de workflow no formato do antigo campo JSON, lido de tarefa_evento"""
+        return [evento.como_item_historico() for evento in self.eventos]
+
+
+class TarefaEvento(Base):
+    """Transição de workflow de uma tarefa (somente inclusão)"""
+    __tablename__ = "tarefa_evento"
+    __table_args__ = (
+        Index('idx_tarefa_evento_tarefa', 'tarefa_id', 'timestamp'),
+        Index('idx_tarefa_evento_usuario', 'usuario_id', 'timestamp'),
+        Index('idx_tarefa_evento_etapa', 'etapa_nova', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tarefa_id = Column(Integer, ForeignKey("tarefas.id"), nullable=False)
+    tipo = Column(String(30), nullable=False, default="workflow")  # workflow, classificacao
+    etapa_anterior = Column(String(50), nullable=True)
+    etapa_nova = Column(String(50), nullable=False)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+    usuario_nome = Column(String(100), nullable=True)
+    acao = Column(Text, nullable=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    tarefa = relationship("Tarefa", back_populates="eventos")
+
+    def como_item_historico(self):
+        return {
+            "etapa_anterior": self.etapa_anterior or "",
+            "etapa_nova": self.etapa_nova,
+            "usuario_id": self.usuario_id or 0,
+            "usuario_nome": self.usuario_nome or "",
+            "timestamp": self.timestamp.isoformat() if self.timestamp else "",
+            "acao": self.acao or "",
+        }
+
+class ArquivoBlob(Base):
+    """Conteúdo de anexo armazenado uma única vez em disco, identificado pelo SHA-256"""
+    __tablename__ = "arquivo_blob"
+    __table_args__ = (
+        Index('idx_arquivo_blob_referencias', 'referencias', 'atualizado_em'),
+        Index('idx_arquivo_blob_extracao', 'extracao_status'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    hash_sha256 = Column(String(64), unique=True, nullable=False)
+    tamanho = Column(Integer, nullable=False)
+    mime = Column(String(100))
+    referencias = Column(Integer, nullable=False, default=0)  # anexos que apontam para o blob
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    atualizado_em = Column(DateTime, default=datetime.utcnow)  # última mudança de referências
+    # Extração de texto/miniatura (utils.extracao_anexos): pendente, concluida, indisponivel, erro
+    extracao_status = Column(String(20), nullable=False, default="pendente", server_default="pendente")
+    paginas = Column(Integer, nullable=True)
+    tem_miniatura = Column(Boolean, nullable=False, default=False, server_default="0")
+
 
 class Anexo(Base):
     __tablename__ = "anexos"
+    __table_args__ = (
+        Index('idx_anexo_blob', 'blob_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     processo_id = Column(Integer, ForeignKey("processos.id"), nullable=True)
     andamento_id = Column(Integer, ForeignKey("andamentos.id"), nullable=True)
     nome_arquivo = Column(String(255)) # Renomeado para consistência
+    nome_original = synonym("nome_arquivo")  # Nome usado pela API
     caminho_arquivo = Column(String(500), nullable=False)
     mime = Column(String(100))
     tamanho = Column(Integer)
     criado_por = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
     criado_em = Column(DateTime, default=datetime.utcnow)
+    blob_id = Column(Integer, ForeignKey("arquivo_blob.id"), nullable=True)  # Nulo em anexos anteriores ao armazenamento por conteúdo
     processo = relationship("Processo")
     andamento = relationship("Andamento")
     criado_por_usuario = relationship("Usuario")
+    blob = relationship("ArquivoBlob")
+
+    @property
+    def hash_sha256(self):
+        return self.blob.hash_sha256 if self.blob else None
+
+    @property
+    def extracao_status(self):
+        return self.blob.extracao_status if self.blob else None
+
+    @property
+    def paginas(self):
+        return self.blob.paginas if self.blob else None
+
+    @property
+    def tem_miniatura(self):
+        return bool(self.blob and self.blob.tem_miniatura)
 
 class TipoAndamento(Base):
     __tablename__ = "tipos_andamento"
@@ -280,6 +407,7 @@ class AporteCapital(Base):
     __tablename__ = "aportes_capital"
     __table_args__ = (
         Index('idx_aporte_socio_data', 'socio_id', 'data'),
+        Index('idx_aporte_atualizado_em', 'atualizado_em', 'id'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -304,21 +432,35 @@ class ConfiguracaoContabil(Base):
 
 class Entrada(Base):
     __tablename__ = "entradas"
+    __table_args__ = (
+        Index('idx_entrada_data', 'data'),
+        Index('idx_entrada_atualizado_em', 'atualizado_em', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cliente = Column(String(255), nullable=False)
     cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=True)  # Link opcional para cliente cadastrado
     data = Column(Date, nullable=False, default=datetime.utcnow)
     valor = Column(Float, nullable=False)
+    valor_centavos = Column(Integer, nullable=True)  # Espelho inteiro de valor (somas exatas)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamento com os sócios e seus percentuais para esta entrada
     socios = relationship("EntradaSocio", back_populates="entrada", cascade="all, delete-orphan")
     lancamentos = relationship("LancamentoContabil", back_populates="entrada", cascade="all, delete-orphan")
     cliente_rel = relationship("Cliente")
 
+    @validates("valor")
+    def _validar_valor(self, key, valor):
+        return _sincronizar_centavos(self, valor)
+
 
 class Despesa(Base):
     __tablename__ = "despesas"
+    __table_args__ = (
+        Index('idx_despesa_data', 'data'),
+        Index('idx_despesa_atualizado_em', 'atualizado_em', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     data = Column(Date, nullable=False, default=datetime.utcnow)
@@ -326,11 +468,17 @@ class Despesa(Base):
     tipo = Column(String(100)) # Ex: Internet, Estagiário
     descricao = Column(Text, nullable=True)
     valor = Column(Float, nullable=False)
+    valor_centavos = Column(Integer, nullable=True)  # Espelho inteiro de valor (somas exatas)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relacionamento com os sócios responsáveis
     responsaveis = relationship("DespesaSocio", back_populates="despesa", cascade="all, delete-orphan")
     lancamentos = relationship("LancamentoContabil", back_populates="despesa", cascade="all, delete-orphan")
 
+    @validates("valor")
+    def _validar_valor(self, key, valor):
+        return _sincronizar_centavos(self, valor)
+
 
 class EntradaSocio(Base):
     __tablename__ = "entradas_socios"
@@ -372,18 +520,23 @@ class PlanoDeContas(Base):
 
 class LancamentoContabil(Base):
     __tablename__ = "lancamentos_contabeis"
+    __table_args__ = (
+        Index('idx_lancamento_atualizado_em', 'atualizado_em', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     data = Column(Date, nullable=False, default=datetime.utcnow, index=True)
     conta_debito_id = Column(Integer, ForeignKey("plano_de_contas.id"), nullable=False)
     conta_credito_id = Column(Integer, ForeignKey("plano_de_contas.id"), nullable=False)
     valor = Column(Float, nullable=False)
+    valor_centavos = Column(Integer, nullable=True)  # Espelho inteiro de valor (somas exatas)
     historico = Column(Text)
     automatico = Column(Boolean, default=True, nullable=False)  # True = gerado automaticamente
     editavel = Column(Boolean, default=True, nullable=False)  # True = pode ser editado
     criado_por = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
     criado_em = Column(DateTime, default=datetime.utcnow)
     editado_em = Column(DateTime, nullable=True)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relacionamentos para rastrear a origem do lançamento
     entrada_id = Column(Integer, ForeignKey("entradas.id"), nullable=True)
@@ -408,6 +561,10 @@ class LancamentoContabil(Base):
     usuario_criador = relationship("Usuario", foreign_keys=[criado_por])
     lancamento_origem = relationship("LancamentoContabil", remote_side="LancamentoContabil.id", foreign_keys=[lancamento_origem_id])
 
+    @validates("valor")
+    def _validar_valor(self, key, valor):
+        return _sincronizar_centavos(self, valor)
+
 
 class ProvisaoEntrada(Base):
     """Tabela para rastrear provisões calculadas por entrada de honorários"""
@@ -519,6 +676,81 @@ class PrevisaoOperacaoMensal(Base):
     data_consolidacao = Column(DateTime, nullable=True)  # Timestamp da consolidação
 
 
+class ResumoMensal(Base):
+    """Agregado mensal de entradas e despesas, mantido pelas operações de CRUD"""
+    __tablename__ = "resumo_mensal"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mes = Column(String(7), nullable=False, unique=True, index=True)  # YYYY-MM
+    receita_centavos = Column(Integer, nullable=False, default=0)  # Soma das entradas do mês
+    despesas_centavos = Column(Integer, nullable=False, default=0)  # Soma das despesas do mês
+    qtd_entradas = Column(Integer, nullable=False, default=0)
+    qtd_despesas = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ResumoMensalSocio(Base):
+    """Contribuição de cada sócio na receita do mês (valor × percentual da entrada)"""
+    __tablename__ = "resumo_mensal_socio"
+    __table_args__ = (
+        UniqueConstraint('mes', 'socio_id', name='uq_resumo_mensal_socio'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    mes = Column(String(7), nullable=False, index=True)  # YYYY-MM
+    socio_id = Column(Integer, ForeignKey("socios.id"), nullable=False)
+    contribuicao_centavos = Column(Integer, nullable=False, default=0)
+
+
+class ResumoProcesso(Base):
+    """Agregados de atividade por processo (tarefas, andamentos e pagamentos), mantidos a cada flush"""
+    __tablename__ = "processo_resumo"
+
+    processo_id = Column(Integer, ForeignKey("processos.id"), primary_key=True)
+    tarefas_abertas = Column(Integer, nullable=False, default=0)  # Status diferente de Concluída/Cancelada
+    total_tarefas = Column(Integer, nullable=False, default=0)
+    proximo_prazo_fatal = Column(Date, nullable=True)  # Menor prazo fatal entre as tarefas abertas
+    ultimo_andamento = Column(Date, nullable=True)
+    qtd_andamentos = Column(Integer, nullable=False, default=0)
+    total_pagamentos = Column(Float, nullable=False, default=0.0)
+    qtd_pagamentos = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RegistroExclusao(Base):
+    """Registro de exclusão (tombstone) para a sincronização incremental (?since=)"""
+    __tablename__ = "registro_exclusoes"
+    __table_args__ = (
+        Index('idx_exclusao_tabela_data', 'tabela', 'excluido_em'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tabela = Column(String(50), nullable=False)
+    registro_id = Column(Integer, nullable=True)  # NULL = exclusão em lote (recarregar tudo)
+    excluido_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AlertaPrazo(Base):
+    """Notificação de prazo de tarefa próximo ou vencido, emitida pelo agendador de prazos"""
+    __tablename__ = "alertas_prazo"
+    __table_args__ = (
+        UniqueConstraint('tarefa_id', 'tipo_prazo', 'prazo', 'nivel', name='uq_alerta_prazo'),
+        Index('idx_alerta_prazo_lido', 'lido', 'criado_em'),
+        Index('idx_alerta_prazo_responsavel', 'responsavel_id', 'lido'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tarefa_id = Column(Integer, ForeignKey("tarefas.id"), nullable=False)
+    processo_id = Column(Integer, ForeignKey("processos.id"), nullable=True)
+    responsavel_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+    tipo_prazo = Column(String(20), nullable=False)  # 'administrativo' ou 'fatal'
+    prazo = Column(Date, nullable=False)
+    nivel = Column(Integer, nullable=False)  # Dias até o prazo no disparo (negativo = vencido)
+    mensagem = Column(String(300), nullable=False)
+    lido = Column(Boolean, default=False, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+
+
 class PagamentoPendente(Base):
     """Modelo simplificado de pagamentos pendentes - substitui a complexidade do sistema contábil"""
     __tablename__ = "pagamentos_pendentes"
@@ -527,6 +759,7 @@ class PagamentoPendente(Base):
         Index('idx_pendente_mes_ano', 'mes_ref', 'ano_ref'),
         Index('idx_pendente_confirmado', 'confirmado'),
         Index('idx_pendente_socio', 'socio_id'),
+        Index('idx_pendente_atualizado_em', 'atualizado_em', 'id'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -560,6 +793,7 @@ class AtivoImobilizado(Base):
         Index('idx_ativo_categoria', 'categoria'),
         Index('idx_ativo_ativo', 'ativo'),
         Index('idx_ativo_elegivel', 'elegivel_depreciacao'),
+        Index('idx_ativo_atualizado_em', 'atualizado_em', 'id'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -613,6 +847,7 @@ class Operacao(Base):
     __table_args__ = (
         Index('idx_operacao_codigo', 'codigo'),
         Index('idx_operacao_ativo', 'ativo'),
+        Index('idx_operacao_atualizado_em', 'atualizado_em', 'id'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -661,3 +896,32 @@ class OperacaoContabil(Base):
     socio = relationship("Socio")
     criado_por = relationship("Usuario")
     lancamentos = relationship("LancamentoContabil", back_populates="operacao_contabil", cascade="all, delete-orphan")
+
+
+class Job(Base):
+    """Trabalho em segundo plano (relatórios, recálculos), executado pela fila de jobs"""
+    __tablename__ = "job"
+    __table_args__ = (
+        Index('idx_job_status', 'status', 'id'),
+        Index('idx_job_tipo', 'tipo', 'criado_em'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(50), nullable=False)  # Tipo registrado em database.fila_jobs
+    status = Column(String(20), nullable=False, default="pendente")  # pendente, executando, concluido, erro, cancelado
+    parametros = Column(JSON, nullable=True)
+    progresso = Column(Integer, nullable=False, default=0)  # 0 a 100
+    mensagem = Column(String(300), nullable=True)  # Etapa atual, informada pelo job
+    resultado = Column(JSON, nullable=True)  # Resultado JSON (jobs sem arquivo)
+    arquivo = Column(String(500), nullable=True)  # Caminho do arquivo gerado
+    nome_arquivo = Column(String(255), nullable=True)  # Nome sugerido no download
+    tipo_arquivo = Column(String(100), nullable=True)  # media type do arquivo
+    erro = Column(Text, nullable=True)
+    tentativas = Column(Integer, nullable=False, default=0)
+    cancelamento_solicitado = Column(Boolean, nullable=False, default=False)
+    executor = Column(String(100), nullable=True)  # host:pid que executa o job
+    heartbeat_em = Column(DateTime, nullable=True)  # Sinal de vida do executor
+    criado_por_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
@@ -10,6 +10,54 @@ from database.database import SessionLocal
 from database import models
 from database import crud_plano_contas
 
+TIPOS_COM_LANCAMENTO = ('dinheiro', 'bens', 'servicos')
+
+
+def aporte_tem_lancamento(db, aporte) -> bool:
+    """Aportes que geram lançamento: procura o lançamento pelo histórico, data e valor"""
+    if aporte.tipo_aporte not in TIPOS_COM_LANCAMENTO:
+        return True
+    socio_nome = aporte.socio.nome if aporte.socio else "N/A"
+    return db.query(models.LancamentoContabil.id).filter(
+        models.LancamentoContabil.historico.like(f"%Aporte de capital%{socio_nome}%"),
+        models.LancamentoContabil.data == aporte.data,
+        models.LancamentoContabil.valor == aporte.valor
+    ).first() is not None
+
+
+def listar_aportes_sem_lancamento(db):
+    aportes = db.query(models.AporteCapital).order_by(models.AporteCapital.data).all()
+    return [a for a in aportes if not aporte_tem_lancamento(db, a)]
+
+
+def criar_lancamentos_aportes(db, aportes) -> int:
+    """Cria (e grava) o lançamento Caixa x Capital Social de cada aporte. Retorna quantos"""
+    conta_caixa = crud_plano_contas.buscar_conta_por_codigo(db, "1.1.1.1")
+    conta_capital = crud_plano_contas.buscar_conta_por_codigo(db, "3.1")
+    if not conta_caixa or not conta_capital:
+        raise ValueError("Contas contábeis 1.1.1.1 e 3.1 não encontradas")
+
+    for aporte in aportes:
+        socio_nome = aporte.socio.nome if aporte.socio else "N/A"
+        historico = f"Aporte de capital - {socio_nome} - {aporte.tipo_aporte}"
+        if aporte.descricao:
+            historico += f" - {aporte.descricao}"
+        
+        crud_plano_contas.criar_lancamento(
+            db=db,
+            data=aporte.data,
+            conta_debito_id=conta_caixa.id,
+            conta_credito_id=conta_capital.id,
+            valor=aporte.valor,
+            historico=historico,
+            automatico=True,
+            editavel=False,
+            criado_por=None
+        )
+    db.commit()
+    return len(aportes)
+
+
 def verificar_e_corrigir_aportes():
     db = SessionLocal()
     
@@ -39,15 +87,8 @@ def verificar_e_corrigir_aportes():
                 total_bens += aporte.valor
             
             # Verificar se existe lançamento contábil
-            if aporte.tipo_aporte in ['dinheiro', 'bens', 'servicos']:
-                lancamento = db.query(models.LancamentoContabil).filter(
-                    models.LancamentoContabil.historico.like(f"%Aporte de capital%{socio_nome}%"),
-                    models.LancamentoContabil.data == aporte.data,
-                    models.LancamentoContabil.valor == aporte.valor
-                ).first()
-                
-                if not lancamento:
-                    aportes_sem_lancamento.append(aporte)
+            if not aporte_tem_lancamento(db, aporte):
+                aportes_sem_lancamento.append(aporte)
         
         print("-" * 110)
         print(f"\n💰 Total em dinheiro: R$ {total_dinheiro:.2f}")
@@ -78,36 +119,18 @@ def verificar_e_corrigir_aportes():
             if resposta.lower() == 's':
                 print("\n🔄 Criando lançamentos contábeis...")
                 
-                conta_caixa = crud_plano_contas.buscar_conta_por_codigo(db, "1.1.1.1")
-                conta_capital = crud_plano_contas.buscar_conta_por_codigo(db, "3.1")
-                
-                if not conta_caixa or not conta_capital:
-                    print("❌ Erro: Contas contábeis não encontradas!")
+                try:
+                    criar_lancamentos_aportes(db, aportes_sem_lancamento)
+                except ValueError as e:
+                    print(f"❌ Erro: {e}")
                     return
-                
                 for aporte in aportes_sem_lancamento:
-                    socio_nome = aporte.socio.nome if aporte.socio else "N/A"
-                    historico = f"Aporte de capital - {socio_nome} - {aporte.tipo_aporte}"
-                    if aporte.descricao:
-                        historico += f" - {aporte.descricao}"
-                    
-                    crud_plano_contas.criar_lancamento(
-                        db=db,
-                        data=aporte.data,
-                        conta_debito_id=conta_caixa.id,
-                        conta_credito_id=conta_capital.id,
-                        valor=aporte.valor,
-                        historico=historico,
-                        automatico=True,
-                        editavel=False,
-                        criado_por=None
-                    )
                     print(f"   ✅ Criado lançamento para aporte ID {aporte.id}")
-                
-                db.commit()
                 print("\n✅ Lançamentos criados com sucesso!")
                 
                 # Verificar novos saldos
+                conta_caixa = crud_plano_contas.buscar_conta_por_codigo(db, "1.1.1.1")
+                conta_capital = crud_plano_contas.buscar_conta_por_codigo(db, "3.1")
                 saldo_capital = crud_plano_contas.calcular_saldo_conta(db, conta_capital.id)
                 saldo_caixa = crud_plano_contas.calcular_saldo_conta(db, conta_caixa.id)
                 
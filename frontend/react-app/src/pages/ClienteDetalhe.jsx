@@ -30,12 +30,10 @@ export default function ClienteDetalhe() {
 
   const fetchProcessos = useCallback(async () => {
     try {
-      const res = await fetch(`${apiBase}/processos`);
+      // Filtra processos deste cliente no servidor
+      const res = await fetch(`${apiBase}/processos?cliente_id=${clienteId}`);
       if (!res.ok) throw new Error(`Erro na API: ${res.status}`);
-      const allProcessos = await res.json();
-      // Filtra processos deste cliente
-      const processosDoCliente = allProcessos.filter(p => p.cliente_id === parseInt(clienteId));
-      setProcessos(processosDoCliente);
+      setProcessos(await res.json());
     } catch (err) {
       console.error(err);
     }
@@ -4,15 +4,37 @@ Consolida todos os roteadores e configura a aplicação.
 """
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path as PathLib
 from database.database import engine
 from database import models
+from utils import metricas
 
 # Função para criar as tabelas no banco de dados
 def create_database():
     models.Base.metadata.create_all(bind=engine)
+    # Migrações idempotentes de colunas adicionadas após a criação do banco
+    from database.migrar_valores_centavos import migrar_valores_centavos
+    migrar_valores_centavos(engine.url.database, verbose=False)
+    from database.migrar_resumo_mensal import migrar_resumo_mensal
+    migrar_resumo_mensal(engine.url.database, verbose=False)
+    # Antes do índice de busca, que lê anexos.blob_id e arquivo_blob
+    from database.migrar_anexos_blob import migrar_anexos_blob
+    migrar_anexos_blob(engine.url.database, verbose=False)
+    from database.migrar_indice_busca import migrar_indice_busca
+    migrar_indice_busca(engine.url.database, verbose=False)
+    from database.migrar_indices_listagem import migrar_indices_listagem
+    migrar_indices_listagem(engine.url.database, verbose=False)
+    from database.migrar_processo_resumo import migrar_processo_resumo
+    migrar_processo_resumo(engine.url.database, verbose=False)
+    from database.migrar_alertas_prazo import migrar_alertas_prazo
+    migrar_alertas_prazo(engine.url.database, verbose=False)
+    from database.migrar_sincronizacao import migrar_sincronizacao
+    migrar_sincronizacao(engine.url.database, verbose=False)
+    from database.migrar_tarefa_eventos import migrar_tarefa_eventos
+    migrar_tarefa_eventos(engine.url.database, verbose=False)
 
 # --- Lifespan para gerenciar eventos de inicialização e desligamento ---
 @asynccontextmanager
@@ -21,7 +43,18 @@ async def lifespan(app: FastAPI):
     print("✓ Iniciando GESTOR_LS...")
     create_database()
     print("✓ Banco de dados pronto")
+    from database.database import SessionLocal
+    from database import agendador_prazos
+    if agendador_prazos.iniciar_agendador(SessionLocal):
+        print("✓ Agendador de prazos iniciado")
+    from database import fila_jobs
+    if fila_jobs.iniciar_fila(SessionLocal):
+        print("✓ Fila de jobs iniciada")
     yield
+    agendador_prazos.parar_agendador()
+    fila_jobs.parar_fila()
+    from utils.exportacao import encerrar_processos_relatorios
+    encerrar_processos_relatorios()
     # Código a ser executado quando a aplicação for desligada
     print("✓ Aplicação encerrada.")
 
@@ -49,10 +82,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Proximo-Cursor"],  # cursor da paginação das listagens
 )
 
 print("✓ CORS configurado")
 
+# --- Métricas (latência por rota e comandos SQL por requisição) ---
+metricas.instrumentar_engine(engine)
+app.add_middleware(metricas.MiddlewareMetricas)
+
+
+@app.get("/metrics", include_in_schema=False)
+def exportar_metricas():
+    """Métricas no formato texto do Prometheus."""
+    return PlainTextResponse(metricas.registro.exportar(), media_type="text/plain; version=0.0.4")
+
 # --- Importar e registrar roteadores do backend ---
 from backend.main import api_router, config_router
 
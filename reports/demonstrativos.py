@@ -0,0 +1,336 @@
+"""
+Montagem dos demonstrativos contábeis para exportação (Excel e PDF).
+
+Cada demonstrativo é calculado pelos motores já usados nas telas
+(gerar_balanco_patrimonial, calcular_dmpl, calcular_dfc, previsão da
+operação e lançamentos) e convertido numa tabela neutra:
+
+    {
+        "titulo": str,
+        "subtitulo": str,
+        "colunas": [{"titulo": str, "tipo": "texto" | "moeda" | "data"}],
+        "linhas": iterável de {"valores": [...], "nivel": int, "destaque": bool},
+    }
+
+que relatorios_excel e relatorios_pdf sabem escrever. Balanço, DFC e DRE
+têm uma coluna por mês do intervalo pedido.
+"""
+import calendar
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session, aliased
+
+from database import models
+from database import crud_contabilidade
+from database import crud_plano_contas
+
+NOMES_MESES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+# Lançamentos lidos por vez no razão
+LOTE_RAZAO = 1000
+
+
+def _linha(valores: List[Any], nivel: int = 0, destaque: bool = False) -> Dict[str, Any]:
+    return {"valores": valores, "nivel": nivel, "destaque": destaque}
+
+
+def _colunas_meses(ano: int, mes_inicio: int, mes_fim: int, primeira: str) -> List[Dict[str, str]]:
+    colunas = [{"titulo": primeira, "tipo": "texto"}]
+    colunas += [
+        {"titulo": f"{NOMES_MESES[m - 1]}/{ano}", "tipo": "moeda"} for m in range(mes_inicio, mes_fim + 1)
+    ]
+    return colunas
+
+
+def _periodo(ano: int, mes_inicio: int, mes_fim: int) -> str:
+    if mes_inicio == mes_fim:
+        return f"{NOMES_MESES[mes_inicio - 1]}/{ano}"
+    return f"{NOMES_MESES[mes_inicio - 1]} a {NOMES_MESES[mes_fim - 1]}/{ano}"
+
+
+# ===== PARÂMETROS =====
+
+def normalizar_parametros(
+    relatorio: str,
+    ano: Optional[int] = None,
+    mes_inicio: Optional[int] = None,
+    mes_fim: Optional[int] = None,
+    ano_fim: Optional[int] = None,
+    conta_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+) -> Dict[str, Any]:
+    """
+    Valida e completa os parâmetros do demonstrativo (ValueError se
+    inválidos). O resultado é canônico: só contém o que o demonstrativo usa,
+    para servir de chave do cache de arquivos.
+    """
+    if relatorio not in RELATORIOS:
+        raise ValueError(f"Relatório inválido. Use: {', '.join(RELATORIOS)}")
+
+    ano = ano or date.today().year
+    if relatorio == "dmpl":
+        ano_fim = ano_fim or ano
+        if ano_fim < ano:
+            raise ValueError("ano_fim deve ser maior ou igual a ano")
+        return {"ano": ano, "ano_fim": ano_fim}
+
+    if relatorio == "razao":
+        data_inicio = data_inicio or date(ano, mes_inicio or 1, 1)
+        if data_fim is None:
+            mes = mes_fim or 12
+            data_fim = date(ano, mes, calendar.monthrange(ano, mes)[1])
+        if data_fim < data_inicio:
+            raise ValueError("data_fim deve ser maior ou igual a data_inicio")
+        return {"data_inicio": data_inicio.isoformat(), "data_fim": data_fim.isoformat(), "conta_id": conta_id}
+
+    mes_inicio = mes_inicio or 1
+    mes_fim = mes_fim or 12
+    if not (1 <= mes_inicio <= mes_fim <= 12):
+        raise ValueError("Intervalo de meses inválido (1 <= mes_inicio <= mes_fim <= 12)")
+    return {"ano": ano, "mes_inicio": mes_inicio, "mes_fim": mes_fim}
+
+
+# ===== BALANÇO PATRIMONIAL =====
+
+def _achatar_hierarquia(grupos, saldos_por_codigo: Dict[str, Dict[int, float]], mes: int, ordem: List[tuple]):
+    for conta in grupos:
+        saldos_por_codigo.setdefault(conta["codigo"], {})[mes] = conta["saldo"]
+        if not any(c == conta["codigo"] for c, _, _ in ordem):
+            ordem.append((conta["codigo"], conta["nome"], conta["nivel"]))
+        _achatar_hierarquia(conta.get("subgrupos") or [], saldos_por_codigo, mes, ordem)
+
+
+def montar_balanco(db: Session, ano: int, mes_inicio: int, mes_fim: int) -> Dict[str, Any]:
+    meses = list(range(mes_inicio, mes_fim + 1))
+    balancos = {m: crud_plano_contas.gerar_balanco_patrimonial(db, m, ano) for m in meses}
+
+    linhas = []
+    for chave, rotulo_total in (
+        ("ativo", "TOTAL DO ATIVO"),
+        ("passivo", "TOTAL DO PASSIVO"),
+        ("patrimonioLiquido", "TOTAL DO PATRIMÔNIO LÍQUIDO"),
+    ):
+        saldos: Dict[str, Dict[int, float]] = {}
+        ordem: List[tuple] = []
+        for m in meses:
+            _achatar_hierarquia(balancos[m][chave], saldos, m, ordem)
+        for codigo, nome, nivel in ordem:
+            linhas.append(_linha(
+                [f"{codigo} {nome}"] + [saldos[codigo].get(m, 0.0) for m in meses],
+                nivel=max(nivel - 1, 0),
+                destaque=nivel == 1,
+            ))
+        linhas.append(_linha([rotulo_total] + [balancos[m]["totais"][chave] for m in meses], destaque=True))
+        linhas.append(_linha([""] + [None for _ in meses]))
+    linhas.append(_linha(
+        ["PASSIVO + PATRIMÔNIO LÍQUIDO"] + [balancos[m]["totais"]["passivoMaisPl"] for m in meses],
+        destaque=True,
+    ))
+
+    return {
+        "titulo": "Balanço Patrimonial",
+        "subtitulo": f"Saldos no fim de cada mês — {_periodo(ano, mes_inicio, mes_fim)}",
+        "colunas": _colunas_meses(ano, mes_inicio, mes_fim, "Conta"),
+        "linhas": linhas,
+    }
+
+
+# ===== DMPL =====
+
+def montar_dmpl(db: Session, ano: int, ano_fim: int) -> Dict[str, Any]:
+    dmpl = crud_contabilidade.calcular_dmpl(db, ano, ano_fim)
+    campos = ("capital_social", "reservas", "lucros_acumulados", "total")
+
+    linhas = [_linha(["Saldo inicial"] + [dmpl["saldo_inicial"][c] for c in campos], destaque=True)]
+    for mov in dmpl["movimentacoes"]:
+        linhas.append(_linha([mov["descricao"]] + [mov[c] for c in campos], nivel=1))
+    linhas.append(_linha(["Saldo final"] + [dmpl["saldo_final"][c] for c in campos], destaque=True))
+
+    periodo = str(ano) if ano == ano_fim else f"{ano} a {ano_fim}"
+    return {
+        "titulo": "Demonstração das Mutações do Patrimônio Líquido",
+        "subtitulo": f"Exercício {periodo}",
+        "colunas": [
+            {"titulo": "Movimentação", "tipo": "texto"},
+            {"titulo": "Capital Social", "tipo": "moeda"},
+            {"titulo": "Reservas", "tipo": "moeda"},
+            {"titulo": "Lucros Acumulados", "tipo": "moeda"},
+            {"titulo": "Total", "tipo": "moeda"},
+        ],
+        "linhas": linhas,
+    }
+
+
+# ===== DFC =====
+
+LINHAS_DFC = [
+    ("operacionais", "Atividades operacionais", [
+        ("recebimentos_clientes", "Recebimentos de clientes"),
+        ("pagamentos_fornecedores", "Pagamentos a fornecedores"),
+        ("pagamentos_salarios", "Pagamentos de salários e pró-labore"),
+        ("pagamentos_impostos", "Pagamentos de impostos"),
+        ("outras_receitas", "Outras receitas"),
+        ("outras_despesas", "Outras despesas"),
+    ]),
+    ("investimentos", "Atividades de investimento", [
+        ("aquisicao_imobilizado", "Aquisição de imobilizado"),
+        ("venda_imobilizado", "Venda de imobilizado"),
+        ("aplicacoes_financeiras", "Aplicações financeiras"),
+        ("resgate_aplicacoes", "Resgate de aplicações"),
+    ]),
+    ("financiamentos", "Atividades de financiamento", [
+        ("aumento_capital", "Aumento de capital"),
+        ("emprestimos_obtidos", "Empréstimos obtidos"),
+        ("pagamento_emprestimos", "Pagamento de empréstimos"),
+        ("distribuicao_dividendos", "Distribuição de lucros"),
+    ]),
+]
+
+
+def montar_dfc(db: Session, ano: int, mes_inicio: int, mes_fim: int) -> Dict[str, Any]:
+    meses = list(range(mes_inicio, mes_fim + 1))
+    dfcs = [crud_contabilidade.calcular_dfc(db, m, ano) for m in meses]
+
+    linhas = [_linha(["Saldo inicial de caixa"] + [d["saldo_inicial"] for d in dfcs], destaque=True)]
+    for grupo, titulo, itens in LINHAS_DFC:
+        linhas.append(_linha([titulo] + [d[grupo]["total"] for d in dfcs], destaque=True))
+        for chave, rotulo in itens:
+            linhas.append(_linha([rotulo] + [d[grupo].get(chave, 0.0) for d in dfcs], nivel=1))
+    linhas.append(_linha(["Variação líquida de caixa"] + [d["variacao_liquida"] for d in dfcs], destaque=True))
+    linhas.append(_linha(["Saldo final de caixa"] + [d["saldo_final"] for d in dfcs], destaque=True))
+
+    return {
+        "titulo": "Demonstração dos Fluxos de Caixa (método direto)",
+        "subtitulo": _periodo(ano, mes_inicio, mes_fim),
+        "colunas": _colunas_meses(ano, mes_inicio, mes_fim, "Fluxo"),
+        "linhas": linhas,
+    }
+
+
+# ===== DRE / PREVISÃO DA OPERAÇÃO =====
+
+LINHAS_DRE = [
+    ("receita_bruta", "Receita bruta", 0, True),
+    ("imposto", "(-) Simples Nacional", 1, False),
+    ("despesas_gerais", "(-) Despesas gerais", 1, False),
+    ("pro_labore_bruto", "(-) Pró-labore bruto", 1, False),
+    ("inss_patronal", "(-) INSS patronal", 1, False),
+    ("lucro_liquido", "Lucro líquido", 0, True),
+    ("reserva_legal", "(-) Reserva legal (10%)", 1, False),
+    ("lucro_distribuivel", "Lucro distribuível", 0, True),
+]
+
+
+def montar_dre(db: Session, ano: int, mes_inicio: int, mes_fim: int) -> Dict[str, Any]:
+    previsao = crud_contabilidade.calcular_previsao_operacao_ano(db, ano, calcular_tempo_real=True)
+    meses = previsao[mes_inicio - 1:mes_fim]
+
+    linhas = []
+    for chave, rotulo, nivel, destaque in LINHAS_DRE:
+        valores = [m.get(chave, 0.0) for m in meses]
+        linhas.append(_linha([rotulo] + valores + [sum(valores)], nivel=nivel, destaque=destaque))
+    linhas.append(_linha(["Mês consolidado"] + ["Sim" if m["consolidado"] else "Não" for m in meses] + [""]))
+
+    colunas = _colunas_meses(ano, mes_inicio, mes_fim, "DRE")
+    colunas.append({"titulo": "Total", "tipo": "moeda"})
+    return {
+        "titulo": "Demonstração do Resultado (Previsão da Operação)",
+        "subtitulo": f"{_periodo(ano, mes_inicio, mes_fim)} — meses não consolidados calculados em tempo real",
+        "colunas": colunas,
+        "linhas": linhas,
+    }
+
+
+# ===== RAZÃO =====
+
+def _linhas_razao(db: Session, data_inicio: date, data_fim: date, conta_id: Optional[int],
+                  conta: Optional[crud_plano_contas.ContaResumo]) -> Iterator[Dict[str, Any]]:
+    lanc = models.LancamentoContabil
+    debito = aliased(models.PlanoDeContas)
+    credito = aliased(models.PlanoDeContas)
+    query = db.query(
+        lanc.data, lanc.id, lanc.historico, lanc.valor, lanc.conta_debito_id,
+        debito.codigo.label("debito"), credito.codigo.label("credito"),
+    ).outerjoin(debito, debito.id == lanc.conta_debito_id).outerjoin(
+        credito, credito.id == lanc.conta_credito_id
+    ).filter(lanc.data >= data_inicio, lanc.data <= data_fim)
+
+    if conta is None:
+        total = 0.0
+        for l in query.order_by(lanc.data, lanc.id).yield_per(LOTE_RAZAO):
+            total += l.valor or 0.0
+            yield _linha([l.data, l.id, l.historico or "", l.debito or "", l.credito or "", l.valor])
+        yield _linha(["Total", None, "", "", "", total], destaque=True)
+        return
+
+    query = query.filter((lanc.conta_debito_id == conta_id) | (lanc.conta_credito_id == conta_id))
+    devedora = (conta.natureza or "").upper() in ("D", "DEVEDORA")
+    saldo = crud_plano_contas.calcular_saldo_conta(db, conta_id, None, date.fromordinal(data_inicio.toordinal() - 1))
+    yield _linha([data_inicio, None, "Saldo anterior", "", None, None, saldo], destaque=True)
+    total_debitos = total_creditos = 0.0
+    for l in query.order_by(lanc.data, lanc.id).yield_per(LOTE_RAZAO):
+        valor = l.valor or 0.0
+        if l.conta_debito_id == conta_id:
+            contrapartida, valor_debito, valor_credito = l.credito, valor, None
+            total_debitos += valor
+            saldo += valor if devedora else -valor
+        else:
+            contrapartida, valor_debito, valor_credito = l.debito, None, valor
+            total_creditos += valor
+            saldo += -valor if devedora else valor
+        yield _linha([l.data, l.id, l.historico or "", contrapartida or "", valor_debito, valor_credito, saldo])
+    yield _linha([data_fim, None, "Totais / saldo final", "", total_debitos, total_creditos, saldo], destaque=True)
+
+
+def montar_razao(db: Session, data_inicio: str, data_fim: str, conta_id: Optional[int]) -> Dict[str, Any]:
+    inicio, fim = date.fromisoformat(data_inicio), date.fromisoformat(data_fim)
+    periodo = f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}"
+
+    if conta_id is None:
+        return {
+            "titulo": "Livro Razão — todos os lançamentos",
+            "subtitulo": periodo,
+            "colunas": [
+                {"titulo": "Data", "tipo": "data"},
+                {"titulo": "Nº", "tipo": "texto"},
+                {"titulo": "Histórico", "tipo": "texto"},
+                {"titulo": "Débito", "tipo": "texto"},
+                {"titulo": "Crédito", "tipo": "texto"},
+                {"titulo": "Valor", "tipo": "moeda"},
+            ],
+            "linhas": _linhas_razao(db, inicio, fim, None, None),
+        }
+
+    conta = crud_plano_contas.obter_conta_cache_por_id(db, conta_id)
+    if conta is None:
+        raise ValueError(f"Conta {conta_id} não encontrada")
+    return {
+        "titulo": f"Livro Razão — {conta.codigo} {conta.descricao}",
+        "subtitulo": f"{periodo} — natureza {conta.natureza}",
+        "colunas": [
+            {"titulo": "Data", "tipo": "data"},
+            {"titulo": "Nº", "tipo": "texto"},
+            {"titulo": "Histórico", "tipo": "texto"},
+            {"titulo": "Contrapartida", "tipo": "texto"},
+            {"titulo": "Débito", "tipo": "moeda"},
+            {"titulo": "Crédito", "tipo": "moeda"},
+            {"titulo": "Saldo", "tipo": "moeda"},
+        ],
+        "linhas": _linhas_razao(db, inicio, fim, conta_id, conta),
+    }
+
+
+# Relatório → função de montagem (recebe os parâmetros de normalizar_parametros)
+RELATORIOS = {
+    "balanco": montar_balanco,
+    "dmpl": montar_dmpl,
+    "dfc": montar_dfc,
+    "dre": montar_dre,
+    "razao": montar_razao,
+}
+
+
+def montar_relatorio(db: Session, relatorio: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    return RELATORIOS[relatorio](db, **parametros)
@@ -0,0 +1,187 @@
+"""
+Geração dos demonstrativos contábeis em arquivo, com cache em disco.
+
+Os arquivos são gerados num processo de relatórios
+(utils.exportacao.executar_em_processo) e guardados em disco sob uma chave
+(relatório, formato, parâmetros, versão do razão). A versão do razão é uma
+impressão digital barata das tabelas que alimentam os demonstrativos
+(contagens, maiores ids e carimbos de alteração, e o conteúdo das tabelas
+pequenas de configuração): qualquer lançamento, entrada, despesa,
+exclusão, consolidação ou mudança no plano de contas muda a versão, e o
+download seguinte gera um arquivo novo. Sem mudanças, o arquivo em cache é
+devolvido imediatamente.
+
+Pedidos simultâneos do mesmo arquivo aguardam uma única geração.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import models
+
+FORMATOS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+DIRETORIO_CACHE = os.environ.get(
+    "GESTOR_CACHE_RELATORIOS", os.path.join(tempfile.gettempdir(), "gestor_ls_relatorios")
+)
+LIMITE_ARQUIVOS_CACHE = 200  # arquivos mais antigos (por acesso) são removidos além disto
+
+# Gerações em andamento: chave → Future (no event loop da API)
+_em_andamento: Dict[str, asyncio.Future] = {}
+
+
+# ===== VERSÃO DO RAZÃO =====
+
+def versao_razao(db: Session) -> str:
+    """Impressão digital dos dados usados pelos demonstrativos (uma consulta por tabela)"""
+    partes = []
+    for modelo in (models.LancamentoContabil, models.Entrada, models.Despesa):
+        partes.append(db.query(
+            func.count(modelo.id), func.max(modelo.id), func.max(modelo.atualizado_em)
+        ).one())
+    partes.append(db.query(func.max(models.RegistroExclusao.id)).one())
+    partes.append(db.query(
+        func.count(models.PrevisaoOperacaoMensal.id),
+        func.max(models.PrevisaoOperacaoMensal.data_consolidacao),
+        func.sum(models.PrevisaoOperacaoMensal.consolidado),
+    ).one())
+    partes.append(db.query(func.max(models.ResumoMensal.atualizado_em)).one())
+
+    # Tabelas pequenas sem carimbo de alteração: conteúdo inteiro
+    c = models.PlanoDeContas
+    partes.append(db.query(
+        c.id, c.codigo, c.descricao, c.tipo, c.natureza, c.pai_id, c.nivel, c.aceita_lancamento, c.ativo
+    ).order_by(c.id).all())
+    partes.append(db.query(models.SimplesFaixa.__table__).order_by(models.SimplesFaixa.id).all())
+    partes.append(db.query(models.ConfiguracaoContabil.__table__).order_by(models.ConfiguracaoContabil.id).all())
+
+    texto = json.dumps([[list(linha) for linha in p] if isinstance(p, list) else list(p) for p in partes],
+                       default=str, separators=(",", ":"))
+    return hashlib.sha256(texto.encode()).hexdigest()[:16]
+
+
+# ===== CACHE EM DISCO =====
+
+def chave_cache(relatorio: str, formato: str, parametros: Dict[str, Any], versao: str) -> str:
+    texto = json.dumps([relatorio, formato, parametros, versao], sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def caminho_cache(relatorio: str, formato: str, chave: str) -> str:
+    return os.path.join(DIRETORIO_CACHE, f"{relatorio}_{chave[:32]}.{formato}")
+
+
+def _podar_cache() -> None:
+    try:
+        arquivos = [os.path.join(DIRETORIO_CACHE, nome) for nome in os.listdir(DIRETORIO_CACHE)]
+    except FileNotFoundError:
+        return
+    arquivos = [a for a in arquivos if not a.endswith(".tmp")]
+    if len(arquivos) <= LIMITE_ARQUIVOS_CACHE:
+        return
+    arquivos.sort(key=lambda a: os.path.getmtime(a) if os.path.exists(a) else 0)
+    for arquivo in arquivos[:len(arquivos) - LIMITE_ARQUIVOS_CACHE]:
+        try:
+            os.remove(arquivo)
+        except FileNotFoundError:
+            pass
+
+
+# ===== GERAÇÃO =====
+
+def gerar_arquivo_relatorio(url_banco: str, relatorio: str, formato: str,
+                            parametros: Dict[str, Any], destino: str) -> str:
+    """
+    Monta o demonstrativo e o escreve em destino (via arquivo temporário e
+    rename, para que um arquivo parcial nunca seja servido do cache).
+
+    Abre a própria conexão a partir de url_banco para rodar num processo de
+    relatórios; os índices em memória do processo são descartados antes,
+    pois o processo é reaproveitado entre pedidos.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database import crud_plano_contas
+    from utils.simples import invalidar_tabela_simples
+    from reports import demonstrativos
+    from reports.relatorios_excel import escrever_relatorio_excel
+    from reports.relatorios_pdf import escrever_relatorio_pdf
+
+    crud_plano_contas.invalidar_cache_plano_contas()
+    invalidar_tabela_simples()
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    engine = create_engine(url_banco)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        dados = demonstrativos.montar_relatorio(db, relatorio, parametros)
+        if formato == "xlsx":
+            escrever_relatorio_excel(dados, temporario)
+        else:
+            escrever_relatorio_pdf(dados, temporario)
+        os.replace(temporario, destino)
+    except Exception:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    finally:
+        db.close()
+        engine.dispose()
+    return destino
+
+
+async def obter_relatorio(url_banco: str, relatorio: str, formato: str,
+                          parametros: Dict[str, Any], versao: str) -> Tuple[str, bool]:
+    """
+    Caminho do arquivo do demonstrativo, gerando-o num processo de relatórios
+    se não estiver em cache.
+
+    Returns:
+        (caminho, veio_do_cache)
+    """
+    from utils.exportacao import executar_em_processo
+
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido. Use: {', '.join(FORMATOS)}")
+
+    chave = chave_cache(relatorio, formato, parametros, versao)
+    destino = caminho_cache(relatorio, formato, chave)
+    if os.path.exists(destino):
+        # mtime marca o último acesso para a poda
+        os.utime(destino)
+        return destino, True
+
+    pendente = _em_andamento.get(chave)
+    if pendente is not None:
+        return await asyncio.shield(pendente), False
+
+    futuro = asyncio.get_running_loop().create_future()
+    _em_andamento[chave] = futuro
+    try:
+        caminho = await executar_em_processo(
+            gerar_arquivo_relatorio, url_banco, relatorio, formato, parametros, destino
+        )
+        futuro.set_result(caminho)
+    except asyncio.CancelledError:
+        futuro.cancel()
+        raise
+    except Exception as erro:
+        futuro.set_exception(erro)
+        # Evita o aviso de exceção não recuperada quando ninguém mais aguarda
+        futuro.exception()
+        raise
+    finally:
+        _em_andamento.pop(chave, None)
+
+    _podar_cache()
+    return caminho, False
@@ -0,0 +1,88 @@
+"""
+Escrita dos demonstrativos contábeis (reports.demonstrativos) em Excel.
+
+A planilha é gravada em modo write-only: as linhas do demonstrativo (o
+razão pode ter dezenas de milhares) vão direto para o arquivo, sem manter
+a pasta de trabalho em memória.
+"""
+from datetime import date
+from typing import Any, Dict
+
+FORMATO_MOEDA = '#,##0.00;[Red]-#,##0.00'
+FORMATO_DATA = 'DD/MM/YYYY'
+LARGURA_PRIMEIRA_COLUNA = 48
+LARGURA_COLUNA_VALOR = 15
+
+
+def escrever_relatorio_excel(relatorio: Dict[str, Any], destino) -> int:
+    """
+    Escreve o demonstrativo no destino (caminho ou arquivo binário).
+
+    Returns:
+        Quantidade de linhas escritas
+    """
+    try:
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
+    except ImportError:
+        raise ImportError("openpyxl não está instalado. Execute: pip install openpyxl")
+
+    colunas = relatorio["colunas"]
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(relatorio["titulo"][:31])
+    for col, coluna in enumerate(colunas, start=1):
+        if col == 1 and coluna["tipo"] == "texto":
+            largura = LARGURA_PRIMEIRA_COLUNA
+        elif coluna["tipo"] == "texto" and coluna["titulo"] == "Histórico":
+            largura = LARGURA_PRIMEIRA_COLUNA
+        else:
+            largura = LARGURA_COLUNA_VALOR
+        ws.column_dimensions[get_column_letter(col)].width = largura
+    ws.freeze_panes = "B5"
+
+    # Título, subtítulo e cabeçalho
+    titulo = WriteOnlyCell(ws, value=relatorio["titulo"])
+    titulo.font = Font(bold=True, size=14, color="366092")
+    ws.append([titulo])
+    ws.append([relatorio.get("subtitulo", "")])
+    ws.append([])
+
+    fonte = Font(bold=True, color="FFFFFF")
+    preenchimento = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    cabecalho = []
+    for coluna in colunas:
+        cell = WriteOnlyCell(ws, value=coluna["titulo"])
+        cell.font = fonte
+        cell.fill = preenchimento
+        cell.alignment = Alignment(horizontal="center")
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+
+    # Estilos reaproveitados (um objeto por combinação, não por célula)
+    negrito = Font(bold=True)
+    recuos = {}
+
+    total = 0
+    for linha in relatorio["linhas"]:
+        nivel, destaque = linha.get("nivel", 0), linha.get("destaque", False)
+        celulas = []
+        for indice, (valor, coluna) in enumerate(zip(linha["valores"], colunas)):
+            cell = WriteOnlyCell(ws, value=valor)
+            if coluna["tipo"] == "moeda" and isinstance(valor, (int, float)):
+                cell.number_format = FORMATO_MOEDA
+            elif coluna["tipo"] == "data" and isinstance(valor, date):
+                cell.number_format = FORMATO_DATA
+            if indice == 0 and nivel:
+                if nivel not in recuos:
+                    recuos[nivel] = Alignment(indent=nivel)
+                cell.alignment = recuos[nivel]
+            if destaque:
+                cell.font = negrito
+            celulas.append(cell)
+        ws.append(celulas)
+        total += 1
+
+    wb.save(destino)
+    return total
@@ -0,0 +1,162 @@
+"""
+Escrita dos demonstrativos contábeis (reports.demonstrativos) em PDF.
+
+Segue o relatório de tarefas (utils.exportacao): A4 paisagem, uma tabela
+por página gerada sob demanda (FlowablesSobDemanda), de modo que o razão
+com muitos lançamentos não é montado inteiro numa única Table.
+"""
+from datetime import date
+from typing import Any, Dict, Iterator, List
+
+from utils.exportacao import FlowablesSobDemanda
+
+LINHAS_POR_PAGINA = 30
+LINHAS_PRIMEIRA_PAGINA = 26  # título e subtítulo ocupam o topo da primeira página
+ALTURA_LINHA = 15
+RECUO_POR_NIVEL = 8  # pontos
+
+
+def formatar_moeda(valor) -> str:
+    """Valor no formato brasileiro (1.234,56; negativos entre parênteses)"""
+    if valor is None:
+        return ""
+    texto = f"{abs(valor):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"({texto})" if valor < 0 else texto
+
+
+def _formatar(valor, tipo: str) -> str:
+    if valor is None:
+        return ""
+    if tipo == "moeda" and isinstance(valor, (int, float)):
+        return formatar_moeda(valor)
+    if isinstance(valor, date):
+        return valor.strftime("%d/%m/%Y")
+    return str(valor)
+
+
+def _larguras(colunas: List[Dict[str, str]], largura_util: float) -> List[float]:
+    # Colunas de texto longo (primeira ou histórico) dividem a sobra
+    fixas = {"moeda": 70, "data": 58, "texto": 55}
+    largas = [i for i, c in enumerate(colunas) if c["tipo"] == "texto" and (i == 0 or c["titulo"] == "Histórico")]
+    larguras = [fixas[c["tipo"]] if i not in largas else 0 for i, c in enumerate(colunas)]
+    sobra = max(largura_util - sum(larguras), 120 * max(len(largas), 1))
+    for i in largas:
+        larguras[i] = sobra / len(largas)
+    total = sum(larguras)
+    # Muitas colunas (12 meses + total): encolhe proporcionalmente
+    if total > largura_util:
+        larguras = [l * largura_util / total for l in larguras]
+    return larguras
+
+
+def _flowables_relatorio(relatorio: Dict[str, Any], largura_util: float, contador: list) -> Iterator:
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, PageBreak
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'TituloRelatorio',
+        parent=styles['Heading1'],
+        fontSize=15,
+        textColor=colors.HexColor('#366092'),
+        spaceAfter=6,
+        alignment=1
+    )
+    subtitle_style = ParagraphStyle('SubtituloRelatorio', parent=styles['Normal'], fontSize=9, alignment=1)
+    footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey)
+
+    colunas = relatorio["colunas"]
+    larguras = _larguras(colunas, largura_util)
+    tamanho_fonte = 7 if len(colunas) > 8 else 8
+    cabecalho = [c["titulo"] for c in colunas]
+    estilo_base = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), tamanho_fonte),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+    ]
+    estilo_base += [
+        ('ALIGN', (i, 1), (i, -1), 'RIGHT') for i, c in enumerate(colunas) if c["tipo"] == "moeda"
+    ]
+
+    def _tabela(pagina, estilos_linhas):
+        return Table(
+            [cabecalho] + pagina,
+            colWidths=larguras,
+            rowHeights=[ALTURA_LINHA + 4] + [ALTURA_LINHA] * len(pagina),
+            style=TableStyle(estilo_base + estilos_linhas),
+            repeatRows=1,
+        )
+
+    yield Paragraph(relatorio["titulo"], title_style)
+    if relatorio.get("subtitulo"):
+        yield Paragraph(relatorio["subtitulo"], subtitle_style)
+    yield Spacer(1, 0.4*cm)
+
+    pagina, estilos_linhas = [], []
+    capacidade = LINHAS_PRIMEIRA_PAGINA
+    for linha in relatorio["linhas"]:
+        indice = len(pagina) + 1
+        pagina.append([_formatar(v, c["tipo"]) for v, c in zip(linha["valores"], colunas)])
+        if linha.get("nivel"):
+            estilos_linhas.append(('LEFTPADDING', (0, indice), (0, indice), 6 + RECUO_POR_NIVEL * linha["nivel"]))
+        if linha.get("destaque"):
+            estilos_linhas.append(('FONTNAME', (0, indice), (-1, indice), 'Helvetica-Bold'))
+            estilos_linhas.append(('BACKGROUND', (0, indice), (-1, indice), colors.HexColor('#E8EEF6')))
+        contador[0] += 1
+        if len(pagina) == capacidade:
+            yield _tabela(pagina, estilos_linhas)
+            yield PageBreak()
+            pagina, estilos_linhas = [], []
+            capacidade = LINHAS_POR_PAGINA
+    if pagina or contador[0] == 0:
+        yield _tabela(pagina, estilos_linhas)
+
+    yield Spacer(1, 0.6*cm)
+    yield Paragraph(f"Gerado em: {date.today().strftime('%d/%m/%Y')}", footer_style)
+
+
+def escrever_relatorio_pdf(relatorio: Dict[str, Any], destino) -> int:
+    """
+    Escreve o demonstrativo no destino (caminho ou arquivo binário).
+
+    Returns:
+        Quantidade de linhas escritas
+    """
+    try:
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.platypus import SimpleDocTemplate
+        from reportlab.lib.units import cm
+    except ImportError:
+        raise ImportError("reportlab não está instalado. Execute: pip install reportlab")
+
+    doc = SimpleDocTemplate(
+        destino,
+        pagesize=landscape(A4),
+        rightMargin=1*cm,
+        leftMargin=1*cm,
+        topMargin=1*cm,
+        bottomMargin=1*cm,
+        title=relatorio["titulo"],
+    )
+
+    def _numerar_pagina(canvas, documento):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 7)
+        canvas.drawString(1*cm, 0.5*cm, relatorio["titulo"])
+        canvas.drawRightString(documento.pagesize[0] - 1*cm, 0.5*cm, f"Página {documento.page}")
+        canvas.restoreState()
+
+    contador = [0]
+    doc.build(
+        FlowablesSobDemanda(_flowables_relatorio(relatorio, doc.width, contador)),
+        onFirstPage=_numerar_pagina,
+        onLaterPages=_numerar_pagina,
+    )
+    return contador[0]
@@ -0,0 +1,168 @@
+"""
+Armazenamento em disco dos arquivos de anexos, endereçado por conteúdo.
+
+Cada conteúdo é gravado uma única vez, em blobs/<h[:2]>/<h[2:4]>/<h>, onde
+h é o SHA-256 do arquivo: a mesma intimação anexada a vários processos
+ocupa o espaço de um arquivo só. O upload é copiado em blocos para um
+temporário enquanto o hash é calculado (o arquivo nunca fica inteiro em
+memória) e depois movido para o lugar definitivo com rename.
+
+A contagem de referências fica na tabela arquivo_blob
+(database.crud_anexos); este módulo cuida só dos arquivos.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+DIRETORIO_ANEXOS = os.getenv(
+    "GESTOR_ANEXOS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "anexos"),
+)
+DIRETORIO_BLOBS = os.path.join(DIRETORIO_ANEXOS, "blobs")
+DIRETORIO_TEMPORARIOS = os.path.join(DIRETORIO_ANEXOS, "tmp")
+
+TAMANHO_BLOCO = 1024 * 1024
+LIMITE_TAMANHO = int(os.getenv("GESTOR_LIMITE_ANEXO_MB", "200")) * 1024 * 1024
+
+# Serializa a efetivação de blobs e a remoção pelo coletor, para que um
+# upload não reaproveite um arquivo que está sendo apagado
+_lock = threading.Lock()
+
+
+@contextmanager
+def trava():
+    with _lock:
+        yield
+
+
+def caminho_blob(hash_sha256: str) -> str:
+    return os.path.join(DIRETORIO_BLOBS, hash_sha256[:2], hash_sha256[2:4], hash_sha256)
+
+
+def gravar_temporario(origem: BinaryIO, limite: int = LIMITE_TAMANHO) -> Tuple[str, str, int]:
+    """
+    Copia o conteúdo de origem em blocos para um arquivo temporário,
+    calculando o SHA-256. Retorna (caminho temporário, hash, tamanho).
+    """
+    os.makedirs(DIRETORIO_TEMPORARIOS, exist_ok=True)
+    temporario = os.path.join(DIRETORIO_TEMPORARIOS, f"{uuid.uuid4().hex}.part")
+    sha = hashlib.sha256()
+    tamanho = 0
+    try:
+        with open(temporario, "wb") as destino:
+            while True:
+                bloco = origem.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                tamanho += len(bloco)
+                if tamanho > limite:
+                    raise ValueError(f"Arquivo maior que o limite de {limite // (1024 * 1024)} MB")
+                sha.update(bloco)
+                destino.write(bloco)
+    except BaseException:
+        remover_arquivo(temporario)
+        raise
+    if tamanho == 0:
+        remover_arquivo(temporario)
+        raise ValueError("Arquivo vazio")
+    return temporario, sha.hexdigest(), tamanho
+
+
+def efetivar(temporario: str, hash_sha256: str) -> str:
+    """
+    Move o temporário para o caminho do blob; se o conteúdo já existe, o
+    temporário é descartado. Chamar com trava() adquirida.
+    """
+    destino = caminho_blob(hash_sha256)
+    if os.path.exists(destino):
+        remover_arquivo(temporario)
+    else:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(temporario, destino)
+    return destino
+
+
+def remover_arquivo(caminho: Optional[str]) -> int:
+    """Remove o arquivo se existir. Retorna o tamanho liberado em bytes"""
+    if not caminho:
+        return 0
+    try:
+        tamanho = os.path.getsize(caminho)
+        os.remove(caminho)
+        return tamanho
+    except FileNotFoundError:
+        return 0
+
+
+def listar_blobs() -> Iterator[Tuple[str, str, float]]:
+    """(hash, caminho, mtime) de cada blob em disco"""
+    for raiz, _, arquivos in os.walk(DIRETORIO_BLOBS):
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            try:
+                yield nome, caminho, os.path.getmtime(caminho)
+            except FileNotFoundError:
+                continue
+
+
+def limpar_temporarios(idade_segundos: float) -> int:
+    """Remove temporários de uploads interrompidos mais antigos que idade_segundos"""
+    limite = time.time() - idade_segundos
+    removidos = 0
+    try:
+        nomes = os.listdir(DIRETORIO_TEMPORARIOS)
+    except FileNotFoundError:
+        return 0
+    for nome in nomes:
+        caminho = os.path.join(DIRETORIO_TEMPORARIOS, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+                removidos += 1
+        except FileNotFoundError:
+            continue
+    return removidos
+
+
+# ===== DOWNLOAD PARCIAL (Range) =====
+
+def intervalo_bytes(cabecalho: Optional[str], tamanho: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta um cabeçalho Range de um único intervalo ("bytes=0-499",
+    "bytes=500-", "bytes=-500"). Retorna (início, fim) inclusivos, ou None
+    para servir o arquivo inteiro (sem Range ou com vários intervalos).
+    Levanta ValueError se o intervalo não puder ser atendido (HTTP 416).
+    """
+    if not cabecalho or not cabecalho.startswith("bytes=") or "," in cabecalho:
+        return None
+    inicio_txt, _, fim_txt = cabecalho[len("bytes="):].strip().partition("-")
+    try:
+        if inicio_txt == "":
+            sufixo = int(fim_txt)
+            if sufixo <= 0:
+                raise ValueError("Intervalo inválido")
+            return max(0, tamanho - sufixo), tamanho - 1
+        inicio = int(inicio_txt)
+        fim = int(fim_txt) if fim_txt else tamanho - 1
+    except ValueError:
+        raise ValueError("Intervalo inválido")
+    if inicio >= tamanho or fim < inicio:
+        raise ValueError("Intervalo fora do arquivo")
+    return inicio, min(fim, tamanho - 1)
+
+
+def ler_intervalo(caminho: str, inicio: int, fim: int) -> Iterator[bytes]:
+    """Lê os bytes [inicio, fim] do arquivo em blocos"""
+    restante = fim - inicio + 1
+    with open(caminho, "rb") as arquivo:
+        arquivo.seek(inicio)
+        while restante > 0:
+            bloco = arquivo.read(min(TAMANHO_BLOCO, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Benchmark do relatório PDF de tarefas (escrever_tarefas_pdf).
+
+Cria um banco SQLite temporário com N tarefas (processos, clientes,
+responsáveis e municípios) e mede, para cada tamanho, o tempo de geração
+e o pico de memória Python (tracemalloc, medido numa segunda passada para
+não distorcer o tempo), além do tamanho do arquivo.
+
+Uso:
+    python utils/benchmark_exportacao_pdf.py [--tamanhos 1000 10000 50000] [--tabela-unica]
+
+--tabela-unica mede também o formato anterior (uma única Table com todas
+as linhas), para comparação.
+
+O pico de memória do formato paginado cresce com o número de páginas, não
+com o layout: o reportlab guarda o conteúdo de cada página pronta (~14 KB)
+até salvar o arquivo.
+"""
+import sys
+import os
+import time
+import tempfile
+import tracemalloc
+import argparse
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import models
+from database import crud_tarefas
+from utils import exportacao
+
+
+def _preparar_banco(caminho: str, total: int):
+    engine = create_engine(f"sqlite:///{caminho}")
+    models.Base.metadata.create_all(bind=engine)
+    qtd_processos = max(1, total // 20)
+    qtd_clientes = max(1, qtd_processos // 5)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Usuario.__table__), [
+            {"id": i, "nome": f"Responsável {i}", "login": f"usuario{i}", "senha": "x"} for i in range(1, 11)
+        ])
+        conn.execute(insert(models.TipoTarefa.__table__), [
+            {"id": i, "nome": f"Tipo de tarefa {i}"} for i in range(1, 6)
+        ])
+        conn.execute(insert(models.Municipio.__table__), [
+            {"id": i, "nome": f"Município {i}", "uf": "SP", "codigo_ibge": str(3500000 + i)} for i in range(1, 11)
+        ])
+        conn.execute(insert(models.Cliente.__table__), [
+            {"id": i, "nome": f"Cliente de teste número {i}", "cpf_cnpj": f"{i:011d}"} for i in range(1, qtd_clientes + 1)
+        ])
+        conn.execute(insert(models.Processo.__table__), [
+            {"id": i, "numero": f"{i:07d}-12.2024.8.26.0100", "cliente_id": i % qtd_clientes + 1,
+             "municipio_id": i % 10 + 1} for i in range(1, qtd_processos + 1)
+        ])
+        conn.execute(insert(models.Tarefa.__table__), [
+            {"id": i, "tipo_tarefa_id": i % 5 + 1, "processo_id": i % qtd_processos + 1,
+             "responsavel_id": i % 10 + 1, "prazo_fatal": date(2026, i % 12 + 1, i % 28 + 1),
+             "status": "Pendente", "etapa_workflow_atual": "analise_pendente",
+             "criado_em": datetime(2025, 1, 1)} for i in range(1, total + 1)
+        ])
+    return engine, sessionmaker(bind=engine, autoflush=False)
+
+
+def _escrever_tabela_unica(linhas, destino) -> int:
+    """Formato anterior: todas as linhas numa única Table (referência)"""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import SimpleDocTemplate, Table
+    dados = [["ID", "Tipo", "Processo", "Cliente", "Responsável", "Prazo Fatal", "Status"]]
+    for (tarefa_id, tipo, processo, cliente, responsavel, _adm, prazo_fatal, status, *_r) in linhas:
+        dados.append([str(tarefa_id), (tipo or "")[:30], (processo or "")[:20], (cliente or "")[:25],
+                      (responsavel or "")[:20], prazo_fatal.strftime("%d/%m/%Y") if prazo_fatal else "", status])
+    SimpleDocTemplate(destino, pagesize=landscape(A4)).build([Table(dados, repeatRows=1)])
+    return len(dados) - 1
+
+
+def _medir(Session, escrever) -> dict:
+    fd, saida = tempfile.mkstemp(suffix=".pdf", prefix="bench_pdf_")
+    os.close(fd)
+    try:
+        db = Session()
+        try:
+            inicio = time.perf_counter()
+            total = escrever(crud_tarefas.consultar_tarefas_exportacao(db), saida)
+            duracao = time.perf_counter() - inicio
+        finally:
+            db.close()
+
+        db = Session()
+        try:
+            tracemalloc.start()
+            escrever(crud_tarefas.consultar_tarefas_exportacao(db), saida)
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        finally:
+            db.close()
+        return {
+            "tarefas": total,
+            "segundos": duracao,
+            "pico_mb": pico / 1e6,
+            "arquivo_mb": os.path.getsize(saida) / 1e6,
+        }
+    finally:
+        os.remove(saida)
+
+
+def executar_benchmark(tamanhos, tabela_unica: bool = False) -> list:
+    resultados = []
+    for tamanho in tamanhos:
+        fd, caminho = tempfile.mkstemp(suffix=".db", prefix="bench_pdf_")
+        os.close(fd)
+        engine, Session = _preparar_banco(caminho, tamanho)
+        try:
+            r = _medir(Session, exportacao.escrever_tarefas_pdf)
+            r["formato"] = "paginado"
+            resultados.append(r)
+            if tabela_unica:
+                r = _medir(Session, _escrever_tabela_unica)
+                r["formato"] = "tabela única"
+                resultados.append(r)
+        finally:
+            engine.dispose()
+            os.remove(caminho)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do relatório PDF de tarefas")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--tabela-unica", action="store_true")
+    args = parser.parse_args()
+
+    resultados = executar_benchmark(args.tamanhos, args.tabela_unica)
+    print("=" * 66)
+    print(f"{'Formato':<14}{'Tarefas':>9}{'Tempo (s)':>12}{'Pico (MB)':>12}{'Arquivo (MB)':>14}{'Tarefas/s':>11}")
+    for r in resultados:
+        por_segundo = r["tarefas"] / r["segundos"] if r["segundos"] else 0.0
+        print(f"{r['formato']:<14}{r['tarefas']:>9}{r['segundos']:>12.2f}{r['pico_mb']:>12.1f}"
+              f"{r['arquivo_mb']:>14.2f}{por_segundo:>11.0f}")
+    print("=" * 66)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Conversão de valores monetários entre reais (float) e centavos (int).
+
+Os valores são armazenados também em centavos inteiros para que somas no
+banco e em Python sejam exatas; a API continua expondo reais.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Union
+
+Numero = Union[int, float, Decimal, str]
+
+
+def para_centavos(valor: Optional[Numero]) -> Optional[int]:
+    """Converte reais em centavos inteiros, arredondando meio centavo para cima"""
+    if valor is None:
+        return None
+    return int((Decimal(str(valor)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def para_reais(centavos: Optional[int]) -> float:
+    """Converte centavos inteiros em reais (None vira 0.0)"""
+    if not centavos:
+        return 0.0
+    return int(centavos) / 100
@@ -1,123 +1,211 @@
 """
 Utilitários para exportação de dados em Excel e PDF.
 """
-from typing import List
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, List
 from datetime import date
+import asyncio
 import io
+import multiprocessing
+import os
+import tempfile
+import threading
 
 
-def exportar_tarefas_excel(tarefas: List, filepath: str = None) -> bytes:
+# Cabeçalho e largura das colunas da planilha de tarefas (modo write-only não
+# permite ajustar a largura depois de escrever as linhas)
+COLUNAS_TAREFAS_EXCEL = [
+    ("ID", 8), ("Tipo", 30), ("Processo", 28), ("Cliente", 40), ("Responsável", 25),
+    ("Prazo Administrativo", 20), ("Prazo Fatal", 14), ("Status", 16), ("Etapa Workflow", 24),
+    ("Município", 25), ("UF", 5), ("Criado Em", 17),
+]
+
+# Tamanho dos blocos lidos do arquivo gerado no envio por streaming
+TAMANHO_BLOCO_ARQUIVO = 64 * 1024
+
+
+def _formatar_data(valor, formato: str = "%d/%m/%Y") -> str:
+    return valor.strftime(formato) if valor else ""
+
+
+def _linha_de_tarefa(tarefa) -> tuple:
+    """Converte um objeto Tarefa na tupla de colunas da exportação"""
+    processo = tarefa.processo
+    municipio = processo.municipio if processo else None
+    return (
+        tarefa.id,
+        tarefa.tipo_tarefa.nome if tarefa.tipo_tarefa else None,
+        processo.numero if processo else None,
+        processo.cliente.nome if processo and processo.cliente else None,
+        tarefa.responsavel.nome if tarefa.responsavel else None,
+        tarefa.prazo_administrativo,
+        tarefa.prazo_fatal,
+        tarefa.status,
+        tarefa.etapa_workflow_atual,
+        municipio.nome if municipio else None,
+        municipio.uf if municipio else None,
+        tarefa.criado_em,
+    )
+
+
+def escrever_tarefas_excel(linhas: Iterable, destino) -> int:
     """
-    Exporta lista de tarefas para Excel.
-    
-    Args:
-        tarefas: Lista de objetos Tarefa
-        filepath: Caminho do arquivo (opcional, se None retorna bytes)
-    
+    Escreve a planilha de tarefas em modo write-only (streaming) no destino
+    (caminho ou arquivo binário). As linhas são tuplas na ordem de
+    COLUNAS_TAREFAS_EXCEL, como as de crud_tarefas.consultar_tarefas_exportacao,
+    e são gravadas à medida que chegam, sem manter a planilha em memória.
+
     Returns:
-        Bytes do arquivo Excel
+        Quantidade de tarefas escritas
     """
     try:
         import openpyxl
+        from openpyxl.cell import WriteOnlyCell
         from openpyxl.styles import Font, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
     except ImportError:
         raise ImportError("openpyxl não está instalado. Execute: pip install openpyxl")
-    
-    # Cria workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Tarefas"
-    
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Tarefas")
+    for col, (_, largura) in enumerate(COLUNAS_TAREFAS_EXCEL, start=1):
+        ws.column_dimensions[get_column_letter(col)].width = largura
+
     # Cabeçalho
-    headers = [
-        "ID", "Tipo", "Processo", "Cliente", "Responsável",
-        "Prazo Administrativo", "Prazo Fatal", "Status", "Etapa Workflow",
-        "Município", "UF", "Criado Em"
-    ]
-    
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center")
-    
+    fonte = Font(bold=True, color="FFFFFF")
+    preenchimento = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    alinhamento = Alignment(horizontal="center")
+    cabecalho = []
+    for titulo, _ in COLUNAS_TAREFAS_EXCEL:
+        cell = WriteOnlyCell(ws, value=titulo)
+        cell.font = fonte
+        cell.fill = preenchimento
+        cell.alignment = alinhamento
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+
     # Dados
-    for row_idx, tarefa in enumerate(tarefas, start=2):
-        ws.cell(row=row_idx, column=1, value=tarefa.id)
-        ws.cell(row=row_idx, column=2, value=tarefa.tipo_tarefa.nome if tarefa.tipo_tarefa else "")
-        ws.cell(row=row_idx, column=3, value=tarefa.processo.numero if tarefa.processo else "")
-        ws.cell(row=row_idx, column=4, value=tarefa.processo.cliente.nome if tarefa.processo and tarefa.processo.cliente else "")
-        ws.cell(row=row_idx, column=5, value=tarefa.responsavel.nome if tarefa.responsavel else "")
-        ws.cell(row=row_idx, column=6, value=tarefa.prazo_administrativo.strftime("%d/%m/%Y") if tarefa.prazo_administrativo else "")
-        ws.cell(row=row_idx, column=7, value=tarefa.prazo_fatal.strftime("%d/%m/%Y") if tarefa.prazo_fatal else "")
-        ws.cell(row=row_idx, column=8, value=tarefa.status)
-        ws.cell(row=row_idx, column=9, value=tarefa.etapa_workflow_atual)
-        
-        if tarefa.processo and tarefa.processo.municipio:
-            ws.cell(row=row_idx, column=10, value=tarefa.processo.municipio.nome)
-            ws.cell(row=row_idx, column=11, value=tarefa.processo.municipio.uf)
-        
-        ws.cell(row=row_idx, column=12, value=tarefa.criado_em.strftime("%d/%m/%Y %H:%M") if tarefa.criado_em else "")
-    
-    # Ajusta largura das colunas
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(cell.value)
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column].width = adjusted_width
-    
-    # Salva ou retorna bytes
-    if filepath:
-        wb.save(filepath)
-        return None
-    else:
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.getvalue()
+    total = 0
+    for (tarefa_id, tipo, processo, cliente, responsavel, prazo_adm, prazo_fatal,
+         status, etapa, municipio, uf, criado_em) in linhas:
+        ws.append([
+            tarefa_id,
+            tipo or "",
+            processo or "",
+            cliente or "",
+            responsavel or "",
+            _formatar_data(prazo_adm),
+            _formatar_data(prazo_fatal),
+            status,
+            etapa,
+            municipio,
+            uf,
+            _formatar_data(criado_em, "%d/%m/%Y %H:%M"),
+        ])
+        total += 1
 
+    wb.save(destino)
+    return total
 
-def exportar_tarefas_pdf(tarefas: List, filepath: str = None) -> bytes:
+
+def gerar_arquivo_tarefas_excel(linhas: Iterable) -> str:
+    """Escreve a planilha num arquivo temporário e retorna o caminho (remover após o uso)"""
+    arquivo = tempfile.NamedTemporaryFile(prefix="tarefas_", suffix=".xlsx", delete=False)
+    arquivo.close()
+    try:
+        escrever_tarefas_excel(linhas, arquivo.name)
+    except Exception:
+        os.remove(arquivo.name)
+        raise
+    return arquivo.name
+
+
+def iterar_arquivo(caminho: str, tamanho_bloco: int = TAMANHO_BLOCO_ARQUIVO, remover: bool = True) -> Iterator[bytes]:
+    """Lê o arquivo em blocos (para StreamingResponse) e o remove ao final"""
+    try:
+        with open(caminho, "rb") as arquivo:
+            while True:
+                bloco = arquivo.read(tamanho_bloco)
+                if not bloco:
+                    break
+                yield bloco
+    finally:
+        if remover:
+            os.remove(caminho)
+
+
+def exportar_tarefas_excel(tarefas: List, filepath: str = None) -> bytes:
     """
-    Exporta lista de tarefas para PDF.
+    Exporta lista de tarefas para Excel.
+    
+    Para volumes grandes, prefira crud_tarefas.consultar_tarefas_exportacao
+    com escrever_tarefas_excel, que não carrega os objetos relacionados.
     
     Args:
         tarefas: Lista de objetos Tarefa
         filepath: Caminho do arquivo (opcional, se None retorna bytes)
     
     Returns:
-        Bytes do arquivo PDF
+        Bytes do arquivo Excel
     """
-    try:
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import A4, landscape
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import cm
-    except ImportError:
-        raise ImportError("reportlab não está instalado. Execute: pip install reportlab")
-    
-    # Cria documento
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buffer if not filepath else filepath,
-        pagesize=landscape(A4),
-        rightMargin=1*cm,
-        leftMargin=1*cm,
-        topMargin=1*cm,
-        bottomMargin=1*cm
-    )
-    
-    elements = []
+    linhas = (_linha_de_tarefa(tarefa) for tarefa in tarefas)
+    if filepath:
+        escrever_tarefas_excel(linhas, filepath)
+        return None
+    output = io.BytesIO()
+    escrever_tarefas_excel(linhas, output)
+    return output.getvalue()
+
+
+# Colunas do relatório PDF de tarefas: (título, largura em cm, limite de caracteres)
+COLUNAS_TAREFAS_PDF = [
+    ("ID", 1.6, None), ("Tipo", 5.0, 30), ("Processo", 4.4, 20), ("Cliente", 5.6, 25),
+    ("Responsável", 4.2, 20), ("Prazo Fatal", 2.6, None), ("Status", 3.2, None),
+]
+# Linhas por página (altura fixa de linha): cada página é uma tabela própria,
+# então o layout é linear no total de tarefas e só uma página fica em memória
+LINHAS_POR_PAGINA_PDF = 32
+LINHAS_PRIMEIRA_PAGINA_PDF = 28  # o título ocupa o topo da primeira página
+ALTURA_LINHA_PDF = 14
+ALTURA_CABECALHO_PDF = 24
+
+
+class FlowablesSobDemanda(list):
+    """
+    Lista de flowables abastecida por um gerador à medida que o reportlab a
+    consome (build() só usa len(), [i] e del [0]), para não materializar o
+    relatório inteiro.
+    """
+
+    def __init__(self, gerador, reserva: int = 4):
+        super().__init__()
+        self._gerador = gerador
+        self._reserva = reserva
+
+    def _abastecer(self):
+        while self._gerador is not None and list.__len__(self) < self._reserva:
+            try:
+                list.append(self, next(self._gerador))
+            except StopIteration:
+                self._gerador = None
+
+    def __len__(self):
+        self._abastecer()
+        return list.__len__(self)
+
+    def __getitem__(self, indice):
+        self._abastecer()
+        return list.__getitem__(self, indice)
+
+
+def _flowables_tarefas_pdf(linhas: Iterable, contador: list) -> Iterator:
+    """Gera título, uma tabela por página e o rodapé a partir das linhas já unidas"""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, PageBreak
+
     styles = getSampleStyleSheet()
-    
-    # Título
     title_style = ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
@@ -126,60 +214,186 @@ def exportar_tarefas_pdf(tarefas: List, filepath: str = None) -> bytes:
         spaceAfter=30,
         alignment=1  # Center
     )
-    elements.append(Paragraph("Relatório de Tarefas", title_style))
-    elements.append(Spacer(1, 0.5*cm))
-    
-    # Tabela de dados
-    data = [["ID", "Tipo", "Processo", "Cliente", "Responsável", "Prazo Fatal", "Status"]]
-    
-    for tarefa in tarefas:
-        data.append([
-            str(tarefa.id),
-            tarefa.tipo_tarefa.nome[:30] if tarefa.tipo_tarefa else "",
-            tarefa.processo.numero[:20] if tarefa.processo else "",
-            tarefa.processo.cliente.nome[:25] if tarefa.processo and tarefa.processo.cliente else "",
-            tarefa.responsavel.nome[:20] if tarefa.responsavel else "",
-            tarefa.prazo_fatal.strftime("%d/%m/%Y") if tarefa.prazo_fatal else "",
-            tarefa.status
-        ])
-    
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.grey
+    )
+    estilo_tabela = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
         ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
         ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
         ('FONTSIZE', (0, 1), (-1, -1), 8),
-    ]))
-    
-    elements.append(table)
-    
+    ])
+    cabecalho = [titulo for titulo, _, _ in COLUNAS_TAREFAS_PDF]
+    larguras = [largura * cm for _, largura, _ in COLUNAS_TAREFAS_PDF]
+    limites = [limite for _, _, limite in COLUNAS_TAREFAS_PDF]
+
+    def _tabela(pagina):
+        return Table(
+            [cabecalho] + pagina,
+            colWidths=larguras,
+            rowHeights=[ALTURA_CABECALHO_PDF] + [ALTURA_LINHA_PDF] * len(pagina),
+            style=estilo_tabela,
+        )
+
+    yield Paragraph("Relatório de Tarefas", title_style)
+    yield Spacer(1, 0.5*cm)
+
+    pagina = []
+    capacidade = LINHAS_PRIMEIRA_PAGINA_PDF
+    for (tarefa_id, tipo, processo, cliente, responsavel, _prazo_adm, prazo_fatal,
+         status, *_resto) in linhas:
+        valores = [str(tarefa_id), tipo, processo, cliente, responsavel, _formatar_data(prazo_fatal), status]
+        pagina.append([
+            (valor or "")[:limite] if limite else (valor or "")
+            for valor, limite in zip(valores, limites)
+        ])
+        contador[0] += 1
+        if len(pagina) == capacidade:
+            yield _tabela(pagina)
+            yield PageBreak()
+            pagina = []
+            capacidade = LINHAS_POR_PAGINA_PDF
+    if pagina or contador[0] == 0:
+        yield _tabela(pagina)
+
     # Rodapé
-    elements.append(Spacer(1, 1*cm))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey
-    )
-    elements.append(Paragraph(
-        f"Gerado em: {date.today().strftime('%d/%m/%Y')} | Total de tarefas: {len(tarefas)}",
+    yield Spacer(1, 1*cm)
+    yield Paragraph(
+        f"Gerado em: {date.today().strftime('%d/%m/%Y')} | Total de tarefas: {contador[0]}",
         footer_style
-    ))
+    )
+
+
+def escrever_tarefas_pdf(linhas: Iterable, destino) -> int:
+    """
+    Escreve o relatório PDF de tarefas no destino (caminho ou arquivo binário),
+    paginando as linhas (tuplas de crud_tarefas.consultar_tarefas_exportacao)
+    em tabelas de uma página, geradas sob demanda.
+
+    Returns:
+        Quantidade de tarefas escritas
+    """
+    try:
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.platypus import SimpleDocTemplate
+        from reportlab.lib.units import cm
+    except ImportError:
+        raise ImportError("reportlab não está instalado. Execute: pip install reportlab")
+
+    doc = SimpleDocTemplate(
+        destino,
+        pagesize=landscape(A4),
+        rightMargin=1*cm,
+        leftMargin=1*cm,
+        topMargin=1*cm,
+        bottomMargin=1*cm
+    )
+
+    def _numerar_pagina(canvas, documento):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 7)
+        canvas.drawRightString(documento.pagesize[0] - 1*cm, 0.5*cm, f"Página {documento.page}")
+        canvas.restoreState()
+
+    contador = [0]
+    doc.build(
+        FlowablesSobDemanda(_flowables_tarefas_pdf(linhas, contador)),
+        onFirstPage=_numerar_pagina,
+        onLaterPages=_numerar_pagina,
+    )
+    return contador[0]
+
+
+def gerar_arquivo_tarefas_pdf(url_banco: str, filtros: dict) -> str:
+    """
+    Consulta as tarefas filtradas e escreve o PDF num arquivo temporário;
+    retorna o caminho (remover após o uso).
+
+    Abre a própria conexão a partir de url_banco para poder rodar num
+    processo separado (executar_em_processo), fora da thread da API.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database import crud_tarefas
+
+    engine = create_engine(url_banco)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    arquivo = tempfile.NamedTemporaryFile(prefix="tarefas_", suffix=".pdf", delete=False)
+    arquivo.close()
+    try:
+        escrever_tarefas_pdf(crud_tarefas.consultar_tarefas_exportacao(db, **filtros), arquivo.name)
+    except Exception:
+        os.remove(arquivo.name)
+        raise
+    finally:
+        db.close()
+        engine.dispose()
+    return arquivo.name
+
+
+# Processos de geração de relatórios (spawn: não herda threads nem conexões da API)
+PROCESSOS_RELATORIOS = int(os.environ.get("GESTOR_PROCESSOS_RELATORIOS", "2"))
+_executor_processos = None
+_lock_executor = threading.Lock()
+
+
+def _obter_executor() -> ProcessPoolExecutor:
+    global _executor_processos
+    with _lock_executor:
+        if _executor_processos is None:
+            _executor_processos = ProcessPoolExecutor(
+                max_workers=PROCESSOS_RELATORIOS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor_processos
+
+
+async def executar_em_processo(funcao, *args):
+    """Executa funcao(*args) num processo de relatórios sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_obter_executor(), funcao, *args)
+
+
+def submeter_em_processo(funcao, *args) -> Future:
+    """Agenda funcao(*args) num processo de relatórios (para uso fora do event loop)"""
+    return _obter_executor().submit(funcao, *args)
+
+
+def encerrar_processos_relatorios() -> None:
+    global _executor_processos
+    with _lock_executor:
+        if _executor_processos is not None:
+            _executor_processos.shutdown(wait=False, cancel_futures=True)
+            _executor_processos = None
+
+
+def exportar_tarefas_pdf(tarefas: List, filepath: str = None) -> bytes:
+    """
+    Exporta lista de tarefas para PDF.
     
-    # Gera PDF
-    doc.build(elements)
+    Args:
+        tarefas: Lista de objetos Tarefa
+        filepath: Caminho do arquivo (opcional, se None retorna bytes)
     
+    Returns:
+        Bytes do arquivo PDF
+    """
+    linhas = (_linha_de_tarefa(tarefa) for tarefa in tarefas)
     if filepath:
+        escrever_tarefas_pdf(linhas, filepath)
         return None
-    else:
-        buffer.seek(0)
-        return buffer.getvalue()
+    buffer = io.BytesIO()
+    escrever_tarefas_pdf(linhas, buffer)
+    return buffer.getvalue()
 
 
 def exportar_dashboard_excel(estatisticas: dict, filepath: str = None) -> bytes:
@@ -0,0 +1,179 @@
+"""
+Extração de texto e miniatura dos arquivos de anexos, com cache em disco.
+
+O resultado de cada conteúdo fica em extraidos/<h[:2]>/<h>.txt (texto),
+<h>.png (miniatura da primeira página) e <h>.json (situação e número de
+páginas), sob o diretório de anexos. Como o conteúdo é identificado pelo
+SHA-256, o arquivo é processado uma única vez, mesmo anexado várias vezes;
+pré-visualização e busca leem só o cache.
+
+PDFs exigem o pypdfium2 (opcional: sem ele a situação fica "indisponivel"
+e o arquivo pode ser reprocessado depois de instalado). Imagens usam o
+Pillow e arquivos de texto são lidos diretamente.
+
+As funções não usam o banco, para rodar no processo de relatórios
+(utils.exportacao.submeter_em_processo).
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+from utils import armazenamento_anexos as armazenamento
+
+DIRETORIO_EXTRAIDOS = os.path.join(armazenamento.DIRETORIO_ANEXOS, "extraidos")
+
+STATUS_PENDENTE = "pendente"
+STATUS_CONCLUIDA = "concluida"
+STATUS_INDISPONIVEL = "indisponivel"  # formato sem extrator (ou dependência ausente)
+STATUS_ERRO = "erro"
+
+LIMITE_PAGINAS = 500  # páginas de PDF lidas para o texto
+LIMITE_TEXTO = 2_000_000  # caracteres guardados por arquivo
+TAMANHO_MINIATURA = (320, 320)
+
+
+def _caminho(hash_sha256: str, extensao: str) -> str:
+    return os.path.join(DIRETORIO_EXTRAIDOS, hash_sha256[:2], f"{hash_sha256}.{extensao}")
+
+
+def caminho_texto(hash_sha256: str) -> str:
+    return _caminho(hash_sha256, "txt")
+
+
+def caminho_miniatura(hash_sha256: str) -> str:
+    return _caminho(hash_sha256, "png")
+
+
+def _gravar(destino: str, conteudo, modo: str = "w") -> None:
+    """Grava via temporário e rename, para o cache nunca ter arquivo parcial"""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    if modo == "w":
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+    else:
+        conteudo.save(temporario, format="PNG", optimize=True)
+    os.replace(temporario, destino)
+
+
+def ler_metadados(hash_sha256: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_caminho(hash_sha256, "json"), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def ler_texto(hash_sha256: str) -> Optional[str]:
+    try:
+        with open(caminho_texto(hash_sha256), encoding="utf-8") as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        return None
+
+
+def _miniatura(imagem) -> Any:
+    imagem = imagem.convert("RGB")
+    imagem.thumbnail(TAMANHO_MINIATURA)
+    return imagem
+
+
+def _extrair_pdf(caminho: str) -> Dict[str, Any]:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return {"status": STATUS_INDISPONIVEL, "erro": "pypdfium2 não está instalado. Execute: pip install pypdfium2"}
+
+    documento = pdfium.PdfDocument(caminho)
+    try:
+        paginas = len(documento)
+        textos = []
+        total = 0
+        miniatura = None
+        for indice in range(min(paginas, LIMITE_PAGINAS)):
+            pagina = documento[indice]
+            pagina_texto = pagina.get_textpage()
+            try:
+                texto = pagina_texto.get_text_range()
+            finally:
+                pagina_texto.close()
+            textos.append(texto)
+            total += len(texto)
+            if indice == 0:
+                largura = pagina.get_width() or 1
+                escala = TAMANHO_MINIATURA[0] / largura
+                miniatura = _miniatura(pagina.render(scale=escala).to_pil())
+            pagina.close()
+            if total >= LIMITE_TEXTO:
+                break
+    finally:
+        documento.close()
+    return {
+        "status": STATUS_CONCLUIDA,
+        "paginas": paginas,
+        "texto": "\n\n".join(textos)[:LIMITE_TEXTO],
+        "miniatura": miniatura,
+    }
+
+
+def _extrair_imagem(caminho: str) -> Dict[str, Any]:
+    from PIL import Image
+
+    with Image.open(caminho) as imagem:
+        return {"status": STATUS_CONCLUIDA, "paginas": 1, "texto": "", "miniatura": _miniatura(imagem)}
+
+
+def _extrair_texto(caminho: str) -> Dict[str, Any]:
+    with open(caminho, "rb") as arquivo:
+        bruto = arquivo.read(LIMITE_TEXTO * 4)
+    try:
+        texto = bruto.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = bruto.decode("latin-1")
+    return {"status": STATUS_CONCLUIDA, "paginas": None, "texto": texto[:LIMITE_TEXTO], "miniatura": None}
+
+
+def extrair(caminho: str, mime: Optional[str], hash_sha256: str, reprocessar: bool = False) -> Dict[str, Any]:
+    """
+    Extrai texto e miniatura do arquivo para o cache e devolve os metadados
+    {"status", "paginas", "miniatura", "caracteres", "erro"}. Se o cache já
+    tiver um resultado concluído, ele é devolvido sem abrir o arquivo.
+    """
+    if not reprocessar:
+        existente = ler_metadados(hash_sha256)
+        if existente and existente.get("status") == STATUS_CONCLUIDA:
+            return existente
+
+    mime = (mime or "").lower()
+    try:
+        with open(caminho, "rb") as arquivo:
+            assinatura = arquivo.read(5)
+        if mime == "application/pdf" or assinatura == b"%PDF-":
+            resultado = _extrair_pdf(caminho)
+        elif mime.startswith("image/"):
+            resultado = _extrair_imagem(caminho)
+        elif mime.startswith("text/") or mime in ("application/json", "application/xml"):
+            resultado = _extrair_texto(caminho)
+        else:
+            resultado = {"status": STATUS_INDISPONIVEL, "erro": f"Sem extrator para {mime or 'tipo desconhecido'}"}
+    except Exception as e:
+        resultado = {"status": STATUS_ERRO, "erro": str(e)[:500]}
+
+    if resultado.get("texto") is not None:
+        _gravar(caminho_texto(hash_sha256), resultado["texto"])
+    if resultado.get("miniatura") is not None:
+        _gravar(caminho_miniatura(hash_sha256), resultado["miniatura"], modo="png")
+    metadados = {
+        "status": resultado["status"],
+        "paginas": resultado.get("paginas"),
+        "miniatura": resultado.get("miniatura") is not None,
+        "caracteres": len(resultado.get("texto") or ""),
+        "erro": resultado.get("erro"),
+    }
+    _gravar(_caminho(hash_sha256, "json"), json.dumps(metadados))
+    return metadados
+
+
+def remover_cache(hash_sha256: str) -> None:
+    for extensao in ("txt", "png", "json"):
+        armazenamento.remover_arquivo(_caminho(hash_sha256, extensao))
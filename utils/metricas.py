@@ -0,0 +1,355 @@
+"""
+Métricas das requisições HTTP no formato texto do Prometheus.
+
+O middleware (MiddlewareMetricas) mede a duração de cada requisição por
+método e rota (o molde da rota, ex. /api/processos/{processo_id}, para não
+criar uma série por id) e, com os eventos before/after_cursor_execute do
+engine (instrumentar_engine), quantos comandos SQL ela executou e quanto
+tempo passou no banco. A medição da requisição fica num ContextVar: o
+Starlette copia o contexto para a threadpool dos endpoints síncronos, então
+as consultas feitas lá são somadas à requisição certa. Consultas fora de
+requisições (fila de jobs, agendador) não são contadas.
+
+Requisições com mais de LIMITE_CONSULTAS comandos SQL são contadas à parte
+e registradas no log, para que um N+1 novo apareça em produção. O texto é
+servido em GET /metrics (main.py).
+
+Em desenvolvimento (GESTOR_DETECTAR_N_MAIS_1=1), cada comando também é
+guardado pelo formato (o SQL sem os valores) com o ponto do código que o
+disparou; formatos repetidos mais de LIMITE_REPETICOES vezes na mesma
+requisição são listados no log com esses locais. Um lazy load dentro de um
+laço aparece assim como "SELECT ... FROM contas WHERE contas.id = ?" x 300
+e a linha do laço. O plugin utils.pytest_consultas usa o mesmo mecanismo
+para travar o número de consultas por endpoint nos testes.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+LIMITE_CONSULTAS = int(os.getenv("GESTOR_LIMITE_CONSULTAS", "50"))
+DETECTAR_REPETICOES = os.getenv("GESTOR_DETECTAR_N_MAIS_1", "0") != "0"
+LIMITE_REPETICOES = int(os.getenv("GESTOR_LIMITE_REPETICOES", "5"))
+
+# Limites superiores dos baldes dos histogramas
+BALDES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BALDES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Caminhos que não entram nas métricas
+IGNORADOS = {"/metrics"}
+
+ROTA_DESCONHECIDA = "desconhecida"
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Medicao:
+    """
+    Consultas da requisição (ou do bloco medir()) em andamento. Com
+    detectar, guarda também formato -> (quantidade, locais de chamada).
+    """
+    __slots__ = ("consultas", "segundos_sql", "inicio_consulta", "formatos")
+
+    def __init__(self, detectar: bool = False):
+        self.consultas = 0
+        self.segundos_sql = 0.0
+        self.inicio_consulta = None
+        self.formatos: Optional[Dict[str, List]] = {} if detectar else None
+
+    def repetidas(self, limite: int = None) -> List[Tuple[str, int, List[Tuple[str, int]]]]:
+        """
+        Formatos executados mais de limite vezes, do mais repetido para o
+        menos: (formato, quantidade, [(local, vezes), ...]).
+        """
+        limite = LIMITE_REPETICOES if limite is None else limite
+        if not self.formatos:
+            return []
+        resultado = [
+            (formato, quantidade, locais.most_common())
+            for formato, (quantidade, locais) in self.formatos.items()
+            if quantidade > limite
+        ]
+        return sorted(resultado, key=lambda item: -item[1])
+
+    def relatorio(self, limite: int = None) -> str:
+        linhas = []
+        for formato, quantidade, locais in self.repetidas(limite):
+            linhas.append(f"  {quantidade}x {formato[:200]}")
+            for local, vezes in locais[:3]:
+                linhas.append(f"      {vezes}x em {local}")
+        return "\n".join(linhas)
+
+
+_medicao_atual: ContextVar[Optional[Medicao]] = ContextVar("medicao_requisicao", default=None)
+
+# Funções chamadas com (método, rota, medição) ao fim de cada requisição
+_observadores: List[Callable[[str, str, Medicao], None]] = []
+
+
+class _Histograma:
+    __slots__ = ("baldes", "contagens", "soma", "total")
+
+    def __init__(self, baldes):
+        self.baldes = baldes
+        self.contagens = [0] * len(baldes)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        indice = bisect_left(self.baldes, valor)
+        if indice < len(self.contagens):
+            self.contagens[indice] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class _Registro:
+    """Séries acumuladas desde o início do processo, por (método, rota)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requisicoes: Dict[Tuple[str, str, str], int] = {}
+        self.duracao: Dict[Tuple[str, str], _Histograma] = {}
+        self.consultas: Dict[Tuple[str, str], _Histograma] = {}
+        self.segundos_sql: Dict[Tuple[str, str], float] = {}
+        self.excesso: Dict[Tuple[str, str], int] = {}
+
+    def registrar(self, metodo: str, rota: str, status: int, segundos: float, medicao: Medicao) -> None:
+        chave = (metodo, rota)
+        with self._lock:
+            chave_status = (metodo, rota, str(status))
+            self.requisicoes[chave_status] = self.requisicoes.get(chave_status, 0) + 1
+            self.duracao.setdefault(chave, _Histograma(BALDES_SEGUNDOS)).observar(segundos)
+            self.consultas.setdefault(chave, _Histograma(BALDES_CONSULTAS)).observar(medicao.consultas)
+            self.segundos_sql[chave] = self.segundos_sql.get(chave, 0.0) + medicao.segundos_sql
+            if medicao.consultas > LIMITE_CONSULTAS:
+                self.excesso[chave] = self.excesso.get(chave, 0) + 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self.requisicoes.clear()
+            self.duracao.clear()
+            self.consultas.clear()
+            self.segundos_sql.clear()
+            self.excesso.clear()
+
+    def exportar(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        linhas = []
+        with self._lock:
+            linhas += [
+                "# HELP gestor_http_requisicoes_total Requisições HTTP atendidas.",
+                "# TYPE gestor_http_requisicoes_total counter",
+            ]
+            for (metodo, rota, status), valor in sorted(self.requisicoes.items()):
+                linhas.append(f"gestor_http_requisicoes_total{_rotulos(metodo, rota, status=status)} {valor}")
+            _exportar_histogramas(
+                linhas, "gestor_http_requisicao_segundos", "Duração das requisições HTTP em segundos.",
+                self.duracao,
+            )
+            _exportar_histogramas(
+                linhas, "gestor_http_consultas_sql", "Comandos SQL executados por requisição.",
+                self.consultas,
+            )
+            linhas += [
+                "# HELP gestor_http_sql_segundos_total Tempo gasto no banco pelas requisições, em segundos.",
+                "# TYPE gestor_http_sql_segundos_total counter",
+            ]
+            for (metodo, rota), valor in sorted(self.segundos_sql.items()):
+                linhas.append(f"gestor_http_sql_segundos_total{_rotulos(metodo, rota)} {_numero(valor)}")
+            linhas += [
+                f"# HELP gestor_http_excesso_consultas_total Requisições com mais de {LIMITE_CONSULTAS} comandos SQL.",
+                "# TYPE gestor_http_excesso_consultas_total counter",
+            ]
+            for (metodo, rota), valor in sorted(self.excesso.items()):
+                linhas.append(f"gestor_http_excesso_consultas_total{_rotulos(metodo, rota)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(metodo: str, rota: str, **extras: str) -> str:
+    pares = [("metodo", metodo), ("rota", rota)] + list(extras.items())
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+def _exportar_histogramas(linhas, nome: str, ajuda: str, series: Dict[Tuple[str, str], _Histograma]) -> None:
+    linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} histogram"]
+    for (metodo, rota), histograma in sorted(series.items()):
+        acumulado = 0
+        for limite, contagem in zip(histograma.baldes, histograma.contagens):
+            acumulado += contagem
+            linhas.append(f"{nome}_bucket{_rotulos(metodo, rota, le=_numero(limite))} {acumulado}")
+        linhas.append(f"{nome}_bucket{_rotulos(metodo, rota, le='+Inf')} {histograma.total}")
+        linhas.append(f"{nome}_sum{_rotulos(metodo, rota)} {_numero(histograma.soma)}")
+        linhas.append(f"{nome}_count{_rotulos(metodo, rota)} {histograma.total}")
+
+
+registro = _Registro()
+
+
+# ===== SQL =====
+
+_ESPACOS = re.compile(r"\s+")
+_LISTA_PARAMETROS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+@lru_cache(maxsize=2048)
+def formato_consulta(statement: str) -> str:
+    """SQL sem valores: literais viram ? e listas de IN viram (?)"""
+    formato = _LITERAIS.sub("?", _ESPACOS.sub(" ", statement).strip())
+    return _LISTA_PARAMETROS.sub("(?)", formato)
+
+
+def _local_chamada() -> str:
+    """
+    Primeiro quadro da pilha no código do projeto (fora do SQLAlchemy e deste
+    módulo). Sem nenhum, como no lazy load disparado pela serialização da
+    resposta, devolve o primeiro quadro de biblioteca fora do SQLAlchemy.
+    """
+    quadro = sys._getframe(2)
+    biblioteca = None
+    while quadro is not None:
+        arquivo = quadro.f_code.co_filename
+        if arquivo != __file__ and f"{os.sep}sqlalchemy{os.sep}" not in arquivo:
+            if arquivo.startswith(RAIZ_PROJETO) and "site-packages" not in arquivo:
+                return f"{os.path.relpath(arquivo, RAIZ_PROJETO)}:{quadro.f_lineno} ({quadro.f_code.co_name})"
+            if biblioteca is None:
+                caminho = arquivo.split(f"site-packages{os.sep}")[-1]
+                biblioteca = f"{caminho}:{quadro.f_lineno} ({quadro.f_code.co_name})"
+        quadro = quadro.f_back
+    return biblioteca or "desconhecido"
+
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        if medicao.formatos is not None:
+            formato = formato_consulta(statement)
+            entrada = medicao.formatos.get(formato)
+            if entrada is None:
+                entrada = medicao.formatos[formato] = [0, Counter()]
+            entrada[0] += 1
+            entrada[1][_local_chamada()] += 1
+        medicao.inicio_consulta = time.perf_counter()
+
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = _medicao_atual.get()
+    if medicao is not None and medicao.inicio_consulta is not None:
+        medicao.consultas += 1
+        medicao.segundos_sql += time.perf_counter() - medicao.inicio_consulta
+        medicao.inicio_consulta = None
+
+
+def instrumentar_engine(engine) -> None:
+    """Liga a contagem de comandos SQL por requisição ao engine (idempotente)"""
+    if not event.contains(engine, "before_cursor_execute", _antes_da_consulta):
+        event.listen(engine, "before_cursor_execute", _antes_da_consulta)
+        event.listen(engine, "after_cursor_execute", _depois_da_consulta)
+
+
+@contextmanager
+def medir(detectar: bool = True) -> Iterator[Medicao]:
+    """Mede as consultas feitas no bloco, fora de uma requisição HTTP"""
+    medicao = Medicao(detectar)
+    token = _medicao_atual.set(medicao)
+    try:
+        yield medicao
+    finally:
+        _medicao_atual.reset(token)
+
+
+@contextmanager
+def observar(funcao: Callable[[str, str, Medicao], None], detectar: bool = True) -> Iterator[None]:
+    """
+    Chama funcao(método, rota, medição) ao fim de cada requisição atendida
+    dentro do bloco; com detectar, as requisições guardam os formatos.
+    """
+    global DETECTAR_REPETICOES
+    anterior = DETECTAR_REPETICOES
+    DETECTAR_REPETICOES = anterior or detectar
+    _observadores.append(funcao)
+    try:
+        yield
+    finally:
+        _observadores.remove(funcao)
+        DETECTAR_REPETICOES = anterior
+
+
+# ===== MIDDLEWARE =====
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mede cada requisição HTTP. A duração vai até o fim
+    do corpo da resposta (em downloads e SSE, inclui o envio).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._rotas: Dict[object, str] = {}
+
+    def _rota(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return ROTA_DESCONHECIDA
+        rota = self._rotas.get(endpoint)
+        if rota is None:
+            # Mapa endpoint -> molde da rota, montado sob demanda
+            aplicacao = scope.get("app")
+            for item in getattr(getattr(aplicacao, "router", None), "routes", []):
+                if getattr(item, "endpoint", None) is not None and hasattr(item, "path"):
+                    self._rotas.setdefault(item.endpoint, item.path)
+            rota = self._rotas.get(endpoint, ROTA_DESCONHECIDA)
+        return rota
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in IGNORADOS:
+            await self.app(scope, receive, send)
+            return
+
+        medicao = Medicao(DETECTAR_REPETICOES)
+        token = _medicao_atual.set(medicao)
+        status = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicao_atual.reset(token)
+            segundos = time.perf_counter() - inicio
+            metodo = scope["method"]
+            rota = self._rota(scope)
+            registro.registrar(metodo, rota, status, segundos, medicao)
+            if medicao.consultas > LIMITE_CONSULTAS:
+                print(
+                    f"⚠️ {metodo} {rota}: {medicao.consultas} comandos SQL "
+                    f"({medicao.segundos_sql * 1000:.0f} ms no banco, limite {LIMITE_CONSULTAS})"
+                )
+            relatorio = medicao.relatorio()
+            if relatorio:
+                print(f"⚠️ {metodo} {rota}: consultas repetidas (possível N+1)\n{relatorio}")
+            for funcao in list(_observadores):
+                funcao(metodo, rota, medicao)
@@ -0,0 +1,110 @@
+"""
+Paginação por cursor (keyset) para listagens.
+
+O cursor é opaco para o cliente: codifica o valor da coluna de ordenação e o
+id do último item da página. A página seguinte é filtrada por
+(coluna, id) > (valor, id), o que usa os índices compostos (coluna, id) em
+vez de OFFSET, e o custo não cresce com a posição na lista.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, and_, or_, tuple_
+
+HEADER_PROXIMO_CURSOR = "X-Proximo-Cursor"
+
+
+def codificar_cursor(valor: Any, item_id: int) -> str:
+    """Gera o cursor opaco a partir do valor de ordenação e do id do último item"""
+    if isinstance(valor, (date, datetime)):
+        valor = valor.isoformat()
+    bruto = json.dumps([valor, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Any, int]:
+    """Retorna (valor, id) de um cursor; ValueError se for inválido"""
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        valor, item_id = json.loads(base64.urlsafe_b64decode(preenchido.encode()))
+        return valor, int(item_id)
+    except Exception:
+        raise ValueError("Cursor de paginação inválido")
+
+
+def _valor_da_coluna(coluna, valor: Any) -> Any:
+    """Converte o valor do cursor (ISO) de volta para colunas Date/DateTime"""
+    if not isinstance(valor, str):
+        return valor
+    try:
+        if isinstance(coluna.type, DateTime):
+            return datetime.fromisoformat(valor)
+        if isinstance(coluna.type, Date):
+            return date.fromisoformat(valor)
+    except ValueError:
+        raise ValueError("Cursor de paginação inválido")
+    return valor
+
+
+def coluna_ordenacao(ordenar: str, ordenacoes: dict):
+    """
+    Interpreta "campo" ou "-campo" (decrescente) entre as ordenações aceitas.
+    Retorna (coluna, descendente); ValueError se o campo não for suportado.
+    """
+    descendente = ordenar.startswith("-")
+    campo = ordenar.lstrip("-")
+    if campo not in ordenacoes:
+        raise ValueError(f"Ordenação inválida. Use: {', '.join(ordenacoes)} (prefixo - para decrescente)")
+    return ordenacoes[campo], descendente
+
+
+def filtro_apos_cursor(coluna, coluna_id, valor: Any, item_id: int, descendente: bool = False):
+    """
+    Condição "depois do cursor" para ORDER BY coluna, id (ASC ou DESC).
+
+    No SQLite NULL é o menor valor: vem primeiro em ASC e por último em DESC.
+    """
+    if coluna is coluna_id:
+        return coluna_id < item_id if descendente else coluna_id > item_id
+
+    if descendente:
+        if valor is None:
+            return and_(coluna.is_(None), coluna_id < item_id)
+        return or_(tuple_(coluna, coluna_id) < tuple_(valor, item_id), coluna.is_(None))
+
+    if valor is None:
+        return or_(and_(coluna.is_(None), coluna_id > item_id), coluna.isnot(None))
+    return tuple_(coluna, coluna_id) > tuple_(valor, item_id)
+
+
+def paginar(query, coluna, coluna_id, cursor: Optional[str], limit: Optional[int], descendente: bool = False):
+    """
+    Aplica ordenação, cursor e limite a uma query.
+
+    Retorna (linhas, próximo cursor). Sem limit, devolve todas as linhas e o
+    cursor é None. A coluna de ordenação deve estar disponível em cada linha
+    (atributo com o mesmo nome) para gerar o próximo cursor.
+    """
+    if cursor:
+        valor, item_id = decodificar_cursor(cursor)
+        valor = _valor_da_coluna(coluna, valor)
+        query = query.filter(filtro_apos_cursor(coluna, coluna_id, valor, item_id, descendente))
+
+    if coluna is coluna_id:
+        ordem = [coluna_id.desc() if descendente else coluna_id.asc()]
+    else:
+        ordem = [coluna.desc(), coluna_id.desc()] if descendente else [coluna.asc(), coluna_id.asc()]
+    query = query.order_by(*ordem)
+
+    if not limit:
+        return query.all(), None
+
+    # Uma linha a mais indica se existe próxima página
+    linhas: List[Any] = query.limit(limit + 1).all()
+    if len(linhas) <= limit:
+        return linhas, None
+    linhas = linhas[:limit]
+    ultima = linhas[-1]
+    return linhas, codificar_cursor(getattr(ultima, coluna.key), getattr(ultima, coluna_id.key))
@@ -0,0 +1,60 @@
+"""
+Plugin do pytest que trava o número de comandos SQL por endpoint.
+
+Ative no conftest.py:
+
+    pytest_plugins = ["utils.pytest_consultas"]
+
+e use a fixture limite_consultas em volta das chamadas ao TestClient (ou
+a funções CRUD chamadas direto no teste):
+
+    def test_listar_lancamentos(client, limite_consultas):
+        with limite_consultas(4):
+            client.get("/api/contabilidade/lancamentos")
+
+Cada requisição atendida no bloco que passar do máximo (e o bloco em si,
+para consultas feitas fora de requisições) falha o teste com os formatos de
+SQL repetidos e os locais que os dispararam (utils.metricas). Assim um
+endpoint corrigido de N+1 não volta a ter o problema sem que o teste acuse.
+
+Os testes que usam um engine próprio devem sobrescrever a fixture
+engine_consultas para devolvê-lo.
+"""
+from contextlib import contextmanager
+from typing import List, Tuple
+
+import pytest
+
+from utils import metricas
+
+
+@pytest.fixture
+def engine_consultas():
+    """Engine cujas consultas são contadas (o da aplicação, por padrão)"""
+    from database.database import engine
+
+    return engine
+
+
+@pytest.fixture
+def limite_consultas(engine_consultas):
+    metricas.instrumentar_engine(engine_consultas)
+
+    @contextmanager
+    def limite(maximo: int, repeticoes: int = None):
+        requisicoes: List[Tuple[str, str, metricas.Medicao]] = []
+        with metricas.observar(lambda metodo, rota, medicao: requisicoes.append((metodo, rota, medicao))):
+            with metricas.medir() as direta:
+                yield requisicoes
+        falhas = []
+        medidas = requisicoes + ([("", "fora de requisição", direta)] if direta.consultas else [])
+        for metodo, rota, medicao in medidas:
+            if medicao.consultas > maximo:
+                falhas.append(f"{metodo} {rota}".strip() + f": {medicao.consultas} comandos SQL (máximo {maximo})")
+                relatorio = medicao.relatorio(repeticoes)
+                if relatorio:
+                    falhas.append(relatorio)
+        if falhas:
+            pytest.fail("\n".join(falhas), pytrace=False)
+
+    return limite
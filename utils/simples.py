@@ -1,10 +1,157 @@
-from typing import Optional, Tuple
-from datetime import date
+import threading
+from bisect import bisect_left, bisect_right
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from datetime import date, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from database.models import SimplesFaixa
 
 
+# ===== TABELA DE FAIXAS EM MEMÓRIA =====
+
+class FaixaSimples(NamedTuple):
+    """Dados imutáveis de uma faixa do Simples, independentes de sessão"""
+    id: int
+    limite_superior: float
+    aliquota: float
+    deducao: float
+    vigencia_inicio: date
+    vigencia_fim: Optional[date]
+    ordem: int
+
+
+class SimplesTabela:
+    """
+    Retrato imutável das faixas do Simples Nacional indexado por vigência.
+    
+    As datas de início e fim de vigência dividem o tempo em intervalos com o
+    mesmo conjunto de faixas vigentes; uma data é localizada no intervalo por
+    bisect e a faixa aplicável pelo limite superior, também por bisect.
+    """
+
+    def __init__(self, faixas: List[FaixaSimples], versao: int):
+        self.versao = versao
+        marcos = set()
+        for f in faixas:
+            marcos.add(f.vigencia_inicio)
+            if f.vigencia_fim is not None:
+                marcos.add(f.vigencia_fim + timedelta(days=1))
+        self._marcos = sorted(marcos)
+        self._intervalos: List[List[FaixaSimples]] = []
+        self._limites: List[List[float]] = []
+        for marco in self._marcos:
+            vigentes = sorted(
+                (f for f in faixas
+                 if f.vigencia_inicio <= marco and (f.vigencia_fim is None or f.vigencia_fim >= marco)),
+                key=lambda f: f.ordem
+            )
+            self._intervalos.append(vigentes)
+            self._limites.append([f.limite_superior for f in vigentes])
+
+    def _intervalo(self, data_ref: date) -> int:
+        return bisect_right(self._marcos, data_ref) - 1
+
+    def faixas_vigentes(self, data_ref: date) -> List[FaixaSimples]:
+        """Faixas vigentes na data, ordenadas por ordem"""
+        i = self._intervalo(data_ref)
+        return list(self._intervalos[i]) if i >= 0 else []
+
+    def faixa_inicial(self, data_ref: date) -> Optional[FaixaSimples]:
+        """Primeira faixa (menor ordem) vigente na data"""
+        i = self._intervalo(data_ref)
+        return self._intervalos[i][0] if i >= 0 and self._intervalos[i] else None
+
+    def resolver(self, receita_12m: float, data_ref: date) -> Tuple[float, float, float]:
+        """
+        Retorna (aliquota, deducao, aliquota_efetiva) para a receita de 12 meses.
+        
+        Raises:
+            ValueError: Se não houver faixas vigentes ou a receita exceder a última faixa
+        """
+        i = self._intervalo(data_ref)
+        faixas = self._intervalos[i] if i >= 0 else []
+        if not faixas:
+            raise ValueError("Nenhuma faixa do Simples Nacional configurada para a data de referência")
+        
+        limites = self._limites[i]
+        limite_max = faixas[-1].limite_superior
+        if receita_12m > limite_max:
+            raise ValueError(
+                f"Receita acumulada 12m (R$ {receita_12m:,.2f}) excede o limite "
+                f"do Simples Nacional (R$ {limite_max:,.2f})"
+            )
+        
+        # Primeira faixa com receita_12m <= limite_superior
+        j = bisect_left(limites, receita_12m)
+        faixa = faixas[j] if j < len(faixas) else faixas[-1]
+        return _aliquotas(faixa, receita_12m)
+
+    def resolver_meses(
+        self,
+        receitas_12m: Sequence[float],
+        datas_ref: Sequence[date],
+        padrao: Optional[Tuple[float, float, float]] = None
+    ) -> List[Optional[Tuple[float, float, float]]]:
+        """
+        Resolve vários meses numa chamada. Meses sem faixa vigente ou acima
+        do limite recebem `padrao` em vez de gerar ValueError.
+        """
+        resultado = []
+        for receita_12m, data_ref in zip(receitas_12m, datas_ref):
+            try:
+                resultado.append(self.resolver(receita_12m, data_ref))
+            except ValueError:
+                resultado.append(padrao)
+        return resultado
+
+
+def _aliquotas(faixa: FaixaSimples, receita_12m: float) -> Tuple[float, float, float]:
+    aliquota = faixa.aliquota
+    deducao = faixa.deducao
+    
+    # Alíquota efetiva = (Receita_12m × Alíquota - Dedução) / Receita_12m
+    if receita_12m > 0:
+        aliquota_efetiva = (receita_12m * aliquota - deducao) / receita_12m
+    else:
+        aliquota_efetiva = 0.0
+    
+    # Garantir que alíquota efetiva não seja negativa
+    return aliquota, deducao, max(0.0, aliquota_efetiva)
+
+
+_tabela_lock = threading.Lock()
+_tabela_versao = 0
+_tabela: Optional[SimplesTabela] = None
+
+
+def invalidar_tabela_simples() -> None:
+    """Descarta a tabela de faixas (recarregada no próximo acesso)"""
+    global _tabela, _tabela_versao
+    with _tabela_lock:
+        _tabela_versao += 1
+        _tabela = None
+
+
+def obter_tabela_simples(db: Session) -> SimplesTabela:
+    """Retorna a tabela vigente, carregando todas as faixas numa única consulta se necessário"""
+    global _tabela
+    tabela = _tabela
+    if tabela is not None:
+        return tabela
+
+    versao = _tabela_versao
+    f = SimplesFaixa
+    linhas = db.query(
+        f.id, f.limite_superior, f.aliquota, f.deducao,
+        f.vigencia_inicio, f.vigencia_fim, f.ordem
+    ).all()
+    tabela = SimplesTabela([FaixaSimples(*l) for l in linhas], versao)
+    with _tabela_lock:
+        # Só publica se ninguém invalidou durante a carga
+        if versao == _tabela_versao:
+            _tabela = tabela
+    return tabela
+
+
 def calcular_faixa_simples(
     receita_12m: float,
     data_ref: date,
@@ -19,52 +166,12 @@ def calcular_faixa_simples(
         db: Sessão do banco de dados
     
     Returns:
-        (aliquota, deducao, aliquota_efetiva, imposto)
+        (aliquota, deducao, aliquota_efetiva)
         
     Raises:
         ValueError: Se receita exceder 4.800.000,00 (fora do Simples)
     """
-    # Buscar faixas vigentes na data de referência, ordenadas por ordem
-    faixas = db.query(SimplesFaixa).filter(
-        SimplesFaixa.vigencia_inicio <= data_ref,
-        (SimplesFaixa.vigencia_fim.is_(None)) | (SimplesFaixa.vigencia_fim >= data_ref)
-    ).order_by(SimplesFaixa.ordem).all()
-    
-    if not faixas:
-        raise ValueError("Nenhuma faixa do Simples Nacional configurada para a data de referência")
-    
-    # Verificar se excede o limite máximo (última faixa)
-    limite_max = faixas[-1].limite_superior
-    if receita_12m > limite_max:
-        raise ValueError(
-            f"Receita acumulada 12m (R$ {receita_12m:,.2f}) excede o limite "
-            f"do Simples Nacional (R$ {limite_max:,.2f})"
-        )
-    
-    # Encontrar faixa aplicável
-    faixa_aplicavel = None
-    for faixa in faixas:
-        if receita_12m <= faixa.limite_superior:
-            faixa_aplicavel = faixa
-            break
-    
-    if not faixa_aplicavel:
-        # Fallback: usar última faixa se não encontrar (não deve ocorrer)
-        faixa_aplicavel = faixas[-1]
-    
-    aliquota = faixa_aplicavel.aliquota
-    deducao = faixa_aplicavel.deducao
-    
-    # Alíquota efetiva = (Receita_12m × Alíquota - Dedução) / Receita_12m
-    if receita_12m > 0:
-        aliquota_efetiva = (receita_12m * aliquota - deducao) / receita_12m
-    else:
-        aliquota_efetiva = 0.0
-    
-    # Garantir que alíquota efetiva não seja negativa
-    aliquota_efetiva = max(0.0, aliquota_efetiva)
-    
-    return aliquota, deducao, aliquota_efetiva
+    return obter_tabela_simples(db).resolver(receita_12m, data_ref)
 
 
 def calcular_imposto_simples(receita_bruta_mes: float, aliquota_efetiva: float) -> float:
@@ -122,6 +229,7 @@ def inicializar_faixas_simples(db: Session, data_vigencia: date) -> None:
         db.add(faixa)
     
     db.commit()
+    invalidar_tabela_simples()
     print(f"Faixas do Simples Nacional inicializadas com vigência a partir de {data_vigencia}")
 
 
@@ -129,6 +237,9 @@ def calcular_receita_12_meses(db: Session, data_ref: date) -> float:
     """
     Calcula a receita acumulada dos últimos 12 meses a partir da data de referência.
     
+    Lê as 12 linhas do resumo mensal (mês da data de referência e os 11
+    anteriores) em vez de somar as entradas.
+    
     Args:
         db: Sessão do banco de dados
         data_ref: Data de referência
@@ -136,19 +247,6 @@ def calcular_receita_12_meses(db: Session, data_ref: date) -> float:
     Returns:
         Receita acumulada dos últimos 12 meses
     """
-    from database.models import Entrada
-    from dateutil.relativedelta import relativedelta
-    from sqlalchemy import extract, and_
-    
-    # Data início: 12 meses antes da data de referência
-    data_inicio = data_ref - relativedelta(months=12)
-    
-    # Soma todas as entradas entre data_inicio e data_ref
-    total = db.query(func.sum(Entrada.valor)).filter(
-        and_(
-            Entrada.data >= data_inicio,
-            Entrada.data <= data_ref
-        )
-    ).scalar()
+    from database.crud_resumo_mensal import receita_12_meses, mes_da_data
     
-    return total if total else 0.0
+    return receita_12_meses(db, mes_da_data(data_ref))